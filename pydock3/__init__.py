@@ -0,0 +1,6 @@
+from importlib.metadata import version, PackageNotFoundError
+
+try:
+    __version__ = version("pydock3")
+except PackageNotFoundError:  # e.g., run from a source checkout without installing
+    __version__ = "unknown"
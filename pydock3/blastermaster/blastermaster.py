@@ -52,6 +52,8 @@ from pydock3.files import (
     INDOCK_FILE_NAME,
 )
 from pydock3.blastermaster.util import BLASTER_FILE_IDENTIFIER_TO_PROPER_BLASTER_FILE_NAME_DICT, WorkingDir, BlasterFiles
+from pydock3.blastermaster.executor import BlasterStepDAGExecutor
+from pydock3.blastermaster.cache import BlasterStepOutputsCache
 from pydock3.blastermaster import __file__ as BLASTERMASTER_INIT_FILE_PATH
 from pydock3.blastermaster.defaults import __file__ as DEFAULTS_INIT_FILE_PATH
 
@@ -495,6 +497,8 @@ class Blastermaster(Script):
         self,
         job_dir_path=".",
         config_file_path=None,
+        max_workers=None,
+        cache_dir_path=None,
         #use_graph_state=True,  # TODO
         #write_graph_image=False,  # TODO
     ):
@@ -551,10 +555,13 @@ class Blastermaster(Script):
             if not step.is_done:
                 step.step_dir.delete()
 
-        # run steps
-        logger.info("Running blaster steps in sequence.")
-        for step in steps:
-            step.run()
+        # run steps (independent steps run concurrently)
+        if cache_dir_path is not None:
+            logger.info(f"Using blaster step outputs cache: {cache_dir_path}")
+            cache = BlasterStepOutputsCache(cache_dir_path)
+        else:
+            cache = None
+        BlasterStepDAGExecutor(steps, max_workers=max_workers, cache=cache).run()
 
         # copy dock files to dock files directory
         logger.info("Copying dock files to dock files directory")
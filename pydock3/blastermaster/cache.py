@@ -0,0 +1,123 @@
+import os
+import json
+import logging
+import uuid
+import shutil
+
+from pydock3.util import get_hexdigest_of_persistent_md5_hash_of_tuple
+from pydock3.files import Dir, File, FileLock
+from pydock3.blastermaster.util import BlasterStep
+
+
+#
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+#
+CACHE_ENTRY_MANIFEST_FILE_NAME = "manifest.json"
+
+
+class BlasterStepOutputsCache(object):
+    """Content-addressed store of blaster step outfiles, shareable between jobs (e.g., different DockOpt jobs on the same receptor).
+
+    Each entry is keyed by a hash of the step class, its program file path, its parameters, and the *contents* of its
+    infiles, and holds the step's outfiles. Entries are materialized into the working dir by reflink or hardlink where
+    the file system allows it (copy otherwise). Cached files are made read-only since they may be hardlinked into
+    many working dirs.
+
+    Layout: `<cache_dir>/<first 2 chars of key>/<key>/<outfile step var name>`
+    """
+
+    def __init__(self, cache_dir_path: str):
+        self.cache_dir = Dir(path=cache_dir_path, create=True, reset=False)
+
+    @staticmethod
+    def get_step_key(step: BlasterStep) -> str:
+        """Returns the hash of the step class, program file path, parameters, and infile contents."""
+
+        #
+        infiles_dict_items_list = sorted(step.infiles._asdict().items())
+        parameters_dict_items_list = sorted(step.parameters._asdict().items())
+        outfile_step_var_names = sorted(step.outfiles._asdict().keys())
+
+        #
+        return get_hexdigest_of_persistent_md5_hash_of_tuple(
+            tuple(
+                [step.__class__.__name__, step.program_file.path if step.program_file is not None else None]
+                + [(parameter_step_var_name, parameter.hexdigest_of_persistent_md5_hash) for parameter_step_var_name, parameter in parameters_dict_items_list]
+                + [(infile_step_var_name, File.get_hexdigest_of_md5_hash_of_file_contents(infile.original_file_in_working_dir.path)) for infile_step_var_name, infile in infiles_dict_items_list]
+                + outfile_step_var_names
+            )
+        )
+
+    def get_entry_dir_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir.path, key[:2], key)
+
+    def has_entry(self, key: str) -> bool:
+        return Dir.dir_exists(self.get_entry_dir_path(key))
+
+    def _store(self, step: BlasterStep, key: str) -> None:
+        """Stores the outfiles of the (completed) step as a new entry. The entry appears atomically via rename."""
+
+        #
+        entry_dir_path = self.get_entry_dir_path(key)
+        temp_entry_dir = Dir(path=f"{entry_dir_path}.{uuid.uuid4()}.tmp", create=True, reset=True)
+        try:
+            for outfile_step_var_name, outfile in step.outfiles._asdict().items():
+                temp_file_path = os.path.join(temp_entry_dir.path, outfile_step_var_name)
+                File.clone_file(outfile.original_file_in_working_dir.path, temp_file_path)
+            with open(os.path.join(temp_entry_dir.path, CACHE_ENTRY_MANIFEST_FILE_NAME), "w") as f:
+                json.dump(
+                    {
+                        "step_class": step.__class__.__name__,
+                        "program_file_path": step.program_file.path if step.program_file is not None else None,
+                        "parameters": {parameter.name: str(parameter.value) for parameter in step.parameters},
+                        "infiles": {infile_step_var_name: infile.original_file_in_working_dir.name for infile_step_var_name, infile in step.infiles._asdict().items()},
+                        "outfiles": {outfile_step_var_name: outfile.original_file_in_working_dir.name for outfile_step_var_name, outfile in step.outfiles._asdict().items()},
+                    },
+                    f,
+                    indent=4,
+                )
+            for file_name in os.listdir(temp_entry_dir.path):
+                os.chmod(os.path.join(temp_entry_dir.path, file_name), 0o444)
+            os.rename(temp_entry_dir.path, entry_dir_path)
+        except Exception:
+            shutil.rmtree(temp_entry_dir.path, ignore_errors=True)
+            raise
+        logger.debug(f"Stored outfiles of {step.__class__.__name__} in cache entry {key}")
+
+    def _materialize(self, step: BlasterStep, key: str) -> None:
+        """Materializes the outfiles of the entry into the working dir."""
+
+        entry_dir_path = self.get_entry_dir_path(key)
+        for outfile_step_var_name, outfile in step.outfiles._asdict().items():
+            method = File.clone_file(
+                os.path.join(entry_dir_path, outfile_step_var_name),
+                outfile.original_file_in_working_dir.path,
+                overwrite=True,
+            )
+            logger.debug(f"Materialized {outfile.original_file_in_working_dir.name} from cache entry {key} via {method}")
+
+    def run_step(self, step: BlasterStep) -> None:
+        """Materializes the outfiles of the step from the cache if present. Otherwise, runs the step and stores its outfiles.
+
+        The lock on the entry is held while the step runs, so concurrent jobs needing the same entry wait for it rather
+        than duplicating the work."""
+
+        #
+        if step.is_done:
+            logger.debug(f"Skipping {step.__class__.__name__} since is_done=True")
+            return
+
+        #
+        key = self.get_step_key(step)
+        entry_dir_path = self.get_entry_dir_path(key)
+        Dir(path=os.path.dirname(entry_dir_path), create=True, reset=False)
+        with FileLock(entry_dir_path):
+            if self.has_entry(key):
+                outfiles_str = ', '.join([f.name for f in step.outfiles])
+                logger.info(f"Using cached outfiles for {step.__class__.__name__}: {outfiles_str}")
+                self._materialize(step, key)
+            else:
+                step.run()
+                self._store(step, key)
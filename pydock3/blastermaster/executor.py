@@ -0,0 +1,251 @@
+import os
+import sys
+import logging
+import threading
+from enum import Enum
+from typing import Callable, Iterable, List, Dict, Optional
+import multiprocessing
+from multiprocessing.connection import wait
+
+import networkx as nx
+
+from pydock3.files import FileLock
+from pydock3.blastermaster.util import BlasterStep
+from pydock3.blastermaster.cache import BlasterStepOutputsCache
+
+
+#
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+#
+SECONDS_BETWEEN_WORKER_CHECKS = 1.0
+
+
+class BlasterStepStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    ALREADY_DONE = "already_done"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    BLOCKED = "blocked"  # an upstream step failed
+
+
+def get_blaster_steps_dependency_graph(steps: Iterable[BlasterStep]) -> nx.DiGraph:
+    """Returns a graph with one node per step (keyed by step dir path) and an edge from each step to every step that consumes one of its outfiles."""
+
+    #
+    graph = nx.DiGraph()
+    outfile_path_to_step_key_dict = {}
+    for step in steps:
+        graph.add_node(step.step_dir.path, step=step)
+        for outfile in step.outfiles:
+            outfile_path = outfile.original_file_in_working_dir.path
+            if outfile_path in outfile_path_to_step_key_dict and outfile_path_to_step_key_dict[outfile_path] != step.step_dir.path:
+                raise Exception(f"Multiple blaster steps produce the same outfile: {outfile_path}")
+            outfile_path_to_step_key_dict[outfile_path] = step.step_dir.path
+
+    #
+    for step in steps:
+        for infile in step.infiles:
+            infile_path = infile.original_file_in_working_dir.path
+            if infile_path in outfile_path_to_step_key_dict:
+                graph.add_edge(outfile_path_to_step_key_dict[infile_path], step.step_dir.path)
+
+    #
+    if not nx.is_directed_acyclic_graph(graph):
+        raise Exception("Cycle found in blaster steps dependency graph!")
+
+    return graph
+
+
+def _run_step_with_outfiles_locked(step: BlasterStep, cache: Optional[BlasterStepOutputsCache] = None) -> None:
+    """Runs the step while holding the locks of its outfiles in the working dir, so that no other process produces the same outfiles concurrently.
+
+    If a cache is given, the outfiles are taken from it when possible and stored in it otherwise."""
+
+    locks = [FileLock(outfile.original_file_in_working_dir.path) for outfile in sorted(step.outfiles, key=lambda x: x.original_file_in_working_dir.path)]  # sorted to avoid deadlock
+    for lock in locks:
+        lock.acquire()
+    try:
+        # both skip if another process produced the outfiles while we waited on the locks
+        if cache is None:
+            step.run()
+        else:
+            cache.run_step(step)
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
+def _get_worker_process_context() -> multiprocessing.context.BaseContext:
+    """Forked workers inherit the steps, which therefore need not be pickled. But forking a process with other threads
+    running (e.g., the other targets of `dockopt batch`) can deadlock the child on a lock (logging, import, I/O) held by
+    one of them at the time of the fork, so in that case workers are started by a fork server instead."""
+
+    if threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("forkserver")
+
+
+def _run_step_in_worker_process(step: BlasterStep, cache: Optional[BlasterStepOutputsCache]) -> None:
+    if not logging.getLogger().handlers:  # not forked, so logging is not configured
+        logging.basicConfig(level=logging.INFO)
+    try:
+        _run_step_with_outfiles_locked(step, cache)
+    except Exception as e:
+        logger.exception(f"{step.__class__.__name__} failed (step dir: {step.step_dir.path}): {e}")
+        os._exit(1)
+    os._exit(0)
+
+
+class BlasterStepDAGExecutor(object):
+    """Runs blaster steps in dependency order, running independent steps concurrently in a bounded pool of local worker processes.
+
+    Steps whose outfiles already exist are skipped. If a step fails, every step downstream of it is blocked, the
+    remaining independent steps are still run, and an exception is raised at the end. If a cache is given, outfiles of
+    steps already run elsewhere with identical inputs are taken from it instead of running the step.
+
+    A callback may be passed to `run` in order to consume outfiles as soon as they are ready (see `outfile_is_ready`),
+    e.g. to submit docking jobs while other steps are still running. Optionally, steps may be given priorities (lower
+    runs first), e.g. so that the dock files of the most promising docking configurations are generated first."""
+
+    def __init__(
+            self,
+            steps: Iterable[BlasterStep],
+            max_workers: Optional[int] = None,
+            cache: Optional[BlasterStepOutputsCache] = None,
+            step_key_to_priority_dict: Optional[Dict[str, int]] = None,
+    ):
+        #
+        unique_steps = []
+        step_dir_paths = set()
+        for step in steps:
+            if step.step_dir.path not in step_dir_paths:
+                unique_steps.append(step)
+                step_dir_paths.add(step.step_dir.path)
+        self.steps = unique_steps
+
+        #
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 1:
+            raise Exception(f"`max_workers` must be a positive integer. Witnessed: {max_workers}")
+        self.max_workers = max_workers
+        self.cache = cache
+        self.step_key_to_priority_dict = step_key_to_priority_dict if step_key_to_priority_dict is not None else {}
+
+        #
+        self.graph = get_blaster_steps_dependency_graph(self.steps)
+        self.step_key_to_status_dict = {step_key: BlasterStepStatus.PENDING for step_key in self.graph.nodes}
+
+        # kept up to date as steps finish (see `_set_status`), so that finding the ready steps needs no graph traversal
+        self.step_key_to_topological_index_dict = {step_key: i for i, step_key in enumerate(nx.topological_sort(self.graph))}
+        self.step_key_to_num_unfinished_predecessors_dict = {step_key: self.graph.in_degree(step_key) for step_key in self.graph.nodes}
+        self.ready_step_keys = {step_key for step_key, num in self.step_key_to_num_unfinished_predecessors_dict.items() if num == 0}
+
+        #
+        self.outfile_path_to_step_key_dict = {outfile.original_file_in_working_dir.path: step.step_dir.path for step in self.steps for outfile in step.outfiles}
+
+    def outfile_is_ready(self, file_path: str) -> bool:
+        """Whether the file (in the working dir) is not produced by any of the steps or was produced by a step that is done."""
+
+        if file_path not in self.outfile_path_to_step_key_dict:
+            return True
+        return self.step_key_to_status_dict[self.outfile_path_to_step_key_dict[file_path]] in (BlasterStepStatus.SUCCEEDED, BlasterStepStatus.ALREADY_DONE)
+
+    def _set_status(self, step_key: str, status: BlasterStepStatus) -> None:
+        was_finished = self.step_key_to_status_dict[step_key] in (BlasterStepStatus.SUCCEEDED, BlasterStepStatus.ALREADY_DONE)
+        self.step_key_to_status_dict[step_key] = status
+        if status != BlasterStepStatus.PENDING:
+            self.ready_step_keys.discard(step_key)
+        if status in (BlasterStepStatus.SUCCEEDED, BlasterStepStatus.ALREADY_DONE) and not was_finished:
+            for successor_step_key in self.graph.successors(step_key):
+                self.step_key_to_num_unfinished_predecessors_dict[successor_step_key] -= 1
+                if self.step_key_to_num_unfinished_predecessors_dict[successor_step_key] == 0 and self.step_key_to_status_dict[successor_step_key] == BlasterStepStatus.PENDING:
+                    self.ready_step_keys.add(successor_step_key)
+        step = self.graph.nodes[step_key]['step']
+        logger.debug(f"{step.__class__.__name__} ({os.path.basename(step_key)}): {status.value}")
+
+    def _block_descendants(self, step_key: str) -> None:
+        for descendant_step_key in nx.descendants(self.graph, step_key):
+            if self.step_key_to_status_dict[descendant_step_key] == BlasterStepStatus.PENDING:
+                self._set_status(descendant_step_key, BlasterStepStatus.BLOCKED)
+
+    def _get_ready_step_keys(self) -> List[str]:
+        ready_step_keys = sorted(self.ready_step_keys, key=lambda step_key: self.step_key_to_topological_index_dict[step_key])
+        if self.step_key_to_priority_dict:  # lower runs first; ties keep topological order
+            ready_step_keys = sorted(ready_step_keys, key=lambda step_key: self.step_key_to_priority_dict.get(step_key, sys.maxsize))
+        return ready_step_keys
+
+    def run(self, on_steps_finished: Optional[Callable[[], None]] = None) -> Dict[str, BlasterStepStatus]:
+        """Run all steps. Returns a dict mapping each step dir path to the status of its step.
+
+        If given, `on_steps_finished` is called (in this process) whenever one or more steps have finished, as well as
+        once before any step is run."""
+
+        #
+        for step_key in self.graph.nodes:
+            if self.graph.nodes[step_key]['step'].is_done:
+                self._set_status(step_key, BlasterStepStatus.ALREADY_DONE)
+        num_steps_to_run = list(self.step_key_to_status_dict.values()).count(BlasterStepStatus.PENDING)
+        logger.info(f"Running {num_steps_to_run} blaster steps using up to {self.max_workers} worker processes.")
+        if on_steps_finished is not None:
+            on_steps_finished()
+
+        #
+        context = _get_worker_process_context()
+        sentinel_to_step_key_and_process_dict = {}
+        while True:
+            # start as many ready steps as there are free workers
+            for step_key in self._get_ready_step_keys():
+                if len(sentinel_to_step_key_and_process_dict) >= self.max_workers:
+                    break
+                step = self.graph.nodes[step_key]['step']
+                if self.max_workers == 1:  # no need for worker processes
+                    self._set_status(step_key, BlasterStepStatus.RUNNING)
+                    try:
+                        _run_step_with_outfiles_locked(step, self.cache)
+                        self._set_status(step_key, BlasterStepStatus.SUCCEEDED)
+                    except Exception as e:
+                        logger.exception(f"{step.__class__.__name__} failed (step dir: {step.step_dir.path}): {e}")
+                        self._set_status(step_key, BlasterStepStatus.FAILED)
+                        self._block_descendants(step_key)
+                    if on_steps_finished is not None:
+                        on_steps_finished()
+                    break  # re-evaluate which steps are ready
+                process = context.Process(target=_run_step_in_worker_process, args=(step, self.cache))
+                process.start()
+                sentinel_to_step_key_and_process_dict[process.sentinel] = (step_key, process)
+                self._set_status(step_key, BlasterStepStatus.RUNNING)
+
+            #
+            if not sentinel_to_step_key_and_process_dict:
+                if not self._get_ready_step_keys():
+                    break
+                continue
+
+            # wait for at least one worker to finish
+            finished_sentinels = wait(list(sentinel_to_step_key_and_process_dict.keys()), timeout=SECONDS_BETWEEN_WORKER_CHECKS)
+            for sentinel in finished_sentinels:
+                step_key, process = sentinel_to_step_key_and_process_dict.pop(sentinel)
+                process.join()
+                if process.exitcode == 0 and self.graph.nodes[step_key]['step'].is_done:
+                    self._set_status(step_key, BlasterStepStatus.SUCCEEDED)
+                else:
+                    self._set_status(step_key, BlasterStepStatus.FAILED)
+                    self._block_descendants(step_key)
+            if finished_sentinels and on_steps_finished is not None:
+                on_steps_finished()
+
+        #
+        status_to_step_keys_dict = {status: [key for key, s in self.step_key_to_status_dict.items() if s == status] for status in BlasterStepStatus}
+        logger.info("Blaster step statuses:\n\t" + "\n\t".join([f"{status.value}: {len(step_keys)}" for status, step_keys in status_to_step_keys_dict.items() if step_keys]))
+
+        #
+        failed_step_keys = status_to_step_keys_dict[BlasterStepStatus.FAILED]
+        if failed_step_keys:
+            failed_steps_str = "\n\t".join(failed_step_keys)
+            raise Exception(f"{len(failed_step_keys)} blaster step(s) failed (with {len(status_to_step_keys_dict[BlasterStepStatus.BLOCKED])} downstream step(s) blocked). See logs in step dirs:\n\t{failed_steps_str}")
+
+        return self.step_key_to_status_dict
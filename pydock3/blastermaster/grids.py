@@ -0,0 +1,256 @@
+import os
+import struct
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from pydock3.files import File
+from pydock3.blastermaster import phi
+from pydock3.blastermaster.steps.vdw import VDWScoringGridGenerationStep
+
+
+#
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# DOCK 3.8 grid formats (see the sources of the programs that write them under `blastermaster/programs/`):
+#   vdw.vdw (chemgrid): fortran unformatted (big-endian, as the bundled chemgrid writes it), one record of a (repulsive)
+#       values & one of b (attractive) values
+#   vdw.bmp (chemgrid): formatted, label line, (4F8.3, 3I4) spacing, origin & points per side, then (80A1) bump chars
+#   ligand.desolv.* (solvmap): formatted, (4(i4,2x),3(f8.3,1x)) max indices, points per angstrom & max corner (in grid
+#       units), then (13f6.3) values
+#   *.phi (qnifft): see `phi.py`
+# chemgrid grids are stored x-fastest (fortran order); solvmap grids are stored z-fastest. Every array returned here is
+# indexed [x, y, z].
+VDW_RECORD_MARKER_NUM_BYTES = 4
+VDW_DTYPE = np.dtype("f4")
+BUMP_MAP_LABEL = "bump map         "
+BUMP_MAP_NUM_CHARS_PER_LINE = 80
+SOLVMAP_NUM_VALUES_PER_LINE = 13
+SOLVMAP_NUM_CHARS_PER_VALUE = 6
+SOLVMAP_DTYPE = np.dtype("f4")
+
+# INDOCK keys of grid files -> names of grids read from them
+INDOCK_KEY_TO_GRID_NAMES_DICT = {
+    "chemgrid_file": ("vdw_a", "vdw_b"),
+    "bumpmap_file": ("bump_map",),
+    "solvmap_file": ("heavy_atom_desolvation",),
+    "hydrogen_solvmap_file": ("hydrogen_desolvation",),
+    "delphi_file": ("electrostatics",),
+}
+
+
+@dataclass
+class GridGeometry:
+    origin: Tuple[float, float, float]  # coordinates of grid point [0, 0, 0]
+    spacing: float  # angstroms between neighboring grid points
+    shape: Tuple[int, int, int]  # number of grid points along x, y, z
+
+    @property
+    def num_points(self) -> int:
+        return int(np.prod(self.shape))
+
+    def get_coordinates_of_indices(self, indices: np.ndarray) -> np.ndarray:
+        return np.asarray(self.origin) + (np.asarray(indices) * self.spacing)
+
+    def get_fractional_indices_of_coordinates(self, coordinates: np.ndarray) -> np.ndarray:
+        return (np.asarray(coordinates) - np.asarray(self.origin)) / self.spacing
+
+    @classmethod
+    def from_box_file(cls, box_file_path: str, spacing: float = VDWScoringGridGenerationStep.GRID_SPACING) -> "GridGeometry":
+        """Geometry of the grid chemgrid lays over the box (origin at the min corner, sides rounded up)."""
+
+        _, center, dimensions = phi.read_box_file(File(path=box_file_path))
+        if len(center) != 3 or len(dimensions) != 3:
+            raise Exception(f"Box file is missing CENTER or DIMENSIONS: {box_file_path}")
+
+        # single precision, as in chemgrid, so that the number of points per side is rounded the same way
+        center, dimensions, spacing_32 = np.float32(center), np.float32(dimensions), np.float32(spacing)
+        origin = center - (dimensions / np.float32(2.0))
+        shape = (dimensions / spacing_32 + np.float32(1.0)).astype(int) + 1
+
+        return cls(origin=tuple(float(x) for x in origin), spacing=spacing, shape=tuple(int(n) for n in shape))
+
+    @classmethod
+    def from_bump_map_file(cls, bump_map_file_path: str) -> "GridGeometry":
+        with open(bump_map_file_path, "r") as f:
+            _ = f.readline()
+            return cls._from_bump_map_header_line(f.readline())
+
+    @classmethod
+    def _from_bump_map_header_line(cls, line: str) -> "GridGeometry":
+        # (4F8.3, 3I4)
+        floats = [float(line[i: i + 8]) for i in range(0, 32, 8)]
+        ints = [int(line[i: i + 4]) for i in range(32, 44, 4)]
+        return cls(origin=tuple(floats[1:]), spacing=floats[0], shape=tuple(ints))
+
+
+@dataclass(eq=False)
+class Grid:
+    geometry: GridGeometry
+    values: np.ndarray  # indexed [x, y, z]
+
+    def __post_init__(self):
+        if tuple(self.values.shape) != tuple(self.geometry.shape):
+            raise Exception(f"Grid values of shape {self.values.shape} do not match geometry of shape {self.geometry.shape}")
+
+
+def _read_lines_without_newlines(file_path: str, num_header_lines: int) -> Tuple[list, bytes]:
+    with open(file_path, "rb") as f:
+        data = f.read()
+    parts = data.split(b"\n", num_header_lines)
+    if len(parts) <= num_header_lines:
+        raise Exception(f"Grid file is missing its header: {file_path}")
+    header_lines = [part.decode() for part in parts[:num_header_lines]]
+    body = parts[num_header_lines].replace(b"\r", b"").replace(b"\n", b"")
+    return header_lines, body
+
+
+def read_vdw_file(vdw_file_path: str, geometry: GridGeometry) -> Tuple[Grid, Grid]:
+    """Returns the a (repulsive) & b (attractive) vdw grids, memory-mapped from the file.
+
+    `geometry` comes from the bump map written alongside (`GridGeometry.from_bump_map_file`) or from the box file
+    (`GridGeometry.from_box_file`). The byte order is detected from the fortran record markers."""
+
+    num_bytes_per_record = geometry.num_points * VDW_DTYPE.itemsize
+    with open(vdw_file_path, "rb") as f:
+        first_marker = f.read(VDW_RECORD_MARKER_NUM_BYTES)
+    for byte_order in ["<", ">"]:
+        if len(first_marker) == VDW_RECORD_MARKER_NUM_BYTES and struct.unpack(f"{byte_order}i", first_marker)[0] == num_bytes_per_record:
+            break
+    else:
+        raise Exception(f"vdw file does not hold grids of {geometry.num_points} points: {vdw_file_path}")
+    expected_file_size = 2 * (num_bytes_per_record + (2 * VDW_RECORD_MARKER_NUM_BYTES))
+    if os.path.getsize(vdw_file_path) != expected_file_size:
+        raise Exception(f"vdw file is {os.path.getsize(vdw_file_path)} bytes, expected {expected_file_size}: {vdw_file_path}")
+
+    #
+    grids = []
+    dtype = VDW_DTYPE.newbyteorder(byte_order)
+    for record_num in range(2):
+        offset = (record_num * (num_bytes_per_record + (2 * VDW_RECORD_MARKER_NUM_BYTES))) + VDW_RECORD_MARKER_NUM_BYTES
+        values = np.memmap(vdw_file_path, dtype=dtype, mode="r", offset=offset, shape=geometry.shape, order="F")
+        grids.append(Grid(geometry=geometry, values=values))
+
+    return grids[0], grids[1]
+
+
+def write_vdw_file(vdw_file_path: str, a_grid: Grid, b_grid: Grid, byte_order: str = ">") -> None:
+    dtype = VDW_DTYPE.newbyteorder(byte_order)
+    with open(vdw_file_path, "wb") as f:
+        for grid in [a_grid, b_grid]:
+            values = np.asarray(grid.values, dtype=dtype).ravel(order="F")
+            marker = struct.pack(f"{byte_order}i", values.nbytes)
+            f.write(marker)
+            values.tofile(f)
+            f.write(marker)
+
+
+def read_bump_map_file(bump_map_file_path: str) -> Grid:
+    """Returns the bump map as single characters: F (no bump), T (bump) & X (too close to a receptor atom)."""
+
+    (_, header_line), body = _read_lines_without_newlines(bump_map_file_path, num_header_lines=2)
+    geometry = GridGeometry._from_bump_map_header_line(header_line)
+    if len(body) != geometry.num_points:
+        raise Exception(f"Bump map has {len(body)} points, expected {geometry.num_points}: {bump_map_file_path}")
+    values = np.frombuffer(body, dtype="S1").reshape(geometry.shape, order="F")
+
+    return Grid(geometry=geometry, values=values)
+
+
+def write_bump_map_file(bump_map_file_path: str, grid: Grid) -> None:
+    geometry = grid.geometry
+    body = np.asarray(grid.values, dtype="S1").ravel(order="F").tobytes()
+    with open(bump_map_file_path, "w") as f:
+        f.write(f"{BUMP_MAP_LABEL}\n")
+        f.write("".join([f"{x:8.3f}" for x in [geometry.spacing, *geometry.origin]]) + "".join([f"{n:4d}" for n in geometry.shape]) + "\n")
+        for i in range(0, len(body), BUMP_MAP_NUM_CHARS_PER_LINE):
+            f.write(body[i: i + BUMP_MAP_NUM_CHARS_PER_LINE].decode() + "\n")
+
+
+def read_solvmap_file(solvmap_file_path: str) -> Grid:
+    """Returns the ligand desolvation grid (fraction of each grid point's solvent that a ligand atom there would displace)."""
+
+    (header_line,), body = _read_lines_without_newlines(solvmap_file_path, num_header_lines=1)
+    tokens = header_line.split()
+    max_indices = [int(token) for token in tokens[:3]]
+    num_points_per_angstrom = int(tokens[3])
+    max_corner = [float(token) / num_points_per_angstrom for token in tokens[4:7]]
+    spacing = 1.0 / num_points_per_angstrom
+    geometry = GridGeometry(
+        origin=tuple(x - (n * spacing) for x, n in zip(max_corner, max_indices)),
+        spacing=spacing,
+        shape=tuple(n + 1 for n in max_indices),
+    )
+
+    # fixed-width values, which may run into each other, so parse by width not by whitespace
+    if len(body) != geometry.num_points * SOLVMAP_NUM_CHARS_PER_VALUE:
+        raise Exception(f"solvmap file has {len(body) // SOLVMAP_NUM_CHARS_PER_VALUE} points, expected {geometry.num_points}: {solvmap_file_path}")
+    values = np.frombuffer(body, dtype=f"S{SOLVMAP_NUM_CHARS_PER_VALUE}").astype(SOLVMAP_DTYPE).reshape(geometry.shape)
+
+    return Grid(geometry=geometry, values=values)
+
+
+def write_solvmap_file(solvmap_file_path: str, grid: Grid) -> None:
+    geometry = grid.geometry
+    num_points_per_angstrom = int(round(1.0 / geometry.spacing))
+    max_indices = [n - 1 for n in geometry.shape]
+    max_corner = [(x + (n * geometry.spacing)) * num_points_per_angstrom for x, n in zip(geometry.origin, max_indices)]
+    values = np.asarray(grid.values, dtype=SOLVMAP_DTYPE).reshape(-1, geometry.shape[2])  # one row per (x, y)
+    with open(solvmap_file_path, "w") as f:
+        f.write("".join([f"{n:4d}  " for n in [*max_indices, num_points_per_angstrom]]) + " ".join([f"{x:8.3f}" for x in max_corner]) + "\n")
+        for row in values:
+            for i in range(0, len(row), SOLVMAP_NUM_VALUES_PER_LINE):
+                f.write("".join([f"{x:6.3f}" for x in row[i: i + SOLVMAP_NUM_VALUES_PER_LINE]]) + "\n")
+
+
+def read_phi_file(phi_file_path: str) -> Grid:
+    """Returns the electrostatics grid, memory-mapped from the (e.g., trimmed) phimap."""
+
+    phi_data = phi.Phi(File(path=phi_file_path))
+    grid_size = phi_data.grid_dimension
+    mins, _ = phi_data.get_mins_maxs()
+    geometry = GridGeometry(origin=tuple(mins), spacing=1.0 / phi_data.scale, shape=(grid_size,) * 3)
+
+    return Grid(geometry=geometry, values=np.reshape(phi_data.phi_array, geometry.shape, order="F"))
+
+
+def read_grids_from_indock_file(indock_file_path: str, box_file_path: Optional[str] = None, base_dir_path: Optional[str] = None) -> Dict[str, Grid]:
+    """Reads every grid the INDOCK file points to. Relative paths are relative to `base_dir_path`, i.e. the dir DOCK
+    runs in (e.g., `working/` of a retrodock task, for the `../dockfiles/<name>` paths of INDOCK files written by
+    DockOpt), which defaults to the INDOCK file's dir.
+
+    The vdw grids take their geometry from the bump map, or from `box_file_path` if given."""
+
+    if base_dir_path is None:
+        base_dir_path = os.path.dirname(indock_file_path)
+    base_dir_path = os.path.abspath(base_dir_path)
+    indock_key_to_file_path_dict = {}
+    with open(indock_file_path, "r") as f:
+        for line in f:
+            tokens = line.split()
+            if len(tokens) >= 2 and tokens[0] in INDOCK_KEY_TO_GRID_NAMES_DICT and tokens[1] != "0":  # 0: implicitly zero grid
+                indock_key_to_file_path_dict[tokens[0]] = os.path.normpath(os.path.join(base_dir_path, tokens[1]))  # normalized since the base dir need not exist
+
+    #
+    grid_name_to_grid_dict = {}
+    if "bumpmap_file" in indock_key_to_file_path_dict:
+        grid_name_to_grid_dict["bump_map"] = read_bump_map_file(indock_key_to_file_path_dict["bumpmap_file"])
+    if "chemgrid_file" in indock_key_to_file_path_dict:
+        if box_file_path is not None:
+            vdw_geometry = GridGeometry.from_box_file(box_file_path)
+        elif "bump_map" in grid_name_to_grid_dict:
+            vdw_geometry = grid_name_to_grid_dict["bump_map"].geometry
+        else:
+            raise Exception(f"INDOCK file has no bumpmap_file to take the geometry of the vdw grids from. Pass box_file_path: {indock_file_path}")
+        grid_name_to_grid_dict["vdw_a"], grid_name_to_grid_dict["vdw_b"] = read_vdw_file(indock_key_to_file_path_dict["chemgrid_file"], vdw_geometry)
+    for indock_key in ["solvmap_file", "hydrogen_solvmap_file"]:
+        if indock_key in indock_key_to_file_path_dict:
+            grid_name, = INDOCK_KEY_TO_GRID_NAMES_DICT[indock_key]
+            grid_name_to_grid_dict[grid_name] = read_solvmap_file(indock_key_to_file_path_dict[indock_key])
+    if "delphi_file" in indock_key_to_file_path_dict:
+        grid_name_to_grid_dict["electrostatics"] = read_phi_file(indock_key_to_file_path_dict["delphi_file"])
+
+    return grid_name_to_grid_dict
@@ -1,7 +1,8 @@
-import collections
 import copy
 import logging
 
+import numpy as np
+
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -59,8 +60,239 @@ def read_radii_file(radii_file_path):
     return name_radius
 
 
+ATOM_RECORD_NAMES = ("ATOM", "HETATM")
+
+# columns [start, end) of the fields of ATOM / HETATM records
+PDB_ATOM_FIELD_SLICES = {
+    "record_name": (0, 6),
+    "serial": (6, 11),
+    "atom_name": (12, 16),
+    "alt_loc": (16, 17),
+    "residue_name": (17, 20),
+    "chain_id": (21, 22),
+    "residue_num": (22, 26),
+    "insertion_code": (26, 27),
+    "x": (30, 38),
+    "y": (38, 46),
+    "z": (46, 54),
+    "occupancy": (54, 60),
+    "b_factor": (60, 66),
+    "element": (76, 78),
+}
+PDB_ATOM_DTYPE = np.dtype(
+    [
+        ("record_name", "U6"),
+        ("serial", "U5"),
+        ("atom_name", "U4"),
+        ("alt_loc", "U1"),
+        ("residue_name", "U3"),
+        ("chain_id", "U1"),
+        ("residue_num", "i8"),
+        ("insertion_code", "U1"),
+        ("x", "f8"),
+        ("y", "f8"),
+        ("z", "f8"),
+        ("occupancy", "f8"),
+        ("b_factor", "f8"),
+        ("element", "U2"),
+    ]
+)
+
+
+def read_pdb_file_lines(pdb_file_path):
+    with open(pdb_file_path, "r") as f:
+        return f.readlines()
+
+
+def write_pdb_file_lines(pdb_file_path, lines):
+    """writes the lines, skipping empty ones & ending each with a newline"""
+    with open(pdb_file_path, "w") as f:
+        f.write("".join([line if line.endswith("\n") else line + "\n" for line in lines if line]))
+
+
+def get_char_array_of_lines(lines):
+    """returns the lines as a 2D array of characters, one row per line (padded with null characters)"""
+    lines_array = np.array(lines, dtype=str).reshape(-1)
+    width = lines_array.dtype.itemsize // np.dtype("U1").itemsize
+    return lines_array.view("U1").reshape(len(lines_array), width)
+
+
+def get_padded_char_array(chars, width):
+    if chars.shape[1] >= width:
+        return chars
+    return np.concatenate([chars, np.full((chars.shape[0], width - chars.shape[1]), "", dtype="U1")], axis=1)
+
+
+def parse_floats(strs):
+    """parses each string as `float` would. returns the values (NaN where a string is not a float) & which are valid"""
+    strs = np.asarray(strs, dtype=str)
+    try:
+        return strs.astype(np.float64), np.ones(strs.shape, dtype=bool)
+    except ValueError:
+        pass
+    values, is_valid = [], []
+    for s in strs.tolist():
+        try:
+            values.append(float(s))
+            is_valid.append(True)
+        except ValueError:
+            values.append(np.nan)
+            is_valid.append(False)
+    return np.array(values, dtype=np.float64), np.array(is_valid, dtype=bool)
+
+
+def parse_floats_or_raise(strs):
+    values, is_valid = parse_floats(strs)
+    if not np.all(is_valid):
+        float(np.asarray(strs, dtype=str)[~is_valid][0])  # raises the same error as `float`
+    return values
+
+
+def parse_ints(strs):
+    """parses each string as `int` would, raising ValueError if one is not an int"""
+    strs = np.asarray(strs, dtype=str)
+    try:
+        return strs.astype(np.int64)
+    except ValueError:
+        return np.array([int(s) for s in strs.tolist()], dtype=np.int64)
+
+
+def get_is_in(values, container):
+    """returns whether each value is `in` the container (e.g. a list of residue numbers), with python's semantics"""
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.zeros(0, dtype=bool)
+    unique_values, inverse = np.unique(values, return_inverse=True)
+    return np.array([value in container for value in unique_values.tolist()], dtype=bool)[inverse.reshape(-1)]
+
+
+def get_group_ids(*key_arrays):
+    """returns the id of the group of each element, elements being in the same group if all their keys are equal"""
+    if len(key_arrays[0]) == 0:
+        return np.zeros(0, dtype=np.int64)
+    key_ids = np.column_stack([np.unique(keys, return_inverse=True)[1].reshape(-1) for keys in key_arrays])
+    return np.unique(key_ids, axis=0, return_inverse=True)[1].reshape(-1)
+
+
+def get_index_groups(*key_arrays):
+    """returns lists of the indices of elements with equal keys, ordered by first appearance"""
+    group_ids = get_group_ids(*key_arrays)
+    order = np.argsort(group_ids, kind="stable")
+    groups = np.split(order, np.flatnonzero(np.diff(group_ids[order])) + 1) if len(order) > 0 else []
+    return sorted([group.tolist() for group in groups], key=lambda group: group[0])
+
+
+class PDBAtomRecords(object):
+    """lines of pdb records as a 2D array of characters (one row per line), so that fixed-width fields can be parsed
+    & edited column-wise. lines are written back exactly as read, apart from edited fields."""
+
+    def __init__(self, lines=()):
+        self.chars = get_char_array_of_lines(list(lines))
+
+    @classmethod
+    def from_char_array(cls, chars):
+        records = cls()
+        records.chars = chars
+        return records
+
+    @classmethod
+    def read(cls, pdb_file_path, record_names=ATOM_RECORD_NAMES):
+        records = cls(read_pdb_file_lines(pdb_file_path))
+        return records[records.get_is_record(record_names)]
+
+    @classmethod
+    def concatenate(cls, records_list):
+        width = max([records.chars.shape[1] for records in records_list])
+        return cls.from_char_array(
+            np.concatenate([get_padded_char_array(records.chars, width) for records in records_list], axis=0)
+        )
+
+    def __len__(self):
+        return self.chars.shape[0]
+
+    def __getitem__(self, key):
+        """selects lines by boolean mask, indices or slice"""
+        return PDBAtomRecords.from_char_array(self.chars[key].reshape(-1, self.chars.shape[1]))
+
+    def copy(self):
+        return PDBAtomRecords.from_char_array(self.chars.copy())
+
+    def get_lines_array(self):
+        return np.ascontiguousarray(self.chars).view(f"U{self.chars.shape[1]}").reshape(-1)
+
+    def get_lines(self):
+        return self.get_lines_array().tolist()
+
+    def get_line_lengths(self):
+        return np.char.str_len(self.get_lines_array())
+
+    def get_is_record(self, record_names):
+        lines_array = self.get_lines_array()
+        is_record = np.zeros(len(self), dtype=bool)
+        for record_name in record_names:
+            is_record |= np.char.startswith(lines_array, record_name)
+        return is_record
+
+    def get_field(self, start, end):
+        """returns `line[start:end]` of each line"""
+        end = min(end, self.chars.shape[1])
+        if start >= end:
+            return np.full(len(self), "", dtype="U1")
+        return np.ascontiguousarray(self.chars[:, start:end]).view(f"U{end - start}").reshape(-1)
+
+    def get_coords(self):
+        return np.column_stack(
+            [parse_floats_or_raise(self.get_field(*PDB_ATOM_FIELD_SLICES[field_name])) for field_name in ["x", "y", "z"]]
+        ).reshape(-1, 3)
+
+    def get_atoms_array(self):
+        """returns the fields of the ATOM / HETATM records as a structured array (NaN for missing floats)"""
+        atoms_array = np.zeros(len(self), dtype=PDB_ATOM_DTYPE)
+        for field_name, (start, end) in PDB_ATOM_FIELD_SLICES.items():
+            field_strs = self.get_field(start, end)
+            if field_name in ["x", "y", "z"]:
+                atoms_array[field_name] = parse_floats_or_raise(field_strs)
+            elif field_name in ["occupancy", "b_factor"]:
+                atoms_array[field_name] = parse_floats(field_strs)[0]
+            elif field_name == "residue_num":
+                atoms_array[field_name] = parse_ints(field_strs)
+            else:
+                atoms_array[field_name] = field_strs
+        return atoms_array
+
+    def set_lines(self, indices, lines):
+        new_chars = get_char_array_of_lines(list(lines))
+        width = max(self.chars.shape[1], new_chars.shape[1])
+        self.chars = get_padded_char_array(self.chars, width)
+        self.chars[np.asarray(indices, dtype=np.int64)] = get_padded_char_array(new_chars, width)
+
+    def set_field(self, start, end, values, indices=None):
+        """replaces each line (or those at `indices`) with `line[:start] + value + line[end:]`, for one value or one
+        value per line"""
+        if indices is None:
+            indices = np.arange(len(self))
+        indices = np.array(indices, dtype=np.int64).reshape(-1)
+        values = np.broadcast_to(np.asarray(values, dtype=str), indices.shape)
+
+        # fields of the same width as the values are replaced in place
+        is_in_place = (np.char.str_len(values) == end - start) & (self.get_line_lengths()[indices] >= end)
+        if end > start and np.any(is_in_place):
+            self.chars[indices[is_in_place], start:end] = (
+                np.ascontiguousarray(values[is_in_place]).astype(f"U{end - start}").view("U1").reshape(-1, end - start)
+            )
+        if not np.all(is_in_place):
+            lines = self[indices[~is_in_place]].get_lines()
+            self.set_lines(
+                indices[~is_in_place],
+                [line[:start] + value + line[end:] for line, value in zip(lines, values[~is_in_place].tolist())],
+            )
+
+    def write(self, pdb_file_path):
+        write_pdb_file_lines(pdb_file_path, self.get_lines())
+
+
 class PDBData(object):
-    """stores data for a pdb file consisting of atoms"""
+    """stores data for a pdb file consisting of atoms, as numpy columns (one row per atom)"""
 
     def __init__(
         self,
@@ -78,113 +310,120 @@ class PDBData(object):
                 atom_to_radius_dict_file_path
             )  # override the defaults
         self.__non_zero_radii_count = 0
-        self.raw_data = []
-        self.coords = []
-        self.radii = []
+        self.atom_records = PDBAtomRecords()  # raw lines
+        self.is_removed = np.zeros(0, dtype=bool)
+        self.coords = np.zeros((0, 3), dtype=np.float64)
+        self.radii = np.zeros(0, dtype=np.float64)
         self.charges = []
         self.hydro_charges = []
-        self.factors = []
-        self.atoms = []
-        self.residue_nums = []
-        self.residue_names = []
-        self.alt_chars = []
-        self.chains = []
-        self.model_nums = []  # keeps track of NMR models if present
-        self.atom_to_raw = {}
-        self.raw_to_atom = {}
+        self.factors = np.zeros((0, 2), dtype=np.float64)
+        self.atoms = np.zeros(0, dtype="U4")
+        self.residue_nums = np.zeros(0, dtype=np.int64)
+        self.residue_names = np.zeros(0, dtype="U3")
+        self.alt_chars = np.zeros(0, dtype="U1")
+        self.chains = np.zeros(0, dtype="U1")
+        self.model_nums = np.zeros(0, dtype=np.int64)  # keeps track of NMR models if present
         self.ignore_waters = ignore_waters
         if pdb_file_path is not None:
-            with open(pdb_file_path, "r") as f:
-                model_num = 0
-                for line in f.readlines():
-                    if line.startswith("MODEL"):
-                        try:
-                            model_num = int(
-                                line.split()[1]
-                            )  # [0] is MODEL, [1] is the number
-                        except IndexError:
-                            model_num = 0
-                    if not het_only or line.startswith("HETATM"):
-                        self.process_line(line, atom_to_radius_dict, model_num)
+            records = PDBAtomRecords(read_pdb_file_lines(pdb_file_path))
+
+            # model number of each line is that of the last MODEL line before it
+            model_line_indices = np.flatnonzero(records.get_is_record(["MODEL"]))
+            model_line_model_nums = []
+            for line in records[model_line_indices].get_lines():
+                try:
+                    model_line_model_nums.append(int(line.split()[1]))  # [0] is MODEL, [1] is the number
+                except IndexError:
+                    model_line_model_nums.append(0)
+            last_model_line_positions = np.searchsorted(model_line_indices, np.arange(len(records)), side="right") - 1
+            model_nums = np.where(
+                last_model_line_positions >= 0,
+                np.array(model_line_model_nums + [0], dtype=np.int64)[last_model_line_positions],
+                0,
+            )
+
+            #
+            is_atom = records.get_is_record(["HETATM"] if het_only else ATOM_RECORD_NAMES)
+            self.add_atom_records(records[is_atom], atom_to_radius_dict, model_nums[is_atom])
+
+    def add_atom_records(self, atom_records, atom_to_radius_dict, model_nums=0):
+        """parses ATOM / HETATM records column-wise & adds them"""
+        names = atom_records.get_field(12, 16)
+        first_chars = atom_records.get_field(12, 13)
+        # because apparently hetatm entries can start one col before atom entries (for the atom name)
+        # and the first character might be a number
+        is_first_char_removed = (first_chars == " ") | np.char.isdecimal(first_chars)
+        names = np.where(is_first_char_removed, atom_records.get_field(13, 16), names)
+        if self.ignore_waters:
+            is_kept = names != "HOH"
+            atom_records, names = atom_records[is_kept], names[is_kept]
+            model_nums = np.broadcast_to(model_nums, is_kept.shape)[is_kept]
+        coords = atom_records.get_coords()
+        first_chars_of_names = names.astype("U1")
+        unique_first_chars, inverse = np.unique(first_chars_of_names, return_inverse=True)
+        radii = np.array(
+            [atom_to_radius_dict.get(c, 0.0) for c in unique_first_chars.tolist()],  # default is to ignore
+            dtype=np.float64,
+        ).reshape(-1)[inverse.reshape(-1)]
+        # sometimes hydrogens are formatted badly and don't have H in 1st column
+        radii[(radii > 0.0) & (np.char.find(names, "H") >= 0)] = 0.0  # any H's are bad
+        self.__non_zero_radii_count += int(np.count_nonzero(radii > 0.0))
+        occupancies, is_valid_occupancy = parse_floats(atom_records.get_field(55, 60))
+        bfactors, is_valid_bfactor = parse_floats(atom_records.get_field(61, 67))
+        is_valid = is_valid_occupancy & is_valid_bfactor  # in case no factors or occupancies present
+        factors = np.where(is_valid[:, None], np.column_stack([occupancies, bfactors]), 0.0)  # set to zero for now
+
+        #
+        self.atom_records = PDBAtomRecords.concatenate([self.atom_records, atom_records])
+        self.is_removed = np.concatenate([self.is_removed, np.zeros(len(atom_records), dtype=bool)])
+        self.coords = np.concatenate([self.coords, coords])
+        self.atoms = np.concatenate([self.atoms, names])
+        self.radii = np.concatenate([self.radii, radii])
+        self.model_nums = np.concatenate([self.model_nums, np.broadcast_to(model_nums, (len(atom_records),))])
+        self.residue_nums = np.concatenate([self.residue_nums, parse_ints(atom_records.get_field(22, 26))])
+        self.chains = np.concatenate([self.chains, atom_records.get_field(21, 22)])
+        self.alt_chars = np.concatenate([self.alt_chars, atom_records.get_field(16, 17)])  # alternate sidechain conf letters
+        self.residue_names = np.concatenate([self.residue_names, atom_records.get_field(17, 20)])
+        self.factors = np.concatenate([self.factors, factors])
 
     def process_line(self, line, atom_to_radius_dict, model_number=0):
         if line.startswith("ATOM") or line.startswith("HETATM"):
-            name = line[12:16]
-            if name[0] == " ":  # because apparently hetatm entries can start one col
-                name = name[1:]  # before atom entries (for the atom name)
-            else:
-                try:
-                    _ = int(name[0])
-                    name = name[1:]  # otherwise would have triggered exception
-                except ValueError:
-                    pass  # first character is not a number
-            alt_char = line[16]
-            residue_name = line[17:20]
-            if not (self.ignore_waters and (name == "HOH")):
-                self.raw_data.append(line)
-                x = float(line[30:38])
-                y = float(line[38:46])
-                z = float(line[46:54])
-                chain = line[21:22]
-                self.coords.append((x, y, z))
-                self.atoms.append(name)
-                try:
-                    radius = atom_to_radius_dict[name[0]]
-                except KeyError:
-                    radius = 0.0  # default is to ignore
-                # sometimes hydrogens are formatted badly and don't have H in 1st column
-                if (radius > 0.0) and (name.count("H") > 0):  # any H's are bad
-                    radius = 0.0
-                self.radii.append(radius)
-                if radius > 0.0:
-                    self.__non_zero_radii_count += 1
-                self.model_nums.append(model_number)
-                factor_strings = (line[55:60], line[61:67])
-                try:
-                    factors = (float(factor_strings[0]), float(factor_strings[1]))
-                except ValueError:  # in case no factors or occupancies present
-                    factors = (0.0, 0.0)  # set to zero for now
-                self.residue_nums.append(int(line[22:26]))
-                self.chains.append(chain)
-                self.alt_chars.append(alt_char)  # alternate sidechain conf letters
-                self.residue_names.append(residue_name)
-                self.factors.append(factors)
-                self.atom_to_raw[len(self.atoms) - 1] = len(self.raw_data) - 1
-                self.raw_to_atom[len(self.raw_data) - 1] = len(self.atoms) - 1
+            self.add_atom_records(PDBAtomRecords([line]), atom_to_radius_dict, model_number)
+
+    @property
+    def raw_data(self):
+        """raw line of each atom (False if removed)"""
+        return [
+            False if is_removed else line
+            for line, is_removed in zip(self.atom_records.get_lines(), self.is_removed.tolist())
+        ]
 
     def write(self, pdb_file_path):
         """opens the file, writes to it, closes it"""
-        with open(pdb_file_path, "w") as f:
-            for raw_data_line in self.raw_data:
-                if raw_data_line:
-                    f.write(raw_data_line)
-                    if not raw_data_line.endswith("\n"):
-                        f.write("\n")
+        self.atom_records[~self.is_removed].write(pdb_file_path)
 
     def replace_hetatm_with_atom(self):
         """replaces 'HETATM' with 'ATOM  ' in the rawdataline"""
-        for i, raw_data_line in enumerate(self.raw_data):
-            if raw_data_line[0:6] == "HETATM":
-                new_data_line = "ATOM  " + raw_data_line[6:]
-                self.raw_data[i] = new_data_line
+        self.atom_records.set_field(
+            0, 6, "ATOM  ", np.flatnonzero(self.atom_records.get_field(0, 6) == "HETATM")
+        )
 
     def copy(self):
         new_pdb = PDBData()
         new_pdb.__non_zero_radii_count = 0
-        new_pdb.raw_data = self.raw_data[:]  # copy everything
-        new_pdb.coords = self.coords[:]
-        new_pdb.atoms = self.atoms[:]
-        new_pdb.radii = self.radii[:]
+        new_pdb.atom_records = self.atom_records.copy()  # copy everything
+        new_pdb.is_removed = self.is_removed.copy()
+        new_pdb.coords = self.coords.copy()
+        new_pdb.atoms = self.atoms.copy()
+        new_pdb.radii = self.radii.copy()
         new_pdb.charges = self.charges[:]
         new_pdb.hydro_charges = self.hydro_charges[:]
-        new_pdb.factors = self.factors[:]
-        new_pdb.residue_nums = self.residue_nums[:]
-        new_pdb.chains = self.chains[:]
-        new_pdb.residue_names = self.residue_names[:]
-        new_pdb.alt_chars = self.alt_chars[:]
-        new_pdb.model_nums = self.model_nums[:]
-        new_pdb.atom_to_raw = self.atom_to_raw.copy()
-        new_pdb.raw_to_atom = self.raw_to_atom.copy()
+        new_pdb.factors = self.factors.copy()
+        new_pdb.residue_nums = self.residue_nums.copy()
+        new_pdb.chains = self.chains.copy()
+        new_pdb.residue_names = self.residue_names.copy()
+        new_pdb.alt_chars = self.alt_chars.copy()
+        new_pdb.model_nums = self.model_nums.copy()
         return new_pdb
 
     def clear_factor(self, raw_data_index, which_factor=BFAC_PLACE):
@@ -199,65 +438,64 @@ class PDBData(object):
 
     def update_factors(self, raw_data_index, new_factors):
         """changes the bfactor and occupancy column. now uses longer format for
-        occupancy than might be standard, to get more accurate charges"""
-        self.factors[raw_data_index] = new_factors
-        new_data = "%+2.2f %+2.4f " % (new_factors[0], new_factors[1])
-        new_data = self.raw_data[raw_data_index][:55] + new_data + "\n"
-        new_data_no_plus = new_data.replace("+", " ")
-        self.raw_data[raw_data_index] = new_data_no_plus
+        occupancy than might be standard, to get more accurate charges.
+        takes one index & pair of factors, or an array of indices & one pair per index"""
+        indices = np.array(raw_data_index, dtype=np.int64).reshape(-1)
+        new_factors = np.array(new_factors, dtype=np.float64).reshape(-1, 2)
+        self.factors[indices] = new_factors
+        new_lines = []
+        for line, (occupancy, bfactor) in zip(self.atom_records[indices].get_lines(), new_factors.tolist()):
+            new_data = "%+2.2f %+2.4f " % (occupancy, bfactor)
+            new_data = line[:55] + new_data + "\n"
+            new_lines.append(new_data.replace("+", " "))
+        self.atom_records.set_lines(indices, new_lines)
 
     def clear_factors_residues(self, residue_numbers, matching=True):
         """copy pdb, for each residue in the list, remove the bfactor column.
         if matching is false, then remove the bfactor if the residue is not in list
         return new pdb"""
         new_pdb = self.copy()
-        marked_for_removal = []
-        for i, residue_num in enumerate(new_pdb.residue_nums):
-            if matching and (residue_num not in residue_numbers):
-                marked_for_removal.append(i)
-            elif not matching and (residue_num in residue_numbers):
-                marked_for_removal.append(i)
-        for index in marked_for_removal:
-            new_pdb.clear_factor(new_pdb.atom_to_raw[index])
+        is_in_residues = get_is_in(new_pdb.residue_nums, residue_numbers)
+        marked_for_removal = np.flatnonzero(~is_in_residues if matching else is_in_residues)
+        new_factors = new_pdb.factors[marked_for_removal].copy()
+        new_factors[:, BFAC_PLACE] = 0.0
+        new_pdb.update_factors(marked_for_removal, new_factors)
         return new_pdb
 
     def remove_line(self, raw_data_index):
-        self.raw_data[raw_data_index] = False
+        """takes one index or an array of them"""
+        self.is_removed[np.array(raw_data_index, dtype=np.int64)] = True
+
+    def get_is_hydrogen(self):
+        return self.atoms.astype("U1") == "H"
 
     def remove_all_hydrogens(self, res_list=None):
         """for each residue in the list, remove all the hydrogens. if no list given,
         delete all hydrogens in whole protein."""
         if res_list is None:
             res_list = []
-        marked_for_removal = []
-        for i, atom in enumerate(self.atoms):
-            if atom[0] == "H":  # hydrogen atom
-                residue_num = self.residue_nums[i]
-                if (res_list is None) or (residue_num in res_list):
-                    marked_for_removal.append(self.atom_to_raw[i])
-        for index in marked_for_removal:
-            self.remove_line(index)
+        self.remove_line(np.flatnonzero(self.get_is_hydrogen() & get_is_in(self.residue_nums, res_list)))
 
     def remove_apolar_hydrogen(self, residue_code_to_polar_hydrogens_dict):
         """for removing all nonpolar hydrogens in a protein. uses residue_code_to_polar_hydrogens_dict as the
         dict of residue->atom names to decide which hydrogens to keep"""
-        marked_for_removal = []
-        for i, atom in enumerate(self.atoms):
-            if atom[0] == "H":  # hydrogen atom
-                residue_name = self.residue_names[i]
-                if residue_name not in residue_code_to_polar_hydrogens_dict:
-                    logger.exception(
-                        f"ERROR: residue name unknown: {residue_name} {self.raw_data[i]}"
-                    )
-                    raise
-                else:
-                    allowed_hydrogens = residue_code_to_polar_hydrogens_dict[
-                        residue_name
-                    ]
-                    if atom.strip() not in allowed_hydrogens:
-                        marked_for_removal.append(self.atom_to_raw[i])
-        for index in marked_for_removal:
-            self.remove_line(index)
+        hydrogen_indices = np.flatnonzero(self.get_is_hydrogen())
+        residue_names = self.residue_names[hydrogen_indices]
+        is_known_residue = get_is_in(residue_names, residue_code_to_polar_hydrogens_dict)
+        if not np.all(is_known_residue):
+            i = hydrogen_indices[~is_known_residue][0]
+            logger.exception(
+                f"ERROR: residue name unknown: {self.residue_names[i]} {self.raw_data[i]}"
+            )
+            raise
+
+        # check each distinct (residue name, atom name) pair once
+        atom_names = np.char.strip(self.atoms[hydrogen_indices])
+        is_allowed = np.zeros(len(hydrogen_indices), dtype=bool)
+        for group in get_index_groups(residue_names, atom_names):
+            allowed_hydrogens = residue_code_to_polar_hydrogens_dict[residue_names[group[0]]]
+            is_allowed[group] = atom_names[group[0]] in allowed_hydrogens
+        self.remove_line(hydrogen_indices[~is_allowed])
         # no return necessary, as self has been modified
 
     def remove_protons_for_covalent_docking(
@@ -271,148 +509,115 @@ class PDBData(object):
             )
             self.remove_line(residue_atom_index)
 
+    def update_residue_names(self, raw_data_indices, new_names):
+        """updates the data and raw lines for residue names (one name or one per index)"""
+        new_names = np.asarray(new_names, dtype=str)
+        self.residue_names = self.residue_names.astype(np.result_type(self.residue_names, new_names))
+        self.residue_names[raw_data_indices] = new_names
+        self.atom_records.set_field(17, 20, new_names, raw_data_indices)
+
     def update_one_residue_name(self, raw_data_index, new_name):
         """updates the data and raw line for a residue name"""
-        self.residue_names[self.raw_to_atom[raw_data_index]] = new_name
-        new_data = self.raw_data[raw_data_index][:17]
-        new_data += new_name + self.raw_data[raw_data_index][20:]
-        self.raw_data[raw_data_index] = new_data
+        self.update_residue_names([raw_data_index], new_name)
 
     def replace_alt_chars(self, new_char):
         """updates the data and raw line for all alternate characters"""
-        for i, _ in enumerate(self.raw_data):
-            self.alt_chars[self.raw_to_atom[i]] = new_char
-            new_data = self.raw_data[i][:16]
-            new_data += new_char + self.raw_data[i][17:]
-            self.raw_data[i] = new_data
+        self.alt_chars = np.full(len(self.alt_chars), new_char, dtype=np.result_type(self.alt_chars, np.asarray(new_char)))
+        self.atom_records.set_field(16, 17, new_char)
 
     def delete_insertion_codes(self):
         """insertion codes are sometimes added as 61A for a residue num
         instead of just using 62 (because people want the numbering to line up
         with some other numbering). they cause problems for some people, so
         this is for removing them. they are in column 27"""
-        for i, _ in enumerate(self.raw_data):
-            new_data = self.raw_data[i][:26]
-            new_data += " "
-            new_data += self.raw_data[i][27:]
-            self.raw_data[i] = new_data
+        self.atom_records.set_field(26, 27, " ")
 
     def rename_histidines(self):
         """renames histidines from HIS to HID, HIE, or HIP based on hydrogens"""
-        # two passes, first find histidines named HIS, want to check all at once
-        residue_sets = {}  # from (chain,res number)  to [indices]
-        for i, _ in enumerate(self.raw_data):
-            if self.residue_names[i] == "HIS":  # only care about unchanged his
-                chain_residue_num = (
-                    self.chains[i],
-                    self.residue_nums[i],
-                )
-                if chain_residue_num not in list(residue_sets.keys()):
-                    residue_sets[chain_residue_num] = []
-                residue_sets[chain_residue_num].append(i)
-        # second pass, decide whether each HIS is HID, HIE, or HIP
-        for index_list in residue_sets.values():
-            has_d, has_e, has_p = False, False, False
-            for raw_data_index in index_list:
-                if self.atoms[raw_data_index] == "HD1":
-                    has_d = True
-                if self.atoms[raw_data_index] == "HE2":
-                    has_e = True
-            if has_d and has_e:  # both protonated
-                has_p = True
-            for raw_data_index in index_list:
-                name = "HID"  # default name is HID, HIS is never allowed.
-                if has_d:
-                    name = "HID"
-                if has_e:
-                    name = "HIE"
-                if has_p:
-                    name = "HIP"
-                self.update_one_residue_name(raw_data_index, name)
+        # group the atoms of histidines named HIS by (chain, res number), want to check all at once
+        his_indices = np.flatnonzero(self.residue_names == "HIS")  # only care about unchanged his
+        group_ids = get_group_ids(self.chains[his_indices], self.residue_nums[his_indices])
+        num_groups = int(group_ids.max()) + 1 if len(group_ids) > 0 else 0
+        # decide whether each HIS is HID, HIE, or HIP
+        has_d = np.bincount(group_ids, weights=self.atoms[his_indices] == "HD1", minlength=num_groups) > 0
+        has_e = np.bincount(group_ids, weights=self.atoms[his_indices] == "HE2", minlength=num_groups) > 0
+        has_p = has_d & has_e  # both protonated
+        names = np.where(has_e, "HIE", "HID")  # default name is HID, HIS is never allowed.
+        names = np.where(has_p, "HIP", names)
+        self.update_residue_names(his_indices, names[group_ids])
 
     def rename_cysteines(self):
         """renames cysteines from CYS to CYX based on hydrogens"""
         # what about CYM (negative)?
-        # two passes, first find cysteines named CYS, want to check all at once
-        residue_sets = {}  # from (chain,res number)  to [indices]
-        for i, _ in enumerate(self.raw_data):
-            if self.residue_names[i] == "CYS":  # only care about unchanged his
-                chain_residue_num = (
-                    self.chains[i],
-                    self.residue_nums[i],
-                )
-                if chain_residue_num not in list(residue_sets.keys()):
-                    residue_sets[chain_residue_num] = []
-                residue_sets[chain_residue_num].append(i)
-        # second pass, decide whether each CYS is CYS or CYX
-        for index_list in residue_sets.values():
-            cyx = True
-            for raw_data_index in index_list:
-                if self.atoms[raw_data_index] == "HG ":
-                    cyx = False
-            for raw_data_index in index_list:
-                name = "CYS"  # default name is CYS.
-                if cyx:
-                    name = "CYX"
-                self.update_one_residue_name(raw_data_index, name)
+        # group the atoms of cysteines named CYS by (chain, res number), want to check all at once
+        cys_indices = np.flatnonzero(self.residue_names == "CYS")
+        group_ids = get_group_ids(self.chains[cys_indices], self.residue_nums[cys_indices])
+        num_groups = int(group_ids.max()) + 1 if len(group_ids) > 0 else 0
+        # decide whether each CYS is CYS or CYX
+        has_hg = np.bincount(group_ids, weights=self.atoms[cys_indices] == "HG ", minlength=num_groups) > 0
+        names = np.where(has_hg, "CYS", "CYX")
+        self.update_residue_names(cys_indices, names[group_ids])
+
+    def update_chains(self, raw_data_indices, new_chains=" "):
+        """updates the data and raw lines for chains (one chain or one per index)"""
+        new_chains = np.asarray(new_chains, dtype=str)
+        self.chains = self.chains.astype(np.result_type(self.chains, new_chains))
+        self.chains[raw_data_indices] = new_chains
+        self.atom_records.set_field(21, 22, new_chains, raw_data_indices)
 
     def update_one_chain(self, raw_data_index, new_chain=" "):
         """updates the data and raw line for a residue number"""
-        self.chains[self.raw_to_atom[raw_data_index]] = new_chain
-        new_data = self.raw_data[raw_data_index][:21]
-        temp_data = new_chain
-        new_data += temp_data + self.raw_data[raw_data_index][22:]
-        self.raw_data[raw_data_index] = new_data
+        self.update_chains([raw_data_index], new_chain)
 
     def fix_chain_ids(self):
         """sometimes people screw up the chain id and make them all the same.
         go through the residues and if they go down in number then start a new
         chain id."""
         last_residue_num = -10000
-        chains_used = []
+        max_chain_used = None
         replacing_chains = False
         new_chain = False
-        for i, residue_number in enumerate(self.residue_nums):
+        chains = self.chains.tolist()
+        replaced_indices = []
+        for i, residue_number in enumerate(self.residue_nums.tolist()):
             if residue_number < last_residue_num:
                 replacing_chains = True
-                new_chain = chr(max(ord(self.chains[i]), max(chains_used)) + 1)
+                new_chain = chr(max(ord(chains[i]), max_chain_used) + 1)
             if replacing_chains:
-                self.update_one_chain(i, new_chain)
-            if ord(self.chains[i]) not in chains_used:
-                chains_used.append(ord(self.chains[i]))
+                chains[i] = new_chain
+                replaced_indices.append(i)
+            if max_chain_used is None or ord(chains[i]) > max_chain_used:
+                max_chain_used = ord(chains[i])
             last_residue_num = residue_number
+        self.update_chains(replaced_indices, [chains[i] for i in replaced_indices])
 
     def get_index_by_residue_atom(self, residue_num, res_code, atom_name):
         """gets the index matching the input data, returns false if no match"""
         atom_name_str = atom_name.strip()
-        for i, atom in enumerate(self.atoms):
-            if residue_num == self.residue_nums[i]:
-                if res_code == self.residue_names[i]:
-                    if atom_name_str == atom.strip():
-                        return i
+        is_match = (
+            get_is_in(self.residue_nums, [residue_num])
+            & get_is_in(self.residue_names, [res_code])
+            & (np.char.strip(self.atoms) == atom_name_str)
+        )
+        indices = np.flatnonzero(is_match)
+        if len(indices) > 0:
+            return int(indices[0])
         return False  # not found
 
     def get_occupancy_residue(self, residue_num):
         """gets the occupancy for one residue number. just use first found."""
-        for i, atom in enumerate(self.atoms):
-            if self.residue_nums[i] == residue_num:
-                return self.factors[i][OCC_PLACE]
+        indices = np.flatnonzero(get_is_in(self.residue_nums, [residue_num]))
+        if len(indices) > 0:
+            return float(self.factors[indices[0]][OCC_PLACE])
 
     def is_most_occupied_residue_chain(self, residue_num, chain_id):
         """for all residue_nums, is the chain_id provided the most occupied one (True) or
         not, return False then"""
-        highest_occupancy, highest_count = 0.0, 0
-        for i, atom in enumerate(self.atoms):
-            if self.residue_nums[i] == residue_num:
-                if self.factors[i][OCC_PLACE] > highest_occupancy:
-                    highest_occupancy, highest_count = (
-                        self.factors[i][OCC_PLACE],
-                        i,
-                    )
-        if self.alt_chars[highest_count] == chain_id:  # TODO: simplify this
-            return True
-        else:
-            return False
+        occupancies = np.where(get_is_in(self.residue_nums, [residue_num]), self.factors[:, OCC_PLACE], 0.0)
+        highest_count = 0
+        if len(occupancies) > 0 and occupancies.max() > 0.0:
+            highest_count = int(np.argmax(occupancies))  # first of the most occupied
+        return bool(self.alt_chars[highest_count] == chain_id)
 
     def select_most_occupied(self, exceptions=None, leave_alone=None):
         """for each residue with alternate positions, pick the most occupied
@@ -423,120 +628,70 @@ class PDBData(object):
             exceptions = []
         if leave_alone is None:
             leave_alone = []
-        same_atoms = collections.defaultdict(list)  # collect lists of atoms
-        for i, atom in enumerate(self.atoms):
-            if self.alt_chars[i] != " ":  # space means no alternate position
-                if self.residue_nums[i] not in leave_alone:
-                    truple = (
-                        atom,
-                        self.residue_names[i],
-                        self.residue_nums[i],
-                    )
-                    same_atoms[truple].append(i)
-        for atom_truple, atom_list in same_atoms.items():
+        # collect lists of the same atoms with alternate positions (space means no alternate position)
+        indices = np.flatnonzero((self.alt_chars != " ") & ~get_is_in(self.residue_nums, leave_alone))
+        occupancies = self.factors[:, OCC_PLACE].tolist()
+        alt_chars = self.alt_chars.tolist()
+        marked_for_removal = []
+        for group in get_index_groups(self.atoms[indices], self.residue_names[indices], self.residue_nums[indices]):
+            atom_list = indices[group].tolist()
             normal = True  # means picked most occupied
-            if atom_truple[2] in exceptions:
+            if self.residue_nums[atom_list[0]] in exceptions:
                 normal = False  # means picked least occupied for these residues
             most_occupied = None
             occupancy = 0.0
             if not normal:
                 occupancy = 1.0
             for atom_count in atom_list:
-                if normal and self.factors[atom_count][OCC_PLACE] > occupancy:
-                    occupancy = self.factors[atom_count][OCC_PLACE]
+                if normal and occupancies[atom_count] > occupancy:
+                    occupancy = occupancies[atom_count]
                     most_occupied = atom_count
-                elif self.factors[atom_count][OCC_PLACE] == occupancy:
-                    if (
-                        self.alt_chars[atom_count] < self.alt_chars[most_occupied]
-                    ):  # A<B<C
-                        occupancy = self.factors[atom_count][OCC_PLACE]
+                elif occupancies[atom_count] == occupancy:
+                    if alt_chars[atom_count] < alt_chars[most_occupied]:  # A<B<C
+                        occupancy = occupancies[atom_count]
                         most_occupied = atom_count
-                elif not normal and self.factors[atom_count][OCC_PLACE] < occupancy:
-                    occupancy = self.factors[atom_count][OCC_PLACE]
+                elif not normal and occupancies[atom_count] < occupancy:
+                    occupancy = occupancies[atom_count]
                     most_occupied = atom_count
             # okay, now remove everything but the most_occupied
-            for atom_count in atom_list:
-                if atom_count != most_occupied:  # keep this one
-                    self.remove_line(self.atom_to_raw[atom_count])
+            marked_for_removal += [atom_count for atom_count in atom_list if atom_count != most_occupied]
+        self.remove_line(marked_for_removal)
 
     def delete_alternates(self, only=None):
         """for each sidechain with alternate positions, delete them all.
         if only exists, only delete residues in the list of residue numbers"""
         if only is None:
             only = []
-        same_atoms = collections.defaultdict(list)  # collect lists of atoms
-        for i, atom in enumerate(self.atoms):
-            # if self.alt_chars[atom_count] != ' ':  # space means no alternate position
-            truple = (
-                atom,
-                self.residue_names[i],
-                self.residue_nums[i],
-            )
-            same_atoms[truple].append(i)
-        for atom_truple, atom_list in same_atoms.items():
-            if (only is None) or (atom_truple[2] in only):
-                # okay, now remove everything
-                for atom_count in atom_list:
-                    self.remove_line(self.atom_to_raw[atom_count])
+        self.remove_line(np.flatnonzero(get_is_in(self.residue_nums, only)))
 
     def delete_all_residues(self, leave_alone=None):
         """deletes all the atoms in the protein, except the residues in
         leave_alone"""
         if leave_alone is None:
             leave_alone = []
-        same_atoms = collections.defaultdict(list)  # collect lists of atoms
-        for i, atom in enumerate(self.atoms):
-            if self.residue_nums[i] not in leave_alone:
-                truple = (
-                    atom,
-                    self.residue_names[i],
-                    self.residue_nums[i],
-                )
-                same_atoms[truple].append(i)
-        for atom_truple, atom_list in same_atoms.items():
-            for atom_count in atom_list:
-                self.remove_line(self.atom_to_raw[atom_count])
+        self.remove_line(np.flatnonzero(~get_is_in(self.residue_nums, leave_alone)))
 
     def get_alt_chars(self, residue_numbers=None):
         """for each residue is residue_numbers, return the list of alt chars
         (alternate conformations) seen."""
         if residue_numbers is None:
             residue_numbers = []
-        return_alt_chars = set()
-        for i, atom in enumerate(self.atoms):
-            if self.residue_nums[i] in residue_numbers:  # only care about these
-                if self.alt_chars[i] != " ":  # space means no alternate position
-                    return_alt_chars.add(self.alt_chars[i])
-        return list(return_alt_chars)
+        is_alt = get_is_in(self.residue_nums, residue_numbers) & (self.alt_chars != " ")  # space means no alternate position
+        return list(set(self.alt_chars[is_alt].tolist()))
 
     def select_one_alt(self, residue_numbers=None, pick_alt_char=None):
         """for each residue is residue_numbers, salvage only the pick_alt_char
         alternate conformation, delete other conformations."""
         if residue_numbers is None:
             residue_numbers = []
-        same_atoms = collections.defaultdict(list)  # collect lists of atoms
-        for i, atom in enumerate(self.atoms):
-            if self.alt_chars[i] != " ":  # space means no alternate position
-                truple = (
-                    atom,
-                    self.residue_names[i],
-                    self.residue_nums[i],
-                )
-                same_atoms[truple].append(i)
-        for atom_truple, atom_list in same_atoms.items():
-            if atom_truple[2] in residue_numbers:  # means actually pick here
-                for atom_count in atom_list:
-                    if self.alt_chars[atom_count] != pick_alt_char:
-                        self.remove_line(self.atom_to_raw[atom_count])
+        is_alt = (self.alt_chars != " ") & get_is_in(self.residue_nums, residue_numbers)  # space means no alternate position
+        self.remove_line(np.flatnonzero(is_alt & (self.alt_chars != pick_alt_char)))
 
     def residue_sets(self):
         """calculates and returns a list of residue sets"""
         residue_sets = {}  # from (chain,res number)  to [indices]
-        for i, _ in enumerate(self.raw_data):  # TODO: use itertools.product instead
-            chain_residue_num = (self.chains[i], self.residue_nums[i])
-            if chain_residue_num not in list(residue_sets.keys()):
-                residue_sets[chain_residue_num] = []
-            residue_sets[chain_residue_num].append(i)
+        for index_list in get_index_groups(self.chains, self.residue_nums):
+            residue_sets[(self.chains[index_list[0]].item(), self.residue_nums[index_list[0]].item())] = index_list
         return residue_sets
 
 
@@ -628,32 +783,30 @@ def move_columns(
     dots=PDBColumns.DOTS,
     delete_from=PDBColumns.DELETE_FROM,
 ):
-    lines_to_write = []
-    with open(input_pdb_file_path, "r") as f_in:
-        for line in f_in:
-            if line.startswith("ATOM"):
-                problems = 0
-                for dot in dots:
-                    try:
-                        if line[dot] != ".":  # this is not good
-                            problems += 1
-                    except IndexError:  # might not be that long
-                        pass  # no problem
-                if problems == 0:  # great
-                    lines_to_write.append(line)
-                elif problems > 1:  # find where they should be
-                    extra = 1
-                    while (line[dots[0] + extra] != ".") and (
-                        extra < 20
-                    ):  # at 20, give up
-                        extra += 1
-                    if extra != 20:  # TODO: why 20? Make this a constant
-                        new_line = line[:delete_from]
-                        new_line += line[delete_from + extra :]
-                    lines_to_write.append(new_line)
-            else:
-                lines_to_write.append(line)  # write these anyway
+    records = PDBAtomRecords(read_pdb_file_lines(input_pdb_file_path))
+    line_lengths = records.get_line_lengths()
+    is_atom = records.get_is_record(["ATOM"])
+    problems = np.zeros(len(records), dtype=np.int64)
+    for dot in dots:
+        if dot < records.chars.shape[1]:  # lines might not be that long, no problem
+            problems += (dot < line_lengths) & (records.chars[:, dot] != ".")  # this is not good
+
+    # lines with problems in more than one column are shifted to find where they should be
+    # (lines with a problem in just one column are dropped)
+    is_kept = ~is_atom | (problems == 0) | (problems > 1)
+    problem_line_indices = np.flatnonzero(is_atom & (problems > 1))
+    new_lines = []
+    for line in records[problem_line_indices].get_lines():
+        extra = 1
+        while (line[dots[0] + extra] != ".") and (
+            extra < 20
+        ):  # at 20, give up
+            extra += 1
+        if extra != 20:  # TODO: why 20? Make this a constant
+            new_line = line[:delete_from]
+            new_line += line[delete_from + extra :]
+        new_lines.append(new_line)
+    records.set_lines(problem_line_indices, new_lines)
 
     with open(output_pdb_file_path, "w") as f_out:
-        for line in lines_to_write:
-            f_out.write(line)
+        f_out.write("".join(records[is_kept].get_lines()))
@@ -1,9 +1,6 @@
 import struct
-import array
 import os
 import math
-import copy
-import itertools
 import logging
 
 import numpy as np
@@ -23,6 +20,7 @@ logger.setLevel(logging.DEBUG)
 
 NUM_BYTES_PER_GRID_FILE = 162
 NUM_BYTES_PER_FLOAT = 4
+PHI_DTYPE = np.dtype(">f4")  # phimaps are written by fortran as big-endian real*4
 
 
 def grid_size_from_file_size(file_size):
@@ -47,7 +45,6 @@ class Phi(object):
                     logger.debug(f"Determined size to be {grid_size}")
                 try:
                     f = open(phi_file.path, "rb")
-                    temp_array = array.array("f")
                     _ = struct.unpack("4s", f.read(4))
                     (check,) = struct.unpack("4s", f.read(4))
                     if str(check) == "b'now '":  # this changed, but this is now correct
@@ -73,13 +70,16 @@ class Phi(object):
                     _ = struct.unpack("8s", f.read(8))
                     if is_64:
                         _ = struct.unpack("8s", f.read(8))
-                    # next line raises error if grid too big
-                    # GxGxG -> packed into an array xyz order
-                    temp_array.fromfile(f, grid_size**3)
-                    temp_array.byteswap()
+                    # GxGxG -> packed into an array xyz order, mapped rather than read so that trimming only touches the
+                    # part of the grid that is kept
+                    grid_offset = f.tell()
+                    grid_num_bytes = (grid_size**3) * PHI_DTYPE.itemsize
+                    if grid_offset + grid_num_bytes > os.fstat(f.fileno()).st_size:
+                        raise EOFError(f"grid size {grid_size} too big for phimap file: {phi_file.path}")
+                    self.phi_array = np.memmap(f, dtype=PHI_DTYPE, mode="r", offset=grid_offset, shape=(grid_size**3,))
+                    f.seek(grid_offset + grid_num_bytes)
 
                     self.grid_dimension = grid_size
-                    self.phi_array = temp_array
                     break  # read successfully, just go on and read the last bits
 
                 except EOFError:
@@ -108,8 +108,7 @@ class Phi(object):
         the pad lines reproduce the binary padding of an original
         fortran formatted phi file"""
         if phi_file is not None:  # do nothing if no filename given
-            out_array = copy.deepcopy(self.phi_array)
-            out_array.byteswap()  # switch endianness back, only for writing
+            out_array = np.array(self.phi_array, dtype=PHI_DTYPE)  # copy, in case phi_file is the file mapped from
             with open(
                 phi_file.path, "wb"
             ) as f:  # TODO: b may be unnecessary, have to check
@@ -119,9 +118,9 @@ class Phi(object):
                 f.write(struct.pack("10s", self.head))
                 f.write(struct.pack("60s", self.title))
                 f.write(struct.pack("4b", 0, 0, 0, 70))  # pad, always same
-                f.write(struct.pack(">l", len(out_array) * 4))  # diff. pad sometimes
+                f.write(struct.pack(">l", out_array.nbytes))  # diff. pad sometimes
                 out_array.tofile(f)  # array
-                f.write(struct.pack(">l", len(out_array) * 4))  # diff. pad sometimes
+                f.write(struct.pack(">l", out_array.nbytes))  # diff. pad sometimes
                 f.write(struct.pack("4b", 0, 0, 0, 16))  # pad, always same
                 f.write(struct.pack("16s", self.botlabel))
                 f.write(struct.pack("8b", 0, 0, 0, 16, 0, 0, 0, 16))  # pad
@@ -148,29 +147,21 @@ class Phi(object):
         new_phi.title = self.title
         new_phi.botlabel = self.botlabel
         new_phi.scale = self.scale
-        # the phi_array does change
-        new_phi.phi_array = array.array("f")
-        new_phi.phi_array.fromlist(
-            [
-                self.get_value(old_index_x, old_index_y, old_index_z)
-                if np.all(
-                    [
-                        0 <= old_index < self.grid_dimension
-                        for old_index in [old_index_x, old_index_y, old_index_z]
-                    ]
-                )
-                else 0.0
-                for old_index_z, old_index_y, old_index_x in itertools.product(
-                    *[
-                        range(
-                            int(new_mid_index - plus_minus),
-                            int(new_mid_index + plus_minus + 1),
-                        )
-                        for new_mid_index in reversed(new_mid_indices)
-                    ]
-                )
-            ]
-        )
+        # the phi_array does change: points outside of the current grid are 0.0
+        old_grid = np.reshape(self.phi_array, (self.grid_dimension,) * 3)  # z, y, x
+        new_ranges = [
+            (int(new_mid_index - plus_minus), int(new_mid_index + plus_minus + 1))
+            for new_mid_index in reversed(new_mid_indices)
+        ]
+        new_grid = np.zeros([max(0, stop - start) for start, stop in new_ranges], dtype=np.float32)
+        new_slices, old_slices = [], []
+        for start, stop in new_ranges:
+            old_start, old_stop = max(start, 0), min(stop, self.grid_dimension)
+            old_stop = max(old_start, old_stop)
+            new_slices.append(slice(old_start - start, old_stop - start))
+            old_slices.append(slice(old_start, old_stop))
+        new_grid[tuple(new_slices)] = old_grid[tuple(old_slices)]
+        new_phi.phi_array = new_grid.ravel()
 
         return new_phi
 
@@ -218,10 +209,7 @@ class Phi(object):
     def modify(self, other, change):
         """modify other to self, destructively write over self. allows +-/etc
         presume without checking that grids are compatible (same mid etc)"""
-        self.phi_array = [
-            this_phi_value + (other_phi_value * change)
-            for this_phi_value, other_phi_value in zip(self.phi_array, other.phi_array)
-        ]
+        self.phi_array = np.add(self.phi_array, np.multiply(other.phi_array, change, dtype=np.float32), dtype=np.float32)
 
     def get_indices(self, pt):
         """helper function to find the box a point is in"""
@@ -3,6 +3,16 @@
 # edited in 2015.
 ###
 
+import numpy as np
+
+from pydock3.blastermaster.pdb import (
+    PDBAtomRecords,
+    read_pdb_file_lines,
+    write_pdb_file_lines,
+    get_char_array_of_lines,
+    get_padded_char_array,
+)
+
 
 class PDB_atom_info:
     def __init__(
@@ -44,64 +54,57 @@ def byResId(x, y):
 
 
 #################################################################################################################
-def read_pdb(pdb_file):
+def get_is_first_token(lines_array, token):
+    """whether the first whitespace-separated token of each line is `token`"""
+
+    stripped_chars = get_char_array_of_lines(np.char.lstrip(lines_array))
+    if stripped_chars.shape[1] <= len(token):
+        stripped_chars = get_padded_char_array(stripped_chars, len(token) + 1)
+    char_after_token = stripped_chars[:, len(token)]
+    return np.char.startswith(np.char.lstrip(lines_array), token) & (
+        (char_after_token == "") | np.char.isspace(char_after_token)
+    )
+
+
+def read_pdb_records(pdb_file):
 
     ## this function will read in a muli-pdb file conatining ligands from docking hits.
+    ## returns the ATOM & HETATM records of the first chain (up to the first TER or END).
 
-    # print "read_pdb"
-    file1 = open(pdb_file, "r")
-
-    temp_atom_list = []
-    chain_list = []
-
-    lines = file1.readlines()
-
-    file1.close()
-
-    resstr_cur = " "
-
-    linesplit = [""]
-
-    for line in lines:
-        linesplit = line.split()  # split on white space
-        if len(linesplit) >= 1:
-            if linesplit[0] == "ATOM" or linesplit[0] == "HETATM":
-                chainid = line[21]
-                resname = line[17:20]
-                resnum = line[23:26]
-                atomname = line[12:16]
-                atomnum = line[9:12]
-                X = float(line[30:38])
-                Y = float(line[38:46])
-                Z = float(line[46:54])
-                boolhet = linesplit[0] == "HETATM"
-                temp_atom_info = PDB_atom_info(
-                    "",
-                    chainid,
-                    resname,
-                    resnum,
-                    atomname,
-                    atomnum,
-                    X,
-                    Y,
-                    Z,
-                    0.0,
-                    boolhet,
-                )
-                temp_atom_list.append(temp_atom_info)
-            elif linesplit[0] == "TER" or linesplit[0] == "END":
-                chain_list.append(temp_atom_list)
-                temp_atom_list = []
-        else:
-            print(
-                ("there is an empty line in " + pdb_file + " that might cause problems")
-            )
-            linesplit = [""]
+    records = PDBAtomRecords(read_pdb_file_lines(pdb_file))
+    lines_array = records.get_lines_array()
+
+    for _ in range(int(np.count_nonzero(np.char.strip(lines_array) == ""))):
+        print(("there is an empty line in " + pdb_file + " that might cause problems"))
 
-    if not (linesplit[0] == "TER" or linesplit[0] == "END"):
-        chain_list.append(temp_atom_list)
+    is_atom = get_is_first_token(lines_array, "ATOM") | get_is_first_token(lines_array, "HETATM")
+    chain_end_line_indices = np.flatnonzero(get_is_first_token(lines_array, "TER") | get_is_first_token(lines_array, "END"))
+    if len(chain_end_line_indices) > 0:
+        is_atom[chain_end_line_indices[0]:] = False
 
-    return chain_list[0]
+    return records[is_atom]
+
+
+def read_pdb(pdb_file):
+
+    ## this function will read in a muli-pdb file conatining ligands from docking hits.
+
+    records = read_pdb_records(pdb_file)
+    coords = records.get_coords()
+    boolhets = get_is_first_token(records.get_lines_array(), "HETATM")
+
+    return [
+        PDB_atom_info("", chainid, resname, resnum, atomname, atomnum, X, Y, Z, 0.0, boolhet)
+        for chainid, resname, resnum, atomname, atomnum, (X, Y, Z), boolhet in zip(
+            records.get_field(21, 22).tolist(),
+            records.get_field(17, 20).tolist(),
+            records.get_field(23, 26).tolist(),
+            records.get_field(12, 16).tolist(),
+            records.get_field(9, 12).tolist(),
+            coords.tolist(),
+            boolhets.tolist(),
+        )
+    ]
 
 
 #################################################################################################################
@@ -118,9 +121,9 @@ def output_pdb(pdb, filename):
     # ATOM      9  N   THR A 109      24.471  16.007   8.419  1.00     21.05           N
     # ATOM     10  CA  THR A 109      23.983  17.112   7.589  1.00 21.72           C
     #
-    file1 = open(filename, "w")
+    lines = []
     for atom in pdb:
-        file1.write(
+        lines.append(
             "ATOM  %5d %2s %3s %1s%4d%12.3f%8.3f%8.3f%6.2f%6.2f           %s\n"
             % (
                 int(atom.atomnum),
@@ -136,8 +139,7 @@ def output_pdb(pdb, filename):
                 atom.atomname[1:2],
             )
         )
-
-    file1.close()
+    write_pdb_file_lines(filename, lines)
 
 
 #################################################################################################################
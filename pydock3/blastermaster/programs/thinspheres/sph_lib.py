@@ -1,5 +1,21 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
 from pydock3.util import get_hexdigest_of_persistent_md5_hash_of_tuple
 
+# FORMAT: (I5, 3F10.5, F8.3, I5, I2, I3)
+SPH_LINE_WIDTH = 53
+SPH_LINE_FIELD_SLICES = {
+    "index": (0, 5),
+    "X": (5, 15),
+    "Y": (15, 25),
+    "Z": (25, 35),
+    "radius": (35, 43),
+    "atomnum": (43, 48),
+    "critical_cluster": (48, 50),
+    "sphere_color": (50, 53),
+}
+
 
 class Sphere(object):
     def __init__(self, index, X, Y, Z, radius, atomnum, critical_cluster, sphere_color):
@@ -53,94 +69,234 @@ def remove_val(val, index, list):
         count = count + 1  # index will change everytime somthing is removed.
 
 
-# this function will remove duplicates from the list
+# this function will remove duplicates from the list (in place), keeping the first of each
 # the duplicates have the same X,Y,Z coordinates.
 def remove_duplicates(l):
-    index = 0
+    coords_to_sphere_dict = {}
     for ele in l:
-        remove_val(ele, index, l)
-        index = index + 1
+        coords_to_sphere_dict.setdefault((ele.X, ele.Y, ele.Z), ele)  # dicts keep insertion order
+    l[:] = coords_to_sphere_dict.values()
 
 
 # FORMAT: (I5, 3F10.5, F8.3, I5, I2, I3)
 def read_sph(filename, chosen_cluster, color):
-    sphere_list = []
-    insph = open(filename, "r")
-    flag_cluster = False  # this flag determines if the sphere is writen to list
-
-    for line in insph:
-        if line[0:4] == "DOCK":
-            continue
-        elif line[0:4] == "clus":
-            cluster = int(line[7:16])
-            if chosen_cluster == "A":
-                flag_cluster = True
-            elif int(chosen_cluster) == cluster:
-                flag_cluster = True
-            else:
-                flag_cluster = False
-        elif not (line[0:5].replace(" ", "").isdigit()):
-            pass
-        else:
-            index = int(line[0:5])
-            x = float(line[5:15])
-            y = float(line[15:25])
-            z = float(line[25:35])
-            r = float(line[35:43])
-            if r == 0.0:
-                r = 0.5
-
-            atomnum = int(line[43:48])
-            if line[48:50] != "  ":
-                clust = int(line[48:50])
-            else:
-                clust = 0
-            if line[50:53] != "   ":
-                col = int(line[50:53])
-            else:
-                col = 0
-
-            if color == "A" or int(color) == col:
-                flag_color = True
-            else:
-                flag_color = False
-
-            tmp_sphere = Sphere(index, x, y, z, r, atomnum, clust, col)
-
-            if flag_cluster and flag_color:
-                # only put sphere on list if it is in a cluster of interested
-                # and if the color is the same
-                sphere_list.append(tmp_sphere)
-
-    # sphere_list.append(tmp_sphere)
-    # sphere_list.sort(byIndex)
-    # sphere_list.sort(key = lambda a,b: cmp(a.index, b.index))
-    sphere_list.sort(key=lambda a: a.index)
-    # sphere_list.sort(key = byIndex)
-    # remove duplicates:
-    remove_duplicates(sphere_list)
-
-    if len(sphere_list) == 0:
-        raise Exception("sphere list is empty")
-
-    return sphere_list
+    return SphereSet.read(filename, chosen_cluster, color).to_spheres()
 
 
 def write_sph(filename, spheres):
-    outsph = open(filename, "w")
-    outsph.write("DOCK spheres generated from read_write_sph.py\n")
-    outsph.write("cluster     1   number of spheres in cluster %3d\n" % len(spheres))
-    for i in range(len(spheres)):
-        outsph.write(
-            "%5d%10.5f%10.5f%10.5f%8.3f%5d%2d%3d\n"
-            % (
-                i + 1,
-                round(spheres[i].X, 3),
-                round(spheres[i].Y, 3),
-                round(spheres[i].Z, 3),
-                spheres[i].radius,
-                spheres[i].atomnum,
-                0,
-                spheres[i].sphere_color,
+    SphereSet.from_spheres(spheres).write(filename)
+
+
+def get_candidate_pairs_within_squared_distance(coords_a, coords_b, squared_distance):
+    """Returns indices (into `coords_a`, into `coords_b`) of pairs of points that may be within the squared distance.
+
+    Candidates are found with KD-trees using a slightly larger radius, so that pairs right at the cutoff are not lost
+    to rounding and can be checked exactly by the caller."""
+
+    if len(coords_a) == 0 or len(coords_b) == 0 or squared_distance < 0.0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    radius = np.sqrt(squared_distance) * (1.0 + 1e-6) + 1e-6
+    pairs = cKDTree(coords_a).sparse_distance_matrix(cKDTree(coords_b), radius, output_type="ndarray")
+
+    return pairs["i"].astype(np.int64), pairs["j"].astype(np.int64)
+
+
+def get_squared_distances(coords_a, coords_b):
+    # same order of operations as summing the squared differences of X, Y, Z one by one
+    diffs = coords_a - coords_b
+    return diffs[:, 0] ** 2 + diffs[:, 1] ** 2 + diffs[:, 2] ** 2
+
+
+class SphereSet(object):
+    """Spheres stored column-wise in NumPy arrays, one row per sphere."""
+
+    def __init__(self, indices, coords, radii, atomnums, critical_clusters, sphere_colors):
+        self.coords = np.array(coords, dtype=np.float64).reshape(-1, 3)
+        num_spheres = len(self.coords)
+        self.indices = np.broadcast_to(np.asarray(indices, dtype=np.int64), (num_spheres,)).copy()
+        self.radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), (num_spheres,)).copy()
+        self.atomnums = np.broadcast_to(np.asarray(atomnums, dtype=np.int64), (num_spheres,)).copy()
+        self.critical_clusters = np.broadcast_to(np.asarray(critical_clusters, dtype=np.int64), (num_spheres,)).copy()
+        self.sphere_colors = np.broadcast_to(np.asarray(sphere_colors, dtype=np.int64), (num_spheres,)).copy()
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, key):
+        """Selects spheres by boolean mask, indices or slice."""
+
+        return SphereSet(
+            self.indices[key],
+            self.coords[key],
+            self.radii[key],
+            self.atomnums[key],
+            self.critical_clusters[key],
+            self.sphere_colors[key],
+        )
+
+    @classmethod
+    def from_spheres(cls, spheres):
+        return cls(
+            [sphere.index for sphere in spheres],
+            [[sphere.X, sphere.Y, sphere.Z] for sphere in spheres],
+            [sphere.radius for sphere in spheres],
+            [sphere.atomnum for sphere in spheres],
+            [sphere.critical_cluster for sphere in spheres],
+            [sphere.sphere_color for sphere in spheres],
+        )
+
+    def to_spheres(self):
+        return [
+            Sphere(index, X, Y, Z, radius, atomnum, critical_cluster, sphere_color)
+            for index, (X, Y, Z), radius, atomnum, critical_cluster, sphere_color in zip(
+                self.indices.tolist(),
+                self.coords.tolist(),
+                self.radii.tolist(),
+                self.atomnums.tolist(),
+                self.critical_clusters.tolist(),
+                self.sphere_colors.tolist(),
             )
+        ]
+
+    @classmethod
+    def read(cls, filename, chosen_cluster="A", color="A"):
+        """Reads the spheres of the chosen cluster & color ("A" for all), sorted by index and without duplicates."""
+
+        # collect the sphere lines of the chosen cluster(s)
+        sphere_lines = []
+        flag_cluster = False  # this flag determines if the sphere is writen to list
+        with open(filename, "r") as insph:
+            for line in insph:
+                if line[0:4] == "DOCK":
+                    continue
+                elif line[0:4] == "clus":
+                    cluster = int(line[7:16])
+                    flag_cluster = chosen_cluster == "A" or int(chosen_cluster) == cluster
+                elif flag_cluster and line[0:5].replace(" ", "").isdigit():
+                    sphere_lines.append(line.rstrip("\r\n").ljust(SPH_LINE_WIDTH)[:SPH_LINE_WIDTH])
+
+        # parse the fixed-width fields of all lines at once
+        chars = np.frombuffer("".join(sphere_lines).encode("ascii"), dtype="S1").reshape(-1, SPH_LINE_WIDTH)
+        field_name_to_values_dict = {}
+        for field_name, (start, end) in SPH_LINE_FIELD_SLICES.items():
+            field_strs = np.ascontiguousarray(chars[:, start:end]).view(f"S{end - start}").reshape(-1)
+            if field_name in ["critical_cluster", "sphere_color"]:
+                field_strs = np.where(field_strs == b" " * (end - start), b"0", field_strs)  # blank fields are 0
+            field_name_to_values_dict[field_name] = field_strs.astype(np.float64 if field_name in ["X", "Y", "Z", "radius"] else np.int64)
+        radii = field_name_to_values_dict["radius"]
+        radii[radii == 0.0] = 0.5
+        sphere_set = cls(
+            field_name_to_values_dict["index"],
+            np.column_stack([field_name_to_values_dict["X"], field_name_to_values_dict["Y"], field_name_to_values_dict["Z"]]),
+            radii,
+            field_name_to_values_dict["atomnum"],
+            field_name_to_values_dict["critical_cluster"],
+            field_name_to_values_dict["sphere_color"],
         )
+
+        #
+        if color != "A":
+            sphere_set = sphere_set[sphere_set.sphere_colors == int(color)]
+        sphere_set = sphere_set[np.argsort(sphere_set.indices, kind="stable")]
+        sphere_set = sphere_set.get_without_duplicates()
+
+        if len(sphere_set) == 0:
+            raise Exception("sphere list is empty")
+
+        return sphere_set
+
+    def write(self, filename):
+        """Writes the spheres as one cluster, numbered from 1 & with coordinates rounded to 3 decimals."""
+
+        lines = [
+            "%5d%10.5f%10.5f%10.5f%8.3f%5d%2d%3d\n" % (i + 1, round(X, 3), round(Y, 3), round(Z, 3), radius, atomnum, 0, sphere_color)
+            for i, ((X, Y, Z), radius, atomnum, sphere_color) in enumerate(
+                zip(self.coords.tolist(), self.radii.tolist(), self.atomnums.tolist(), self.sphere_colors.tolist())
+            )
+        ]
+        with open(filename, "w") as outsph:
+            outsph.write("DOCK spheres generated from read_write_sph.py\n")
+            outsph.write("cluster     1   number of spheres in cluster %3d\n" % len(self))
+            outsph.write("".join(lines))
+
+    def get_hexdigests(self):
+        """Returns the persistent hash of each sphere (of index, X, Y, Z, radius, atomnum, critical cluster & color)."""
+
+        return [
+            get_hexdigest_of_persistent_md5_hash_of_tuple((index, X, Y, Z, radius, atomnum, critical_cluster, sphere_color))
+            for index, (X, Y, Z), radius, atomnum, critical_cluster, sphere_color in zip(
+                self.indices.tolist(),
+                self.coords.tolist(),
+                self.radii.tolist(),
+                self.atomnums.tolist(),
+                self.critical_clusters.tolist(),
+                self.sphere_colors.tolist(),
+            )
+        ]
+
+    def get_without_duplicates(self):
+        """Removes spheres with the same X, Y, Z coordinates as an earlier sphere."""
+
+        order = np.lexsort(self.coords.T[::-1])  # stable, so equal spheres keep their order
+        sorted_coords = self.coords[order]
+        is_new_coords = np.ones(len(self), dtype=bool)
+        is_new_coords[1:] = np.any(sorted_coords[1:] != sorted_coords[:-1], axis=1)
+        is_first = np.zeros(len(self), dtype=bool)
+        is_first[order[is_new_coords]] = True
+
+        return self[is_first]
+
+    def get_translated(self, translation_xyz):
+        """Translates all spheres by one X, Y, Z vector or each sphere by its own (num spheres x 3)."""
+
+        sphere_set = self[:]
+        sphere_set.coords = self.coords + np.asarray(translation_xyz, dtype=np.float64)
+
+        return sphere_set
+
+    def get_perturbed(self, max_deviation, random_generator):
+        """Translates each sphere by X, Y, Z deviations drawn uniformly from [-max_deviation, max_deviation].
+
+        Draws from `random_generator` (a `random.Random`) sphere by sphere, in X, Y, Z order."""
+
+        max_deviation = float(max_deviation)
+        deviations = [random_generator.uniform(-max_deviation, max_deviation) for _ in range(3 * len(self))]
+
+        return self.get_translated(np.array(deviations, dtype=np.float64).reshape(-1, 3))
+
+    def get_is_within_distance_of_points(self, points, distance):
+        """Returns whether each sphere is closer than `distance` to any of the points (num points x 3)."""
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        max_squared_distance = float(distance) ** 2.0
+        sph_indices, point_indices = get_candidate_pairs_within_squared_distance(self.coords, points, max_squared_distance)
+        is_close = get_squared_distances(self.coords[sph_indices], points[point_indices]) < max_squared_distance
+        is_within_distance = np.zeros(len(self), dtype=bool)
+        is_within_distance[sph_indices[is_close]] = True
+
+        return is_within_distance
+
+    def get_is_kept_after_trimming(self, sph_rad, is_kept=None):
+        """Goes through the spheres in order, removing every later sphere within `sph_rad / sqrt(2)` of a kept sphere.
+
+        Returns whether each sphere is kept. Spheres not in `is_kept` (default: all) are neither kept nor remove others."""
+
+        max_squared_distance = (sph_rad**2.0) / 2.0
+        i_indices, j_indices = get_candidate_pairs_within_squared_distance(self.coords, self.coords, max_squared_distance)
+        is_later = j_indices > i_indices
+        i_indices, j_indices = i_indices[is_later], j_indices[is_later]
+        is_close = get_squared_distances(self.coords[i_indices], self.coords[j_indices]) <= max_squared_distance
+        i_indices, j_indices = i_indices[is_close], j_indices[is_close]
+
+        # later spheres close to each sphere, grouped by sphere
+        order = np.argsort(i_indices, kind="stable")
+        i_indices, j_indices = i_indices[order], j_indices[order]
+        group_start_indices = np.searchsorted(i_indices, np.arange(len(self) + 1))
+
+        #
+        is_kept = np.ones(len(self), dtype=bool) if is_kept is None else np.array(is_kept, dtype=bool)
+        for i in range(len(self)):
+            if is_kept[i]:
+                is_kept[j_indices[group_start_indices[i]:group_start_indices[i + 1]]] = False
+
+        return is_kept
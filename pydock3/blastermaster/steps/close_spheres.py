@@ -1,5 +1,7 @@
 import logging
 
+import numpy as np
+
 from pydock3.blastermaster.util import BlasterStep
 from pydock3.blastermaster.programs.thinspheres import sph_lib, pdb_lib
 
@@ -38,47 +40,48 @@ class CloseSpheresGenerationStep(BlasterStep):
 
     @BlasterStep.handle_run_func
     def run(self):
-        spheres_list = sph_lib.read_sph(self.infiles.thin_spheres_infile.path, "A", "A")
-        pdb_list = pdb_lib.read_pdb(self.infiles.ligand_infile.path)
-        spheres_list = distance_sph_pdb(
-            spheres_list, pdb_list, self.parameters.distance_to_ligand_parameter.value
-        )
+        spheres = sph_lib.SphereSet.read(self.infiles.thin_spheres_infile.path, "A", "A")
+        ligand_coords = pdb_lib.read_pdb_records(self.infiles.ligand_infile.path).get_coords()
+        spheres = spheres[
+            spheres.get_is_within_distance_of_points(ligand_coords, self.parameters.distance_to_ligand_parameter.value)
+        ]
         radius = (
             self.parameters.distance_to_surface_parameter.value
             + self.parameters.penetration_parameter.value
         )
-        spheres_list = trim_sph(spheres_list, radius)
-        sph_lib.write_sph(self.outfiles.close_spheres_outfile.path, spheres_list)
+        spheres = spheres[spheres.get_is_kept_after_trimming(radius)]
+        spheres.write(self.outfiles.close_spheres_outfile.path)
+
+
+def get_coordinates_array(objs):
+    return np.array([[obj.X, obj.Y, obj.Z] for obj in objs], dtype=np.float64).reshape(-1, 3)
 
 
 def trim_sph(sph_list, sph_rad):
-    for i in range(len(sph_list) - 1):
-        if sph_list[i][1]:
-            for j in range(i + 1, len(sph_list)):
-                if sph_list[j][1]:
-                    dist = (
-                        (sph_list[i][0].X - sph_list[j][0].X) ** 2
-                        + (sph_list[i][0].Y - sph_list[j][0].Y) ** 2
-                        + (sph_list[i][0].Z - sph_list[j][0].Z) ** 2
-                    )
-                    if dist <= (sph_rad**2.0) / 2.0:
-                        sph_list[j][1] = False
+    """Goes through the spheres in order, removing every later sphere within `sph_rad / sqrt(2)` of a kept sphere."""
+
+    sphere_set = sph_lib.SphereSet.from_spheres([sph[0] for sph in sph_list])
+    is_kept = sphere_set.get_is_kept_after_trimming(sph_rad, is_kept=[bool(sph[1]) for sph in sph_list])
 
     final_sph_list = []
-    for sph in sph_list:
-        if sph[1]:
+    for sph, kept in zip(sph_list, is_kept):
+        sph[1] = bool(kept)
+        if kept:
             final_sph_list.append(sph[0])
 
     return final_sph_list
 
 
 def distance_sph_pdb(spheres, pdb_atoms, distance):
+    """Returns the spheres closer than `distance` to any of the atoms, each as [sphere, True]."""
+
+    is_within_distance = sph_lib.SphereSet.from_spheres(spheres).get_is_within_distance_of_points(
+        get_coordinates_array(pdb_atoms), distance
+    )
+
     sph_list = []
-    for sph in spheres:
-        for atom in pdb_atoms:
-            d2 = (atom.X - sph.X) ** 2 + (atom.Y - sph.Y) ** 2 + (atom.Z - sph.Z) ** 2
-            if d2 < float(distance) ** 2.0:
-                sph_list.append([sph, True])
-                break
+    for sph, close in zip(spheres, is_within_distance):
+        if close:
+            sph_list.append([sph, True])
 
     return sph_list
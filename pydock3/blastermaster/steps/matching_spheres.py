@@ -44,6 +44,15 @@ class MatchingSpheresGenerationStep(BlasterStep):
             program_file_path=ProgramFilePaths.MAKESPHERES3_PROGRAM_FILE_PATH,
         )
 
+    def _get_covalent_residue_atom_coords(self, pdb_h, residue_name, atom_name):
+        residue_num = self.parameters.covalent_residue_num_parameter.value
+        index = pdb_h.get_index_by_residue_atom(residue_num, residue_name, atom_name)
+        if index is False:  # not found (N.B.: 0 is a valid index)
+            raise Exception(
+                f"Covalent residue {residue_name} {residue_num} has no atom {atom_name} in receptor file: {self.infiles.charged_receptor_infile.path}"
+            )
+        return pdb_h.coords[index]
+
     @BlasterStep.handle_run_func
     def run(self):
         """run the makespheres3.cli.pl perl script to make low dielectric spheres"""
@@ -72,93 +81,21 @@ class MatchingSpheresGenerationStep(BlasterStep):
                 )
 
                 if self.parameters.covalent_residue_name_parameter.value == "CYS":
-                    p_1_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "CYS",
-                            "CA",
-                        )
-                    ]
-                    p_2_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "CYS",
-                            "CB",
-                        )
-                    ]
-                    p_3_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "CYS",
-                            "SG",
-                        )
-                    ]
+                    p_1_coords = self._get_covalent_residue_atom_coords(pdb_h, "CYS", "CA")
+                    p_2_coords = self._get_covalent_residue_atom_coords(pdb_h, "CYS", "CB")
+                    p_3_coords = self._get_covalent_residue_atom_coords(pdb_h, "CYS", "SG")
                 elif self.parameters.covalent_residue_name_parameter.value == "SER":
-                    p_1_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "SER",
-                            "CA",
-                        )
-                    ]
-                    p_2_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "SER",
-                            "CB",
-                        )
-                    ]
-                    p_3_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "SER",
-                            "OG",
-                        )
-                    ]
+                    p_1_coords = self._get_covalent_residue_atom_coords(pdb_h, "SER", "CA")
+                    p_2_coords = self._get_covalent_residue_atom_coords(pdb_h, "SER", "CB")
+                    p_3_coords = self._get_covalent_residue_atom_coords(pdb_h, "SER", "OG")
                 elif self.parameters.covalent_residue_name_parameter.value == "LYS":
-                    p_1_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "LYS",
-                            "CD",
-                        )
-                    ]
-                    p_2_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "LYS",
-                            "CE",
-                        )
-                    ]
-                    p_3_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "LYS",
-                            "NZ",
-                        )
-                    ]
+                    p_1_coords = self._get_covalent_residue_atom_coords(pdb_h, "LYS", "CD")
+                    p_2_coords = self._get_covalent_residue_atom_coords(pdb_h, "LYS", "CE")
+                    p_3_coords = self._get_covalent_residue_atom_coords(pdb_h, "LYS", "NZ")
                 elif self.parameters.covalent_residue_name_parameter.value == "TYR":
-                    p_1_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "TYR",
-                            "CE1",
-                        )
-                    ]
-                    p_2_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "TYR",
-                            "CZ",
-                        )
-                    ]
-                    p_3_coords = pdb_h.coords[
-                        pdb_h.get_index_by_residue_atom(
-                            self.parameters.covalent_residue_num_parameter.value,
-                            "TYR",
-                            "OH",
-                        )
-                    ]
+                    p_1_coords = self._get_covalent_residue_atom_coords(pdb_h, "TYR", "CE1")
+                    p_2_coords = self._get_covalent_residue_atom_coords(pdb_h, "TYR", "CZ")
+                    p_3_coords = self._get_covalent_residue_atom_coords(pdb_h, "TYR", "OH")
                 else:
                     logger.exception(
                         f"Currently only supporting CYS, SER, LYS, TYR to prep other residues modify matching_spheres.py\ncovalent_residue_name given: {self.parameters.covalent_residue_name_parameter.value}"
@@ -1,6 +1,9 @@
 import logging
 
+import numpy as np
+
 from pydock3.blastermaster.util import BlasterStep
+from pydock3.blastermaster.programs.thinspheres.sph_lib import SphereSet
 
 
 #
@@ -64,26 +67,31 @@ def format_sphere_line(atom_num, sphere, size):
 def thin_spheres(in_f, out_f, distance=1.8, size=1.9):
     """Generate delphi sphere pool near a given distance using rec.ms."""
 
-    spheres = []
+    atom_nums = []
+    points = []
+    normals = []
     for line in in_f:
         if line[40] == "S":
             splits = line.split()
-            point = [float(line[13:21]), float(line[21:30]), float(line[30:39])]
-            normal = [
-                float(line[43:50]),
-                float(line[50:57]),
-                float(line[57:64]),
-                float(line[64:71]),
-            ]
-            sphere = [p + distance * n for p, n in zip(point, normal)]
+            points.append([float(line[13:21]), float(line[21:30]), float(line[30:39])])
+            normals.append([float(line[43:50]), float(line[50:57]), float(line[57:64])])
 
             # Handle odd chain id placement
             try:
                 atom_num = int(splits[1])
             except ValueError:
                 atom_num = int(splits[1][:-1])
-            spheres.append((atom_num, sphere))
+            atom_nums.append(atom_num)
+    points = np.array(points, dtype=np.float64).reshape(-1, 3)
+    normals = np.array(normals, dtype=np.float64).reshape(-1, 3)
+    spheres = SphereSet(atom_nums, points + distance * normals, size, atom_nums, 0, 0)
 
     out_f.write("cluster     0   number of spheres in cluster %5d\n" % len(spheres))
-    for atom_num, sphere in spheres:
-        out_f.write(format_sphere_line(atom_num, sphere, size=size) + "\n")
+    out_f.write(
+        "".join(
+            [
+                format_sphere_line(atom_num, sphere, size=size) + "\n"
+                for atom_num, sphere in zip(spheres.atomnums.tolist(), spheres.coords.tolist())
+            ]
+        )
+    )
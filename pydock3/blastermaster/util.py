@@ -171,6 +171,15 @@ class BlasterFile(File):
             self.get_datetime_file_was_last_modified(self.path)
         )
 
+    def stage_from(self, src_file_path, overwrite=True, allow_symlink=False, read_only=False, link_writable_src=True):
+        method = self.stage_file(
+            src_file_path=src_file_path, dst_file_path=self.path, overwrite=overwrite, allow_symlink=allow_symlink, read_only=read_only, link_writable_src=link_writable_src
+        )
+        self.datetime_marked_complete_in_most_recent_job = (
+            self.get_datetime_file_was_last_modified(self.path)
+        )
+        return method
+
     def delete(self):
         self.delete_file(self.path)
         self.src_file_path = None
@@ -213,7 +222,11 @@ class WorkingDir(Dir):
         if len(backup_files_to_copy_in) != len(new_backup_file_names):
             raise Exception("# backup files to copy in must match # of new backup file names.")
 
-        # copy in specified files if they exist, otherwise try to copy in backup files
+        # stage in specified files if they exist, otherwise try to stage in backup files
+        # (via reflink / hardlink / symlink where the file system allows it, so that this is cheap even when done for many working dirs).
+        # A writable source (a user's input file, or a package default file in a user-writable install) is only reflinked or
+        # copied, never linked, so that nothing done in a working dir can modify it. The staged files are made read-only
+        # since steps in turn hardlink them into their step dirs.
         file_names_to_copy_in = [
             File.get_file_name_of_file(file_path) for file_path in files_to_copy_in
         ]
@@ -225,12 +238,12 @@ class WorkingDir(Dir):
                 not in file_names_to_copy_in
             ):
                 if File.file_exists(src_backup_file_path):
-                    self.copy_in_file(
-                        src_backup_file_path, dst_file_name=dst_backup_file_name
+                    self.stage_in_file(
+                        src_backup_file_path, dst_file_name=dst_backup_file_name, allow_symlink=True, read_only=True, link_writable_src=False
                     )
         for src_file_path, dst_file_name in zip(files_to_copy_in, new_file_names):
             if File.file_exists(src_file_path):
-                self.copy_in_file(src_file_path, dst_file_name=dst_file_name)
+                self.stage_in_file(src_file_path, dst_file_name=dst_file_name, allow_symlink=True, read_only=True, link_writable_src=False)
 
 
 class BlasterFiles(object):
@@ -266,6 +279,7 @@ class BlasterFiles(object):
 
 
 DockFiles = make_dataclass("DockFiles", [(identifier, BlasterFile) for identifier in DOCK_FILE_IDENTIFIERS])
+DockFiles.__module__ = __name__  # so that instances can be pickled
 
 
 class BlasterStep(object):
@@ -295,6 +309,22 @@ class BlasterStep(object):
     def __str__(self):
         return self.__class__.__name__
 
+    def __getstate__(self):
+        # the namedtuple classes of infiles, outfiles, and parameters are created per instance and so cannot be pickled as is
+        state = self.__dict__.copy()
+        for attr in ["_infiles", "_outfiles", "_parameters"]:
+            named_tuple = state[attr]
+            if named_tuple is not None:
+                state[attr] = (type(named_tuple).__name__, named_tuple._fields, tuple(named_tuple))
+        return state
+
+    def __setstate__(self, state):
+        for attr in ["_infiles", "_outfiles", "_parameters"]:
+            if state[attr] is not None:
+                type_name, field_names, values = state[attr]
+                state[attr] = collections.namedtuple(type_name, field_names)(*values)
+        self.__dict__.update(state)
+
     def _get_step_dir(self, working_dir, outfile_tuples):
         class_name_snake_case = re.sub('(?<!^)(?=[A-Z])', '_', self.__str__()).lower()
         comma_separated_outfile_names = ','.join([x[0].name for x in outfile_tuples])
@@ -472,15 +502,19 @@ class BlasterStep(object):
         return LogFile(path=os.path.join(self.step_dir.path, "log"))
 
     def _import_infiles(self):
-        """Copies input files to be used in program process into step dir"""
+        """Stages input files to be used in program process into step dir (via reflink / hardlink / symlink where possible, copy otherwise)"""
         for infile in self.infiles:
-            infile.copy_from(infile.original_file_in_working_dir.path)
+            infile.stage_from(infile.original_file_in_working_dir.path, allow_symlink=True)
 
     def _export_outfiles(self):
-        """Copies output files created in program process back out into working dir"""
+        """Stages output files created in program process back out into working dir (via reflink / hardlink where possible, copy otherwise).
+
+        Exported outfiles are made read-only since later steps stage them into their own step dirs by hardlink: a program
+        that modifies one of its input files in place therefore fails loudly rather than silently corrupting the output of
+        another step. Programs that replace files (e.g., `sed -i`) are unaffected."""
         for outfile in self.outfiles:
             if not outfile.original_file_in_working_dir.exists:
-                outfile.original_file_in_working_dir.copy_from(outfile.path)
+                outfile.original_file_in_working_dir.stage_from(outfile.path, read_only=True)
 
     def run_command(self, command_str, timeout_seconds=None, env_vars_dict=None):
         result = system_call(
@@ -1,5 +1,7 @@
 import logging
 import itertools
+import collections
+import random
 
 import oyaml as yaml
 import yamale
@@ -104,18 +106,22 @@ def flatten_and_parameter_cast_param_dict(d, key_prefix=""):
     return new_d
 
 
+def get_hexdigest_of_persistent_md5_hash_of_flat_param_dict(p_dict):
+    p_dict_items_interleaved_sorted_by_key_tuple = tuple(
+        itertools.chain.from_iterable(
+            sorted(list(zip(*list(zip(*p_dict.items())))), key=lambda x: x[0])
+        )
+    )
+    return get_hexdigest_of_persistent_md5_hash_of_tuple(
+        p_dict_items_interleaved_sorted_by_key_tuple
+    )
+
+
 def sort_list_of_flat_param_dicts(param_dicts):
     param_dict_hashes = []
     for p_dict in param_dicts:
-        p_dict_items_interleaved_sorted_by_key_tuple = tuple(
-            itertools.chain.from_iterable(
-                sorted(list(zip(*list(zip(*p_dict.items())))), key=lambda x: x[0])
-            )
-        )
         param_dict_hashes.append(
-            get_hexdigest_of_persistent_md5_hash_of_tuple(
-                p_dict_items_interleaved_sorted_by_key_tuple
-            )
+            get_hexdigest_of_persistent_md5_hash_of_flat_param_dict(p_dict)
         )
     sorted_param_dicts = [
         x
@@ -155,3 +161,241 @@ def get_sorted_univalued_flat_parameter_cast_param_dicts_from_multivalued_param_
         )
 
     return sort_list_of_flat_param_dicts(univalued_flat_parameter_cast_param_dicts)
+
+
+class ParameterConstraint(object):
+    """Restricts which values of some parameters may be combined with which values of others, e.g.
+
+        if: {indock_file_generation.electrostatic_scale: [0.5, 2.0]}
+        then: {dock_files_generation.thin_spheres_elec.distance_to_surface: 1.0}
+
+    means that electrostatic scales of 0.5 and 2.0 are only combined with a thin spheres distance of 1.0. Values may be
+    given as a single value or a list of allowed values. Keys are fully qualified flat parameter names."""
+
+    def __init__(self, if_dict, then_dict):
+        self.if_key_to_allowed_values_dict = {key: self._get_allowed_values(value) for key, value in if_dict.items()}
+        self.then_key_to_allowed_values_dict = {key: self._get_allowed_values(value) for key, value in then_dict.items()}
+
+    @staticmethod
+    def _get_allowed_values(value):
+        if isinstance(value, list):
+            return value
+        return [value]
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(if_dict=d["if"], then_dict=d["then"])
+
+    @property
+    def keys(self):
+        return set(self.if_key_to_allowed_values_dict.keys()) | set(self.then_key_to_allowed_values_dict.keys())
+
+    def is_satisfied_by(self, flat_param_dict):
+        """Returns False only if every key of the constraint is in `flat_param_dict` and the constraint is violated.
+        Values may be instances of `Parameter`."""
+
+        if not self.keys.issubset(flat_param_dict.keys()):
+            return True  # cannot be decided
+
+        def get_value(key):
+            value = flat_param_dict[key]
+            if isinstance(value, Parameter):
+                return value.value
+            return value
+
+        #
+        if not all([get_value(key) in allowed_values for key, allowed_values in self.if_key_to_allowed_values_dict.items()]):
+            return True
+
+        return all([get_value(key) in allowed_values for key, allowed_values in self.then_key_to_allowed_values_dict.items()])
+
+
+class ParameterSpace(object):
+    """Lazy Cartesian product of the values of a multivalued param dict.
+
+    Combinations are never materialized all at once: each combination corresponds to an index into the product, decoded
+    in mixed radix (keys sorted, values sorted), so enumeration streams in a deterministic order and random / Latin
+    hypercube samples can be drawn directly. Constraints (see `ParameterConstraint`) are applied during enumeration,
+    pruning whole sub-products as soon as a violated constraint's keys are all assigned.
+
+    `key_prefix` is the prefix under which the keys of this space appear in the fully qualified flat parameter names
+    used by constraints (e.g., "indock_file_generation."). Constraints involving keys outside this space are ignored."""
+
+    def __init__(self, multivalued_param_dict, constraints=None, key_prefix=""):
+        #
+        if constraints is None:
+            constraints = []
+
+        #
+        self.key_prefix = key_prefix
+        self.keys = []
+        self.multivalues = []
+        for key, multivalue in sorted(flatten_param_dict(multivalued_param_dict).items(), key=lambda item: item[0]):  # sort by keys
+            self.keys.append(key)
+            if isinstance(multivalue, list):
+                self.multivalues.append(sorted(multivalue))  # is multivalue, sort it
+            else:
+                self.multivalues.append([multivalue])  # is univalue, so cast as multivalue
+
+        # only constraints entirely within this space can be applied here
+        prefixed_keys = set([f"{self.key_prefix}{key}" for key in self.keys])
+        self.constraints = [constraint for constraint in constraints if constraint.keys.issubset(prefixed_keys)]
+
+        # each constraint is checked as soon as its last key (in enumeration order) is assigned
+        self._key_index_to_constraints_dict = collections.defaultdict(list)
+        for constraint in self.constraints:
+            last_key_index = max([self.keys.index(key[len(self.key_prefix):]) for key in constraint.keys])
+            self._key_index_to_constraints_dict[last_key_index].append(constraint)
+
+    @property
+    def size(self):
+        """Number of combinations before constraints are applied."""
+
+        size = 1
+        for multivalue in self.multivalues:
+            size *= len(multivalue)
+        return size
+
+    def count(self, max_count=None):
+        """Number of combinations satisfying the constraints, or None if there are more than `max_count` of them (so
+        that counting stops early on huge spaces). Counts without building the combinations."""
+
+        num_combinations = 0
+        for _ in self._iterate_over_value_indices_of_combinations([]):
+            num_combinations += 1
+            if max_count is not None and num_combinations > max_count:
+                return None
+        return num_combinations
+
+    def _get_univalued_flat_parameter_cast_param_dict(self, value_indices):
+        return {key: Parameter(name=key, value=self.multivalues[i][value_indices[i]]) for i, key in enumerate(self.keys)}
+
+    def _get_value_indices_of_combination_index(self, index):
+        value_indices = [0] * len(self.keys)
+        for i in reversed(range(len(self.keys))):  # last key varies fastest
+            index, value_indices[i] = divmod(index, len(self.multivalues[i]))
+        return value_indices
+
+    def _get_combination_index_of_value_indices(self, value_indices):
+        index = 0
+        for i, value_index in enumerate(value_indices):
+            index = index * len(self.multivalues[i]) + value_index
+        return index
+
+    def _satisfies_constraints(self, value_indices, key_indices=None):
+        if key_indices is None:
+            key_indices = range(len(self.keys))
+        prefixed_flat_value_dict = {f"{self.key_prefix}{self.keys[i]}": self.multivalues[i][value_indices[i]] for i in range(len(value_indices))}
+        return all([constraint.is_satisfied_by(prefixed_flat_value_dict) for i in key_indices for constraint in self._key_index_to_constraints_dict[i]])
+
+    def __getitem__(self, index):
+        """Combination at `index` of the (unconstrained) product."""
+
+        if not 0 <= index < self.size:
+            raise IndexError(f"Index {index} out of range for parameter space of size {self.size}")
+        return self._get_univalued_flat_parameter_cast_param_dict(self._get_value_indices_of_combination_index(index))
+
+    def __iter__(self):
+        """Yields each combination satisfying the constraints, in mixed-radix order."""
+
+        for value_indices in self._iterate_over_value_indices_of_combinations([]):
+            yield self._get_univalued_flat_parameter_cast_param_dict(value_indices)
+
+    def iterate_over_indices(self):
+        """Yields the index (see `__getitem__`) of each combination satisfying the constraints, in mixed-radix order."""
+
+        for value_indices in self._iterate_over_value_indices_of_combinations([]):
+            yield self._get_combination_index_of_value_indices(value_indices)
+
+    def _iterate_over_value_indices_of_combinations(self, value_indices):
+        # depth-first over keys, skipping the sub-product below any assignment that violates a constraint
+        i = len(value_indices)
+        if i == len(self.keys):
+            yield list(value_indices)
+            return
+        for value_index in range(len(self.multivalues[i])):
+            value_indices.append(value_index)
+            if self._satisfies_constraints(value_indices, key_indices=[i]):
+                yield from self._iterate_over_value_indices_of_combinations(value_indices)
+            value_indices.pop()
+
+    def sample(self, num_samples, method="random", random_seed=None):
+        """Returns up to `num_samples` distinct combinations satisfying the constraints, in mixed-radix order.
+
+        `method` is one of "random" (uniform, without replacement) or "latin_hypercube" (each key's values are covered
+        as evenly as possible; samples that violate constraints or duplicate others are replaced by random ones)."""
+
+        return [self[index] for index in self.sample_indices(num_samples, method=method, random_seed=random_seed)]
+
+    def sample_indices(self, num_samples, method="random", random_seed=None):
+        """Like `sample`, but returns the indices of the combinations (see `__getitem__`)."""
+
+        #
+        rng = random.Random(random_seed)
+        sampled_indices = set()
+
+        #
+        if method == "latin_hypercube":
+            strata_permutations = [rng.sample(range(num_samples), num_samples) for _ in self.keys]
+            for j in range(num_samples):
+                value_indices = [
+                    min(int((strata_permutations[i][j] + rng.random()) * len(multivalue) / num_samples), len(multivalue) - 1)
+                    for i, multivalue in enumerate(self.multivalues)
+                ]
+                if self._satisfies_constraints(value_indices):
+                    sampled_indices.add(self._get_combination_index_of_value_indices(value_indices))
+        elif method != "random":
+            raise Exception(f"Unrecognized parameter space sampling method: {method}")
+
+        # draw uniformly at random (without replacement) until enough samples are found
+        max_num_attempts = 100 * num_samples
+        num_attempts = 0
+        while len(sampled_indices) < min(num_samples, self.size) and num_attempts < max_num_attempts:
+            index = rng.randrange(self.size)
+            num_attempts += 1
+            if index in sampled_indices:
+                continue
+            if self._satisfies_constraints(self._get_value_indices_of_combination_index(index)):
+                sampled_indices.add(index)
+
+        # constraints exclude most of the space, so fall back to reservoir sampling over the (lazy) enumeration
+        if len(sampled_indices) < min(num_samples, self.size):
+            reservoir = []
+            num_seen = 0
+            for value_indices in self._iterate_over_value_indices_of_combinations([]):
+                index = self._get_combination_index_of_value_indices(value_indices)
+                if index in sampled_indices:
+                    continue
+                num_seen += 1
+                if len(reservoir) < num_samples - len(sampled_indices):
+                    reservoir.append(index)
+                else:
+                    j = rng.randrange(num_seen)
+                    if j < len(reservoir):
+                        reservoir[j] = index
+            sampled_indices.update(reservoir)
+
+        return sorted(sampled_indices)
+
+
+class ParameterSpaceSortedByHash(object):
+    """Combinations of a `ParameterSpace` (all those satisfying its constraints, or those at the given indices) in the
+    order `sort_list_of_flat_param_dicts` puts them in.
+
+    The combinations are enumerated once, one at a time, keeping only the hash & index of each; they are rebuilt from
+    their indices whenever iterated over, so that iterating over the product of spaces does not materialize either."""
+
+    def __init__(self, parameter_space, indices=None):
+        if indices is None:
+            indices = parameter_space.iterate_over_indices()
+
+        #
+        self.parameter_space = parameter_space
+        self.indices = [index for _, index in sorted((get_hexdigest_of_persistent_md5_hash_of_flat_param_dict(parameter_space[index]), index) for index in indices)]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        for index in self.indices:
+            yield self.parameter_space[index]
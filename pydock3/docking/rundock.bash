@@ -80,6 +80,9 @@ mkdir -p $DOCKFILES_TEMP
 mkdir -p $OUTPUT
 chmod -R 777 $OUTPUT
 
+# record start time (used by DockOpt to detect straggler tasks)
+date +%s > $OUTPUT/start_time
+
 # copy dockfiles
 awk "\$1==${TASK_ID}{for (j=2; j<=NF; j++) print \$j}" "$ARRAY_JOB_DOCKING_CONFIGURATIONS" | xargs -I {} cp {} "$DOCKFILES_TEMP"
 echo "dockfiles: "
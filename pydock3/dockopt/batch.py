@@ -0,0 +1,266 @@
+import os
+import sys
+import math
+import time
+import logging
+import threading
+from typing import Dict, Optional, Set, Union, Iterable
+
+import pandas as pd
+
+from pydock3.util import logging_formatter
+from pydock3.job_schedulers import JobScheduler, TaskAccountingRecord
+from pydock3.dockopt.status import DockoptJobStatus, STATUS_FILE_NAME
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+BATCH_TARGET_LOG_FILE_NAME = "dockopt_batch.log"
+MIN_SECONDS_BETWEEN_QUEUE_SNAPSHOTS = 30
+SECONDS_BETWEEN_BATCH_PROGRESS_REPORTS = 300
+DEFAULT_TARGET_PRIORITY = 1.0
+
+
+class SharedJobSchedulerQueue(object):
+    """A view of the job scheduler queue shared by the DockOpt jobs ("targets") of a batch, along with a budget on the
+    number of their tasks on the queue at a time.
+
+    The view is refreshed with a single query of the queue at most every `MIN_SECONDS_BETWEEN_QUEUE_SNAPSHOTS`, instead
+    of one query per check of each job. Tasks submitted since the last snapshot are counted as on the queue. The budget
+    is split among the targets waiting to submit or with tasks on the queue in proportion to their priorities, but a
+    target may use budget left unused by the others."""
+
+    def __init__(self, job_scheduler: JobScheduler, max_tasks_on_queue: Optional[int] = None):
+        self.job_scheduler = job_scheduler
+        self.max_tasks_on_queue = max_tasks_on_queue
+
+        #
+        self._condition = threading.Condition()
+        self._job_name_to_task_ids_dict = {}
+        self._time_of_last_snapshot = None
+        self._submissions_since_last_snapshot = []  # (time submitted, job name, task ids)
+        self._job_name_to_target_name_dict = {}
+        self._target_name_to_priority_dict = {}
+        self._target_names_waiting_to_submit = set()
+
+    def add_target(self, target_name: str, priority: float = DEFAULT_TARGET_PRIORITY) -> "BatchTargetJobScheduler":
+        if priority <= 0:
+            raise Exception(f"Priority of target must be positive. Witnessed: {priority}")
+        with self._condition:
+            self._target_name_to_priority_dict[target_name] = priority
+
+        return BatchTargetJobScheduler(self, target_name)
+
+    def remove_target(self, target_name: str) -> None:
+        with self._condition:
+            self._target_name_to_priority_dict.pop(target_name, None)
+            self._condition.notify_all()
+
+    def _refresh(self, force: bool = False) -> None:
+        """Must be called with `self._condition` held."""
+
+        if not force and self._time_of_last_snapshot is not None and time.time() - self._time_of_last_snapshot < MIN_SECONDS_BETWEEN_QUEUE_SNAPSHOTS:
+            return
+
+        #
+        time_of_snapshot = time.time()
+        self._job_name_to_task_ids_dict = self.job_scheduler.get_queue_snapshot()
+        self._time_of_last_snapshot = time_of_snapshot
+        self._submissions_since_last_snapshot = [x for x in self._submissions_since_last_snapshot if x[0] >= time_of_snapshot]
+        self._condition.notify_all()  # tasks may have left the queue
+
+    def _get_task_ids_on_queue(self, job_name: str) -> Optional[Set[str]]:
+        """Returns None if the job is not on the queue."""
+
+        task_ids = self._job_name_to_task_ids_dict.get(job_name)
+        for _, submitted_job_name, submitted_task_ids in self._submissions_since_last_snapshot:
+            if submitted_job_name == job_name:
+                task_ids = (task_ids or set()) | submitted_task_ids
+
+        return task_ids
+
+    def _get_num_tasks_on_queue(self, target_name: Optional[str] = None) -> int:
+        """Number of tasks on the queue of the given target (or of all targets)."""
+
+        return sum([
+            len(self._get_task_ids_on_queue(job_name) or [])
+            for job_name, this_target_name in self._job_name_to_target_name_dict.items()
+            if target_name is None or this_target_name == target_name
+        ])
+
+    def _get_num_tasks_target_may_submit(self, target_name: str) -> int:
+        """Must be called with `self._condition` held."""
+
+        if self.max_tasks_on_queue is None:
+            return sys.maxsize
+        num_tasks_free = self.max_tasks_on_queue - self._get_num_tasks_on_queue()
+        if num_tasks_free <= 0:
+            return 0
+
+        # split the budget among the targets competing for it
+        target_name_to_num_tasks_on_queue_dict = {t: self._get_num_tasks_on_queue(t) for t in self._target_name_to_priority_dict}
+        competing_target_names = [t for t in self._target_name_to_priority_dict if t in self._target_names_waiting_to_submit or target_name_to_num_tasks_on_queue_dict[t] > 0]
+        sum_of_priorities = sum([self._target_name_to_priority_dict[t] for t in competing_target_names])
+
+        def get_num_tasks_under_share(t):
+            share = self.max_tasks_on_queue * self._target_name_to_priority_dict[t] / sum_of_priorities
+            return min(num_tasks_free, math.ceil(share) - target_name_to_num_tasks_on_queue_dict[t])
+
+        #
+        num_tasks = get_num_tasks_under_share(target_name)
+        if num_tasks > 0:
+            return num_tasks
+
+        # budget left unused (every target waiting to submit is at or over its share) goes to the furthest under its share
+        if all([get_num_tasks_under_share(t) <= 0 for t in self._target_names_waiting_to_submit]):
+            most_underserved_target_name = min(
+                sorted(self._target_names_waiting_to_submit),
+                key=lambda t: target_name_to_num_tasks_on_queue_dict[t] / self._target_name_to_priority_dict[t],
+            )
+            if most_underserved_target_name == target_name:
+                return num_tasks_free
+
+        return 0
+
+    def submit(self, target_name: str, job_name: str, task_ids: Iterable[Union[str, int]], **kwargs) -> list:
+        """Submit the given tasks of the array job (blocking until the target's share of the budget allows it)."""
+
+        task_ids = [str(task_id) for task_id in task_ids]
+        procs = []
+        while task_ids:
+            #
+            with self._condition:
+                self._target_names_waiting_to_submit.add(target_name)
+                try:
+                    while True:
+                        self._refresh()
+                        num_tasks = self._get_num_tasks_target_may_submit(target_name)
+                        if num_tasks > 0:
+                            break
+                        self._condition.wait(timeout=MIN_SECONDS_BETWEEN_QUEUE_SNAPSHOTS)
+                finally:
+                    self._target_names_waiting_to_submit.discard(target_name)
+                self._job_name_to_target_name_dict[job_name] = target_name
+
+            #
+            task_ids_to_submit, task_ids = task_ids[:num_tasks], task_ids[num_tasks:]
+            if task_ids:
+                logger.debug(f"Submitting {len(task_ids_to_submit)} tasks of array job {job_name} now and {len(task_ids)} once the budget of tasks on the queue allows")
+            procs += self.job_scheduler.submit(job_name=job_name, task_ids=task_ids_to_submit, **kwargs)
+
+            # recorded once submitted so that only snapshots taken afterward replace it
+            with self._condition:
+                self._submissions_since_last_snapshot.append((time.time(), job_name, set(task_ids_to_submit)))
+
+        return procs
+
+    def job_is_on_queue(self, job_name: str, target_name: Optional[str] = None) -> bool:
+        with self._condition:
+            if target_name is not None:  # e.g., array job submitted before a restart, counted against the target's budget
+                self._job_name_to_target_name_dict.setdefault(job_name, target_name)
+            self._refresh()
+            return self._get_task_ids_on_queue(job_name) is not None
+
+    def task_is_on_queue(self, task_id: Union[str, int], job_name: str, target_name: Optional[str] = None) -> bool:
+        with self._condition:
+            if target_name is not None:
+                self._job_name_to_target_name_dict.setdefault(job_name, target_name)
+            self._refresh()
+            return str(task_id) in (self._get_task_ids_on_queue(job_name) or set())
+
+    def get_num_tasks_on_queue(self, target_name: Optional[str] = None) -> int:
+        with self._condition:
+            return self._get_num_tasks_on_queue(target_name)
+
+
+class BatchTargetJobScheduler(JobScheduler):
+    """Job scheduler of a DockOpt job in a batch, going through the queue view and budget shared by the batch."""
+
+    def __init__(self, shared_queue: SharedJobSchedulerQueue, target_name: str):
+        super().__init__(name=shared_queue.job_scheduler.name)
+        self.shared_queue = shared_queue
+        self.target_name = target_name
+
+    def submit(
+            self,
+            job_name: str,
+            script_path: str,
+            env_vars_dict: dict,
+            log_dir_path: str,
+            task_ids: Iterable[Union[str, int]],
+            job_timeout_minutes: Union[int, None] = None,
+            extra_submission_cmd_params_str: [str, None] = None,
+            job_memory_mb: Union[int, None] = None,
+            excluded_node_names: Union[Iterable[str], None] = None,
+    ):
+        return self.shared_queue.submit(
+            self.target_name,
+            job_name=job_name,
+            task_ids=task_ids,
+            script_path=script_path,
+            env_vars_dict=env_vars_dict,
+            log_dir_path=log_dir_path,
+            job_timeout_minutes=job_timeout_minutes,
+            extra_submission_cmd_params_str=extra_submission_cmd_params_str,
+            job_memory_mb=job_memory_mb,
+            excluded_node_names=excluded_node_names,
+        )
+
+    def job_is_on_queue(self, job_name: str) -> bool:
+        return self.shared_queue.job_is_on_queue(job_name, target_name=self.target_name)
+
+    def task_is_on_queue(self, task_id: Union[str, int], job_name: str) -> bool:
+        return self.shared_queue.task_is_on_queue(task_id, job_name, target_name=self.target_name)
+
+    def cancel_task(self, task_id: Union[str, int], job_name: str):
+        return self.shared_queue.job_scheduler.cancel_task(task_id, job_name)
+
+    def get_task_accounting_records(self, job_name: str) -> Dict[str, TaskAccountingRecord]:
+        return self.shared_queue.job_scheduler.get_task_accounting_records(job_name)
+
+    def get_task_stderr_file_path(self, job_name: str, log_dir_path: str, job_id: str, task_id: Union[str, int]) -> str:
+        return self.shared_queue.job_scheduler.get_task_stderr_file_path(job_name, log_dir_path, job_id, task_id)
+
+
+class BatchTargetLogFilter(logging.Filter):
+    """Passes only the log records of the thread running the given target."""
+
+    def __init__(self, thread_name: str):
+        super().__init__()
+        self.thread_name = thread_name
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.threadName == self.thread_name
+
+
+def add_batch_target_log_file_handler(job_dir_path: str) -> logging.Handler:
+    """Log the records of the current thread (running the target in `job_dir_path`) to a file in its job dir."""
+
+    handler = logging.FileHandler(os.path.join(job_dir_path, BATCH_TARGET_LOG_FILE_NAME))
+    handler.setLevel(logging.DEBUG)
+    handler.setFormatter(logging_formatter)
+    handler.addFilter(BatchTargetLogFilter(threading.current_thread().name))
+    logging.getLogger().addHandler(handler)
+
+    return handler
+
+
+def get_batch_progress_dataframe(job_dir_path_to_priority_dict: Dict[str, float], shared_queue: SharedJobSchedulerQueue) -> pd.DataFrame:
+    """One row per target, from the status file of each target (see `DockoptJobStatus`)."""
+
+    rows = []
+    for job_dir_path, priority in job_dir_path_to_priority_dict.items():
+        status_dict = DockoptJobStatus.load(os.path.join(job_dir_path, STATUS_FILE_NAME)) or {}
+        rows.append({
+            "job_dir": os.path.basename(job_dir_path),
+            "priority": priority,
+            "state": status_dict.get("state", "pending"),
+            "component_id": status_dict.get("component_id"),
+            "docked": f"{status_dict.get('num_docking_configurations_docked', 0)}/{status_dict.get('num_docking_configurations_specified', '?')}",
+            "tasks_submitted": status_dict.get("num_tasks_submitted", 0),
+            "tasks_on_queue": shared_queue.get_num_tasks_on_queue(job_dir_path),
+        })
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import signal
+import socket
+import logging
+import subprocess
+from datetime import datetime
+from typing import List, Optional
+
+import fire
+
+from pydock3.util import get_logger_for_script
+from pydock3.dockopt.status import DockoptJobStatus, STATUS_FILE_NAME
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+JOB_LOCK_FILE_NAME = "dockopt.lock"  # held by the process running the job (in the foreground or under the daemon)
+DAEMON_PID_FILE_NAME = "dockopt_daemon.pid"  # held by the daemon (supervisor) process
+DAEMON_LOG_FILE_NAME = "dockopt_daemon.log"
+DAEMON_RUN_KWARGS_FILE_NAME = "dockopt_daemon_run_kwargs.json"
+
+#
+DEFAULT_MAX_RESTARTS = 3
+SECONDS_TO_WAIT_BEFORE_RESTART = 60
+SECONDS_TO_WAIT_FOR_DAEMON_TO_START = 60
+SECONDS_TO_WAIT_FOR_TERMINATION = 60
+
+
+class LockFile(object):
+    """An exclusive lock on a file (via `flock`, so that it is released if the holding process dies) whose content
+    describes the holder (PID, host, etc.) as JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = None
+
+    def acquire(self) -> bool:
+        """Returns False if the lock is held by another process."""
+
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._f = f
+        self.write_info({"pid": os.getpid(), "hostname": socket.gethostname(), "started_utc": datetime.utcnow().isoformat()})
+
+        return True
+
+    def write_info(self, info_dict: dict) -> None:
+        self._f.seek(0)
+        self._f.truncate()
+        json.dump(info_dict, self._f)
+        self._f.flush()
+
+    def release(self) -> None:
+        if self._f is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+    def read_info(self) -> Optional[dict]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def is_held(self) -> bool:
+        """Whether some process currently holds the lock."""
+
+        if self._f is not None:
+            return True
+        try:
+            f = open(self.path, "r")
+        except OSError:
+            return False
+        with f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            return False
+
+
+def get_daemon_cmd_args(*args: str) -> List[str]:
+    """Command to run a function of this module in a new process (see `main`)."""
+
+    return [sys.executable, "-c", "from pydock3.dockopt.daemon import main; main()", *args]
+
+
+def supervise(job_dir_path: str, max_restarts: int = DEFAULT_MAX_RESTARTS) -> None:
+    """Run the DockOpt job in a child process, restarting it (up to `max_restarts` times) if it crashes or fails.
+
+    The job resumes from the state persisted in the job dir (dock files, submitted array jobs, task output), so a
+    restart picks up where the previous attempt left off. Terminating this process (see `Dockopt.stop`) terminates the
+    job."""
+
+    #
+    get_logger_for_script(debug=False)
+    pid_lock_file = LockFile(os.path.join(job_dir_path, DAEMON_PID_FILE_NAME))
+    if not pid_lock_file.acquire():
+        logger.error(f"DockOpt daemon is already running for job directory: {job_dir_path}")
+        return
+    info_dict = {**pid_lock_file.read_info(), "state": "running", "num_restarts": 0, "child_pid": None}
+    pid_lock_file.write_info(info_dict)
+
+    # forward termination to the job
+    child_proc = None
+    stop_requested = False
+
+    def handle_termination_signal(signum, frame):
+        nonlocal stop_requested
+        stop_requested = True
+        if child_proc is not None and child_proc.poll() is None:
+            child_proc.terminate()
+
+    signal.signal(signal.SIGTERM, handle_termination_signal)
+    signal.signal(signal.SIGINT, handle_termination_signal)
+
+    #
+    status_file_path = os.path.join(job_dir_path, STATUS_FILE_NAME)
+    try:
+        while True:
+            logger.info(f"Starting DockOpt job (attempt {info_dict['num_restarts'] + 1} of at most {max_restarts + 1})")
+            child_proc = subprocess.Popen(get_daemon_cmd_args("run_job", job_dir_path))
+            info_dict["child_pid"] = child_proc.pid
+            pid_lock_file.write_info(info_dict)
+            while True:
+                try:
+                    return_code = child_proc.wait()
+                    break
+                except InterruptedError:
+                    continue
+            info_dict["child_pid"] = None
+
+            #
+            if stop_requested:
+                logger.info("DockOpt job stopped")
+                info_dict["state"] = "stopped"
+                break
+
+            # the job writes its state to the status file (exceptions do not change its exit code)
+            status_dict = DockoptJobStatus.load(status_file_path) or {}
+            if status_dict.get("pid") != child_proc.pid:  # e.g., invalid arguments, so restarting is futile
+                logger.error("DockOpt job exited without running. See log for details.")
+                info_dict["state"] = "failed"
+                break
+            if status_dict.get("state") == "finished":
+                logger.info("DockOpt job finished")
+                info_dict["state"] = "finished"
+                break
+            if info_dict["num_restarts"] >= max_restarts:
+                logger.error(f"DockOpt job failed {info_dict['num_restarts'] + 1} times. Giving up.")
+                info_dict["state"] = "failed"
+                break
+
+            #
+            info_dict["num_restarts"] += 1
+            info_dict["state"] = "restarting"
+            pid_lock_file.write_info(info_dict)
+            logger.warning(f"DockOpt job exited unexpectedly (exit code: {return_code}, state: {status_dict.get('state')}). Restarting in {SECONDS_TO_WAIT_BEFORE_RESTART} seconds.")
+            time_waiting_started = time.time()
+            while not stop_requested and time.time() - time_waiting_started < SECONDS_TO_WAIT_BEFORE_RESTART:
+                time.sleep(1)
+            if stop_requested:
+                info_dict["state"] = "stopped"
+                break
+            info_dict["state"] = "running"
+    finally:
+        pid_lock_file.write_info(info_dict)
+        pid_lock_file.release()
+
+
+def run_job(job_dir_path: str) -> None:
+    """Run the DockOpt job with the arguments saved by `Dockopt.start`."""
+
+    from pydock3.dockopt.dockopt import Dockopt
+
+    #
+    get_logger_for_script(debug=False)
+    with open(os.path.join(job_dir_path, DAEMON_RUN_KWARGS_FILE_NAME), "r") as f:
+        run_kwargs = json.load(f)
+    Dockopt().run(**run_kwargs)
+
+
+def main():
+    fire.Fire({"supervise": supervise, "run_job": run_job})
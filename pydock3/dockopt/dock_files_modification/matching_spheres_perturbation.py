@@ -1,9 +1,8 @@
 import logging
-from copy import deepcopy
 import random
 
 from pydock3.blastermaster.util import BlasterStep
-from pydock3.blastermaster.programs.thinspheres.sph_lib import read_sph, write_sph
+from pydock3.blastermaster.programs.thinspheres.sph_lib import SphereSet
 from pydock3.util import get_hexdigest_of_persistent_md5_hash_of_tuple
 
 
@@ -39,35 +38,18 @@ class MatchingSpheresPerturbationStep(BlasterStep):
         """#TODO"""
 
         #
-        spheres = read_sph(
+        spheres = SphereSet.read(
             self.infiles.matching_spheres_infile.path,
             chosen_cluster="A",
             color="A",
         )
 
         # set random seed based on spheres and outfile name for reproducibility
-        sphere_hashes = [get_hexdigest_of_persistent_md5_hash_of_tuple((sphere.index, sphere.X, sphere.Y, sphere.Z, sphere.radius, sphere.atomnum, sphere.critical_cluster, sphere.sphere_color)) for sphere in spheres]
+        sphere_hashes = spheres.get_hexdigests()
         seed = get_hexdigest_of_persistent_md5_hash_of_tuple(tuple(sphere_hashes + [self.outfiles.perturbed_matching_spheres_outfile.name, self.parameters.max_deviation_angstroms_parameter.value]))
-        random.seed(seed)
 
         # perturb all spheres in file
-        new_spheres = []
-        for sphere in spheres:
-            new_sphere = deepcopy(sphere)
-            max_deviation = float(self.parameters.max_deviation_angstroms_parameter.value)
-            perturbation_xyz = tuple(
-                [
-                    random.uniform(
-                        -max_deviation,
-                        max_deviation,
-                    )
-                    for _ in range(3)
-                ]
-            )
-            new_sphere.X += perturbation_xyz[0]
-            new_sphere.Y += perturbation_xyz[1]
-            new_sphere.Z += perturbation_xyz[2]
-            new_spheres.append(new_sphere)
+        new_spheres = spheres.get_perturbed(self.parameters.max_deviation_angstroms_parameter.value, random.Random(seed))
 
         # write perturbed spheres to new matching spheres file
-        write_sph(self.outfiles.perturbed_matching_spheres_outfile.path, new_spheres)
+        new_spheres.write(self.outfiles.perturbed_matching_spheres_outfile.path)
@@ -1,11 +1,12 @@
 from dataclasses import dataclass, make_dataclass, fields, asdict
 import itertools
+import functools
 import os
 import hashlib
 from typing import Union
 import logging
 
-from pydock3.files import IndockFile
+from pydock3.files import File, IndockFile
 from pydock3.blastermaster.util import BlasterFile
 from pydock3.util import get_hexdigest_of_persistent_md5_hash_of_tuple, filter_kwargs_for_callable
 from pydock3.blastermaster.util import DOCK_FILE_IDENTIFIERS, DockFiles
@@ -16,6 +17,20 @@ from pydock3.jobs import DOCK3_EXECUTABLE_PATH
 logger = logging.getLogger("dockopt")
 
 
+#
+def get_hexdigest_of_md5_hash_of_dock_executable(dock_executable_path):
+    """Hashed once per version of the file, since every docking configuration of a step is hashed with it."""
+
+    stat = os.stat(dock_executable_path)
+    return _get_hexdigest_of_md5_hash_of_dock_executable(dock_executable_path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_hexdigest_of_md5_hash_of_dock_executable(dock_executable_path, mtime_ns, size):
+    with open(dock_executable_path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
 #
 DockFileCoordinate = make_dataclass("DockFileCoordinate", [
     ("component_id", str),
@@ -30,6 +45,10 @@ IndockFileCoordinate = make_dataclass("IndockFileCoordinate", [
 #
 DockFileCoordinates = make_dataclass("DockFileCoordinates", [(identifier, DockFileCoordinate) for identifier in DOCK_FILE_IDENTIFIERS])
 
+# so that instances can be pickled (e.g., in plan files)
+for _cls in [DockFileCoordinate, IndockFileCoordinate, DockFileCoordinates]:
+    _cls.__module__ = __name__
+
 
 @dataclass
 class DockingConfiguration:
@@ -110,7 +129,7 @@ class DockingConfiguration:
         try:
             custom_dock_executable = dc_kwargs["custom_dock_executable"]
             dock_executable_path = DockingConfiguration.get_dock_executable_path(custom_dock_executable)
-            dock_exec_hash_tuple = tuple([hashlib.md5(open(dock_executable_path, 'rb').read()).hexdigest()])
+            dock_exec_hash_tuple = tuple([get_hexdigest_of_md5_hash_of_dock_executable(dock_executable_path)])
         except KeyError:
             if not partial_okay:
                 raise Exception(f"Key `custom_dock_executable` not found in dict: {dc_kwargs}")
@@ -141,6 +160,46 @@ class DockingConfiguration:
     def hexdigest_of_persistent_md5_hash(self):
         return self.get_hexdigest_of_persistent_md5_hash_of_docking_configuration_kwargs({field.name: getattr(self, field.name) for field in fields(self)}, partial_okay=False)
 
+    def get_hexdigest_of_md5_hash_of_effective_content(self, pipeline_dir_path, file_path_to_hexdigest_dict=None):
+        """Hash of what DOCK actually sees for this docking configuration: the contents of the dock files, the INDOCK
+        file (with dock file names replaced by their identifiers), and the dock executable. Configurations with
+        different parameters but identical effective content yield identical docking results.
+
+        Must be called after the dock files and INDOCK file have been written. `file_path_to_hexdigest_dict` may be
+        passed to avoid rehashing files shared between configurations."""
+
+        if file_path_to_hexdigest_dict is None:
+            file_path_to_hexdigest_dict = {}
+
+        def get_file_hexdigest(file_path):
+            if file_path not in file_path_to_hexdigest_dict:
+                file_path_to_hexdigest_dict[file_path] = File.get_hexdigest_of_md5_hash_of_file_contents(file_path)
+            return file_path_to_hexdigest_dict[file_path]
+
+        #
+        dock_files = self.get_dock_files(pipeline_dir_path)
+        dock_file_name_to_identifier_dict = {}
+        dock_file_hexdigests = []
+        for field in fields(dock_files):
+            dock_file = getattr(dock_files, field.name)
+            dock_file_name_to_identifier_dict[dock_file.name] = field.name
+            dock_file_hexdigests.append((field.name, get_file_hexdigest(dock_file.path)))
+
+        # normalize file lines of INDOCK file since dock file names differ between otherwise identical configurations
+        indock_file_lines = []
+        with open(self.get_indock_file(pipeline_dir_path).path, "r") as f:
+            for line in f.readlines():
+                tokens = line.split()
+                if len(tokens) == 2 and os.path.basename(tokens[1]) in dock_file_name_to_identifier_dict:
+                    line = f"{tokens[0]} {dock_file_name_to_identifier_dict[os.path.basename(tokens[1])]}\n"
+                indock_file_lines.append(line)
+        indock_file_hexdigest = hashlib.md5("".join(indock_file_lines).encode("utf-8")).hexdigest()
+
+        #
+        dock_executable_hexdigest = get_file_hexdigest(self.dock_executable_path)
+
+        return get_hexdigest_of_persistent_md5_hash_of_tuple(tuple(dock_file_hexdigests + [indock_file_hexdigest, dock_executable_hexdigest]))
+
     def to_dict(self):
         #
         d = {
@@ -9,10 +9,16 @@ from copy import deepcopy
 import logging
 import collections
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 import tarfile
 import re
 import shutil
+import signal
+import socket
+import subprocess
+import json
+import inspect
+import threading
 
 import networkx as nx
 import pandas as pd
@@ -29,8 +35,11 @@ from pydock3.util import (
 from pydock3.dockopt.util import WORKING_DIR_NAME, RETRODOCK_JOBS_DIR_NAME, RESULTS_CSV_FILE_NAME, BEST_RETRODOCK_JOBS_DIR_NAME
 from pydock3.config import (
     Parameter,
+    flatten_param_dict,
     flatten_and_parameter_cast_param_dict,
-    get_sorted_univalued_flat_parameter_cast_param_dicts_from_multivalued_param_dict,
+    ParameterSpace,
+    ParameterSpaceSortedByHash,
+    ParameterConstraint,
 )
 from pydock3.blastermaster.blastermaster import BlasterFiles, get_blaster_steps
 from pydock3.dockopt.config import DockoptParametersConfiguration
@@ -38,7 +47,6 @@ from pydock3.files import (
     INDOCK_FILE_NAME,
     Dir,
     File,
-    OutdockFile,
 )
 from pydock3.blastermaster.util import (
     BLASTER_FILE_IDENTIFIER_TO_PROPER_BLASTER_FILE_NAME_DICT,
@@ -47,15 +55,45 @@ from pydock3.blastermaster.util import (
     BlasterFile,
     BlasterStep,
 )
-from pydock3.jobs import ArrayDockingJob
-from pydock3.job_schedulers import SlurmJobScheduler, SGEJobScheduler
+from pydock3.blastermaster.executor import BlasterStepDAGExecutor
+from pydock3.blastermaster.cache import BlasterStepOutputsCache
+from pydock3.jobs import ArrayDockingJob, OUTDOCK_FILE_NAME, MOL2_FILE_NAME
+from pydock3.job_schedulers import JobScheduler, SlurmJobScheduler, SGEJobScheduler
 from pydock3.dockopt import __file__ as DOCKOPT_INIT_FILE_PATH
-from pydock3.retrodock.retrodock import log_job_submission_result, get_results_dataframe_from_actives_job_and_decoys_job_outdock_files, sort_by_energy_and_drop_duplicate_molecules
+from pydock3.retrodock.retrodock import log_job_submission_result, sort_by_energy_and_drop_duplicate_molecules
 from pydock3.blastermaster.util import DEFAULT_FILES_DIR_PATH
 from pydock3.dockopt.results import DockoptStepResultsManager, DockoptStepSequenceIterationResultsManager, DockoptStepSequenceResultsManager
 from pydock3.criterion.enrichment.logauc import NormalizedLogAUC
 from pydock3.dockopt.pipeline import PipelineComponent, PipelineComponentSequence, PipelineComponentSequenceIteration, Pipeline
 from pydock3.dockopt.parameters import DockoptComponentParametersManager
+from pydock3.dockopt.provenance import ProvenanceGraph, PROVENANCE_GRAPH_FILE_NAME
+from pydock3.dockopt.search import get_docking_configuration_search
+from pydock3.dockopt.plan import PLAN_FILE_NAME, get_step_plan_key, load_step_plan, save_step_plan
+from pydock3.dockopt.results_database import DockoptResultsDatabase, get_hexdigest_of_md5_hash_of_parameters, get_score_vectors_blob
+from pydock3.dockopt.task_processing import TaskResultsProcessor
+from pydock3.dockopt.submission_ordering import SubmissionOrdering
+from pydock3.dockopt.submission_journal import SubmissionJournal, SUBMISSION_JOURNAL_FILE_NAME
+from pydock3.dockopt.status import DockoptJobStatus, STATUS_FILE_NAME
+from pydock3.dockopt.batch import (
+    SharedJobSchedulerQueue,
+    BATCH_TARGET_LOG_FILE_NAME,
+    SECONDS_BETWEEN_BATCH_PROGRESS_REPORTS,
+    DEFAULT_TARGET_PRIORITY,
+    add_batch_target_log_file_handler,
+    get_batch_progress_dataframe,
+)
+from pydock3.dockopt.daemon import (
+    LockFile,
+    JOB_LOCK_FILE_NAME,
+    DAEMON_PID_FILE_NAME,
+    DAEMON_LOG_FILE_NAME,
+    DAEMON_RUN_KWARGS_FILE_NAME,
+    DEFAULT_MAX_RESTARTS,
+    SECONDS_TO_WAIT_FOR_DAEMON_TO_START,
+    SECONDS_TO_WAIT_FOR_TERMINATION,
+    get_daemon_cmd_args,
+)
+from pydock3.dockopt.runtime_model import TaskRuntimeModel, get_task_features, get_job_timeout_minutes, get_job_memory_mb
 from pydock3.dockopt.docking_configuration import DockingConfiguration, DockFileCoordinates, DockFileCoordinate, IndockFileCoordinate
 from pydock3.dockopt.dock_files_modification.matching_spheres_perturbation import MatchingSpheresPerturbationStep
 from pydock3.retrodock.retrospective_dataset import RetrospectiveDataset
@@ -72,11 +110,6 @@ SCHEDULER_NAME_TO_CLASS_DICT = {
 #
 CRITERION_CLASS_DICT = {"normalized_log_auc": NormalizedLogAUC}
 
-#
-MIN_SECONDS_BETWEEN_QUEUE_CHECKS = 2
-MIN_SECONDS_BETWEEN_TASK_OUTPUT_DETECTION_REATTEMPTS = 30
-MIN_SECONDS_BETWEEN_TASK_OUTPUT_LOADING_REATTEMPTS = 30
-
 
 @dataclass
 class DockoptPipelineComponentRunFuncArgSet:  # TODO: rename?
@@ -86,11 +119,18 @@ class DockoptPipelineComponentRunFuncArgSet:  # TODO: rename?
     allow_failed_retrodock_jobs: bool = False
     retrodock_job_timeout_minutes: Optional[int] = None
     max_task_array_size: Optional[int] = None
+    submission_chunk_size: Optional[int] = None
     extra_submission_cmd_params_str: Optional[str] = None
     sleep_seconds_after_copying_output: int = 0
     export_decoys_mol2: bool = False
     delete_intermediate_files: bool = False
     max_scheduler_jobs_running_at_a_time: Optional[int] = None
+    blaster_step_max_workers: Optional[int] = None
+    blaster_step_cache_dir_path: Optional[str] = None
+    results_database_file_path: Optional[str] = None
+    speculative_execution_runtime_multiple: Optional[float] = None
+    task_runtime_model_file_path: Optional[str] = None
+    job_status: Optional[DockoptJobStatus] = None
 
 
 class Dockopt(Script):
@@ -174,7 +214,7 @@ class Dockopt(Script):
     @handle_run_func.__get__(0)
     def run(
         self,
-        scheduler: str,
+        scheduler: Union[str, JobScheduler],
         job_dir_path: str = ".",
         config_file_path: Optional[str] = None,
         actives_tgz_file_path: Optional[str] = None,
@@ -183,11 +223,17 @@ class Dockopt(Script):
         allow_failed_retrodock_jobs: bool = False,
         retrodock_job_timeout_minutes: Optional[str] = None,
         max_task_array_size: Optional[int] = None,
+        submission_chunk_size: Optional[int] = None,
         extra_submission_cmd_params_str: Optional[str] = None,
         sleep_seconds_after_copying_output: int = 0,
         export_decoys_mol2: bool = False,
         delete_intermediate_files: bool = False,
         #max_scheduler_jobs_running_at_a_time: Optional[str] = None,  # TODO
+        blaster_step_max_workers: Optional[int] = None,
+        blaster_step_cache_dir_path: Optional[str] = None,
+        results_database_file_path: Optional[str] = None,
+        speculative_execution_runtime_multiple: Optional[float] = None,
+        task_runtime_model_file_path: Optional[str] = None,
         force_redock: bool = False,
         force_rewrite_results: bool = False,
         force_rewrite_report: bool = False,
@@ -218,82 +264,392 @@ class Dockopt(Script):
                 "Actives TGZ file and/or decoys TGZ file not found. Did you put them in the job directory?\nNote: if you do not have actives and decoys, please use blastermaster instead of dockopt."
             )
             return
-        if scheduler not in SCHEDULER_NAME_TO_CLASS_DICT:
-            logger.error(
-                f"scheduler flag must be one of: {list(SCHEDULER_NAME_TO_CLASS_DICT.keys())}"
-            )
-            return
+        if not isinstance(scheduler, JobScheduler):  # e.g., shared by the jobs of a batch (see `batch`)
+            if scheduler not in SCHEDULER_NAME_TO_CLASS_DICT:
+                logger.error(
+                    f"scheduler flag must be one of: {list(SCHEDULER_NAME_TO_CLASS_DICT.keys())}"
+                )
+                return
+
+            #
+            try:
+                scheduler = SCHEDULER_NAME_TO_CLASS_DICT[scheduler]()
+            except KeyError:
+                logger.error(
+                    f"The following environmental variables are required to use the {scheduler} job scheduler: {SCHEDULER_NAME_TO_CLASS_DICT[scheduler].REQUIRED_ENV_VAR_NAMES}"
+                )
+                return
 
         #
         try:
-            scheduler = SCHEDULER_NAME_TO_CLASS_DICT[scheduler]()
+            temp_storage_path = os.environ["TMPDIR"]
         except KeyError:
             logger.error(
-                f"The following environmental variables are required to use the {scheduler} job scheduler: {SCHEDULER_NAME_TO_CLASS_DICT[scheduler].REQUIRED_ENV_VAR_NAMES}"
+                "The following environmental variables are required to submit retrodock jobs: TMPDIR"
             )
             return
 
-        #
+        # only one process may run the job at a time (e.g., not both the daemon and a foreground run)
+        job_lock_file = LockFile(os.path.join(job_dir_path, JOB_LOCK_FILE_NAME))
+        if not job_lock_file.acquire():
+            logger.error(f"DockOpt job is already running in directory: {job_dir_path}. See `pydock3 dockopt - status`.")
+            return
+
+        # persist progress so that it can be reported by `status` (and so that the daemon knows whether the job finished)
+        job_status = DockoptJobStatus(os.path.join(job_dir_path, STATUS_FILE_NAME))
+        job_status.update(force=True, state="running", pid=os.getpid(), hostname=socket.gethostname(), started_utc=datetime.utcnow().isoformat())
         try:
-            temp_storage_path = os.environ["TMPDIR"]
-        except KeyError:
-            logger.error(
-                "The following environmental variables are required to submit retrodock jobs: TMPDIR"
+            #
+            retrospective_dataset = RetrospectiveDataset(actives_tgz_file_path, decoys_tgz_file_path, 'actives', 'decoys')
+
+            #
+            component_run_func_arg_set = DockoptPipelineComponentRunFuncArgSet(
+                scheduler=scheduler,
+                temp_storage_path=temp_storage_path,
+                retrodock_job_max_reattempts=retrodock_job_max_reattempts,
+                allow_failed_retrodock_jobs=allow_failed_retrodock_jobs,
+                retrodock_job_timeout_minutes=retrodock_job_timeout_minutes,
+                max_task_array_size=max_task_array_size,
+                submission_chunk_size=submission_chunk_size,
+                extra_submission_cmd_params_str=extra_submission_cmd_params_str,
+                sleep_seconds_after_copying_output=sleep_seconds_after_copying_output,
+                export_decoys_mol2=export_decoys_mol2,
+                delete_intermediate_files=delete_intermediate_files,
+                #max_scheduler_jobs_running_at_a_time=max_scheduler_jobs_running_at_a_time,  # TODO: move checking of this to this class?
+                blaster_step_max_workers=blaster_step_max_workers,
+                blaster_step_cache_dir_path=blaster_step_cache_dir_path,
+                results_database_file_path=results_database_file_path,
+                speculative_execution_runtime_multiple=speculative_execution_runtime_multiple,
+                task_runtime_model_file_path=task_runtime_model_file_path,
+                job_status=job_status,
             )
+
+            #
+            logger.info("Loading config file")
+            config = DockoptParametersConfiguration(config_file_path)
+
+            #
+            config_params_str = "\n".join(
+                [
+                    f"{param_name}: {param.value}"
+                    for param_name, param in flatten_and_parameter_cast_param_dict(
+                        config.param_dict
+                    ).items()
+                ]
+            )
+            logger.debug(f"Parameters:\n{config_params_str}")
+
+            #
+            proper_blaster_file_names = list(BLASTER_FILE_IDENTIFIER_TO_PROPER_BLASTER_FILE_NAME_DICT.values())
+            blaster_files_to_copy_in = [
+                os.path.join(job_dir_path, f) for f in proper_blaster_file_names if os.path.isfile(os.path.join(job_dir_path, f))
+            ]
+
+            #
+            pipeline = DockoptPipeline(
+                **config.param_dict["pipeline"],
+                pipeline_dir_path=job_dir_path,
+                retrospective_dataset=retrospective_dataset,
+                blaster_files_to_copy_in=blaster_files_to_copy_in,
+            )
+            pipeline.run(
+                component_run_func_arg_set=component_run_func_arg_set,
+                force_redock=force_redock,
+                force_rewrite_results=force_rewrite_results,
+                force_rewrite_report=force_rewrite_report,
+            )
+        except BaseException as e:
+            job_status.update(force=True, state="failed", error=f"{type(e).__name__}: {e}")
+            raise
+        else:
+            job_status.update(force=True, state="finished")
+        finally:
+            job_lock_file.release()
+
+    @handle_run_func.__get__(0)
+    def plan(
+        self,
+        job_dir_path: str = ".",
+        config_file_path: Optional[str] = None,
+        actives_tgz_file_path: Optional[str] = None,
+        decoys_tgz_file_path: Optional[str] = None,
+        max_task_array_size: Optional[int] = None,
+        submission_chunk_size: Optional[int] = None,
+        export_decoys_mol2: bool = False,
+        task_runtime_model_file_path: Optional[str] = None,
+    ) -> None:
+        """Estimate the size of a DockOpt job (docking configurations, tasks, CPU-hours, disk usage) without running it."""
+
+        from pydock3.dockopt.dry_run import (  # imports this module
+            RetrospectiveDatasetClassSize,
+            estimate_dockopt_pipeline_components,
+            get_sizes_of_existing_outputs,
+            get_dockopt_job_estimate_dataframe,
+        )
+
+        #
+        job_dir_path = os.path.abspath(job_dir_path)
+        logger.info(f"Planning DockOpt job in directory: {job_dir_path}")
+
+        # validate args
+        if config_file_path is None:
+            config_file_path = os.path.join(job_dir_path, self.CONFIG_FILE_NAME)
+        if actives_tgz_file_path is None:
+            actives_tgz_file_path = os.path.join(job_dir_path, self.ACTIVES_TGZ_FILE_NAME)
+        if decoys_tgz_file_path is None:
+            decoys_tgz_file_path = os.path.join(job_dir_path, self.DECOYS_TGZ_FILE_NAME)
+        try:
+            File.validate_file_exists(config_file_path)
+        except FileNotFoundError:
+            logger.error("Config file not found. Are you in the job directory?")
+            return
+        try:
+            File.validate_file_exists(actives_tgz_file_path)
+            File.validate_file_exists(decoys_tgz_file_path)
+        except FileNotFoundError:
+            logger.error("Actives TGZ file and/or decoys TGZ file not found. Did you put them in the job directory?")
             return
 
         #
-        retrospective_dataset = RetrospectiveDataset(actives_tgz_file_path, decoys_tgz_file_path, 'actives', 'decoys')
+        logger.info("Loading config file")
+        config = DockoptParametersConfiguration(config_file_path)
 
         #
-        component_run_func_arg_set = DockoptPipelineComponentRunFuncArgSet(
-            scheduler=scheduler,
-            temp_storage_path=temp_storage_path,
-            retrodock_job_max_reattempts=retrodock_job_max_reattempts,
-            allow_failed_retrodock_jobs=allow_failed_retrodock_jobs,
-            retrodock_job_timeout_minutes=retrodock_job_timeout_minutes,
+        logger.info("Expanding pipeline")
+        step_estimates, _ = estimate_dockopt_pipeline_components(job_dir_path, config.param_dict["pipeline"]["components"])
+
+        #
+        logger.info("Reading retrospective dataset")
+        actives_size = RetrospectiveDatasetClassSize.from_tarball(actives_tgz_file_path)
+        decoys_size = RetrospectiveDatasetClassSize.from_tarball(decoys_tgz_file_path)
+
+        #
+        runtime_seconds_per_conformation = None
+        if task_runtime_model_file_path is not None and File.file_exists(task_runtime_model_file_path):
+            runtime_seconds_per_conformation = TaskRuntimeModel(task_runtime_model_file_path).get_median_runtime_seconds_per_conformation()
+
+        #
+        key_to_sizes_of_existing_outputs_dict = get_sizes_of_existing_outputs(job_dir_path)
+        df = get_dockopt_job_estimate_dataframe(
+            step_estimates,
+            actives_size,
+            decoys_size,
+            key_to_sizes_of_existing_outputs_dict,
+            runtime_seconds_per_conformation=runtime_seconds_per_conformation,
             max_task_array_size=max_task_array_size,
-            extra_submission_cmd_params_str=extra_submission_cmd_params_str,
-            sleep_seconds_after_copying_output=sleep_seconds_after_copying_output,
+            submission_chunk_size=submission_chunk_size,
             export_decoys_mol2=export_decoys_mol2,
-            delete_intermediate_files=delete_intermediate_files,
-            #max_scheduler_jobs_running_at_a_time=max_scheduler_jobs_running_at_a_time,  # TODO: move checking of this to this class?
         )
 
         #
-        logger.info("Loading config file")
-        config = DockoptParametersConfiguration(config_file_path)
+        df["output_size"] = df["output_bytes"].apply(lambda num_bytes: f"{num_bytes / 2**30:.2f} GiB")
+        df["cpu_hours"] = df["cpu_hours"].apply(lambda cpu_hours: f"{cpu_hours:.1f}" if pd.notnull(cpu_hours) else "unknown")
+        df = df.drop(columns=["output_bytes"])
+        logger.info(f"Retrospective dataset:\n\tactives: {actives_size.num_molecules} molecules, {actives_size.num_conformations} conformations ({actives_size.num_db2_files} DB2 files)\n\tdecoys: {decoys_size.num_molecules} molecules, {decoys_size.num_conformations} conformations ({decoys_size.num_db2_files} DB2 files)")
+        if runtime_seconds_per_conformation is not None:
+            logger.info(f"Median runtime per conformation of past tasks: {runtime_seconds_per_conformation:.4f} s")
+        else:
+            logger.info("No past task runtimes to estimate CPU-hours from (see `task_runtime_model_file_path`)")
+        if not key_to_sizes_of_existing_outputs_dict:
+            logger.info("No output of previously run tasks in job directory. Output sizes are rough defaults.")
+        logger.info(f"Estimated size of DockOpt job (upper bounds: sequences are assumed to run all iterations and parameter constraints spanning parameter groups are not applied):\n{df.to_string(index=False)}")
+
+    @staticmethod
+    def _validate_run_kwargs(run_kwargs: dict) -> bool:
+        """Check that the given arguments (other than `scheduler` & `job_dir_path`) are among those of `run`."""
+
+        run_arg_names = [arg_name for arg_name in inspect.signature(Dockopt.run).parameters if arg_name not in ["self", "scheduler", "job_dir_path"]]
+        unknown_arg_names = [arg_name for arg_name in run_kwargs if arg_name not in run_arg_names]
+        if unknown_arg_names:
+            logger.error(f"Unknown arguments: {unknown_arg_names}. Arguments must be among those of `run`: {run_arg_names}")
+            return False
+
+        return True
+
+    def start(
+        self,
+        scheduler: Optional[str] = None,
+        job_dir_path: str = ".",
+        max_restarts: int = DEFAULT_MAX_RESTARTS,
+        **run_kwargs,
+    ) -> None:
+        """Run DockOpt job in the background (detached from the terminal), restarting it if it crashes. Takes the same
+        arguments as `run`. Without arguments, the job is resumed with the arguments it was last started with."""
 
         #
-        config_params_str = "\n".join(
-            [
-                f"{param_name}: {param.value}"
-                for param_name, param in flatten_and_parameter_cast_param_dict(
-                    config.param_dict
-                ).items()
-            ]
-        )
-        logger.debug(f"Parameters:\n{config_params_str}")
+        job_dir_path = os.path.abspath(job_dir_path)
+        pid_lock_file = LockFile(os.path.join(job_dir_path, DAEMON_PID_FILE_NAME))
+        if pid_lock_file.is_held:
+            logger.error(f"DockOpt daemon is already running for job directory: {job_dir_path} (PID: {(pid_lock_file.read_info() or {}).get('pid')})")
+            return
+        if LockFile(os.path.join(job_dir_path, JOB_LOCK_FILE_NAME)).is_held:
+            logger.error(f"DockOpt job is already running in directory: {job_dir_path}")
+            return
+
+        # validate args
+        if not self._validate_run_kwargs(run_kwargs):
+            return
+        run_kwargs_file_path = os.path.join(job_dir_path, DAEMON_RUN_KWARGS_FILE_NAME)
+        if scheduler is None:
+            if run_kwargs or not File.file_exists(run_kwargs_file_path):
+                logger.error(f"scheduler flag must be one of: {list(SCHEDULER_NAME_TO_CLASS_DICT.keys())}")
+                return
+            logger.info(f"Resuming DockOpt job with the arguments it was last started with (see `{run_kwargs_file_path}`)")
+        else:
+            if scheduler not in SCHEDULER_NAME_TO_CLASS_DICT:
+                logger.error(f"scheduler flag must be one of: {list(SCHEDULER_NAME_TO_CLASS_DICT.keys())}")
+                return
+
+            # the daemon runs in the job dir, so relative paths are made absolute
+            run_kwargs = {arg_name: (os.path.abspath(value) if arg_name.endswith("_path") and isinstance(value, str) else value) for arg_name, value in run_kwargs.items()}
+            with open(run_kwargs_file_path, "w") as f:
+                json.dump({"scheduler": scheduler, "job_dir_path": job_dir_path, **run_kwargs}, f, indent=2)
+
+        # detach from the terminal (new session, no stdin) so that the daemon survives logging out
+        daemon_log_file_path = os.path.join(job_dir_path, DAEMON_LOG_FILE_NAME)
+        with open(daemon_log_file_path, "a") as f:
+            proc = subprocess.Popen(
+                get_daemon_cmd_args("supervise", job_dir_path, f"--max_restarts={max_restarts}"),
+                cwd=job_dir_path,
+                stdin=subprocess.DEVNULL,
+                stdout=f,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
 
         #
-        proper_blaster_file_names = list(BLASTER_FILE_IDENTIFIER_TO_PROPER_BLASTER_FILE_NAME_DICT.values())
-        blaster_files_to_copy_in = [
-            os.path.join(job_dir_path, f) for f in proper_blaster_file_names if os.path.isfile(os.path.join(job_dir_path, f))
-        ]
+        time_started = time.time()
+        while not pid_lock_file.is_held and proc.poll() is None and time.time() - time_started < SECONDS_TO_WAIT_FOR_DAEMON_TO_START:
+            time.sleep(0.1)
+        if pid_lock_file.is_held:
+            logger.info(f"Started DockOpt daemon (PID: {proc.pid}). Log file: {daemon_log_file_path}\nUse `pydock3 dockopt - status` to monitor the job and `pydock3 dockopt - stop` to stop it.")
+        else:
+            logger.error(f"DockOpt daemon failed to start. See log file: {daemon_log_file_path}")
+
+    @handle_run_func.__get__(0)
+    def batch(
+        self,
+        scheduler: str,
+        job_dir_paths: Union[str, List[str]],
+        priorities: Optional[List[float]] = None,
+        max_tasks_on_queue: Optional[int] = None,
+        **run_kwargs,
+    ) -> None:
+        """Run many DockOpt jobs (one per job dir) from this process. The jobs share one view of the job scheduler queue and
+        a budget of `max_tasks_on_queue` tasks on the queue at a time, split among them in proportion to their
+        `priorities`. Takes the same arguments as `run` otherwise."""
 
         #
-        pipeline = DockoptPipeline(
-            **config.param_dict["pipeline"],
-            pipeline_dir_path=job_dir_path,
-            retrospective_dataset=retrospective_dataset,
-            blaster_files_to_copy_in=blaster_files_to_copy_in,
-        )
-        pipeline.run(
-            component_run_func_arg_set=component_run_func_arg_set,
-            force_redock=force_redock,
-            force_rewrite_results=force_rewrite_results,
-            force_rewrite_report=force_rewrite_report,
-        )
+        if isinstance(job_dir_paths, str):
+            job_dir_paths = [job_dir_path for job_dir_path in job_dir_paths.split(",") if job_dir_path]
+        job_dir_paths = [os.path.abspath(job_dir_path) for job_dir_path in job_dir_paths]
+        if len(set(job_dir_paths)) != len(job_dir_paths):
+            logger.error("Job directories must be unique.")
+            return
+        if priorities is None:
+            priorities = [DEFAULT_TARGET_PRIORITY for _ in job_dir_paths]
+        if len(priorities) != len(job_dir_paths) or any([priority <= 0 for priority in priorities]):
+            logger.error("`priorities` must be positive and as many as job directories.")
+            return
+        job_dir_path_to_priority_dict = {job_dir_path: float(priority) for job_dir_path, priority in zip(job_dir_paths, priorities)}
+
+        # validate args
+        if not self._validate_run_kwargs(run_kwargs):
+            return
+        if scheduler not in SCHEDULER_NAME_TO_CLASS_DICT:
+            logger.error(f"scheduler flag must be one of: {list(SCHEDULER_NAME_TO_CLASS_DICT.keys())}")
+            return
+        try:
+            job_scheduler = SCHEDULER_NAME_TO_CLASS_DICT[scheduler]()
+        except KeyError:
+            logger.error(f"The following environmental variables are required to use the {scheduler} job scheduler: {SCHEDULER_NAME_TO_CLASS_DICT[scheduler].REQUIRED_ENV_VAR_NAMES}")
+            return
+
+        #
+        shared_queue = SharedJobSchedulerQueue(job_scheduler, max_tasks_on_queue=max_tasks_on_queue)
+
+        def run_target(job_dir_path):
+            handler = add_batch_target_log_file_handler(job_dir_path)
+            try:
+                self.run(
+                    scheduler=shared_queue.add_target(job_dir_path, job_dir_path_to_priority_dict[job_dir_path]),
+                    job_dir_path=job_dir_path,
+                    **run_kwargs,
+                )
+            finally:
+                shared_queue.remove_target(job_dir_path)
+                logging.getLogger().removeHandler(handler)
+                handler.close()
+
+        # one thread per job (each spends most of its time waiting on the queue)
+        logger.info(f"Running batch of {len(job_dir_paths)} DockOpt jobs (log of each job: `{BATCH_TARGET_LOG_FILE_NAME}` in its job directory)")
+        threads = [threading.Thread(target=run_target, args=(job_dir_path,), name=f"dockopt_batch_target_{i + 1}") for i, job_dir_path in enumerate(job_dir_paths)]
+        for thread in threads:
+            thread.start()
+        while any([thread.is_alive() for thread in threads]):
+            [thread for thread in threads if thread.is_alive()][0].join(timeout=SECONDS_BETWEEN_BATCH_PROGRESS_REPORTS)  # report when a job finishes or periodically
+            df = get_batch_progress_dataframe(job_dir_path_to_priority_dict, shared_queue)
+            logger.info(f"Progress of batch ({shared_queue.get_num_tasks_on_queue()} tasks on queue{f' out of at most {max_tasks_on_queue}' if max_tasks_on_queue is not None else ''}):\n{df.to_string(index=False)}")
+
+    def status(
+        self,
+        job_dir_path: str = ".",
+    ) -> None:
+        """Report the progress of DockOpt job (whether run in the foreground or by the daemon)."""
+
+        #
+        job_dir_path = os.path.abspath(job_dir_path)
+        pid_lock_file = LockFile(os.path.join(job_dir_path, DAEMON_PID_FILE_NAME))
+        daemon_info_dict = pid_lock_file.read_info()
+        status_dict = DockoptJobStatus.load(os.path.join(job_dir_path, STATUS_FILE_NAME))
+        if daemon_info_dict is None and status_dict is None:
+            logger.info(f"No DockOpt job has been run in directory: {job_dir_path}")
+            return
+
+        #
+        lines = []
+        if daemon_info_dict is not None:
+            daemon_state = daemon_info_dict.get("state")
+            if not pid_lock_file.is_held and daemon_state not in ["finished", "failed", "stopped"]:
+                daemon_state = "dead"
+            lines.append(f"daemon: {daemon_state} (PID: {daemon_info_dict.get('pid')}, host: {daemon_info_dict.get('hostname')}, restarts: {daemon_info_dict.get('num_restarts')})")
+        if status_dict is not None:
+            job_state = status_dict.get("state")
+            if job_state == "running" and not LockFile(os.path.join(job_dir_path, JOB_LOCK_FILE_NAME)).is_held:
+                job_state = "interrupted"
+            lines.append(f"job: {job_state}")
+            lines += [f"{key}: {value}" for key, value in status_dict.items() if key != "state"]
+        lines_str = "\n\t".join(lines)
+        logger.info(f"DockOpt job status ({job_dir_path}):\n\t{lines_str}")
+
+    def stop(
+        self,
+        job_dir_path: str = ".",
+    ) -> None:
+        """Stop the DockOpt daemon and the job it is running. Array jobs already submitted are left to run, so that the job
+        can be resumed with `start`."""
+
+        #
+        job_dir_path = os.path.abspath(job_dir_path)
+        pid_lock_file = LockFile(os.path.join(job_dir_path, DAEMON_PID_FILE_NAME))
+        if not pid_lock_file.is_held:
+            logger.info(f"DockOpt daemon is not running for job directory: {job_dir_path}")
+            return
+        daemon_info_dict = pid_lock_file.read_info() or {}
+        if daemon_info_dict.get("hostname") != socket.gethostname():
+            logger.error(f"DockOpt daemon is running on a different host: {daemon_info_dict.get('hostname')}")
+            return
+
+        #
+        logger.info(f"Stopping DockOpt daemon (PID: {daemon_info_dict['pid']})")
+        os.kill(daemon_info_dict["pid"], signal.SIGTERM)
+        time_started = time.time()
+        while pid_lock_file.is_held and time.time() - time_started < SECONDS_TO_WAIT_FOR_TERMINATION:
+            time.sleep(0.5)
+        if pid_lock_file.is_held:
+            logger.error(f"DockOpt daemon did not stop within {SECONDS_TO_WAIT_FOR_TERMINATION} seconds")
+        else:
+            logger.info("DockOpt daemon stopped")
 
 
 class DockoptStep(PipelineComponent):
@@ -308,6 +664,9 @@ class DockoptStep(PipelineComponent):
             dock_files_to_use_from_previous_component: dict,
             blaster_files_to_copy_in: Iterable[BlasterFile],
             last_component_completed: Union[PipelineComponent, None] = None,
+            search: Optional[dict] = None,
+            parameter_space: Optional[dict] = None,
+            submission_ordering: Optional[dict] = None,
     ) -> None:
         super().__init__(
             pipeline_dir_path=pipeline_dir_path,
@@ -320,6 +679,16 @@ class DockoptStep(PipelineComponent):
         #
         self.retrospective_dataset = retrospective_dataset
 
+        # how to choose which of the specified docking configurations to dock (see `pydock3.dockopt.search`)
+        self.search_dict = search
+
+        # constraints on & sampling of the combinations of parameter values
+        self.parameter_space_dict = parameter_space if parameter_space is not None else {}
+
+        # order in which to submit the docking configurations (see `pydock3.dockopt.submission_ordering`)
+        self.submission_ordering = SubmissionOrdering.from_dict(submission_ordering)
+        self.last_component_completed = last_component_completed
+
         #
         blaster_file_names = list(BLASTER_FILE_IDENTIFIER_TO_PROPER_BLASTER_FILE_NAME_DICT.values())
         backup_blaster_file_paths = [
@@ -334,7 +703,7 @@ class DockoptStep(PipelineComponent):
             f"{File.get_file_name_of_file(file_path)}_1"  # TODO
             for file_path in backup_blaster_file_paths
         ]  # ^
-        # TODO: remove need to copy these blaster files in for every step
+        # blaster files are staged in (via reflink / hardlink / symlink where possible) rather than copied for every step
         self.working_dir = WorkingDir(
             path=os.path.join(self.component_dir.path, WORKING_DIR_NAME),
             create=True,
@@ -360,21 +729,33 @@ class DockoptStep(PipelineComponent):
         #
         self.retrospective_dataset = retrospective_dataset
 
+        # load persisted plan (docking configurations & graph) if it matches the config and inputs, to skip rebuilding it
+        plan_file_path = os.path.join(self.component_dir.path, PLAN_FILE_NAME)
+        plan_key = get_step_plan_key(self.component_id, parameters, dock_files_to_use_from_previous_component, blaster_files_to_copy_in, last_component_completed, self.parameter_space_dict, backup_blaster_file_paths)
+        plan = load_step_plan(plan_file_path, plan_key)
+        if plan is not None:
+            logger.info("Loading plan of docking configurations from file")
+            self.docking_configurations, self.graph = plan
+            self._set_num_total_docking_configurations_thus_far(last_component_completed)
+            logger.info(f"Number of unique docking configurations: {len(self.docking_configurations)}")
+            return
+
         #
         if isinstance(parameters["custom_dock_executable"], list):
             custom_dock_executables = [custom_dock_executable for custom_dock_executable in parameters["custom_dock_executable"]]
         else:
             custom_dock_executables = [parameters["custom_dock_executable"]]
 
-        #
-        sorted_dock_files_generation_flat_param_dicts = get_sorted_univalued_flat_parameter_cast_param_dicts_from_multivalued_param_dict(parameters["dock_files_generation"])
-        sorted_dock_files_modification_flat_param_dicts = get_sorted_univalued_flat_parameter_cast_param_dicts_from_multivalued_param_dict(parameters["dock_files_modification"])
-        sorted_indock_file_generation_flat_param_dicts = get_sorted_univalued_flat_parameter_cast_param_dicts_from_multivalued_param_dict(parameters["indock_file_generation"])
-
-        #
-        logger.debug(f"{len(sorted_dock_files_generation_flat_param_dicts)} dock file generation parametrizations:\n{sorted_dock_files_generation_flat_param_dicts}")
-        logger.debug(f"{len(sorted_dock_files_modification_flat_param_dicts)} dock file modification parametrizations:\n{sorted_dock_files_modification_flat_param_dicts}")
-        logger.debug(f"{len(sorted_indock_file_generation_flat_param_dicts)} indock file generation parametrizations:\n{sorted_indock_file_generation_flat_param_dicts}")
+        # parameter spaces are lazy, so combinations are generated as they are consumed
+        parameter_constraints = [ParameterConstraint.from_dict(d) for d in self.parameter_space_dict.get("constraints", [])]
+        known_prefixed_keys = set([f"{param_group_key}.{key}" for param_group_key in ["dock_files_generation", "dock_files_modification", "indock_file_generation"] for key in flatten_param_dict(parameters[param_group_key]).keys()])
+        for constraint in parameter_constraints:
+            unknown_keys = constraint.keys - known_prefixed_keys
+            if unknown_keys:
+                raise Exception(f"Parameter constraint specifies unrecognized parameters: {sorted(unknown_keys)}. Keys must be fully qualified, e.g. `indock_file_generation.electrostatic_scale`.")
+        dock_files_generation_flat_param_dicts = self._get_parameter_space_iterable(parameters, "dock_files_generation", parameter_constraints)
+        dock_files_modification_flat_param_dicts = self._get_parameter_space_iterable(parameters, "dock_files_modification", parameter_constraints)
+        indock_file_generation_flat_param_dicts = self._get_parameter_space_iterable(parameters, "indock_file_generation", parameter_constraints)
 
         #
         logger.info("Generating directed acyclic graph of docking configurations")
@@ -390,11 +771,8 @@ class DockoptStep(PipelineComponent):
                     if should_be_used:
                         #
                         dock_file_node_id = getattr(dc.dock_file_coordinates, dock_file_identifier).node_id
-                        dock_file_lineage_subgraph = self._get_dock_file_lineage_subgraph(
-                            graph=last_component_completed.graph,
-                            dock_file_node_id=dock_file_node_id,
-                        )
-                        graph = nx.compose(graph, dock_file_lineage_subgraph)
+                        dock_file_lineage_subgraph = last_component_completed.graph.get_lineage_subgraph(dock_file_node_id).to_networkx()
+                        graph.update(dock_file_lineage_subgraph)  # in place, unlike `nx.compose`
                 last_component_docking_configurations.append(dc)
 
         #
@@ -404,7 +782,7 @@ class DockoptStep(PipelineComponent):
         partial_dock_file_nodes_combination_dicts = []
         if any([not x for x in dock_files_to_use_from_previous_component.values()]):
             logger.debug(f"The following dock files will be generated during this step: {sorted([key for key, value in dock_files_to_use_from_previous_component.items() if not value])}")
-            for dock_files_generation_flat_param_dict in sorted_dock_files_generation_flat_param_dicts:
+            for dock_files_generation_flat_param_dict in dock_files_generation_flat_param_dicts:
                 # get config for get_blaster_steps
                 # each value in dict must be an instance of Parameter
                 steps = get_blaster_steps(
@@ -524,7 +902,7 @@ class DockoptStep(PipelineComponent):
                                             raise Exception(f"Unrecognized node type for `{u}`: {u_data}")
 
                         #
-                        graph = nx.compose(graph, dock_file_lineage_subgraph)
+                        graph.update(dock_file_lineage_subgraph)  # in place, unlike `nx.compose`
 
                 #
                 partial_dock_file_nodes_combination_dicts.append(partial_dock_file_nodes_combination_dict)
@@ -580,7 +958,7 @@ class DockoptStep(PipelineComponent):
         sorted_unique_matching_spheres_file_nodes = sorted(list(set([partial_dc_kwargs['dock_file_coordinates'].matching_spheres_file.node_id for partial_dc_kwargs in dc_kwargs_so_far])))
         new_dc_kwargs_so_far = []
         num_files_perturbed_so_far = 0
-        for dock_files_modification_flat_param_dict in sorted_dock_files_modification_flat_param_dicts:
+        for dock_files_modification_flat_param_dict in dock_files_modification_flat_param_dicts:
             if dock_files_modification_flat_param_dict[
                 "matching_spheres_perturbation.use"
             ].value:
@@ -690,11 +1068,30 @@ class DockoptStep(PipelineComponent):
         dc_kwargs_so_far = self._get_unique_partial_docking_configuration_kwargs_sorted(new_dc_kwargs_so_far)
         logger.debug(f"Number of unique partial docking configurations after dock files modification specification: {len(dc_kwargs_so_far)}")
 
-        #
-        new_dc_kwargs_so_far = []
-        for i, (partial_dc_kwargs, custom_dock_executable, indock_file_generation_flat_param_dict) in enumerate(itertools.product(dc_kwargs_so_far, custom_dock_executables, sorted_indock_file_generation_flat_param_dicts)):
-            configuration_num = i + 1
-            new_partial_dc_kwargs = deepcopy(partial_dc_kwargs)
+        # constraints spanning parameter groups can only be applied once all groups are combined
+        cross_group_parameter_constraints = [constraint for constraint in parameter_constraints if len(set([key.split('.')[0] for key in constraint.keys])) > 1]
+
+        # docking configurations are built one at a time from the (lazy) product & deduplicated as they are built
+        self.docking_configurations = []
+        seen_hashes = set()
+        configuration_num = 0
+        for partial_dc_kwargs, custom_dock_executable, indock_file_generation_flat_param_dict in self._iterate_over_product_lazily(dc_kwargs_so_far, custom_dock_executables, indock_file_generation_flat_param_dicts):
+            #
+            if cross_group_parameter_constraints:
+                prefixed_flat_param_dict = {
+                    f"{param_group_key}.{key}": value
+                    for param_group_key, flat_param_dict in [
+                        ("dock_files_generation", partial_dc_kwargs['dock_files_generation_flat_param_dict']),
+                        ("dock_files_modification", partial_dc_kwargs['dock_files_modification_flat_param_dict']),
+                        ("indock_file_generation", indock_file_generation_flat_param_dict),
+                    ]
+                    for key, value in flat_param_dict.items()
+                }
+                if not all([constraint.is_satisfied_by(prefixed_flat_param_dict) for constraint in cross_group_parameter_constraints]):
+                    continue
+
+            #
+            configuration_num += 1
             new_partial_dc_kwargs = {
                 'component_id': self.component_id,
                 'configuration_num': configuration_num,
@@ -708,31 +1105,76 @@ class DockoptStep(PipelineComponent):
                     file_name=f"{INDOCK_FILE_NAME}_{configuration_num}",
                 ),
             }
-            new_dc_kwargs_so_far.append(new_partial_dc_kwargs)
-        logger.debug(f"Number of partial docking configurations after indock file generation specification: {len(new_partial_dc_kwargs)}")
+            hash = DockingConfiguration.get_hexdigest_of_persistent_md5_hash_of_docking_configuration_kwargs(new_partial_dc_kwargs, partial_okay=True)
+            if hash not in seen_hashes:  # keep the first, i.e. the lowest-numbered
+                seen_hashes.add(hash)
+                self.docking_configurations.append(DockingConfiguration(**new_partial_dc_kwargs))
+        logger.debug(f"Number of partial docking configurations after indock file generation specification: {configuration_num}")
+        logger.debug(f"Number of unique partial docking configurations after indock file generation specification: {len(self.docking_configurations)}")
 
         #
-        all_dc_kwargs = self._get_unique_partial_docking_configuration_kwargs_sorted(new_dc_kwargs_so_far)
-        logger.debug(f"Number of unique partial docking configurations after indock file generation specification: {len(all_dc_kwargs)}")
+        if not self.docking_configurations:
+            raise Exception(f"Parameter space constraints exclude every docking configuration of step {self.component_id}.")
 
         #
-        self.docking_configurations = sorted([DockingConfiguration(**dc_kwargs) for dc_kwargs in all_dc_kwargs], key=lambda dc: getattr(dc, 'configuration_num'))
+        self._set_num_total_docking_configurations_thus_far(last_component_completed)
+
+        # validate that there are no cycles (i.e. that it is a directed acyclic graph)
+        if not nx.is_directed_acyclic_graph(graph):
+            raise Exception("Cycle found in graph!")
+
+        # store compactly
+        self.graph = ProvenanceGraph.from_networkx(graph)
+
+        # persist plan for fast resumption
+        save_step_plan(plan_file_path, plan_key, self.docking_configurations, self.graph)
 
         #
+        logger.info(f"Number of unique docking configurations: {len(self.docking_configurations)}")
+
+    def _set_num_total_docking_configurations_thus_far(self, last_component_completed: Union[PipelineComponent, None]) -> None:
         if last_component_completed is not None:
             self.num_total_docking_configurations_thus_far = len(self.docking_configurations) + last_component_completed.num_total_docking_configurations_thus_far
         else:
             self.num_total_docking_configurations_thus_far = len(self.docking_configurations)
 
-        # validate that there are no cycles (i.e. that it is a directed acyclic graph)
-        if not nx.is_directed_acyclic_graph(graph):
-            raise Exception("Cycle found in graph!")
+    def _get_parameter_space_iterable(self, parameters: dict, param_group_key: str, parameter_constraints: List[ParameterConstraint]) -> ParameterSpaceSortedByHash:
+        """Get the parametrizations of a parameter group (or a sample of them if sampling is specified for the group),
+        sorted by hash.
+
+        The parametrizations must be in the same order as `get_sorted_univalued_flat_parameter_cast_param_dicts_from_multivalued_param_dict`
+        puts them in, since the configuration numbers (and so the names of the retrodock job dirs and blaster files) follow
+        from it. Otherwise, resuming a job started by an earlier version would silently credit existing results to the
+        wrong parameters. Only the hash & index of each parametrization are kept (see `ParameterSpaceSortedByHash`)."""
 
         #
-        self.graph = graph
+        parameter_space = ParameterSpace(parameters[param_group_key], constraints=parameter_constraints, key_prefix=f"{param_group_key}.")
+        logger.debug(f"{param_group_key} parameter space: {parameter_space.size} combinations before constraints ({len(parameter_space.constraints)} constraints)")
 
         #
-        logger.info(f"Number of unique docking configurations: {len(self.docking_configurations)}")
+        sampling_dict = self.parameter_space_dict.get("sampling", {}).get(param_group_key)
+        if sampling_dict is not None:
+            param_dicts = ParameterSpaceSortedByHash(parameter_space, parameter_space.sample_indices(**sampling_dict))
+            logger.info(f"Sampled {len(param_dicts)} of {parameter_space.size} {param_group_key} parametrizations ({sampling_dict['method']})")
+        else:
+            param_dicts = ParameterSpaceSortedByHash(parameter_space)
+
+        #
+        if len(param_dicts) == 0:
+            raise Exception(f"Parameter space constraints exclude every {param_group_key} parametrization, and so every docking configuration of step {self.component_id}. Constraints: {[{'if': constraint.if_key_to_allowed_values_dict, 'then': constraint.then_key_to_allowed_values_dict} for constraint in parameter_space.constraints]}")
+
+        return param_dicts
+
+    @staticmethod
+    def _iterate_over_product_lazily(*iterables: Iterable) -> Iterable[tuple]:
+        """Like `itertools.product`, but re-iterates the inner iterables instead of materializing them."""
+
+        if not iterables:
+            yield ()
+            return
+        for item in iterables[0]:
+            for rest in DockoptStep._iterate_over_product_lazily(*iterables[1:]):
+                yield (item,) + rest
 
     def _get_unique_partial_docking_configuration_kwargs_sorted(self, dc_kwargs_list: List[dict]) -> List[dict]:
         """Get unique partial docking configurations (sorted)."""
@@ -740,13 +1182,17 @@ class DockoptStep(PipelineComponent):
         logger.debug(f"Getting unique partial docking configurations (sorted). # before: {len(dc_kwargs_list)}")
         new_dc_kwargs = []
         hashes = []
+        seen_hashes = set()
         for dc_kwargs in dc_kwargs_list:
             hash = DockingConfiguration.get_hexdigest_of_persistent_md5_hash_of_docking_configuration_kwargs(dc_kwargs, partial_okay=True)
-            if hash not in hashes:
+            if hash not in seen_hashes:
                 new_dc_kwargs.append(dc_kwargs)
                 hashes.append(hash)
+                seen_hashes.add(hash)
 
         #
+        if not new_dc_kwargs:
+            return []
         new_dc_kwargs_sorted, hashes_sorted = zip(*sorted(zip(new_dc_kwargs, hashes), key=lambda x: x[1]))
         logger.debug(f"# after: {len(new_dc_kwargs_sorted)}")
 
@@ -761,19 +1207,6 @@ class DockoptStep(PipelineComponent):
         ) -> pd.DataFrame:
         """Run this component of the pipeline."""
 
-        # run necessary steps to get all dock files
-        logger.info("Generating docking configurations")
-        for dc in self.docking_configurations:
-            # make dock files
-            for dock_file_identifier in DOCK_FILE_IDENTIFIERS:
-                self._run_unrun_steps_needed_to_create_this_blaster_file_node(
-                    getattr(dc.dock_file_coordinates, dock_file_identifier).node_id, self.graph
-                )
-
-            # make indock file now that dock files exist
-            indock_file = dc.get_indock_file(self.pipeline_dir.path)
-            indock_file.write(dc.get_dock_files(self.pipeline_dir.path), dc.indock_file_generation_flat_param_dict)
-
         #
         step_id_file_path = os.path.join(self.component_dir.path, "step_id")
         if File.file_exists(step_id_file_path):
@@ -788,240 +1221,89 @@ class DockoptStep(PipelineComponent):
             with open(step_id_file_path, "w") as f:
                 f.write(f"{step_id}\n")
 
-        # Split self.docking_configurations into chunks of size max_task_array_size
+        #
         if component_run_func_arg_set.max_task_array_size is None:
             max_task_array_size = sys.maxsize
         else:
             max_task_array_size = component_run_func_arg_set.max_task_array_size
-        docking_configurations_chunks = [self.docking_configurations[i:i + max_task_array_size] for i in
-                                         range(0, len(self.docking_configurations), max_task_array_size)]
-
-        chunk_to_array_jobs = {}
-        array_job_specs_dir = Dir(os.path.join(self.retrodock_jobs_dir.path, 'array_job_specs'), create=True, reset=False)
-        for i, docking_configurations in enumerate(docking_configurations_chunks):
-            array_job_docking_configurations_file_path = os.path.join(array_job_specs_dir.path, f"array_job_docking_configurations_{i+1}.txt")
-            with open(array_job_docking_configurations_file_path, 'w') as f:
-                for dc in docking_configurations:
-                    dock_files = dc.get_dock_files(self.pipeline_dir.path)
-                    dockfile_paths_str = " ".join([getattr(dock_files, field.name).path for field in fields(dock_files)])
-                    indock_file_path_str = dc.get_indock_file(self.pipeline_dir.path).path
-                    f.write(f"{dc.configuration_num} {indock_file_path_str} {dockfile_paths_str} {dc.dock_executable_path}\n")
-
-            # submit retrodock jobs (one for actives, one for decoys)
-            chunk_array_jobs = []
-            for sub_dir_name, should_export_mol2, input_molecules_dir_path in [
-                ('actives', True, self.retrospective_dataset.actives_dir_path),
-                ('decoys', component_run_func_arg_set.export_decoys_mol2,
-                 self.retrospective_dataset.decoys_dir_path),
-            ]:
-                job_name = f"dockopt_step_{step_id}_{sub_dir_name}_{i+1}"
-                sub_dir = Dir(os.path.join(self.retrodock_jobs_dir.path, sub_dir_name), create=True, reset=False)  # task dirs get reset in task submission
-                array_job = ArrayDockingJob(
-                    name=job_name,
-                    job_dir=sub_dir,
-                    input_molecules_dir_path=input_molecules_dir_path,
-                    job_scheduler=component_run_func_arg_set.scheduler,
-                    temp_storage_path=component_run_func_arg_set.temp_storage_path,
-                    array_job_docking_configurations_file_path=array_job_docking_configurations_file_path,
-                    job_timeout_minutes=component_run_func_arg_set.retrodock_job_timeout_minutes,
-                    extra_submission_cmd_params_str=component_run_func_arg_set.extra_submission_cmd_params_str,
-                    sleep_seconds_after_copying_output=component_run_func_arg_set.sleep_seconds_after_copying_output,
-                    # max_reattempts=component_run_func_arg_set.retrodock_job_max_reattempts,  # TODO
-                    export_mol2=should_export_mol2,
-                )
-                sub_result, procs = array_job.submit_all_tasks(
-                    skip_if_complete=(not force_redock),
-                )
-                chunk_array_jobs.append(array_job)
-                log_job_submission_result(array_job, sub_result, procs)
 
-            chunk_to_array_jobs[i] = chunk_array_jobs
-
-        # make a queue of tuples containing job-relevant data for processing
-        docking_configurations_processing_queue = collections.deque(deepcopy(self.docking_configurations))
+        #
+        if component_run_func_arg_set.results_database_file_path is not None:
+            results_database = DockoptResultsDatabase(component_run_func_arg_set.results_database_file_path)
+        else:
+            results_database = None
 
-        # process results of docking jobs
-        logger.info(
-            f"Awaiting / processing ({len(docking_configurations_processing_queue)} tasks in total)"
-        )
+        #
+        if component_run_func_arg_set.task_runtime_model_file_path is not None:
+            task_runtime_model = TaskRuntimeModel(component_run_func_arg_set.task_runtime_model_file_path)
+        else:
+            task_runtime_model = None
+
+        # dock batches of docking configurations as chosen by the search strategy (by default, all of them in one batch)
+        search_dict = dict(self.search_dict) if self.search_dict else {}
+        seed_from_results_database = search_dict.pop("seed_from_results_database", False)
+        search = get_docking_configuration_search(self.docking_configurations, search_dict)
+        if seed_from_results_database and results_database is not None:
+            search.add_prior_results(self._get_criterion_values_of_near_matches_in_results_database(results_database))
+        if self.submission_ordering.uses_reference_configurations:
+            self._add_reference_configurations_to_submission_ordering(results_database)
+        array_job_specs_dir = Dir(os.path.join(self.retrodock_jobs_dir.path, 'array_job_specs'), create=True, reset=False)
+        submission_journal = SubmissionJournal(os.path.join(array_job_specs_dir.path, SUBMISSION_JOURNAL_FILE_NAME))
+        self.effective_content_hash_to_representative_configuration_num_dict = {}  # groups of identical effective content span batches
+        self.effective_content_hash_to_representative_data_dict = {}  # of representatives that have a result
         data_dicts = []
-        task_id_to_num_reattempts_dict = collections.defaultdict(int)
-        task_id_to_num_task_output_detection_failed_attempts_dict = collections.defaultdict(int)
-        task_id_to_num_task_output_loading_failed_attempts_dict = collections.defaultdict(int)
-        max_task_output_detection_reattempts = 1
-        max_task_output_loading_reattempts = 1
-        datetime_queue_was_last_checked = datetime.min
-        task_id_to_datetime_task_output_detection_was_last_attempted_dict = {str(d.configuration_num): datetime.min for d in docking_configurations_processing_queue}
-        task_id_to_datetime_task_output_loading_was_last_attempted_dict = {str(d.configuration_num): datetime.min for d in docking_configurations_processing_queue}
-        while len(docking_configurations_processing_queue) > 0:
-            docking_configuration = docking_configurations_processing_queue.popleft()
-            task_id = str(docking_configuration.configuration_num)
-            chunk_id = (int(task_id) - 1) // max_task_array_size  # Determine which chunk this task belongs to
-            array_jobs = chunk_to_array_jobs[chunk_id]  # Get the corresponding array jobs for this task
-
-            actives_outdock_file_path = os.path.join(self.retrodock_jobs_dir.path, 'actives', task_id, 'OUTDOCK.0')
-            decoys_outdock_file_path = os.path.join(self.retrodock_jobs_dir.path, 'decoys', task_id, 'OUTDOCK.0')
-
-            #
-            if any([not array_job.task_is_complete(task_id) for array_job in array_jobs]):  # one or both OUTDOCK files do not exist yet
-                time.sleep(
-                    0.01
-                )  # sleep for a bit
-
-                #
-                datetime_now = datetime.now()
-                if datetime_now < (datetime_queue_was_last_checked + timedelta(seconds=MIN_SECONDS_BETWEEN_QUEUE_CHECKS)): # 2s check once? too short!
-                    docking_configurations_processing_queue.append(docking_configuration)  # move to back of queue
-                    continue  # move on to next in queue in order to more efficiently use time between queue checks
-
-                #
-                datetime_queue_was_last_checked = datetime.now()
-                if any([job.task_failed(task_id) for job in array_jobs]):
-                    #
-                    if datetime.now() < (task_id_to_datetime_task_output_detection_was_last_attempted_dict[task_id] + timedelta(seconds=MIN_SECONDS_BETWEEN_TASK_OUTPUT_DETECTION_REATTEMPTS)):
-                        task_id_to_datetime_task_output_detection_was_last_attempted_dict[task_id] = datetime.now()
-                        docking_configurations_processing_queue.append(docking_configuration)  # move to back of queue
-                        continue  # move on to next in queue in order to more efficiently use time between queue checks
-                    task_id_to_datetime_task_output_detection_was_last_attempted_dict[task_id] = datetime.now()
-
-                    #
-                    task_id_to_num_task_output_detection_failed_attempts_dict[task_id] += 1
-                    logger.warning(f"Failed to detect output for task {task_id}")
-
-                    #
-                    if task_id_to_num_task_output_detection_failed_attempts_dict[task_id] > max_task_output_detection_reattempts:
-                        if task_id_to_num_reattempts_dict[task_id] + 1 > component_run_func_arg_set.retrodock_job_max_reattempts:
-                            logger.warning(
-                                f"Maximum allowed attempts ({component_run_func_arg_set.retrodock_job_max_reattempts + 1}) exhausted for task {task_id}"
-                            )
-                            if not component_run_func_arg_set.allow_failed_retrodock_jobs:
-                                raise Exception(
-                                    f"Failed to complete task {task_id} after {component_run_func_arg_set.retrodock_job_max_reattempts + 1} attempts."
-                                )
-                            continue  # move on to next in queue without re-attempting failed task
-                        else:
-                            # re-attempt incomplete task(s)
-                            for array_job in array_jobs:
-                                if array_job.task_failed(task_id):
-                                    array_job.submit_task(
-                                        task_id,
-                                        skip_if_complete=False,
-                                    )
-                            task_id_to_num_reattempts_dict[task_id] += 1
-                            task_id_to_num_task_output_detection_failed_attempts_dict[task_id] = 0  # reset task failures counter
-                            logger.info(
-                                f"Re-attempting task {task_id} (attempt {task_id_to_num_reattempts_dict[task_id] + 1} of at most {component_run_func_arg_set.retrodock_job_max_reattempts + 1})"
-                            )
-                    else:
-                        # task must have timed out / failed for one or both jobs
-                        logger.warning(
-                            f"Failed to detect output for task {task_id}. Will move on in queue and re-attempt once it cycles back around."
-                        )
-                        time.sleep(1)
-
-                #
-                docking_configurations_processing_queue.append(docking_configuration)  # move to back of queue
-                continue  # move on to next in queue
-
-            # load outdock files and get dataframe
-            try:
-                # get dataframe of actives job results and decoys job results combined
-                df = get_results_dataframe_from_actives_job_and_decoys_job_outdock_files(
-                    actives_outdock_file_path, decoys_outdock_file_path
+        num_docking_configurations_docked = 0
+        num_array_jobs_so_far = 0
+        while True:
+            docking_configurations = search.get_next_batch()
+            if not docking_configurations:
+                break
+            logger.info(f"Docking batch of {len(docking_configurations)} docking configurations ({num_docking_configurations_docked} docked so far out of {len(self.docking_configurations)} specified)")
+            if component_run_func_arg_set.job_status is not None:
+                component_run_func_arg_set.job_status.update(
+                    force=True,
+                    component_id=self.component_id,
+                    num_docking_configurations_specified=len(self.docking_configurations),
+                    num_docking_configurations_docked=num_docking_configurations_docked,
+                    num_docking_configurations_in_batch=len(docking_configurations),
                 )
-            except Exception as e:  # if outdock files failed to be parsed then re-attempt task
-                try:
-                    time.sleep(0.01)  # sleep for a bit and try again
-                    df = get_results_dataframe_from_actives_job_and_decoys_job_outdock_files(
-                        actives_outdock_file_path, decoys_outdock_file_path
-                    )
-                except Exception as e:
-                    #
-                    if datetime.now() < (task_id_to_datetime_task_output_loading_was_last_attempted_dict[task_id] + timedelta(seconds=MIN_SECONDS_BETWEEN_TASK_OUTPUT_LOADING_REATTEMPTS)):
-                        task_id_to_datetime_task_output_loading_was_last_attempted_dict[task_id] = datetime.now()
-                        docking_configurations_processing_queue.append(docking_configuration)  # move to back of queue
-                        continue  # move on to next in queue in order to more efficiently use time between queue checks
-                    task_id_to_datetime_task_output_loading_was_last_attempted_dict[task_id] = datetime.now()
-
-                    #
-                    task_id_to_num_task_output_loading_failed_attempts_dict[task_id] += 1
-                    logger.warning(f"Failed to load output for task {task_id} due to error: {e}")
-
-                    #
-                    if task_id_to_num_task_output_loading_failed_attempts_dict[task_id] > max_task_output_detection_reattempts:
-                        if task_id_to_num_reattempts_dict[task_id] + 1 > component_run_func_arg_set.retrodock_job_max_reattempts:
-                            logger.warning(
-                                f"Maximum allowed attempts ({component_run_func_arg_set.retrodock_job_max_reattempts + 1}) exhausted for task {task_id}"
-                            )
-                            if not component_run_func_arg_set.allow_failed_retrodock_jobs:
-                                raise Exception(
-                                    f"Failed to complete task {task_id} after {component_run_func_arg_set.retrodock_job_max_reattempts + 1} attempts."
-                                )
-                            continue  # move on to next in queue without re-attempting failed task
-                        else:
-                            for array_job, outdock_file_path in zip(array_jobs, [actives_outdock_file_path, decoys_outdock_file_path]):
-                                try:
-                                    _ = OutdockFile(outdock_file_path).get_dataframe()  # only resubmit if outdock file can't be loaded
-                                except Exception as e:
-                                    array_job.submit_task(
-                                        task_id,
-                                        skip_if_complete=False,
-                                    )
-                            task_id_to_num_reattempts_dict[task_id] += 1
-                            logger.info(
-                                f"Re-attempting task {task_id} (attempt {task_id_to_num_reattempts_dict[task_id] + 1} of at most {component_run_func_arg_set.retrodock_job_max_reattempts + 1})"
-                            )
-                    else:
-                        logger.warning(
-                            f"Failed to load output for task {task_id}. Will move on in queue and re-attempt once it cycles back around."
-                        )
-                        time.sleep(1)
-
-                    #
-                    docking_configurations_processing_queue.append(docking_configuration)  # move to back of queue
-                    continue  # move on to next in queue
-
-            #
-            logger.info(
-                f"Task {task_id} complete. Loaded both OUTDOCK files."
+            docking_configurations = self.submission_ordering.order(docking_configurations)
+            batch_data_dicts, num_array_jobs = self._dock_docking_configurations(
+                docking_configurations=docking_configurations,
+                component_run_func_arg_set=component_run_func_arg_set,
+                force_redock=force_redock,
+                step_id=step_id,
+                max_task_array_size=max_task_array_size,
+                array_job_num_offset=num_array_jobs_so_far,
+                results_database=results_database,
+                task_runtime_model=task_runtime_model,
+                submission_journal=submission_journal,
             )
+            num_array_jobs_so_far += num_array_jobs
+            num_docking_configurations_docked += len(docking_configurations)
+            data_dicts += batch_data_dicts
 
-            # validate scored molecules
-            num_active_db2_files_scored = df[df['is_active'].astype(bool)]['db2_file_path'].nunique()
-            num_decoy_db2_files_scored = df[~df['is_active'].astype(bool)]['db2_file_path'].nunique()
-
-            if num_active_db2_files_scored != self.retrospective_dataset.num_db2_files_in_active_class:
-                raise Exception(
-                    f"Retrospective dataset has {self.retrospective_dataset.num_db2_files_in_active_class} DB2 files in active class but only detected {num_active_db2_files_scored} while processing retrodock job for task {task_id}")
-            if num_decoy_db2_files_scored != self.retrospective_dataset.num_db2_files_in_decoy_class:
-                raise Exception(
-                    f"Retrospective dataset has {self.retrospective_dataset.num_db2_files_in_decoy_class} DB2 files in decoy class but only detected {num_decoy_db2_files_scored} while processing retrodock job for task {task_id}")
-
-            # sort dataframe by total energy score and drop duplicate molecules
-            df = sort_by_energy_and_drop_duplicate_molecules(df)
-
-            # make data dict for this configuration num
-            data_dict = docking_configuration.to_dict()
-
-            # get ROC and calculate normalized LogAUC of this job's docking set-up
-            if isinstance(self.criterion, NormalizedLogAUC):  # TODO: generalize `self.criterion` such that this ad hoc check is not necessary
-                booleans = df["is_active"]
-                data_dict[self.criterion.name] = self.criterion.calculate(booleans)
+            #
+            search.add_results({data_dict['configuration_num']: data_dict[self.criterion.name] for data_dict in batch_data_dicts if self.criterion.name in data_dict})
+            if self.submission_ordering.uses_reference_configurations:
+                for data_dict in batch_data_dicts:
+                    if self.criterion.name in data_dict:
+                        self.submission_ordering.add_reference_configuration(data_dict, data_dict[self.criterion.name])
 
-            # save data_dict for this job
-            data_dicts.append(data_dict)
+        # only count the docking configurations that were actually docked
+        self.num_total_docking_configurations_thus_far += num_docking_configurations_docked - len(self.docking_configurations)
 
         # write jobs completion status
         num_tasks_successful = len(data_dicts)
         logger.info(
-            f"Finished {num_tasks_successful} out of {len(self.docking_configurations)} tasks."
+            f"Finished {num_tasks_successful} out of {num_docking_configurations_docked} tasks."
         )
 
         #
-        if num_tasks_successful != len(self.docking_configurations):
+        if num_tasks_successful != num_docking_configurations_docked:
             if not component_run_func_arg_set.allow_failed_retrodock_jobs:
                 raise Exception(
-                    f"Failed {len(self.docking_configurations) - num_tasks_successful} out of {len(self.docking_configurations)} tasks. Failed tasks are not allowed. Exiting."
+                    f"Failed {num_docking_configurations_docked - num_tasks_successful} out of {num_docking_configurations_docked} tasks. Failed tasks are not allowed. Exiting."
                 )
 
         #
@@ -1050,7 +1332,9 @@ class DockoptStep(PipelineComponent):
                 for obj in os.listdir(class_dir):
                     obj_path = os.path.join(class_dir, obj)
                     if obj not in keep_dirs:
-                        if os.path.isdir(obj_path):
+                        if os.path.islink(obj_path):
+                            os.remove(obj_path)
+                        elif os.path.isdir(obj_path):
                             shutil.rmtree(obj_path)
                         elif os.path.isfile(obj_path):
                             os.remove(obj_path)
@@ -1076,6 +1360,454 @@ class DockoptStep(PipelineComponent):
 
         return df
 
+    def _dock_docking_configurations(
+            self,
+            docking_configurations: List[DockingConfiguration],
+            component_run_func_arg_set: DockoptPipelineComponentRunFuncArgSet,
+            force_redock: bool,
+            step_id: str,
+            max_task_array_size: int,
+            array_job_num_offset: int = 0,
+            results_database: Optional[DockoptResultsDatabase] = None,
+            task_runtime_model: Optional[TaskRuntimeModel] = None,
+            submission_journal: Optional[SubmissionJournal] = None,
+    ) -> Tuple[List[dict], int]:
+        """Generate the dock files of the given docking configurations, dock them, and return a data dict per successful task
+        (along with the number of array jobs submitted)."""
+
+        # docking configurations are submitted in array jobs of `submission_chunk_size` tasks as soon as their dock files
+        # and INDOCK files are ready, so that docking overlaps with the generation of the remaining dock files
+        submission_chunk_size = max_task_array_size
+        if component_run_func_arg_set.submission_chunk_size is not None:
+            submission_chunk_size = min(component_run_func_arg_set.submission_chunk_size, max_task_array_size)
+
+        # dock only one docking configuration per group of those with identical effective content (dock files, INDOCK file,
+        # dock executable). The representative of each group is the first of its docking configurations to be ready, in
+        # this batch or an earlier one (see `self.effective_content_hash_to_representative_configuration_num_dict`). If
+        # the representative fails, the group's next docking configuration to be ready (in a later batch) is docked instead.
+        configuration_num_to_duplicate_docking_configurations_dict = {}
+        configuration_num_to_effective_content_hash_dict = {}
+        file_path_to_hexdigest_dict = {}
+        unique_docking_configurations = []
+        num_docking_configurations_reused_from_results_database = 0
+        num_docking_configurations_adopted_from_submission_journal = 0
+
+        #
+        data_dicts = []
+        task_id_to_array_jobs_dict = collections.defaultdict(list)
+        array_job_specs_dir = Dir(os.path.join(self.retrodock_jobs_dir.path, 'array_job_specs'), create=True, reset=False)
+        docking_configurations_pending_generation = list(docking_configurations)  # in submission order
+        docking_configurations_pending_submission = []
+        num_array_jobs_submitted = 0
+        job_name_to_adopted_array_job_dict = {}
+        job_name_to_adopted_array_job_is_on_queue_dict = {}
+
+        # with a task runtime model, the tasks of each chunk are grouped into array jobs by predicted time limit
+        configuration_num_and_sub_dir_name_to_task_features_dict = {}
+
+        def get_task_features_of_docking_configuration(dc, sub_dir_name):
+            key = (dc.configuration_num, sub_dir_name)
+            if key not in configuration_num_and_sub_dir_name_to_task_features_dict:
+                if sub_dir_name == 'actives':
+                    num_molecules, num_conformations = self.retrospective_dataset.num_molecules_in_active_class, self.retrospective_dataset.num_conformations_in_active_class
+                else:
+                    num_molecules, num_conformations = self.retrospective_dataset.num_molecules_in_decoy_class, self.retrospective_dataset.num_conformations_in_decoy_class
+                configuration_num_and_sub_dir_name_to_task_features_dict[key] = get_task_features(dc, self.pipeline_dir.path, num_molecules, num_conformations)
+            return configuration_num_and_sub_dir_name_to_task_features_dict[key]
+
+        def get_array_job_groups(chunk_docking_configurations, sub_dir_name):
+            """Returns a list of (docking configurations, job timeout minutes, job memory MB)."""
+
+            #
+            if task_runtime_model is None:
+                return [(chunk_docking_configurations, component_run_func_arg_set.retrodock_job_timeout_minutes, None)]
+
+            #
+            job_timeout_minutes_to_docking_configurations_dict = collections.defaultdict(list)
+            job_timeout_minutes_to_job_memory_mb_dict = collections.defaultdict(int)
+            for dc in chunk_docking_configurations:
+                task_features_dict = get_task_features_of_docking_configuration(dc, sub_dir_name)
+                predicted_runtime_seconds = task_runtime_model.predict_runtime_seconds_upper_bound(task_features_dict)
+                if predicted_runtime_seconds is None:  # not enough observations yet
+                    job_timeout_minutes = component_run_func_arg_set.retrodock_job_timeout_minutes
+                else:
+                    job_timeout_minutes = get_job_timeout_minutes(predicted_runtime_seconds, component_run_func_arg_set.retrodock_job_timeout_minutes)
+                job_timeout_minutes_to_docking_configurations_dict[job_timeout_minutes].append(dc)
+                job_memory_mb = get_job_memory_mb(task_features_dict, task_runtime_model.predict_memory_mb_upper_bound(task_features_dict))
+                job_timeout_minutes_to_job_memory_mb_dict[job_timeout_minutes] = max(job_timeout_minutes_to_job_memory_mb_dict[job_timeout_minutes], job_memory_mb)
+
+            return [
+                (job_timeout_minutes_to_docking_configurations_dict[job_timeout_minutes], job_timeout_minutes, job_timeout_minutes_to_job_memory_mb_dict[job_timeout_minutes])
+                for job_timeout_minutes in sorted(job_timeout_minutes_to_docking_configurations_dict.keys(), key=lambda x: (x is not None, x))
+            ]
+
+        def write_array_job_docking_configurations_file(file_path, array_job_docking_configurations):
+            with open(file_path, 'w') as f:
+                for dc in array_job_docking_configurations:
+                    dock_files = dc.get_dock_files(self.pipeline_dir.path)
+                    dockfile_paths_str = " ".join([getattr(dock_files, field.name).path for field in fields(dock_files)])
+                    indock_file_path_str = dc.get_indock_file(self.pipeline_dir.path).path
+                    f.write(f"{dc.configuration_num} {indock_file_path_str} {dockfile_paths_str} {dc.dock_executable_path}\n")
+
+        def submit_chunk(chunk_docking_configurations):
+            nonlocal num_array_jobs_submitted
+
+            # do not reuse the array job nums (and thus job names & array job spec files) of array jobs submitted before a restart
+            array_job_num = array_job_num_offset + num_array_jobs_submitted + 1
+            num_array_jobs_submitted += 1
+            while submission_journal is not None and array_job_num in submission_journal.array_job_nums:
+                array_job_num += 1
+                num_array_jobs_submitted += 1
+            array_job_docking_configurations_file_path = os.path.join(array_job_specs_dir.path, f"array_job_docking_configurations_{array_job_num}.txt")
+            write_array_job_docking_configurations_file(array_job_docking_configurations_file_path, chunk_docking_configurations)
+
+            # submit retrodock jobs (one for actives, one for decoys; or, with a task runtime model, one per time limit of each)
+            for sub_dir_name, should_export_mol2, input_molecules_dir_path in [
+                ('actives', True, self.retrospective_dataset.actives_dir_path),
+                ('decoys', component_run_func_arg_set.export_decoys_mol2,
+                 self.retrospective_dataset.decoys_dir_path),
+            ]:
+                array_job_groups = get_array_job_groups(chunk_docking_configurations, sub_dir_name)
+                for group_num, (group_docking_configurations, job_timeout_minutes, job_memory_mb) in enumerate(array_job_groups, start=1):
+                    if len(array_job_groups) == 1:
+                        job_name = f"dockopt_step_{step_id}_{sub_dir_name}_{array_job_num}"
+                        group_array_job_docking_configurations_file_path = array_job_docking_configurations_file_path
+                    else:
+                        job_name = f"dockopt_step_{step_id}_{sub_dir_name}_{array_job_num}_{group_num}"
+                        group_array_job_docking_configurations_file_path = os.path.join(array_job_specs_dir.path, f"array_job_docking_configurations_{array_job_num}_{sub_dir_name}_{group_num}.txt")
+                        write_array_job_docking_configurations_file(group_array_job_docking_configurations_file_path, group_docking_configurations)
+                    if task_runtime_model is not None:
+                        logger.debug(f"Array job {job_name}: {len(group_docking_configurations)} tasks, time limit: {job_timeout_minutes} minutes, memory: {job_memory_mb} MB")
+                    sub_dir = Dir(os.path.join(self.retrodock_jobs_dir.path, sub_dir_name), create=True, reset=False)  # task dirs get reset in task submission
+                    array_job = ArrayDockingJob(
+                        name=job_name,
+                        job_dir=sub_dir,
+                        input_molecules_dir_path=input_molecules_dir_path,
+                        job_scheduler=component_run_func_arg_set.scheduler,
+                        temp_storage_path=component_run_func_arg_set.temp_storage_path,
+                        array_job_docking_configurations_file_path=group_array_job_docking_configurations_file_path,
+                        job_timeout_minutes=job_timeout_minutes,
+                        extra_submission_cmd_params_str=component_run_func_arg_set.extra_submission_cmd_params_str,
+                        sleep_seconds_after_copying_output=component_run_func_arg_set.sleep_seconds_after_copying_output,
+                        # max_reattempts=component_run_func_arg_set.retrodock_job_max_reattempts,  # TODO
+                        export_mol2=should_export_mol2,
+                        job_memory_mb=job_memory_mb,
+                    )
+                    sub_result, procs = array_job.submit_all_tasks(
+                        skip_if_complete=(not force_redock),
+                    )
+                    log_job_submission_result(array_job, sub_result, procs)
+                    if submission_journal is not None:
+                        submission_journal.add(
+                            array_job_num=array_job_num,
+                            job_name=job_name,
+                            sub_dir_name=sub_dir_name,
+                            array_job_docking_configurations_file_path=group_array_job_docking_configurations_file_path,
+                            job_timeout_minutes=job_timeout_minutes,
+                            job_memory_mb=job_memory_mb,
+                            export_mol2=should_export_mol2,
+                            configuration_num_to_effective_content_hash_dict={dc.configuration_num: configuration_num_to_effective_content_hash_dict[dc.configuration_num] for dc in group_docking_configurations},
+                        )
+
+                    #
+                    for dc in group_docking_configurations:
+                        task_id_to_array_jobs_dict[str(dc.configuration_num)].append(array_job)  # actives job, then decoys job
+
+        def get_adopted_array_job(record):
+            if record['job_name'] not in job_name_to_adopted_array_job_dict:
+                if record['sub_dir_name'] == 'actives':
+                    input_molecules_dir_path = self.retrospective_dataset.actives_dir_path
+                else:
+                    input_molecules_dir_path = self.retrospective_dataset.decoys_dir_path
+                array_job = ArrayDockingJob(
+                    name=record['job_name'],
+                    job_dir=Dir(os.path.join(self.retrodock_jobs_dir.path, record['sub_dir_name']), create=True, reset=False),
+                    input_molecules_dir_path=input_molecules_dir_path,
+                    job_scheduler=component_run_func_arg_set.scheduler,
+                    temp_storage_path=component_run_func_arg_set.temp_storage_path,
+                    array_job_docking_configurations_file_path=record['array_job_docking_configurations_file_path'],
+                    job_timeout_minutes=record['job_timeout_minutes'],
+                    extra_submission_cmd_params_str=component_run_func_arg_set.extra_submission_cmd_params_str,
+                    sleep_seconds_after_copying_output=component_run_func_arg_set.sleep_seconds_after_copying_output,
+                    export_mol2=record['export_mol2'],
+                    job_memory_mb=record['job_memory_mb'],
+                )
+                job_name_to_adopted_array_job_dict[record['job_name']] = array_job
+                job_name_to_adopted_array_job_is_on_queue_dict[record['job_name']] = array_job.is_on_job_scheduler_queue
+            return job_name_to_adopted_array_job_dict[record['job_name']]
+
+        def adopt_submitted_array_jobs(dc, records):
+            for record in records:
+                array_job = get_adopted_array_job(record)
+                task_id = str(dc.configuration_num)
+                if not job_name_to_adopted_array_job_is_on_queue_dict[record['job_name']] and not array_job.task_is_complete(task_id):  # e.g., cancelled while the job was down
+                    sub_result, procs = array_job.submit_task(task_id, skip_if_complete=True)
+                    log_job_submission_result(array_job, sub_result, procs)
+                task_id_to_array_jobs_dict[task_id].append(array_job)  # actives job, then decoys job
+
+        def add_duplicate_data_dict(duplicate_dc, representative_data_dict):
+            duplicate_data_dict = duplicate_dc.to_dict()
+            if self.criterion.name in representative_data_dict:
+                duplicate_data_dict[self.criterion.name] = representative_data_dict[self.criterion.name]
+            data_dicts.append(duplicate_data_dict)
+            self._clone_task_dirs(
+                str(duplicate_dc.configuration_num),
+                os.path.join(self.retrodock_jobs_dir.path, 'actives', str(representative_data_dict['configuration_num'])),
+                os.path.join(self.retrodock_jobs_dir.path, 'decoys', str(representative_data_dict['configuration_num'])),
+            )
+
+        def process_ready_docking_configurations(all_steps_finished=False):
+            nonlocal docking_configurations_pending_generation, num_docking_configurations_reused_from_results_database, num_docking_configurations_adopted_from_submission_journal
+
+            #
+            still_pending_docking_configurations = []
+            for dc in docking_configurations_pending_generation:
+                dock_files = dc.get_dock_files(self.pipeline_dir.path)
+                if not all_steps_finished and not all([blaster_step_dag_executor.outfile_is_ready(getattr(dock_files, field.name).path) for field in fields(dock_files)]):
+                    still_pending_docking_configurations.append(dc)
+                    continue
+
+                # make indock file now that dock files exist
+                indock_file = dc.get_indock_file(self.pipeline_dir.path)
+                indock_file.write(dock_files, dc.indock_file_generation_flat_param_dict)
+
+                #
+                effective_content_hash = dc.get_hexdigest_of_md5_hash_of_effective_content(self.pipeline_dir.path, file_path_to_hexdigest_dict)
+                if effective_content_hash in self.effective_content_hash_to_representative_data_dict:  # representative docked in an earlier batch
+                    add_duplicate_data_dict(dc, self.effective_content_hash_to_representative_data_dict[effective_content_hash])
+                    continue
+                if effective_content_hash in self.effective_content_hash_to_representative_configuration_num_dict:
+                    representative_configuration_num = self.effective_content_hash_to_representative_configuration_num_dict[effective_content_hash]
+                    configuration_num_to_duplicate_docking_configurations_dict[representative_configuration_num].append(dc)
+                    continue
+                self.effective_content_hash_to_representative_configuration_num_dict[effective_content_hash] = dc.configuration_num
+                configuration_num_to_duplicate_docking_configurations_dict[dc.configuration_num] = []
+                configuration_num_to_effective_content_hash_dict[dc.configuration_num] = effective_content_hash
+
+                # reuse result of exact match in results database (from previous jobs) if its task dirs still exist
+                if results_database is not None and not force_redock:
+                    result = results_database.get_result(effective_content_hash, self.retrospective_dataset.hexdigest_of_md5_hash_of_manifest, self.criterion.name)
+                    if result is not None and all([result[key] is not None and File.file_exists(os.path.join(result[key], OUTDOCK_FILE_NAME)) for key in ['actives_task_dir_path', 'decoys_task_dir_path']]):
+                        data_dict = dc.to_dict()
+                        data_dict[self.criterion.name] = result['criterion_value']
+                        data_dicts.append(data_dict)
+                        self.effective_content_hash_to_representative_data_dict[effective_content_hash] = data_dict
+                        self._clone_task_dirs(str(dc.configuration_num), result['actives_task_dir_path'], result['decoys_task_dir_path'])
+                        num_docking_configurations_reused_from_results_database += 1
+                        continue
+
+                # adopt the array jobs this docking configuration was submitted in before a restart
+                if submission_journal is not None and not force_redock:
+                    records = submission_journal.get_records_of_docking_configuration(dc.configuration_num, effective_content_hash, ['actives', 'decoys'])
+                    if records is not None:
+                        adopt_submitted_array_jobs(dc, records)
+                        unique_docking_configurations.append(dc)
+                        num_docking_configurations_adopted_from_submission_journal += 1
+                        continue
+
+                #
+                unique_docking_configurations.append(dc)
+                docking_configurations_pending_submission.append(dc)
+            docking_configurations_pending_generation = still_pending_docking_configurations
+            if component_run_func_arg_set.job_status is not None:
+                component_run_func_arg_set.job_status.update(
+                    num_docking_configurations_pending_generation=len(docking_configurations_pending_generation),
+                    num_tasks_submitted=len(task_id_to_array_jobs_dict),
+                )
+
+            # submit full chunks (and, once everything is generated, whatever remains)
+            while len(docking_configurations_pending_submission) >= submission_chunk_size or (all_steps_finished and docking_configurations_pending_submission):
+                chunk_docking_configurations = docking_configurations_pending_submission[:submission_chunk_size]
+                del docking_configurations_pending_submission[:submission_chunk_size]
+                submit_chunk(chunk_docking_configurations)
+
+        # run necessary steps to get the dock files of these docking configurations (independent steps run concurrently)
+        logger.info("Generating docking configurations")
+        dock_file_node_ids = [getattr(dc.dock_file_coordinates, dock_file_identifier).node_id for dc in docking_configurations for dock_file_identifier in DOCK_FILE_IDENTIFIERS]
+        steps = self._get_unrun_steps_needed_to_create_these_blaster_file_nodes(dock_file_node_ids, self.graph)
+        if component_run_func_arg_set.blaster_step_cache_dir_path is not None:
+            blaster_step_outputs_cache = BlasterStepOutputsCache(component_run_func_arg_set.blaster_step_cache_dir_path)
+        else:
+            blaster_step_outputs_cache = None
+        if self.submission_ordering.uses_reference_configurations:  # so that dock files are generated in submission order
+            step_key_to_priority_dict = {}
+            for i, dc in enumerate(docking_configurations):
+                for step in self._get_unrun_steps_needed_to_create_these_blaster_file_nodes([getattr(dc.dock_file_coordinates, dock_file_identifier).node_id for dock_file_identifier in DOCK_FILE_IDENTIFIERS], self.graph):
+                    step_key_to_priority_dict.setdefault(step.step_dir.path, i)
+        else:
+            step_key_to_priority_dict = None
+        blaster_step_dag_executor = BlasterStepDAGExecutor(
+            steps,
+            max_workers=component_run_func_arg_set.blaster_step_max_workers,
+            cache=blaster_step_outputs_cache,
+            step_key_to_priority_dict=step_key_to_priority_dict,
+        )
+        blaster_step_dag_executor.run(on_steps_finished=process_ready_docking_configurations)
+        process_ready_docking_configurations(all_steps_finished=True)
+
+        #
+        unique_docking_configurations = sorted(unique_docking_configurations, key=lambda dc: dc.configuration_num)
+        num_unique_docking_configurations = len(unique_docking_configurations) + num_docking_configurations_reused_from_results_database
+        if num_unique_docking_configurations < len(docking_configurations):
+            logger.info(f"{len(docking_configurations) - num_unique_docking_configurations} out of {len(docking_configurations)} docking configurations are identical in effective content to another and will not be docked separately")
+        if num_docking_configurations_reused_from_results_database > 0:
+            logger.info(f"Reused results from results database for {num_docking_configurations_reused_from_results_database} out of {num_unique_docking_configurations} unique docking configurations")
+        if num_docking_configurations_adopted_from_submission_journal > 0:
+            logger.info(f"Resumed {num_docking_configurations_adopted_from_submission_journal} out of {num_unique_docking_configurations} unique docking configurations from array jobs submitted previously")
+
+        # process results of docking jobs
+        logger.info(
+            f"Awaiting / processing ({len(unique_docking_configurations)} tasks in total)"
+        )
+        configuration_num_to_docking_configuration_dict = {dc.configuration_num: dc for dc in unique_docking_configurations}
+        task_results_processor = TaskResultsProcessor(
+            job_scheduler=component_run_func_arg_set.scheduler,
+            max_reattempts=component_run_func_arg_set.retrodock_job_max_reattempts,
+            allow_failed_tasks=component_run_func_arg_set.allow_failed_retrodock_jobs,
+            max_job_timeout_minutes=component_run_func_arg_set.retrodock_job_timeout_minutes,
+            speculative_execution_runtime_multiple=component_run_func_arg_set.speculative_execution_runtime_multiple,
+        )
+
+        def update_job_status(num_tasks_remaining):
+            if component_run_func_arg_set.job_status is not None:
+                component_run_func_arg_set.job_status.update(
+                    num_tasks_in_batch=len(unique_docking_configurations),
+                    num_tasks_in_batch_remaining=num_tasks_remaining,
+                    num_tasks_reattempted=len(task_results_processor.task_id_to_num_reattempts_dict),
+                )
+
+        def process_task_results(task_id, df, array_jobs):
+            docking_configuration = configuration_num_to_docking_configuration_dict[int(task_id)]
+            actives_task_dir_path = os.path.join(self.retrodock_jobs_dir.path, 'actives', task_id)
+            decoys_task_dir_path = os.path.join(self.retrodock_jobs_dir.path, 'decoys', task_id)
+
+            # validate scored molecules
+            num_active_db2_files_scored = df[df['is_active'].astype(bool)]['db2_file_path'].nunique()
+            num_decoy_db2_files_scored = df[~df['is_active'].astype(bool)]['db2_file_path'].nunique()
+
+            if num_active_db2_files_scored != self.retrospective_dataset.num_db2_files_in_active_class:
+                raise Exception(
+                    f"Retrospective dataset has {self.retrospective_dataset.num_db2_files_in_active_class} DB2 files in active class but only detected {num_active_db2_files_scored} while processing retrodock job for task {task_id}")
+            if num_decoy_db2_files_scored != self.retrospective_dataset.num_db2_files_in_decoy_class:
+                raise Exception(
+                    f"Retrospective dataset has {self.retrospective_dataset.num_db2_files_in_decoy_class} DB2 files in decoy class but only detected {num_decoy_db2_files_scored} while processing retrodock job for task {task_id}")
+
+            # sort dataframe by total energy score and drop duplicate molecules
+            df = sort_by_energy_and_drop_duplicate_molecules(df)
+
+            # make data dict for this configuration num
+            data_dict = docking_configuration.to_dict()
+
+            # get ROC and calculate normalized LogAUC of this job's docking set-up
+            if isinstance(self.criterion, NormalizedLogAUC):  # TODO: generalize `self.criterion` such that this ad hoc check is not necessary
+                booleans = df["is_active"]
+                data_dict[self.criterion.name] = self.criterion.calculate(booleans)
+
+            # save data_dict for this job
+            data_dicts.append(data_dict)
+            self.effective_content_hash_to_representative_data_dict[configuration_num_to_effective_content_hash_dict[docking_configuration.configuration_num]] = data_dict
+
+            # learn from the runtimes & peak memory usages (if accounted for by the job scheduler) of this task's jobs
+            if task_runtime_model is not None:
+                for array_job, sub_dir_name in zip(array_jobs, ['actives', 'decoys']):
+                    runtime_seconds = array_job.get_task_runtime_seconds(task_id)
+                    if runtime_seconds is not None:  # e.g., output of a speculative attempt was accepted
+                        accounting_record = task_results_processor.task_failure_classifier.get_accounting_record(array_job, task_id)
+                        task_runtime_model.add_observation(
+                            get_task_features_of_docking_configuration(docking_configuration, sub_dir_name),
+                            runtime_seconds,
+                            task_dir_path=array_job.get_task_dir_path(task_id),
+                            start_time=array_job.get_task_start_time(task_id),
+                            max_rss_mb=accounting_record.max_rss_mb if accounting_record is not None else None,
+                        )
+
+            # save result for future jobs
+            if results_database is not None and self.criterion.name in data_dict:
+                results_database.put_result(
+                    effective_content_hash=configuration_num_to_effective_content_hash_dict[docking_configuration.configuration_num],
+                    dataset_hash=self.retrospective_dataset.hexdigest_of_md5_hash_of_manifest,
+                    criterion_name=self.criterion.name,
+                    criterion_value=data_dict[self.criterion.name],
+                    data_dict=data_dict,
+                    actives_task_dir_path=actives_task_dir_path,  # accepted speculative attempts get moved here
+                    decoys_task_dir_path=decoys_task_dir_path,
+                    score_vectors_blob=get_score_vectors_blob(df),
+                )
+
+        #
+        task_results_processor.run(
+            [str(dc.configuration_num) for dc in unique_docking_configurations],
+            task_id_to_array_jobs_dict,
+            on_task_results_loaded=process_task_results,
+            on_queue_cycle=update_job_status,
+        )
+
+        # fan results out to docking configurations identical in effective content. Those of failed representatives are
+        # counted as failed (and their group is no longer represented, so that a later batch docks it anew)
+        for effective_content_hash, representative_configuration_num in list(self.effective_content_hash_to_representative_configuration_num_dict.items()):
+            if representative_configuration_num not in configuration_num_to_duplicate_docking_configurations_dict:  # not in this batch
+                continue
+            duplicate_docking_configurations = configuration_num_to_duplicate_docking_configurations_dict[representative_configuration_num]
+            if effective_content_hash in self.effective_content_hash_to_representative_data_dict:
+                for duplicate_dc in duplicate_docking_configurations:
+                    add_duplicate_data_dict(duplicate_dc, self.effective_content_hash_to_representative_data_dict[effective_content_hash])
+            else:
+                del self.effective_content_hash_to_representative_configuration_num_dict[effective_content_hash]
+                if duplicate_docking_configurations:
+                    logger.warning(f"Task {representative_configuration_num} failed, so the docking configurations identical to it in effective content failed too: {', '.join([str(dc.configuration_num) for dc in duplicate_docking_configurations])}")
+
+        return data_dicts, num_array_jobs_submitted
+
+    def _clone_task_dirs(self, task_id: str, src_actives_task_dir_path: str, src_decoys_task_dir_path: str) -> None:
+        """Fill the task dirs (actives & decoys) of `task_id` with clones (reflinks, hardlinks, or copies) of the output
+        files of the given task dirs, which may belong to another job. Unlike symlinks, the clones remain valid if the
+        given task dirs are deleted."""
+
+        for sub_dir_name, src_task_dir_path in [('actives', src_actives_task_dir_path), ('decoys', src_decoys_task_dir_path)]:
+            task_dir_path = os.path.join(self.retrodock_jobs_dir.path, sub_dir_name, task_id)
+            if os.path.realpath(task_dir_path) == os.path.realpath(src_task_dir_path):  # already there
+                continue
+            if os.path.islink(task_dir_path):  # linked by an earlier version
+                os.remove(task_dir_path)
+            Dir(task_dir_path, create=True, reset=True)
+            for file_name in [OUTDOCK_FILE_NAME, MOL2_FILE_NAME]:
+                src_file_path = os.path.join(src_task_dir_path, file_name)
+                if File.file_exists(src_file_path):  # no mol2 file if not exported
+                    File.clone_file(src_file_path, os.path.join(task_dir_path, file_name))
+
+    def _add_reference_configurations_to_submission_ordering(self, results_database: Optional[DockoptResultsDatabase] = None) -> None:
+        """Add the configurations with known criterion values (docked by the previous component, or near matches in the results database) as references for the submission ordering."""
+
+        #
+        if self.last_component_completed is not None:
+            df = self.last_component_completed.load_results_dataframe()
+            if self.criterion.name in df.columns:
+                for _, row in df.iterrows():
+                    self.submission_ordering.add_reference_configuration(row.to_dict(), row[self.criterion.name])
+
+        #
+        if results_database is not None:
+            configuration_num_to_docking_configuration_dict = {dc.configuration_num: dc for dc in self.docking_configurations}
+            for configuration_num, criterion_value in self._get_criterion_values_of_near_matches_in_results_database(results_database).items():
+                self.submission_ordering.add_reference_configuration(configuration_num_to_docking_configuration_dict[configuration_num].to_dict(), criterion_value)
+
+    def _get_criterion_values_of_near_matches_in_results_database(self, results_database: DockoptResultsDatabase) -> Dict[int, float]:
+        """Get the mean criterion value of the results in the results database with the same parameter values as each docking configuration (on the same retrospective dataset)."""
+
+        configuration_num_to_criterion_value_dict = {}
+        for dc in self.docking_configurations:
+            results = results_database.get_results_with_same_parameters(
+                get_hexdigest_of_md5_hash_of_parameters(dc.to_dict()),
+                self.retrospective_dataset.hexdigest_of_md5_hash_of_manifest,
+                self.criterion.name,
+            )
+            criterion_values = [result['criterion_value'] for result in results if result['criterion_value'] is not None]
+            if criterion_values:
+                configuration_num_to_criterion_value_dict[dc.configuration_num] = sum(criterion_values) / len(criterion_values)
+        logger.info(f"Found near matches in results database for {len(configuration_num_to_criterion_value_dict)} out of {len(self.docking_configurations)} docking configurations")
+
+        return configuration_num_to_criterion_value_dict
+
     @staticmethod
     def _get_dock_file_lineage_subgraph(graph: nx.DiGraph, dock_file_node_id: str) -> nx.DiGraph:
         """Gets the subgraph representing the steps necessary to produce the desired dock file"""
@@ -1262,27 +1994,38 @@ class DockoptStep(PipelineComponent):
         return d
 
     @staticmethod
-    def _run_unrun_steps_needed_to_create_this_blaster_file_node(
-        blaster_file_node: str,
-        g: nx.DiGraph,
-    ) -> None:
-        """Run all steps needed to create this blaster file node."""
-
-        if g.nodes[blaster_file_node].get("blaster_file") is not None:
-            blaster_file = g.nodes[blaster_file_node]['blaster_file']
-            if not blaster_file.exists:
-                for parent_node in g.predecessors(blaster_file_node):
-                    DockoptStep._run_unrun_steps_needed_to_create_this_blaster_file_node(
-                        parent_node, g
-                    )
-                if list(g.predecessors(blaster_file_node)): # die otherwise
-                    a_parent_node = list(g.predecessors(blaster_file_node))[0]
-                    step_instance = g[a_parent_node][blaster_file_node]["step_instance"]
-                    if step_instance.is_done:
-                        raise Exception(
-                            f"blaster file {blaster_file.path} does not exist but step instance is_done=True"
-                        )
-                    step_instance.run() # I think this step should generate dedicated files
+    def _get_unrun_steps_needed_to_create_these_blaster_file_nodes(
+        blaster_file_nodes: Iterable[str],
+        g: ProvenanceGraph,
+    ) -> List[BlasterStep]:
+        """Get all unrun steps needed to create these blaster file nodes (each step appears once)."""
+
+        step_hash_to_step_instance_dict = {}
+        visited_nodes = set()
+        nodes_to_visit = list(blaster_file_nodes)
+        while nodes_to_visit:
+            node = nodes_to_visit.pop()
+            if node in visited_nodes:
+                continue
+            visited_nodes.add(node)
+            blaster_file = g.get_blaster_file(node)
+            if blaster_file is None:
+                continue
+            if blaster_file.exists:
+                continue
+            parent_nodes = list(g.predecessors(node))
+            if not parent_nodes:  # die otherwise
+                continue
+            edge_data_dict = g.get_edge_data(parent_nodes[0], node)
+            step_instance = edge_data_dict["step_instance"]
+            if step_instance.is_done:
+                raise Exception(
+                    f"blaster file {blaster_file.path} does not exist but step instance is_done=True"
+                )
+            step_hash_to_step_instance_dict[edge_data_dict["step_hash"]] = step_instance
+            nodes_to_visit += parent_nodes
+
+        return list(step_hash_to_step_instance_dict.values())
 
 
 class DockoptStepSequenceIteration(PipelineComponentSequenceIteration):
@@ -1322,7 +2065,7 @@ class DockoptStepSequenceIteration(PipelineComponentSequenceIteration):
         )
 
         #
-        self.graph = nx.DiGraph()
+        self.graph = ProvenanceGraph()
 
     def run(
             self, 
@@ -1368,6 +2111,8 @@ class DockoptStepSequenceIteration(PipelineComponentSequenceIteration):
                 'blaster_files_to_copy_in': self.blaster_files_to_copy_in,  # TODO: is this necessary?
                 'last_component_completed': last_component_completed_in_sequence,
             }, component_class)
+            if component_run_func_arg_set.job_status is not None:
+                component_run_func_arg_set.job_status.update(force=True, component_id=component_id)
             component = component_class(**kwargs)
             component.run(
                 component_run_func_arg_set,
@@ -1383,8 +2128,8 @@ class DockoptStepSequenceIteration(PipelineComponentSequenceIteration):
             #
             last_component_completed_in_sequence = component
 
-            # TODO: make sure this is memory efficient
-            self.graph = nx.compose(self.graph, last_component_completed_in_sequence.graph)
+            #
+            self.graph.update(last_component_completed_in_sequence.graph)
 
         #
         self.last_component_completed = last_component_completed_in_sequence
@@ -1442,7 +2187,7 @@ class DockoptStepSequence(PipelineComponentSequence):
         )
 
         #
-        self.graph = nx.DiGraph()
+        self.graph = ProvenanceGraph()
 
     def run(
             self, 
@@ -1484,8 +2229,8 @@ class DockoptStepSequence(PipelineComponentSequence):
             #
             last_component_completed_in_sequence = component
 
-            # TODO: make sure this is memory efficient
-            self.graph = nx.compose(self.graph, last_component_completed_in_sequence.graph)
+            #
+            self.graph.update(last_component_completed_in_sequence.graph)
 
             #
             best_criterion_value_witnessed_this_iteration = df_component[component.criterion.name].max()
@@ -1543,7 +2288,7 @@ class DockoptPipeline(Pipeline):
         )
 
         #
-        self.graph = nx.DiGraph()
+        self.graph = ProvenanceGraph()
 
     def run(
             self, 
@@ -1590,6 +2335,8 @@ class DockoptPipeline(Pipeline):
                 'blaster_files_to_copy_in': self.blaster_files_to_copy_in,  # TODO: is this necessary?
                 'last_component_completed': last_component_completed_in_sequence,
             }, component_class)
+            if component_run_func_arg_set.job_status is not None:
+                component_run_func_arg_set.job_status.update(force=True, component_id=component_id)
             component = component_class(**kwargs) # In class DockoptStep __init__, several files will be copied from /data/git-repo/pydock3/pydock3/blastermaster/defaults
             component.run(
                 component_run_func_arg_set,
@@ -1605,12 +2352,15 @@ class DockoptPipeline(Pipeline):
             #
             last_component_completed_in_sequence = component
 
-            # TODO: make sure this is memory efficient
-            self.graph = nx.compose(self.graph, last_component_completed_in_sequence.graph)
+            #
+            self.graph.update(last_component_completed_in_sequence.graph)
 
         #
         self.last_component_completed = last_component_completed_in_sequence
 
+        #
+        self.graph.save(os.path.join(self.pipeline_dir.path, PROVENANCE_GRAPH_FILE_NAME))
+
         return df
 
     @property
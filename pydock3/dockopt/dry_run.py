@@ -0,0 +1,468 @@
+import os
+import math
+import gzip
+import tarfile
+import logging
+import itertools
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import networkx as nx
+import pandas as pd
+
+from pydock3.config import Parameter, ParameterSpace, ParameterConstraint
+from pydock3.blastermaster.blastermaster import BlasterFiles, get_blaster_steps
+from pydock3.blastermaster.util import WorkingDir
+from pydock3.jobs import OUTDOCK_FILE_NAME, MOL2_FILE_NAME
+from pydock3.dockopt.util import WORKING_DIR_NAME, RETRODOCK_JOBS_DIR_NAME
+from pydock3.dockopt.parameters import DockoptComponentParametersManager
+from pydock3.dockopt.search import SurrogateModelSearch
+from pydock3.dockopt.dockopt import DockoptStep
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+MAX_NUM_COMBINATIONS_TO_ENUMERATE = 100000
+MAX_NUM_EXISTING_OUTPUTS_TO_MEASURE = 100
+REFERENCE_VALUE_PLACEHOLDER = 0.0  # stands in for values taken from the results of the previous component
+
+#
+NUM_INODES_PER_TASK = 5  # task dir, OUTDOCK, start time file, stdout & stderr log files
+NUM_INODES_PER_MATCHING_SPHERES_PERTURBATION_STEP = 5  # step dir, log file, infile & outfile in step dir, outfile in working dir
+INDOCK_FILE_BYTES = 2 * 2**10
+
+# used when the job dir has no output of previously run tasks / blaster steps to measure
+FALLBACK_OUTDOCK_BYTES_PER_MOLECULE = 600
+FALLBACK_MOL2_BYTES_PER_MOLECULE = 1500
+FALLBACK_BLASTER_STEP_BYTES = 8 * 2**20
+
+
+@dataclass
+class RetrospectiveDatasetClassSize:
+    num_db2_files: int
+    num_molecules: int
+    num_conformations: int
+
+    @staticmethod
+    def from_tarball(tgz_file_path: str) -> "RetrospectiveDatasetClassSize":
+        """Reads the DB2 files straight from the tarball, so nothing is extracted."""
+
+        num_db2_files = 0
+        molecule_names = set()
+        num_conformations = 0
+        with tarfile.open(tgz_file_path, "r:*") as tar:
+            for tarinfo in tar:
+                if not tarinfo.isfile():
+                    continue
+                f = tar.extractfile(tarinfo)
+                if tarinfo.name.endswith(".gz"):
+                    f = gzip.open(f)
+                num_db2_files += 1
+                molecule_name = None
+                for line in f:
+                    if line.startswith(b"C "):
+                        num_conformations += 1
+                    elif molecule_name is None:
+                        columns = line.split()
+                        if columns and columns[0] == b"M":
+                            molecule_name = columns[1].decode()
+                            molecule_names.add(molecule_name)
+
+        return RetrospectiveDatasetClassSize(num_db2_files, len(molecule_names), num_conformations)
+
+
+@dataclass
+class DockoptStepEstimate:
+    component_id: str
+    num_docking_configurations: int
+    num_docking_configurations_to_dock: int
+    num_unique_blaster_steps: int
+    num_blaster_step_inodes: int
+    num_matching_spheres_perturbation_steps: int
+
+
+class _BlasterStepsLayout(object):
+    """The blaster steps needed to generate the dock files for one assignment of the `use` flags (which decide which
+    steps there are), along with the parameters that the output of each step depends on."""
+
+    def __init__(self, component_id: str, working_dir: WorkingDir, flat_param_dict: dict, dock_file_identifiers: List[str]):
+        #
+        steps = get_blaster_steps(BlasterFiles(working_dir), flat_param_dict, working_dir)
+        graph = DockoptStep._get_graph_from_all_steps_in_order(component_id, steps)
+
+        #
+        def get_parameter_keys(node_ids):
+            return tuple(sorted(set([graph.nodes[node_id]['parameter'].name for node_id in node_ids if 'parameter' in graph.nodes[node_id]]) & set(flat_param_dict.keys())))
+
+        #
+        self.step_dir_name_to_parameter_keys_dict = {}
+        self.step_dir_name_to_num_inodes_dict = {}
+        self.dock_file_identifier_to_parameter_keys_dict = {}
+        for dock_file_identifier in dock_file_identifiers:
+            dock_file_node_id = DockoptStep._get_blaster_file_node_with_blaster_file_identifier(dock_file_identifier, graph)
+            self.dock_file_identifier_to_parameter_keys_dict[dock_file_identifier] = get_parameter_keys(nx.ancestors(graph, dock_file_node_id))
+            for u, v, data in DockoptStep._get_dock_file_lineage_subgraph(graph, dock_file_node_id).edges(data=True):
+                step = data["step_instance"]
+                if step.step_dir.name not in self.step_dir_name_to_parameter_keys_dict:
+                    self.step_dir_name_to_parameter_keys_dict[step.step_dir.name] = get_parameter_keys(nx.ancestors(graph, v))
+                    self.step_dir_name_to_num_inodes_dict[step.step_dir.name] = 2 + len(step.infiles) + 2 * len(step.outfiles)  # step dir, log file, infiles & outfiles in step dir, outfiles in working dir
+
+        #
+        self.dock_files_parameter_keys = tuple(sorted(set([key for keys in self.dock_file_identifier_to_parameter_keys_dict.values() for key in keys])))
+
+
+def _get_num_combinations(parameter_space: ParameterSpace, sampling_dict: Optional[dict] = None) -> int:
+    """Number of combinations of the parameter space that a step uses (an upper bound if there are too many combinations
+    satisfying the constraints to count)."""
+
+    #
+    num_combinations = parameter_space.size
+    if parameter_space.constraints:
+        num_satisfying_combinations = parameter_space.count(max_count=MAX_NUM_COMBINATIONS_TO_ENUMERATE)
+        if num_satisfying_combinations is not None:
+            num_combinations = num_satisfying_combinations
+
+    #
+    if sampling_dict is not None:
+        num_combinations = min(sampling_dict["num_samples"], num_combinations)
+
+    return num_combinations
+
+
+def _estimate_dock_files_generation(
+        component_id: str,
+        working_dir: WorkingDir,
+        parameter_space: ParameterSpace,
+        sampling_dict: Optional[dict],
+        dock_file_identifiers: List[str],
+) -> Tuple[int, int, int, int]:
+    """Returns the number of distinct combinations of generated dock files, the number of unique blaster steps needed to
+    generate them, the number of inodes those steps create, and the number of distinct matching spheres files.
+
+    A step is unique if the values of the parameters its output depends on are, so only the steps of one combination
+    per assignment of the `use` flags need to be built. Without constraints or sampling, the counts are products of the
+    numbers of values of the parameters involved; otherwise, the combinations are enumerated (up to
+    `MAX_NUM_COMBINATIONS_TO_ENUMERATE`, beyond which the products are used as upper bounds)."""
+
+    #
+    use_flag_keys = [key for key in parameter_space.keys if key.endswith(".use")]
+    use_flag_values_to_layout_dict = {}
+
+    def get_layout(use_flag_values, flat_param_dict):
+        if use_flag_values not in use_flag_values_to_layout_dict:
+            use_flag_values_to_layout_dict[use_flag_values] = _BlasterStepsLayout(component_id, working_dir, flat_param_dict, dock_file_identifiers)
+        return use_flag_values_to_layout_dict[use_flag_values]
+
+    #
+    can_enumerate = sampling_dict is not None or (parameter_space.constraints and parameter_space.count(max_count=MAX_NUM_COMBINATIONS_TO_ENUMERATE) is not None)
+    if not can_enumerate:
+        key_to_num_values_dict = {key: len(multivalue) for key, multivalue in zip(parameter_space.keys, parameter_space.multivalues)}
+
+        def get_num_distinct_values(keys):
+            return math.prod([key_to_num_values_dict[key] for key in keys if key not in use_flag_keys])
+
+        #
+        num_partial_docking_configurations = 0
+        num_unique_blaster_steps = 0
+        num_blaster_step_inodes = 0
+        num_matching_spheres_files = 0
+        key_to_multivalue_dict = dict(zip(parameter_space.keys, parameter_space.multivalues))
+        for use_flag_values in itertools.product(*[key_to_multivalue_dict[key] for key in use_flag_keys]):
+            flat_param_dict = {key: Parameter(name=key, value=multivalue[0]) for key, multivalue in key_to_multivalue_dict.items()}
+            flat_param_dict.update({key: Parameter(name=key, value=value) for key, value in zip(use_flag_keys, use_flag_values)})
+            layout = get_layout(use_flag_values, flat_param_dict)
+            num_partial_docking_configurations += get_num_distinct_values(layout.dock_files_parameter_keys)
+            for step_dir_name, keys in layout.step_dir_name_to_parameter_keys_dict.items():
+                num_unique_blaster_steps += get_num_distinct_values(keys)
+                num_blaster_step_inodes += get_num_distinct_values(keys) * layout.step_dir_name_to_num_inodes_dict[step_dir_name]
+            num_matching_spheres_files += get_num_distinct_values(layout.dock_file_identifier_to_parameter_keys_dict.get("matching_spheres_file", ()))
+
+        return num_partial_docking_configurations, num_unique_blaster_steps, num_blaster_step_inodes, num_matching_spheres_files
+
+    #
+    if sampling_dict is not None:
+        flat_param_dicts = parameter_space.sample(**sampling_dict)
+    else:
+        flat_param_dicts = parameter_space
+    partial_docking_configuration_keys = set()
+    blaster_step_keys = set()
+    matching_spheres_file_keys = set()
+    num_blaster_step_inodes = 0
+    for flat_param_dict in flat_param_dicts:
+        #
+        use_flag_values = tuple([flat_param_dict[key].value for key in use_flag_keys])
+        layout = get_layout(use_flag_values, flat_param_dict)
+
+        def get_values(keys):
+            return tuple([flat_param_dict[key].value for key in keys])
+
+        #
+        partial_docking_configuration_keys.add((use_flag_values, get_values(layout.dock_files_parameter_keys)))
+        matching_spheres_file_keys.add((use_flag_values, get_values(layout.dock_file_identifier_to_parameter_keys_dict.get("matching_spheres_file", ()))))
+        for step_dir_name, keys in layout.step_dir_name_to_parameter_keys_dict.items():
+            blaster_step_key = (use_flag_values, step_dir_name, get_values(keys))
+            if blaster_step_key not in blaster_step_keys:
+                blaster_step_keys.add(blaster_step_key)
+                num_blaster_step_inodes += layout.step_dir_name_to_num_inodes_dict[step_dir_name]
+
+    return len(partial_docking_configuration_keys), len(blaster_step_keys), num_blaster_step_inodes, len(matching_spheres_file_keys)
+
+
+def _get_parameters_dict_with_references_resolved(parameters_dict: dict) -> dict:
+    """Replaces references to the results of the previous component (`^`) in numerical operators by a placeholder and
+    applies the operators. The values are meaningless but their number is right, which is all that counting needs."""
+
+    def traverse(obj):
+        if isinstance(obj, dict):
+            if 'reference_value' in obj and 'arguments' in obj and 'operator' in obj:  # numerical operator detected
+                if obj['reference_value'] == '^':
+                    obj = {**obj, 'reference_value': REFERENCE_VALUE_PLACEHOLDER}
+                return obj
+            return {key: traverse(value) for key, value in obj.items()}
+        return obj
+
+    return DockoptComponentParametersManager(parameters_dict=traverse(parameters_dict)).parameters_dict
+
+
+def estimate_dockopt_step(component_dir_path: str, component_id: str, step_dict: dict, num_previous_docking_configurations: int) -> DockoptStepEstimate:
+    """Counts the docking configurations of a step the way `DockoptStep` generates them, without building them.
+    `num_previous_docking_configurations` is the number of top results of the previous component available to the step."""
+
+    #
+    parameters = _get_parameters_dict_with_references_resolved(step_dict["parameters"])
+    parameter_space_dict = step_dict.get("parameter_space") or {}
+    parameter_constraints = [ParameterConstraint.from_dict(d) for d in parameter_space_dict.get("constraints", [])]
+    sampling_dict = parameter_space_dict.get("sampling", {})
+
+    #
+    dock_files_to_use_from_previous_component = step_dict["dock_files_to_use_from_previous_component"]
+    dock_file_identifiers_to_generate = sorted([identifier for identifier, should_be_used in dock_files_to_use_from_previous_component.items() if not should_be_used])
+    if any(list(dock_files_to_use_from_previous_component.values())):
+        num_previous_docking_configurations_used = num_previous_docking_configurations
+    else:
+        num_previous_docking_configurations_used = 0
+
+    #
+    num_unique_blaster_steps = 0
+    num_blaster_step_inodes = 0
+    if dock_file_identifiers_to_generate:
+        working_dir = WorkingDir(os.path.join(component_dir_path, WORKING_DIR_NAME))  # not created
+        dock_files_generation_parameter_space = ParameterSpace(parameters["dock_files_generation"], constraints=parameter_constraints, key_prefix="dock_files_generation.")
+        num_partial_docking_configurations, num_unique_blaster_steps, num_blaster_step_inodes, num_matching_spheres_files = _estimate_dock_files_generation(
+            component_id,
+            working_dir,
+            dock_files_generation_parameter_space,
+            sampling_dict.get("dock_files_generation"),
+            dock_file_identifiers_to_generate,
+        )
+        if num_previous_docking_configurations_used > 0:  # generated dock files are combined with those of each previous docking configuration
+            num_partial_docking_configurations *= num_previous_docking_configurations_used
+        if "matching_spheres_file" not in dock_file_identifiers_to_generate:
+            num_matching_spheres_files = num_previous_docking_configurations_used
+    else:
+        num_partial_docking_configurations = num_previous_docking_configurations_used
+        num_matching_spheres_files = num_previous_docking_configurations_used
+
+    # matching spheres perturbation
+    num_partial_docking_configurations_after_modification = 0
+    num_matching_spheres_perturbation_steps = 0
+    for flat_param_dict in ParameterSpace(parameters["dock_files_modification"], constraints=parameter_constraints, key_prefix="dock_files_modification."):
+        if flat_param_dict["matching_spheres_perturbation.use"].value:
+            num_samples = int(flat_param_dict["matching_spheres_perturbation.num_samples_per_matching_spheres_file"].value)
+            num_partial_docking_configurations_after_modification += num_samples * num_partial_docking_configurations
+            num_matching_spheres_perturbation_steps += num_samples * num_matching_spheres_files
+        else:
+            num_partial_docking_configurations_after_modification += num_partial_docking_configurations
+
+    #
+    if isinstance(parameters["custom_dock_executable"], list):
+        num_custom_dock_executables = len(parameters["custom_dock_executable"])
+    else:
+        num_custom_dock_executables = 1
+    indock_file_generation_parameter_space = ParameterSpace(parameters["indock_file_generation"], constraints=parameter_constraints, key_prefix="indock_file_generation.")
+    num_indock_file_generation_combinations = _get_num_combinations(indock_file_generation_parameter_space, sampling_dict.get("indock_file_generation"))
+
+    # constraints spanning parameter groups are not applied, so this is an upper bound if there are any
+    num_docking_configurations = num_partial_docking_configurations_after_modification * num_custom_dock_executables * num_indock_file_generation_combinations
+
+    #
+    search_dict = step_dict.get("search")
+    if search_dict and search_dict.get("strategy", "exhaustive") == "surrogate":
+        num_docking_configurations_to_dock = SurrogateModelSearch.get_max_configurations(num_docking_configurations, search_dict.get("max_configurations")) if num_docking_configurations > 0 else 0
+    else:
+        num_docking_configurations_to_dock = num_docking_configurations
+
+    return DockoptStepEstimate(
+        component_id=component_id,
+        num_docking_configurations=num_docking_configurations,
+        num_docking_configurations_to_dock=num_docking_configurations_to_dock,
+        num_unique_blaster_steps=num_unique_blaster_steps,
+        num_blaster_step_inodes=num_blaster_step_inodes,
+        num_matching_spheres_perturbation_steps=num_matching_spheres_perturbation_steps,
+    )
+
+
+def estimate_dockopt_pipeline_components(
+        pipeline_dir_path: str,
+        components: List[dict],
+        parent_component_id: Optional[str] = None,
+        last_component_top_n_and_num_docking_configurations: Optional[Tuple[int, int]] = None,
+) -> Tuple[List[DockoptStepEstimate], Optional[Tuple[int, int]]]:
+    """Expands the components of a pipeline (or of an iteration of a sequence) into estimates of their steps, the way
+    `DockoptPipeline` runs them. Sequences are assumed to run all of their iterations, so their estimates are upper
+    bounds. Also returns the top n and number of docking configurations of the last component."""
+
+    #
+    step_estimates = []
+    for i, component_identifier_dict in enumerate(components):
+        #
+        component_num = i + 1
+        component_id_prefix = f"{parent_component_id}." if parent_component_id is not None else ""
+
+        #
+        if "step" in component_identifier_dict:
+            step_dict = component_identifier_dict["step"]
+            component_id = f"{component_id_prefix}{component_num}_step"
+            if last_component_top_n_and_num_docking_configurations is not None:
+                num_previous_docking_configurations = int(min(last_component_top_n_and_num_docking_configurations))
+            else:
+                num_previous_docking_configurations = 0
+            step_estimate = estimate_dockopt_step(
+                os.path.join(pipeline_dir_path, *component_id.split('.')),
+                component_id,
+                step_dict,
+                num_previous_docking_configurations,
+            )
+            step_estimates.append(step_estimate)
+            last_component_top_n_and_num_docking_configurations = (step_dict["top_n"], step_estimate.num_docking_configurations_to_dock)
+        elif "sequence" in component_identifier_dict:
+            sequence_dict = component_identifier_dict["sequence"]
+            component_id = f"{component_id_prefix}{component_num}_seq"
+            sequence_step_estimates = []
+            for iteration_num in range(1, sequence_dict["num_iterations"] + 1):
+                iteration_step_estimates, _ = estimate_dockopt_pipeline_components(
+                    pipeline_dir_path,
+                    sequence_dict["components"],
+                    parent_component_id=f"{component_id}.{iteration_num}_iter",
+                    last_component_top_n_and_num_docking_configurations=last_component_top_n_and_num_docking_configurations,
+                )
+                sequence_step_estimates += iteration_step_estimates
+                last_component_top_n_and_num_docking_configurations = (sequence_dict["inter_iteration_top_n"], sum([e.num_docking_configurations_to_dock for e in iteration_step_estimates]))
+            step_estimates += sequence_step_estimates
+            last_component_top_n_and_num_docking_configurations = (sequence_dict["top_n"], sum([e.num_docking_configurations_to_dock for e in sequence_step_estimates]))
+        else:
+            raise Exception(f"Dict must have one of 'step' or 'sequence' as keys. Witnessed: {component_identifier_dict}")
+
+    return step_estimates, last_component_top_n_and_num_docking_configurations
+
+
+def get_sizes_of_existing_outputs(job_dir_path: str) -> Dict[str, List[int]]:
+    """Sizes (bytes) of up to `MAX_NUM_EXISTING_OUTPUTS_TO_MEASURE` of each kind of output already in the job dir: the
+    OUTDOCK and mol2 files of the tasks of each class (keyed by e.g. "actives/OUTDOCK.0") and the blaster step dirs
+    (keyed by "blaster_step")."""
+
+    key_to_sizes_dict = {}
+
+    def add_size(key, size):
+        sizes = key_to_sizes_dict.setdefault(key, [])
+        if len(sizes) < MAX_NUM_EXISTING_OUTPUTS_TO_MEASURE:
+            sizes.append(size)
+
+    #
+    for root, dir_names, file_names in os.walk(job_dir_path):
+        if os.path.basename(root) == RETRODOCK_JOBS_DIR_NAME:
+            for sub_dir_name in ["actives", "decoys"]:
+                sub_dir_path = os.path.join(root, sub_dir_name)
+                if not os.path.isdir(sub_dir_path):
+                    continue
+                for task_dir_name in itertools.islice(sorted(os.listdir(sub_dir_path)), MAX_NUM_EXISTING_OUTPUTS_TO_MEASURE):
+                    for file_name in [OUTDOCK_FILE_NAME, MOL2_FILE_NAME]:
+                        file_path = os.path.join(sub_dir_path, task_dir_name, file_name)
+                        if os.path.isfile(file_path):
+                            add_size(f"{sub_dir_name}/{file_name}", os.path.getsize(file_path))
+            dir_names[:] = []  # do not descend into task dirs
+        elif os.path.basename(root) == WORKING_DIR_NAME:
+            for dir_name in dir_names:
+                if "_outfiles=" in dir_name:  # blaster step dir
+                    step_dir_path = os.path.join(root, dir_name)
+                    add_size("blaster_step", sum([os.path.getsize(os.path.join(step_dir_path, f)) for f in os.listdir(step_dir_path) if os.path.isfile(os.path.join(step_dir_path, f))]))
+            dir_names[:] = []
+
+    return key_to_sizes_dict
+
+
+def get_dockopt_job_estimate_dataframe(
+        step_estimates: List[DockoptStepEstimate],
+        actives_size: RetrospectiveDatasetClassSize,
+        decoys_size: RetrospectiveDatasetClassSize,
+        key_to_sizes_of_existing_outputs_dict: Dict[str, List[int]],
+        runtime_seconds_per_conformation: Optional[float] = None,
+        max_task_array_size: Optional[int] = None,
+        submission_chunk_size: Optional[int] = None,
+        export_decoys_mol2: bool = False,
+) -> pd.DataFrame:
+    """One row per step (plus a total row) with the number of docking configurations, tasks, array jobs, and unique
+    blaster steps, the CPU-hours of docking (if `runtime_seconds_per_conformation` is known), and the bytes & inodes of
+    the output."""
+
+    #
+    def get_bytes_per_molecule(key, num_molecules, fallback_bytes_per_molecule):
+        sizes = key_to_sizes_of_existing_outputs_dict.get(key)
+        if not sizes or num_molecules == 0:
+            return fallback_bytes_per_molecule
+        return sum(sizes) / len(sizes) / num_molecules
+
+    #
+    actives_task_bytes = actives_size.num_molecules * (
+        get_bytes_per_molecule(f"actives/{OUTDOCK_FILE_NAME}", actives_size.num_molecules, FALLBACK_OUTDOCK_BYTES_PER_MOLECULE)
+        + get_bytes_per_molecule(f"actives/{MOL2_FILE_NAME}", actives_size.num_molecules, FALLBACK_MOL2_BYTES_PER_MOLECULE)
+    )
+    decoys_task_bytes = decoys_size.num_molecules * get_bytes_per_molecule(f"decoys/{OUTDOCK_FILE_NAME}", decoys_size.num_molecules, FALLBACK_OUTDOCK_BYTES_PER_MOLECULE)
+    if export_decoys_mol2:
+        decoys_task_bytes += decoys_size.num_molecules * get_bytes_per_molecule(f"decoys/{MOL2_FILE_NAME}", decoys_size.num_molecules, FALLBACK_MOL2_BYTES_PER_MOLECULE)
+    blaster_step_sizes = key_to_sizes_of_existing_outputs_dict.get("blaster_step")
+    blaster_step_bytes = sum(blaster_step_sizes) / len(blaster_step_sizes) if blaster_step_sizes else FALLBACK_BLASTER_STEP_BYTES
+
+    #
+    array_size = min([x for x in [max_task_array_size, submission_chunk_size] if x is not None], default=None)
+    rows = []
+    for step_estimate in step_estimates:
+        num_docked = step_estimate.num_docking_configurations_to_dock
+        if runtime_seconds_per_conformation is not None:
+            cpu_hours = num_docked * (actives_size.num_conformations + decoys_size.num_conformations) * runtime_seconds_per_conformation / 3600
+        else:
+            cpu_hours = None
+        num_mol2_files = num_docked * (2 if export_decoys_mol2 else 1)
+        rows.append({
+            "component_id": step_estimate.component_id,
+            "configurations": step_estimate.num_docking_configurations,
+            "configurations_docked": num_docked,
+            "tasks": 2 * num_docked,
+            "array_jobs": 2 * math.ceil(num_docked / array_size) if array_size is not None else 2 * min(1, num_docked),
+            "max_array_index": step_estimate.num_docking_configurations,  # array indices are configuration numbers, which run up to the number of configurations even if only some of them are docked
+            "unique_blaster_steps": step_estimate.num_unique_blaster_steps + step_estimate.num_matching_spheres_perturbation_steps,
+            "cpu_hours": cpu_hours,
+            "output_bytes": int(
+                num_docked * (actives_task_bytes + decoys_task_bytes + INDOCK_FILE_BYTES)
+                + (step_estimate.num_unique_blaster_steps + step_estimate.num_matching_spheres_perturbation_steps) * blaster_step_bytes
+            ),
+            "output_inodes": (
+                2 * num_docked * NUM_INODES_PER_TASK
+                + num_mol2_files
+                + num_docked  # INDOCK files
+                + step_estimate.num_blaster_step_inodes
+                + step_estimate.num_matching_spheres_perturbation_steps * NUM_INODES_PER_MATCHING_SPHERES_PERTURBATION_STEP
+            ),
+        })
+    df = pd.DataFrame(rows)
+
+    #
+    total_row = {column: df[column].sum() for column in ["configurations", "configurations_docked", "tasks", "array_jobs", "unique_blaster_steps", "output_bytes", "output_inodes"]}
+    total_row["component_id"] = "total"
+    total_row["max_array_index"] = df["max_array_index"].max()
+    total_row["cpu_hours"] = df["cpu_hours"].sum() if runtime_seconds_per_conformation is not None else None
+    df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
+
+    return df
@@ -0,0 +1,104 @@
+import os
+import gzip
+import json
+import pickle
+import logging
+import uuid
+from typing import Iterable, List, Optional, Tuple
+
+import pydock3
+from pydock3.files import File
+from pydock3.util import get_hexdigest_of_persistent_md5_hash_of_tuple
+from pydock3.dockopt.docking_configuration import DockingConfiguration
+from pydock3.dockopt.provenance import ProvenanceGraph
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+PLAN_FILE_NAME = "plan.pkl.gz"
+PLAN_FORMAT_VERSION = 1
+
+
+def get_step_plan_key(
+        component_id: str,
+        parameters: dict,
+        dock_files_to_use_from_previous_component: dict,
+        blaster_files_to_copy_in: Iterable[str],
+        last_component_completed=None,
+        parameter_space_dict: Optional[dict] = None,
+        backup_blaster_files: Iterable[str] = (),
+) -> str:
+    """Returns the hash of everything the plan of a `DockoptStep` (its graph and docking configurations) is derived from:
+    the step's config (after references to the previous component have been resolved, and including its parameter
+    space constraints & sampling), the contents of the input files and of the default files used in their absence, the
+    top results of the previous component, and the version of pydock3."""
+
+    #
+    def get_file_hexdigests(file_paths):
+        return tuple(sorted([(File.get_file_name_of_file(file_path), File.get_hexdigest_of_md5_hash_of_file_contents(file_path)) for file_path in file_paths]))
+
+    blaster_file_hexdigests = get_file_hexdigests(blaster_files_to_copy_in)
+    backup_blaster_file_hexdigests = get_file_hexdigests([file_path for file_path in backup_blaster_files if File.file_exists(file_path)])
+
+    #
+    if last_component_completed is not None:
+        last_component_top_results_csv_str = last_component_completed.load_results_dataframe().head(last_component_completed.top_n).to_csv(index=False)
+        last_component_str = f"{last_component_completed.component_id}\n{last_component_completed.top_n}\n{last_component_top_results_csv_str}"
+    else:
+        last_component_str = None
+
+    return get_hexdigest_of_persistent_md5_hash_of_tuple((
+        PLAN_FORMAT_VERSION,
+        pydock3.__version__,
+        component_id,
+        json.dumps(parameters, sort_keys=True, default=str),
+        json.dumps(dock_files_to_use_from_previous_component, sort_keys=True, default=str),
+        blaster_file_hexdigests,
+        backup_blaster_file_hexdigests,
+        last_component_str,
+        json.dumps(parameter_space_dict, sort_keys=True, default=str),
+    ))
+
+
+def save_step_plan(plan_file_path: str, plan_key: str, docking_configurations: List[DockingConfiguration], graph: ProvenanceGraph) -> None:
+    """Write the plan to a gzipped pickle. The file appears atomically via rename."""
+
+    temp_plan_file_path = f"{plan_file_path}.{uuid.uuid4()}.tmp"
+    try:
+        with gzip.open(temp_plan_file_path, "wb", compresslevel=1) as f:  # favor speed
+            pickle.dump({
+                "format_version": PLAN_FORMAT_VERSION,
+                "plan_key": plan_key,
+                "docking_configurations": docking_configurations,
+                "graph": graph,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(temp_plan_file_path, plan_file_path)
+    except Exception:
+        if os.path.exists(temp_plan_file_path):
+            os.remove(temp_plan_file_path)
+        raise
+    logger.debug(f"Saved plan to {plan_file_path}")
+
+
+def load_step_plan(plan_file_path: str, plan_key: str) -> Optional[Tuple[List[DockingConfiguration], ProvenanceGraph]]:
+    """Returns (docking configurations, graph) if a plan file with matching key exists, and None otherwise."""
+
+    if not File.file_exists(plan_file_path):
+        return None
+
+    #
+    try:
+        with gzip.open(plan_file_path, "rb") as f:
+            plan = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Failed to load plan file {plan_file_path}. Plan will be rebuilt. Error: {e}")
+        return None
+
+    #
+    if plan.get("format_version") != PLAN_FORMAT_VERSION or plan.get("plan_key") != plan_key:
+        logger.info(f"Plan file {plan_file_path} does not match current config and inputs. Plan will be rebuilt.")
+        return None
+
+    return plan["docking_configurations"], plan["graph"]
@@ -0,0 +1,412 @@
+import gzip
+import json
+import logging
+import importlib
+from array import array
+from typing import Iterable, List, Optional, Set, Union, Any
+
+import networkx as nx
+
+from pydock3.config import Parameter
+from pydock3.blastermaster.util import BlasterFile, BlasterStep
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+PROVENANCE_GRAPH_FILE_NAME = "provenance_graph.json.gz"
+PROVENANCE_GRAPH_FORMAT_VERSION = 1
+
+
+class ProvenanceGraph(object):
+    """Compact, append-only store of the provenance of blaster files.
+
+    Nodes are blaster files and parameters, keyed by their hashes (as in the graphs built by `DockoptStep`) but
+    stored under integer IDs. Node and edge attributes live in flat tables rather than per-node / per-edge dicts,
+    each step is stored once (rather than once per edge), and an adjacency index in both directions plus an index of
+    the edges of each step make lineage queries proportional to the size of the lineage rather than of the graph.
+    Nodes and edges can be added but never removed, so merging graphs is linear in the size of the graph merged in.
+    """
+
+    NODE_KIND_BLASTER_FILE = 0
+    NODE_KIND_PARAMETER = 1
+
+    def __init__(self):
+        # node tables (indexed by node id)
+        self._node_key_to_node_id = {}
+        self._node_keys = []
+        self._node_kinds = array('b')
+        self._node_values = []  # (path, identifier) for blaster files, (name, value) for parameters
+        self._node_id_to_parent_edge_ids = []
+        self._node_id_to_child_edge_ids = []
+
+        # edge tables (indexed by edge id)
+        self._node_ids_pair_to_edge_id = {}
+        self._edge_parent_node_ids = array('q')
+        self._edge_child_node_ids = array('q')
+        self._edge_step_ids = array('q')
+        self._edge_parent_node_step_var_name_string_ids = array('q')
+        self._edge_child_node_step_var_name_string_ids = array('q')
+
+        # step tables (indexed by step id)
+        self._step_hash_to_step_id = {}
+        self._step_hashes = []
+        self._step_classes = []
+        self._step_original_step_dir_name_string_ids = array('q')
+        self._step_instances = []  # not serialized
+        self._step_id_to_edge_ids = []
+
+        # interned strings (step var names & step dir names repeat a lot)
+        self._string_to_string_id = {}
+        self._strings = []
+
+    def __len__(self) -> int:
+        return len(self._node_keys)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._edge_parent_node_ids)
+
+    @property
+    def num_steps(self) -> int:
+        return len(self._step_hashes)
+
+    def _get_string_id(self, s: str) -> int:
+        if s not in self._string_to_string_id:
+            self._string_to_string_id[s] = len(self._strings)
+            self._strings.append(s)
+        return self._string_to_string_id[s]
+
+    #
+    def add_node(self, node_key: str, blaster_file: Optional[BlasterFile] = None, parameter: Optional[Parameter] = None) -> int:
+        """Adds node (if not present) and returns its integer ID."""
+
+        if (blaster_file is None) == (parameter is None):
+            raise Exception(f"Exactly one of `blaster_file` and `parameter` must be specified for node `{node_key}`.")
+        if blaster_file is not None:
+            node_kind, node_value = self.NODE_KIND_BLASTER_FILE, (blaster_file.path, blaster_file.identifier)
+        else:
+            node_kind, node_value = self.NODE_KIND_PARAMETER, (parameter.name, parameter.value)
+
+        #
+        if node_key in self._node_key_to_node_id:
+            node_id = self._node_key_to_node_id[node_key]
+            if self._node_kinds[node_id] != node_kind:
+                raise Exception(f"Node `{node_key}` already exists with a different kind of attribute: {self._node_values[node_id]} vs. {node_value}")
+            self._node_values[node_id] = node_value  # latest wins (as with `nx.compose`)
+            return node_id
+
+        #
+        node_id = len(self._node_keys)
+        self._node_key_to_node_id[node_key] = node_id
+        self._node_keys.append(node_key)
+        self._node_kinds.append(node_kind)
+        self._node_values.append(node_value)
+        self._node_id_to_parent_edge_ids.append([])
+        self._node_id_to_child_edge_ids.append([])
+
+        return node_id
+
+    def _add_step(self, step_hash: str, step_class: type, original_step_dir_name: str, step_instance: Optional[BlasterStep]) -> int:
+        if step_hash in self._step_hash_to_step_id:
+            step_id = self._step_hash_to_step_id[step_hash]
+            if self._step_instances[step_id] is None and step_instance is not None:
+                self._step_instances[step_id] = step_instance
+            return step_id
+
+        #
+        step_id = len(self._step_hashes)
+        self._step_hash_to_step_id[step_hash] = step_id
+        self._step_hashes.append(step_hash)
+        self._step_classes.append(step_class)
+        self._step_original_step_dir_name_string_ids.append(self._get_string_id(original_step_dir_name))
+        self._step_instances.append(step_instance)
+        self._step_id_to_edge_ids.append([])
+
+        return step_id
+
+    def add_edge(
+        self,
+        parent_node_key: str,
+        child_node_key: str,
+        step_class: type,
+        original_step_dir_name: str,
+        step_hash: str,
+        parent_node_step_var_name: str,
+        child_node_step_var_name: str,
+        step_instance: Optional[BlasterStep] = None,
+    ) -> int:
+        """Adds edge (if not present) between two existing nodes and returns its integer ID."""
+
+        #
+        parent_node_id = self._node_key_to_node_id[parent_node_key]
+        child_node_id = self._node_key_to_node_id[child_node_key]
+        step_id = self._add_step(step_hash, step_class, original_step_dir_name, step_instance)
+        if (parent_node_id, child_node_id) in self._node_ids_pair_to_edge_id:
+            return self._node_ids_pair_to_edge_id[(parent_node_id, child_node_id)]
+
+        #
+        edge_id = len(self._edge_parent_node_ids)
+        self._node_ids_pair_to_edge_id[(parent_node_id, child_node_id)] = edge_id
+        self._edge_parent_node_ids.append(parent_node_id)
+        self._edge_child_node_ids.append(child_node_id)
+        self._edge_step_ids.append(step_id)
+        self._edge_parent_node_step_var_name_string_ids.append(self._get_string_id(parent_node_step_var_name))
+        self._edge_child_node_step_var_name_string_ids.append(self._get_string_id(child_node_step_var_name))
+        self._node_id_to_child_edge_ids[parent_node_id].append(edge_id)
+        self._node_id_to_parent_edge_ids[child_node_id].append(edge_id)
+        self._step_id_to_edge_ids[step_id].append(edge_id)
+
+        return edge_id
+
+    #
+    def has_node(self, node_key: str) -> bool:
+        return node_key in self._node_key_to_node_id
+
+    def has_edge(self, parent_node_key: str, child_node_key: str) -> bool:
+        if not (self.has_node(parent_node_key) and self.has_node(child_node_key)):
+            return False
+        return (self._node_key_to_node_id[parent_node_key], self._node_key_to_node_id[child_node_key]) in self._node_ids_pair_to_edge_id
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._node_keys)
+
+    def is_blaster_file_node(self, node_key: str) -> bool:
+        return self._node_kinds[self._node_key_to_node_id[node_key]] == self.NODE_KIND_BLASTER_FILE
+
+    def is_parameter_node(self, node_key: str) -> bool:
+        return self._node_kinds[self._node_key_to_node_id[node_key]] == self.NODE_KIND_PARAMETER
+
+    def get_blaster_file(self, node_key: str) -> Optional[BlasterFile]:
+        """Returns the blaster file of the node (instantiated on demand), or None if the node is a parameter node."""
+
+        node_id = self._node_key_to_node_id[node_key]
+        if self._node_kinds[node_id] != self.NODE_KIND_BLASTER_FILE:
+            return None
+        path, identifier = self._node_values[node_id]
+        return BlasterFile(path=path, identifier=identifier)
+
+    def get_parameter(self, node_key: str) -> Optional[Parameter]:
+        """Returns the parameter of the node (instantiated on demand), or None if the node is a blaster file node."""
+
+        node_id = self._node_key_to_node_id[node_key]
+        if self._node_kinds[node_id] != self.NODE_KIND_PARAMETER:
+            return None
+        name, value = self._node_values[node_id]
+        return Parameter(name=name, value=value)
+
+    def get_node_data(self, node_key: str) -> dict:
+        """Returns the attributes of the node in the form used by the `networkx` graphs built by `DockoptStep`."""
+
+        if self.is_blaster_file_node(node_key):
+            return {"blaster_file": self.get_blaster_file(node_key)}
+        return {"parameter": self.get_parameter(node_key)}
+
+    def predecessors(self, node_key: str) -> List[str]:
+        return [self._node_keys[self._edge_parent_node_ids[edge_id]] for edge_id in self._node_id_to_parent_edge_ids[self._node_key_to_node_id[node_key]]]
+
+    def successors(self, node_key: str) -> List[str]:
+        return [self._node_keys[self._edge_child_node_ids[edge_id]] for edge_id in self._node_id_to_child_edge_ids[self._node_key_to_node_id[node_key]]]
+
+    def _get_edge_data_by_edge_id(self, edge_id: int) -> dict:
+        step_id = self._edge_step_ids[edge_id]
+        return {
+            "step_class": self._step_classes[step_id],
+            "original_step_dir_name": self._strings[self._step_original_step_dir_name_string_ids[step_id]],
+            "step_instance": self._step_instances[step_id],
+            "step_hash": self._step_hashes[step_id],
+            "parent_node_step_var_name": self._strings[self._edge_parent_node_step_var_name_string_ids[edge_id]],
+            "child_node_step_var_name": self._strings[self._edge_child_node_step_var_name_string_ids[edge_id]],
+        }
+
+    def get_edge_data(self, parent_node_key: str, child_node_key: str) -> Optional[dict]:
+        """Returns the attributes of the edge in the form used by the `networkx` graphs built by `DockoptStep`, or None if there is no such edge."""
+
+        if not self.has_edge(parent_node_key, child_node_key):
+            return None
+        return self._get_edge_data_by_edge_id(self._node_ids_pair_to_edge_id[(self._node_key_to_node_id[parent_node_key], self._node_key_to_node_id[child_node_key])])
+
+    def edges(self, data: bool = False) -> Iterable[Union[tuple, Any]]:
+        for edge_id in range(self.num_edges):
+            u, v = self._node_keys[self._edge_parent_node_ids[edge_id]], self._node_keys[self._edge_child_node_ids[edge_id]]
+            if data:
+                yield u, v, self._get_edge_data_by_edge_id(edge_id)
+            else:
+                yield u, v
+
+    #
+    def _get_ancestor_node_ids(self, node_ids: Iterable[int]) -> Set[int]:
+        ancestor_node_ids = set()
+        node_ids_to_visit = list(node_ids)
+        while node_ids_to_visit:
+            node_id = node_ids_to_visit.pop()
+            for edge_id in self._node_id_to_parent_edge_ids[node_id]:
+                parent_node_id = self._edge_parent_node_ids[edge_id]
+                if parent_node_id not in ancestor_node_ids:
+                    ancestor_node_ids.add(parent_node_id)
+                    node_ids_to_visit.append(parent_node_id)
+        return ancestor_node_ids
+
+    def ancestors(self, node_key: str) -> Set[str]:
+        return {self._node_keys[node_id] for node_id in self._get_ancestor_node_ids([self._node_key_to_node_id[node_key]])}
+
+    def get_lineage_subgraph(self, node_key: str) -> "ProvenanceGraph":
+        """Gets the subgraph representing the steps necessary to produce the node (i.e., the node, its ancestors, and all nodes and edges of the steps involved)."""
+
+        #
+        node_id = self._node_key_to_node_id[node_key]
+        lineage_node_ids = {node_id} | self._get_ancestor_node_ids([node_id])
+        step_ids = set()
+        for lineage_node_id in lineage_node_ids:
+            for edge_id in self._node_id_to_parent_edge_ids[lineage_node_id]:
+                step_ids.add(self._edge_step_ids[edge_id])
+        edge_ids = sorted([edge_id for step_id in step_ids for edge_id in self._step_id_to_edge_ids[step_id]])
+
+        #
+        subgraph = ProvenanceGraph()
+        for n_id in sorted(lineage_node_ids | {self._edge_parent_node_ids[e] for e in edge_ids} | {self._edge_child_node_ids[e] for e in edge_ids}):
+            subgraph._add_node_from(self, n_id)
+        for edge_id in edge_ids:
+            subgraph._add_edge_from(self, edge_id)
+
+        return subgraph
+
+    #
+    def _add_node_from(self, other: "ProvenanceGraph", node_id: int) -> None:
+        node_key = other._node_keys[node_id]
+        if node_key in self._node_key_to_node_id:
+            self._node_values[self._node_key_to_node_id[node_key]] = other._node_values[node_id]  # latest wins (as with `nx.compose`)
+            return
+        new_node_id = len(self._node_keys)
+        self._node_key_to_node_id[node_key] = new_node_id
+        self._node_keys.append(node_key)
+        self._node_kinds.append(other._node_kinds[node_id])
+        self._node_values.append(other._node_values[node_id])
+        self._node_id_to_parent_edge_ids.append([])
+        self._node_id_to_child_edge_ids.append([])
+
+    def _add_edge_from(self, other: "ProvenanceGraph", edge_id: int) -> None:
+        step_id = other._edge_step_ids[edge_id]
+        self.add_edge(
+            parent_node_key=other._node_keys[other._edge_parent_node_ids[edge_id]],
+            child_node_key=other._node_keys[other._edge_child_node_ids[edge_id]],
+            step_class=other._step_classes[step_id],
+            original_step_dir_name=other._strings[other._step_original_step_dir_name_string_ids[step_id]],
+            step_hash=other._step_hashes[step_id],
+            parent_node_step_var_name=other._strings[other._edge_parent_node_step_var_name_string_ids[edge_id]],
+            child_node_step_var_name=other._strings[other._edge_child_node_step_var_name_string_ids[edge_id]],
+            step_instance=other._step_instances[step_id],
+        )
+
+    def update(self, other: "ProvenanceGraph") -> None:
+        """Merges the nodes and edges of `other` into this graph (in place)."""
+
+        for node_id in range(len(other)):
+            self._add_node_from(other, node_id)
+        for edge_id in range(other.num_edges):
+            self._add_edge_from(other, edge_id)
+
+    #
+    @classmethod
+    def from_networkx(cls, g: nx.DiGraph) -> "ProvenanceGraph":
+        """Converts a graph of the form built by `DockoptStep`."""
+
+        graph = cls()
+        for node_key, node_data in g.nodes(data=True):
+            graph.add_node(node_key, blaster_file=node_data.get("blaster_file"), parameter=node_data.get("parameter"))
+        for u, v, data in g.edges(data=True):
+            graph.add_edge(
+                u,
+                v,
+                step_class=data["step_class"],
+                original_step_dir_name=data["original_step_dir_name"],
+                step_hash=data["step_hash"],
+                parent_node_step_var_name=data["parent_node_step_var_name"],
+                child_node_step_var_name=data["child_node_step_var_name"],
+                step_instance=data.get("step_instance"),
+            )
+
+        return graph
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Converts to a graph of the form built by `DockoptStep`."""
+
+        g = nx.DiGraph()
+        for node_key in self._node_keys:
+            g.add_node(node_key, **self.get_node_data(node_key))
+        for u, v, data in self.edges(data=True):
+            g.add_edge(u, v, **data)
+
+        return g
+
+    #
+    def save(self, file_path: str) -> None:
+        """Serializes the graph to a gzipped JSON file. Step instances are not serialized."""
+
+        d = {
+            "format_version": PROVENANCE_GRAPH_FORMAT_VERSION,
+            "strings": self._strings,
+            "node_keys": self._node_keys,
+            "node_kinds": self._node_kinds.tolist(),
+            "node_values": self._node_values,
+            "edge_parent_node_ids": self._edge_parent_node_ids.tolist(),
+            "edge_child_node_ids": self._edge_child_node_ids.tolist(),
+            "edge_step_ids": self._edge_step_ids.tolist(),
+            "edge_parent_node_step_var_name_string_ids": self._edge_parent_node_step_var_name_string_ids.tolist(),
+            "edge_child_node_step_var_name_string_ids": self._edge_child_node_step_var_name_string_ids.tolist(),
+            "step_hashes": self._step_hashes,
+            "step_classes": [f"{step_class.__module__}:{step_class.__qualname__}" for step_class in self._step_classes],
+            "step_original_step_dir_name_string_ids": self._step_original_step_dir_name_string_ids.tolist(),
+        }
+        with gzip.open(file_path, "wt") as f:
+            json.dump(d, f)
+        logger.debug(f"Saved provenance graph ({len(self)} nodes, {self.num_edges} edges, {self.num_steps} steps) to {file_path}")
+
+    @classmethod
+    def load(cls, file_path: str) -> "ProvenanceGraph":
+        """Loads a graph saved with `save`. Step instances of the loaded graph are None."""
+
+        #
+        with gzip.open(file_path, "rt") as f:
+            d = json.load(f)
+        if d["format_version"] != PROVENANCE_GRAPH_FORMAT_VERSION:
+            raise Exception(f"Unsupported provenance graph format version: {d['format_version']}")
+
+        #
+        def get_class(class_path):
+            module_name, class_name = class_path.split(":")
+            return getattr(importlib.import_module(module_name), class_name)
+
+        #
+        graph = cls()
+        graph._strings = d["strings"]
+        graph._string_to_string_id = {s: i for i, s in enumerate(graph._strings)}
+        graph._node_keys = d["node_keys"]
+        graph._node_key_to_node_id = {node_key: i for i, node_key in enumerate(graph._node_keys)}
+        graph._node_kinds = array('b', d["node_kinds"])
+        graph._node_values = [tuple(x) for x in d["node_values"]]
+        graph._edge_parent_node_ids = array('q', d["edge_parent_node_ids"])
+        graph._edge_child_node_ids = array('q', d["edge_child_node_ids"])
+        graph._edge_step_ids = array('q', d["edge_step_ids"])
+        graph._edge_parent_node_step_var_name_string_ids = array('q', d["edge_parent_node_step_var_name_string_ids"])
+        graph._edge_child_node_step_var_name_string_ids = array('q', d["edge_child_node_step_var_name_string_ids"])
+        graph._step_hashes = d["step_hashes"]
+        graph._step_hash_to_step_id = {step_hash: i for i, step_hash in enumerate(graph._step_hashes)}
+        graph._step_classes = [get_class(class_path) for class_path in d["step_classes"]]
+        graph._step_original_step_dir_name_string_ids = array('q', d["step_original_step_dir_name_string_ids"])
+        graph._step_instances = [None for _ in graph._step_hashes]
+
+        # rebuild indices
+        graph._node_id_to_parent_edge_ids = [[] for _ in graph._node_keys]
+        graph._node_id_to_child_edge_ids = [[] for _ in graph._node_keys]
+        graph._step_id_to_edge_ids = [[] for _ in graph._step_hashes]
+        graph._node_ids_pair_to_edge_id = {}
+        for edge_id, (parent_node_id, child_node_id, step_id) in enumerate(zip(graph._edge_parent_node_ids, graph._edge_child_node_ids, graph._edge_step_ids)):
+            graph._node_ids_pair_to_edge_id[(parent_node_id, child_node_id)] = edge_id
+            graph._node_id_to_child_edge_ids[parent_node_id].append(edge_id)
+            graph._node_id_to_parent_edge_ids[child_node_id].append(edge_id)
+            graph._step_id_to_edge_ids[step_id].append(edge_id)
+
+        return graph
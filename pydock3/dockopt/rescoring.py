@@ -0,0 +1,406 @@
+import os
+import glob
+import gzip
+import logging
+import itertools
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pydock3.files import File, MOL2_HEADER_INDICATOR
+from pydock3.criterion.criterion import Criterion
+from pydock3.criterion.enrichment.logauc import NormalizedLogAUC
+from pydock3.blastermaster.grids import Grid, read_grids_from_indock_file
+from pydock3.jobs import MOL2_FILE_NAME
+from pydock3.dockopt.util import WORKING_DIR_NAME
+
+
+#
+logger = logging.getLogger("dockopt")
+
+# recomputed energy terms, named as in the results dataframe of a retrodock job, & the INDOCK scale applied to each
+TERM_NAME_TO_INDOCK_SCALE_NAME_DICT = {
+    "electrostatic_energy": "electrostatic_scale",
+    "vdw_energy": "vdw_scale",
+    "polar_desolvation_energy": "ligand_desolv_scale",
+    "apolar_desolvation_energy": "ligand_desolv_scale",
+}
+TERM_NAMES = list(TERM_NAME_TO_INDOCK_SCALE_NAME_DICT.keys())
+INDOCK_SCALE_NAMES = list(dict.fromkeys(TERM_NAME_TO_INDOCK_SCALE_NAME_DICT.values()))
+
+# comment lines of poses written by DOCK, e.g. "##########    Van der Waals:   -25.12"
+MOL2_COMMENT_KEY_TO_TERM_NAME_DICT = {
+    "Electrostatic": "electrostatic_energy",
+    "Van der Waals": "vdw_energy",
+    "Ligand Polar Desolv": "polar_desolvation_energy",
+    "Ligand Apolar Desolv": "apolar_desolvation_energy",
+    "Total Energy": "total_energy",
+}
+
+#
+HYDROGEN_VDW_TYPES = (6, 7)  # H on polar atom & H on C (see `vdw.parms.amb.mindock`)
+KT_IN_KCAL_PER_MOL = 0.5925  # phimaps are in kT/e (298.15 K)
+LIGAND_DESOLVATION_OPTIONS = ["volume", "full"]  # `ligand_desolvation` of INDOCK ("full" uses the hydrogen solvmap for H)
+REQUIRED_GRID_NAMES = ["vdw_a", "vdw_b", "heavy_atom_desolvation"]  # electrostatics may be implicitly zero
+
+
+def _open_text_file_maybe_gzipped(file_path: str):
+    with open(file_path, "rb") as f:
+        is_gzipped = f.read(2) == b"\x1f\x8b"
+    if is_gzipped:
+        return gzip.open(file_path, "rt")
+    return open(file_path, "r")
+
+
+def read_vdw_parameters_file(vdw_parameters_file_path: str) -> Dict[int, Tuple[float, float]]:
+    """Returns vdw type -> (sqrt(A), sqrt(B))."""
+
+    vdw_type_to_parameters_dict = {}
+    with open(vdw_parameters_file_path, "r") as f:
+        for line in f:
+            if line.startswith("!") or not line.strip():
+                continue
+            tokens = line.split()
+            vdw_type_to_parameters_dict[int(tokens[0])] = (float(tokens[1]), float(tokens[2]))
+
+    return vdw_type_to_parameters_dict
+
+
+def read_db2_atom_parameters(db2_file_path: str) -> Dict[str, pd.DataFrame]:
+    """Returns molecule name -> per-atom parameters (from the "A" lines: vdw type, charge, polar & apolar solvation)."""
+
+    molecule_name_to_atoms_df_dict = {}
+    molecule_name, rows, is_new_molecule = None, [], True
+    with _open_text_file_maybe_gzipped(db2_file_path) as f:
+        for line in f:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if tokens[0] == "M" and is_new_molecule:
+                molecule_name, rows, is_new_molecule = tokens[1], [], False
+            elif tokens[0] == "A":
+                # A atomnum atomname atomtype dockvdwtype dockcolortype charge polarsolv apolarsolv totalsolv surfarea
+                rows.append((int(tokens[4]), float(tokens[6]), float(tokens[7]), float(tokens[8])))
+            elif tokens[0] == "E":
+                if molecule_name is not None and molecule_name not in molecule_name_to_atoms_df_dict:
+                    molecule_name_to_atoms_df_dict[molecule_name] = pd.DataFrame(rows, columns=["vdw_type", "charge", "polar_solvation", "apolar_solvation"])
+                is_new_molecule = True
+
+    return molecule_name_to_atoms_df_dict
+
+
+def read_mol2_poses(mol2_file_path: str) -> List[Tuple[str, np.ndarray, Dict[str, float]]]:
+    """Returns (molecule name, atom coordinates, energy terms from the comment lines) of each pose written by DOCK.
+
+    Reads the file in a single pass, since splitting it with `Mol2File` takes quadratic time in the number of poses."""
+
+    poses = []
+    molecule_name, coordinates_list, term_name_to_value_dict = None, [], {}
+    record_type, record_line_index = None, 0
+
+    def add_pose():
+        if molecule_name is not None and coordinates_list:
+            poses.append((molecule_name, np.array(coordinates_list, dtype=np.float64), term_name_to_value_dict))
+
+    with _open_text_file_maybe_gzipped(mol2_file_path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("#"):
+                if record_type is not None:  # first comment line of the next pose
+                    add_pose()
+                    molecule_name, coordinates_list, term_name_to_value_dict, record_type = None, [], {}, None
+                key, _, value = line.lstrip("#").partition(":")
+                if key.strip() in MOL2_COMMENT_KEY_TO_TERM_NAME_DICT:
+                    try:
+                        term_name_to_value_dict[MOL2_COMMENT_KEY_TO_TERM_NAME_DICT[key.strip()]] = float(value)
+                    except ValueError:
+                        pass
+            elif line.startswith(MOL2_HEADER_INDICATOR):
+                record_type = line[len(MOL2_HEADER_INDICATOR):].strip()
+                record_line_index = 0
+                if record_type == "MOLECULE" and molecule_name is not None:  # next pose has no comment lines
+                    add_pose()
+                    molecule_name, coordinates_list, term_name_to_value_dict = None, [], {}
+            elif record_type == "MOLECULE":
+                if record_line_index == 0:
+                    molecule_name = line.split()[0]
+                record_line_index += 1
+            elif record_type == "ATOM":
+                coordinates_list.append([float(x) for x in line.split()[2:5]])
+    add_pose()
+
+    return poses
+
+
+def interpolate_grid(grid: Grid, coordinates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Trilinear interpolation of the grid at each of the coordinates (shape: num points x 3).
+
+    Returns the interpolated values & whether each point is inside the grid (values of points outside are NaN)."""
+
+    shape = np.asarray(grid.geometry.shape)
+    fractional_indices = grid.geometry.get_fractional_indices_of_coordinates(coordinates)
+    is_inside = np.all((fractional_indices >= 0) & (fractional_indices <= shape - 1), axis=1)
+    lower_indices = np.clip(np.floor(fractional_indices).astype(np.int64), 0, shape - 2)
+    upper_weights = np.clip(fractional_indices - lower_indices, 0.0, 1.0)
+    lower_weights = 1.0 - upper_weights
+
+    #
+    values = np.zeros(len(coordinates), dtype=np.float64)
+    for offsets in itertools.product([0, 1], repeat=3):
+        corner_weights = np.prod(np.where(offsets, upper_weights, lower_weights), axis=1)
+        corner_indices = tuple((lower_indices + offsets).T)
+        values += corner_weights * grid.values[corner_indices]
+    values[~is_inside] = np.nan
+
+    return values, is_inside
+
+
+@dataclass
+class PoseSet:
+    """Poses of a baseline run with the per-atom parameters needed to rescore them. Atoms of all poses are stored in
+    flat arrays; `atom_pose_indices` gives the pose each atom belongs to."""
+
+    molecule_names: np.ndarray  # per pose
+    is_active: np.ndarray  # per pose
+    baseline_term_energies: np.ndarray  # per pose x term (`TERM_NAMES`); NaN where not written by DOCK
+    atom_pose_indices: np.ndarray  # per atom
+    coordinates: np.ndarray  # per atom x 3
+    charges: np.ndarray
+    vdw_sqrt_a: np.ndarray
+    vdw_sqrt_b: np.ndarray
+    polar_solvation: np.ndarray
+    apolar_solvation: np.ndarray
+    is_hydrogen: np.ndarray
+
+    @property
+    def num_poses(self) -> int:
+        return len(self.molecule_names)
+
+    @classmethod
+    def from_mol2_and_db2_files(
+        cls,
+        mol2_file_paths: Iterable[str],
+        db2_file_paths: Iterable[str],
+        vdw_parameters_file_path: str,
+        is_active: bool,
+    ) -> "PoseSet":
+        """Poses written by DOCK (e.g., `test.mol2.gz.0` of each task of a retrodock job), matched by molecule name to the
+        DB2 files they were docked from. Atoms of poses are in the same order as in the DB2 file."""
+
+        molecule_name_to_atoms_df_dict = {}
+        for db2_file_path in db2_file_paths:
+            molecule_name_to_atoms_df_dict.update(read_db2_atom_parameters(db2_file_path))
+        vdw_type_to_parameters_dict = read_vdw_parameters_file(vdw_parameters_file_path)
+
+        #
+        molecule_names, baseline_term_energies, coordinates_list, atoms_df_list = [], [], [], []
+        for mol2_file_path in mol2_file_paths:
+            for molecule_name, coordinates, term_name_to_value_dict in read_mol2_poses(mol2_file_path):
+                atoms_df = molecule_name_to_atoms_df_dict.get(molecule_name)
+                if atoms_df is None or len(atoms_df) != len(coordinates):
+                    logger.warning(f"Skipping pose of molecule {molecule_name} in {mol2_file_path}: no DB2 file with matching atoms")
+                    continue
+                molecule_names.append(molecule_name)
+                baseline_term_energies.append([term_name_to_value_dict.get(term_name, np.nan) for term_name in TERM_NAMES])
+                coordinates_list.append(coordinates)
+                atoms_df_list.append(atoms_df)
+
+        #
+        if atoms_df_list:
+            atoms_df = pd.concat(atoms_df_list, ignore_index=True)
+            coordinates = np.concatenate(coordinates_list)
+        else:
+            atoms_df = pd.DataFrame(columns=["vdw_type", "charge", "polar_solvation", "apolar_solvation"])
+            coordinates = np.zeros((0, 3))
+        vdw_types = atoms_df["vdw_type"].to_numpy(dtype=int)
+        vdw_parameters = np.array([vdw_type_to_parameters_dict[vdw_type] for vdw_type in vdw_types]).reshape(-1, 2)
+
+        return cls(
+            molecule_names=np.array(molecule_names, dtype=object),
+            is_active=np.full(len(molecule_names), is_active, dtype=bool),
+            baseline_term_energies=np.array(baseline_term_energies, dtype=np.float64).reshape(-1, len(TERM_NAMES)),
+            atom_pose_indices=np.repeat(np.arange(len(coordinates_list)), [len(c) for c in coordinates_list]),
+            coordinates=coordinates,
+            charges=atoms_df["charge"].to_numpy(dtype=np.float64),
+            vdw_sqrt_a=vdw_parameters[:, 0],
+            vdw_sqrt_b=vdw_parameters[:, 1],
+            polar_solvation=atoms_df["polar_solvation"].to_numpy(dtype=np.float64),
+            apolar_solvation=atoms_df["apolar_solvation"].to_numpy(dtype=np.float64),
+            is_hydrogen=np.isin(vdw_types, HYDROGEN_VDW_TYPES),
+        )
+
+    @classmethod
+    def concatenate(cls, pose_sets: List["PoseSet"]) -> "PoseSet":
+        pose_index_offsets = np.cumsum([0] + [pose_set.num_poses for pose_set in pose_sets[:-1]])
+        return cls(
+            molecule_names=np.concatenate([pose_set.molecule_names for pose_set in pose_sets]),
+            is_active=np.concatenate([pose_set.is_active for pose_set in pose_sets]),
+            baseline_term_energies=np.concatenate([pose_set.baseline_term_energies for pose_set in pose_sets]),
+            atom_pose_indices=np.concatenate([pose_set.atom_pose_indices + offset for pose_set, offset in zip(pose_sets, pose_index_offsets)]),
+            coordinates=np.concatenate([pose_set.coordinates for pose_set in pose_sets]),
+            charges=np.concatenate([pose_set.charges for pose_set in pose_sets]),
+            vdw_sqrt_a=np.concatenate([pose_set.vdw_sqrt_a for pose_set in pose_sets]),
+            vdw_sqrt_b=np.concatenate([pose_set.vdw_sqrt_b for pose_set in pose_sets]),
+            polar_solvation=np.concatenate([pose_set.polar_solvation for pose_set in pose_sets]),
+            apolar_solvation=np.concatenate([pose_set.apolar_solvation for pose_set in pose_sets]),
+            is_hydrogen=np.concatenate([pose_set.is_hydrogen for pose_set in pose_sets]),
+        )
+
+
+class PoseRescorer(object):
+    """Rescores the poses of a baseline run against (e.g., modified) grids & under new scales, without redocking.
+
+    Poses are not re-optimized: only the best of the poses DOCK already wrote for each molecule is kept. Terms that are
+    not recomputed (e.g., internal energy) are left out of the totals."""
+
+    def __init__(self, pose_set: PoseSet, ligand_desolvation: str = "volume"):
+        if ligand_desolvation not in LIGAND_DESOLVATION_OPTIONS:
+            raise Exception(f"`ligand_desolvation` must be one of: {LIGAND_DESOLVATION_OPTIONS}")
+        self.pose_set = pose_set
+        self.ligand_desolvation = ligand_desolvation
+
+        # poses grouped by molecule, for taking the best pose of each
+        self.molecule_names, first_pose_indices, self.pose_molecule_indices = np.unique(pose_set.molecule_names.astype(str), return_index=True, return_inverse=True)
+        self.is_active = pose_set.is_active[first_pose_indices]
+        self.pose_order = np.argsort(self.pose_molecule_indices, kind="stable")
+        self.molecule_start_indices = np.searchsorted(self.pose_molecule_indices[self.pose_order], np.arange(len(self.molecule_names)))
+
+    def _sum_over_poses(self, atom_values: np.ndarray) -> np.ndarray:
+        return np.bincount(self.pose_set.atom_pose_indices, weights=atom_values, minlength=self.pose_set.num_poses)
+
+    def get_term_energies(self, grid_name_to_grid_dict: Dict[str, Grid]) -> np.ndarray:
+        """Returns the energy terms (`TERM_NAMES`) of each pose (shape: num poses x num terms) against the grids (as
+        returned by `read_grids_from_indock_file`). Poses not entirely inside the grids get NaN, as DOCK would not have
+        scored them."""
+
+        missing_grid_names = [grid_name for grid_name in REQUIRED_GRID_NAMES if grid_name not in grid_name_to_grid_dict]
+        if missing_grid_names:
+            raise Exception(f"Grids required for rescoring are missing: {missing_grid_names}")
+
+        #
+        pose_set = self.pose_set
+        atom_term_energies = np.zeros((len(pose_set.coordinates), len(TERM_NAMES)))
+        is_inside = np.ones(len(pose_set.coordinates), dtype=bool)
+
+        # electrostatics
+        if "electrostatics" in grid_name_to_grid_dict:
+            phi_values, is_inside_phi = interpolate_grid(grid_name_to_grid_dict["electrostatics"], pose_set.coordinates)
+            atom_term_energies[:, 0] = KT_IN_KCAL_PER_MOL * pose_set.charges * phi_values
+            is_inside &= is_inside_phi
+
+        # vdw
+        a_values, is_inside_a = interpolate_grid(grid_name_to_grid_dict["vdw_a"], pose_set.coordinates)
+        b_values, _ = interpolate_grid(grid_name_to_grid_dict["vdw_b"], pose_set.coordinates)
+        atom_term_energies[:, 1] = (pose_set.vdw_sqrt_a * a_values) - (pose_set.vdw_sqrt_b * b_values)
+        is_inside &= is_inside_a
+
+        # ligand desolvation: fraction of each atom's solvation lost
+        desolvated_fractions, is_inside_desolvation = interpolate_grid(grid_name_to_grid_dict["heavy_atom_desolvation"], pose_set.coordinates)
+        if self.ligand_desolvation == "full" and "hydrogen_desolvation" in grid_name_to_grid_dict:
+            hydrogen_desolvated_fractions, is_inside_hydrogen = interpolate_grid(grid_name_to_grid_dict["hydrogen_desolvation"], pose_set.coordinates)
+            desolvated_fractions = np.where(pose_set.is_hydrogen, hydrogen_desolvated_fractions, desolvated_fractions)
+            is_inside_desolvation = np.where(pose_set.is_hydrogen, is_inside_hydrogen, is_inside_desolvation)
+        atom_term_energies[:, 2] = -desolvated_fractions * pose_set.polar_solvation
+        atom_term_energies[:, 3] = -desolvated_fractions * pose_set.apolar_solvation
+        is_inside &= is_inside_desolvation
+
+        #
+        atom_term_energies[~is_inside] = 0.0
+        term_energies = np.column_stack([self._sum_over_poses(atom_term_energies[:, i]) for i in range(len(TERM_NAMES))])
+        is_pose_inside = self._sum_over_poses((~is_inside).astype(np.float64)) == 0
+        term_energies[~is_pose_inside] = np.nan
+
+        return term_energies
+
+    @staticmethod
+    def get_term_weights(scales_df: pd.DataFrame) -> np.ndarray:
+        """Returns the weight of each term (shape: num variants x num terms) from the INDOCK scales of each variant (one
+        row per variant; missing scales are 1.0)."""
+
+        unknown_column_names = [column_name for column_name in scales_df.columns if column_name not in INDOCK_SCALE_NAMES]
+        if unknown_column_names:
+            raise Exception(f"Unknown scales: {unknown_column_names}. Scales must be among: {INDOCK_SCALE_NAMES}")
+
+        return np.column_stack([
+            scales_df[scale_name].to_numpy(dtype=np.float64) if scale_name in scales_df.columns else np.ones(len(scales_df))
+            for scale_name in TERM_NAME_TO_INDOCK_SCALE_NAME_DICT.values()
+        ])
+
+    def get_best_pose_total_energies(self, term_energies: np.ndarray, scales_df: pd.DataFrame) -> np.ndarray:
+        """Returns the total energy of the best pose of each molecule (shape: num molecules x num variants) under the
+        scales of each variant. Molecules with no pose inside the grids get NaN."""
+
+        total_energies = term_energies @ self.get_term_weights(scales_df).T  # num poses x num variants
+        total_energies = total_energies[self.pose_order]
+        if len(total_energies) == 0:
+            return np.zeros((0, len(scales_df)))
+
+        return np.fmin.reduceat(total_energies, self.molecule_start_indices, axis=0)
+
+    def get_criterion_values(self, best_pose_total_energies: np.ndarray, criterion: Optional[Criterion] = None) -> np.ndarray:
+        """Returns the criterion (e.g., normalized log AUC) of each variant, ranking molecules as retrodock does: by
+        total energy, decoys before actives on ties, molecules without a score last."""
+
+        if criterion is None:
+            criterion = NormalizedLogAUC()
+
+        criterion_values = []
+        for total_energies in best_pose_total_energies.T:
+            order = np.lexsort((self.is_active, total_energies))
+            criterion_values.append(criterion.calculate(self.is_active[order]))
+
+        return np.array(criterion_values)
+
+    def rescore(self, grid_name_to_grid_dict: Dict[str, Grid], scales_df: pd.DataFrame, criterion: Optional[Criterion] = None) -> pd.DataFrame:
+        """Returns `scales_df` with the criterion of each variant after rescoring against the grids."""
+
+        best_pose_total_energies = self.get_best_pose_total_energies(self.get_term_energies(grid_name_to_grid_dict), scales_df)
+        if criterion is None:
+            criterion = NormalizedLogAUC()
+        df = scales_df.copy()
+        df[criterion.name] = self.get_criterion_values(best_pose_total_energies, criterion)
+
+        return df
+
+    def get_baseline_term_errors_df(self, grid_name_to_grid_dict: Dict[str, Grid]) -> pd.DataFrame:
+        """Compares the terms recomputed against the baseline grids to those DOCK wrote for each pose, as a check that
+        rescoring reproduces DOCK."""
+
+        absolute_errors = np.abs(self.get_term_energies(grid_name_to_grid_dict) - self.pose_set.baseline_term_energies)
+        is_known = ~np.isnan(absolute_errors)
+        num_known = is_known.sum(axis=0)
+        return pd.DataFrame({
+            "term": TERM_NAMES,
+            "num_poses": num_known,
+            "mean_absolute_error": np.where(num_known > 0, np.where(is_known, absolute_errors, 0.0).sum(axis=0) / np.maximum(num_known, 1), np.nan),
+            "max_absolute_error": np.where(num_known > 0, np.where(is_known, absolute_errors, -np.inf).max(axis=0, initial=-np.inf), np.nan),
+        })
+
+
+def get_pose_set_of_retrodock_job_tasks(
+    task_dir_paths: Iterable[str],
+    db2_file_paths: Iterable[str],
+    vdw_parameters_file_path: str,
+    is_active: bool,
+    mol2_file_name: str = MOL2_FILE_NAME,
+) -> PoseSet:
+    """Poses written by the tasks of a retrodock job (run with mol2 export) of actives or of decoys."""
+
+    mol2_file_paths = [os.path.join(task_dir_path, mol2_file_name) for task_dir_path in task_dir_paths]
+    mol2_file_paths = [mol2_file_path for mol2_file_path in mol2_file_paths if File.file_exists(mol2_file_path)]
+    return PoseSet.from_mol2_and_db2_files(mol2_file_paths, db2_file_paths, vdw_parameters_file_path, is_active)
+
+
+def read_grids_of_best_retrodock_job(best_retrodock_job_dir_path: str, box_file_path: Optional[str] = None) -> Dict[str, Grid]:
+    """Grids of a job under `best_retrodock_jobs/`, whose `dockfiles/` dir holds the INDOCK file & dock files laid out as
+    in a retrodock task (see `rundock.bash`), where DOCK runs in `working/`."""
+
+    indock_file_paths = glob.glob(os.path.join(glob.escape(best_retrodock_job_dir_path), "dockfiles", "INDOCK*"))
+    if len(indock_file_paths) != 1:
+        raise Exception(f"Expected exactly one INDOCK file in dockfiles dir of {best_retrodock_job_dir_path}. Witnessed: {indock_file_paths}")
+
+    return read_grids_from_indock_file(indock_file_paths[0], box_file_path=box_file_path, base_dir_path=os.path.join(best_retrodock_job_dir_path, WORKING_DIR_NAME))
@@ -0,0 +1,147 @@
+import os
+import io
+import json
+import sqlite3
+import logging
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Optional, List, Iterator
+
+import numpy as np
+import pandas as pd
+
+from pydock3.util import get_hexdigest_of_persistent_md5_hash_of_tuple
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+PARAMETER_KEY_PREFIX = "parameters."
+
+
+def get_hexdigest_of_md5_hash_of_parameters(data_dict: dict) -> str:
+    """Hash of the parameter values (not the dock file contents) in a results data dict / dataframe row."""
+
+    return get_hexdigest_of_persistent_md5_hash_of_tuple(tuple(sorted([(key, str(value)) for key, value in data_dict.items() if key.startswith(PARAMETER_KEY_PREFIX)])))
+
+
+def get_score_vectors_blob(df: pd.DataFrame) -> bytes:
+    """Compact representation of docking results: total energy (float32) and activity (uint8) per molecule, in rank order.
+
+    `df` must already be sorted by energy with duplicate molecules dropped."""
+
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        total_energy=df["total_energy"].to_numpy(dtype=np.float32),
+        is_active=df["is_active"].to_numpy(dtype=np.uint8),
+    )
+
+    return buffer.getvalue()
+
+
+def load_score_vectors_from_blob(blob: bytes) -> (np.ndarray, np.ndarray):
+    with np.load(io.BytesIO(blob)) as npz:
+        return npz["total_energy"], npz["is_active"].astype(bool)
+
+
+class DockoptResultsDatabase(object):
+    """File-backed (SQLite) database of docking results, shared between DockOpt jobs.
+
+    Results are keyed by the hash of the effective content of a docking configuration (dock files, INDOCK file, dock
+    executable; see `DockingConfiguration.get_hexdigest_of_md5_hash_of_effective_content`), the hash of the retrospective
+    dataset manifest, and the criterion name. Each result also records the hash of the configuration's parameter values,
+    so that results of configurations with the same parameters but different dock file contents (near matches) can be
+    looked up, as well as the task dirs holding the OUTDOCK files."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            effective_content_hash TEXT NOT NULL,
+            dataset_hash TEXT NOT NULL,
+            criterion_name TEXT NOT NULL,
+            criterion_value REAL,
+            parameters_hash TEXT NOT NULL,
+            parameters_json TEXT NOT NULL,
+            actives_task_dir_path TEXT,
+            decoys_task_dir_path TEXT,
+            score_vectors BLOB,
+            created_utc TEXT NOT NULL,
+            PRIMARY KEY (effective_content_hash, dataset_hash, criterion_name)
+        );
+        CREATE INDEX IF NOT EXISTS results_parameters_hash_index ON results (parameters_hash, dataset_hash, criterion_name);
+    """
+
+    def __init__(self, db_file_path: str):
+        self.db_file_path = os.path.abspath(db_file_path)
+        db_dir_path = os.path.dirname(self.db_file_path)
+        if not os.path.isdir(db_dir_path):
+            os.makedirs(db_dir_path)
+        with self._connect() as connection:
+            connection.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Yields a connection, committing on success and always closing it."""
+
+        connection = sqlite3.connect(self.db_file_path, timeout=60)  # jobs may write concurrently
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get_result(self, effective_content_hash: str, dataset_hash: str, criterion_name: str) -> Optional[dict]:
+        """Returns the result of the exact match, or None if there is none."""
+
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT * FROM results WHERE effective_content_hash = ? AND dataset_hash = ? AND criterion_name = ?",
+                (effective_content_hash, dataset_hash, criterion_name),
+            ).fetchone()
+        if row is None:
+            return None
+
+        return dict(row)
+
+    def get_results_with_same_parameters(self, parameters_hash: str, dataset_hash: str, criterion_name: str) -> List[dict]:
+        """Returns the results of configurations with the same parameter values (near matches)."""
+
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT * FROM results WHERE parameters_hash = ? AND dataset_hash = ? AND criterion_name = ?",
+                (parameters_hash, dataset_hash, criterion_name),
+            ).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def put_result(
+            self,
+            effective_content_hash: str,
+            dataset_hash: str,
+            criterion_name: str,
+            criterion_value: float,
+            data_dict: dict,
+            actives_task_dir_path: Optional[str] = None,
+            decoys_task_dir_path: Optional[str] = None,
+            score_vectors_blob: Optional[bytes] = None,
+    ) -> None:
+        parameters_dict = {key: str(value) for key, value in data_dict.items() if key.startswith(PARAMETER_KEY_PREFIX)}
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    effective_content_hash,
+                    dataset_hash,
+                    criterion_name,
+                    criterion_value,
+                    get_hexdigest_of_md5_hash_of_parameters(data_dict),
+                    json.dumps(parameters_dict, sort_keys=True),
+                    os.path.abspath(actives_task_dir_path) if actives_task_dir_path is not None else None,
+                    os.path.abspath(decoys_task_dir_path) if decoys_task_dir_path is not None else None,
+                    score_vectors_blob,
+                    datetime.utcnow().isoformat(),
+                ),
+            )
+        logger.debug(f"Stored result in results database: effective_content_hash={effective_content_hash}, {criterion_name}={criterion_value}")
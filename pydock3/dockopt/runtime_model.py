@@ -0,0 +1,241 @@
+import os
+import math
+import logging
+from dataclasses import fields
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pydock3.files import File, FileLock
+from pydock3.dockopt.docking_configuration import DockingConfiguration
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+MIN_NUM_OBSERVATIONS_FOR_PREDICTION = 10
+RIDGE_REGULARIZATION_STRENGTH = 1.0
+RUNTIME_UPPER_BOUND_NUM_STANDARD_DEVIATIONS = 2.0  # ~97.5th percentile of log runtime
+RUNTIME_SAFETY_FACTOR = 1.25
+MEMORY_UPPER_BOUND_NUM_STANDARD_DEVIATIONS = 2.0  # ~97.5th percentile of log peak memory
+MEMORY_SAFETY_FACTOR = 1.25
+LOG_TRANSFORMED_FEATURE_NAMES = ["num_molecules", "num_conformations", "dock_files_mb"]
+JOB_TIMEOUT_MINUTES_OPTIONS = [15, 30, 60, 120, 240, 480, 960, 1440, 2880, 5760]
+
+# used until enough peak memory usages have been observed
+BASE_MEMORY_MB = 1024
+MEMORY_MB_PER_MB_OF_DOCK_FILES = 2
+MEMORY_MB_GRANULARITY = 256
+
+
+def get_task_features(docking_configuration: DockingConfiguration, pipeline_dir_path: str, num_molecules: int, num_conformations: int) -> Dict[str, float]:
+    """Features of a retrodock task that its runtime and memory usage depend on: the size of its input (molecules &
+    conformations), the total size of its dock files (grids), and the numeric INDOCK parameters."""
+
+    #
+    dock_files = docking_configuration.get_dock_files(pipeline_dir_path)
+    dock_files_mb = sum([File.get_file_size(getattr(dock_files, field.name).path) for field in fields(dock_files)]) / 2**20
+
+    #
+    features_dict = {
+        "num_molecules": float(num_molecules),
+        "num_conformations": float(num_conformations),
+        "dock_files_mb": dock_files_mb,
+    }
+    for key, value in docking_configuration.indock_file_generation_flat_param_dict.items():
+        if hasattr(value, "value"):  # Parameter
+            value = value.value
+        if isinstance(value, (bool, int, float)):
+            features_dict[key] = float(value)
+
+    return features_dict
+
+
+def get_job_timeout_minutes(runtime_seconds: float, max_job_timeout_minutes: Optional[int] = None) -> int:
+    """Round the runtime up to the nearest of a few fixed time limits, so that tasks with similar runtimes can share an array job."""
+
+    job_timeout_minutes = JOB_TIMEOUT_MINUTES_OPTIONS[-1]
+    for option in JOB_TIMEOUT_MINUTES_OPTIONS:
+        if option * 60 >= runtime_seconds:
+            job_timeout_minutes = option
+            break
+    if max_job_timeout_minutes is not None:
+        job_timeout_minutes = min(job_timeout_minutes, int(max_job_timeout_minutes))
+
+    return job_timeout_minutes
+
+
+def get_job_memory_mb(features_dict: Dict[str, float], predicted_memory_mb: Optional[float] = None) -> int:
+    """Memory to request for a task: as predicted from the peak memory usage of observed tasks (see
+    `TaskRuntimeModel.predict_memory_mb_upper_bound`) or, failing that, estimated from the size of its dock files (which
+    DOCK loads into memory)."""
+
+    if predicted_memory_mb is not None:
+        memory_mb = predicted_memory_mb
+    else:
+        memory_mb = BASE_MEMORY_MB + MEMORY_MB_PER_MB_OF_DOCK_FILES * features_dict["dock_files_mb"]
+
+    return int(math.ceil(memory_mb / MEMORY_MB_GRANULARITY) * MEMORY_MB_GRANULARITY)
+
+
+class TaskRuntimeModel(object):
+    """Predicts the runtimes and peak memory usages of retrodock tasks from those of previously observed tasks.
+
+    Observations are appended to a CSV file so that they can be shared between steps and between DockOpt jobs (writes
+    are serialized with a `FileLock`). The peak memory usage of a task (MaxRSS) is taken from the job scheduler's
+    accounting, if available. Each is modelled by a ridge regression, of the log runtime per conformation and of the log
+    peak memory usage respectively, on the log numbers of molecules and conformations, the log size of the dock files,
+    and the numeric INDOCK parameters, so that per-molecule overhead and non-linear scaling with the size of the input
+    are modelled too. Predictions are upper bounds (mean plus `RUNTIME_UPPER_BOUND_NUM_STANDARD_DEVIATIONS` /
+    `MEMORY_UPPER_BOUND_NUM_STANDARD_DEVIATIONS` residual standard deviations, times `RUNTIME_SAFETY_FACTOR` /
+    `MEMORY_SAFETY_FACTOR`), since an underestimate gets the task killed."""
+
+    def __init__(self, observations_csv_file_path: str):
+        self.observations_csv_file_path = os.path.abspath(observations_csv_file_path)
+        dir_path = os.path.dirname(self.observations_csv_file_path)
+        if not os.path.isdir(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
+        with FileLock(self.observations_csv_file_path):
+            self.df = self._read_observations()
+
+        #
+        self._target_name_to_fit_cache_key_dict = {}
+        self._target_name_to_fit_dict = {}
+
+    def _read_observations(self) -> pd.DataFrame:
+        if File.file_exists(self.observations_csv_file_path):
+            return pd.read_csv(self.observations_csv_file_path)
+        return pd.DataFrame()
+
+    @property
+    def num_observations(self) -> int:
+        return len(self.df)
+
+    def get_median_runtime_seconds_per_conformation(self) -> Optional[float]:
+        """Returns None if no task has been observed yet."""
+
+        if self.num_observations == 0:
+            return None
+        df = self.df[self.df["num_conformations"] > 0]
+        if len(df) == 0:
+            return None
+        return float((df["runtime_seconds"] / df["num_conformations"]).median())
+
+    def add_observation(self, features_dict: Dict[str, float], runtime_seconds: float, task_dir_path: str, start_time: float, max_rss_mb: Optional[float] = None) -> None:
+        """Record the runtime (and peak memory usage, if known) of a task. Tasks are identified by their task dir and start time, so re-recording one (e.g., on resume) is a no-op."""
+
+        #
+        if runtime_seconds <= 0:
+            return
+        if self.num_observations > 0:
+            if ((self.df["task_dir_path"] == task_dir_path) & (self.df["start_time"] == start_time)).any():
+                return
+
+        # other jobs (or batch targets) may be writing to the same file
+        row_df = pd.DataFrame([{"task_dir_path": task_dir_path, "start_time": start_time, "runtime_seconds": runtime_seconds, "max_rss_mb": max_rss_mb, **features_dict}])
+        with FileLock(self.observations_csv_file_path):
+            write_header = not File.file_exists(self.observations_csv_file_path)
+            if not write_header:
+                existing_columns = pd.read_csv(self.observations_csv_file_path, nrows=0).columns.tolist()
+                if set(existing_columns) != set(row_df.columns):  # set of features changed, so rewrite file with union of columns
+                    self.df = pd.concat([self._read_observations(), row_df], ignore_index=True)  # re-read so that rows appended by others are kept
+                    temp_file_path = f"{self.observations_csv_file_path}.tmp"
+                    self.df.to_csv(temp_file_path, index=False)
+                    os.replace(temp_file_path, self.observations_csv_file_path)  # so that readers never see a partial file
+                    return
+                row_df = row_df[existing_columns]
+            row_df.to_csv(self.observations_csv_file_path, mode="a", header=write_header, index=False)
+        self.df = pd.concat([self.df, row_df], ignore_index=True)
+
+    @staticmethod
+    def _get_transformed_feature_matrix(x: np.ndarray, feature_names: List[str]) -> np.ndarray:
+        """Log-transforms the columns of features that runtime scales with multiplicatively (sizes & counts)."""
+
+        for i, name in enumerate(feature_names):
+            if name in LOG_TRANSFORMED_FEATURE_NAMES:
+                x[:, i] = np.log(x[:, i] + 1)
+        return x
+
+    def _get_observations_and_log_targets(self, target_name: str) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Returns the observations to fit the target on & the log targets: runtime per conformation or peak memory."""
+
+        if target_name == "runtime_seconds":
+            df = self.df[self.df["num_conformations"] > 0]
+            return df, np.log(df["runtime_seconds"].to_numpy(dtype=float) / df["num_conformations"].to_numpy(dtype=float))
+        if "max_rss_mb" not in self.df.columns:  # e.g., observations recorded without accounting
+            return self.df.iloc[:0], np.zeros(0)
+        max_rss_mb = pd.to_numeric(self.df["max_rss_mb"], errors="coerce")  # unknown for some tasks
+        df = self.df[max_rss_mb > 0]
+        return df, np.log(max_rss_mb[max_rss_mb > 0].to_numpy(dtype=float))
+
+    def _get_fit(self, feature_names: Tuple[str], target_name: str = "runtime_seconds") -> Optional[Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, float]]:
+        """Returns (feature names used, means, standard deviations, coefficients, residual standard deviation)."""
+
+        #
+        fit_cache_key = (self.num_observations, feature_names)
+        if fit_cache_key == self._target_name_to_fit_cache_key_dict.get(target_name):
+            return self._target_name_to_fit_dict[target_name]
+
+        #
+        fit = None
+        if self.num_observations >= MIN_NUM_OBSERVATIONS_FOR_PREDICTION:
+            # use only features witnessed in every observation and which vary (constant ones are absorbed by the intercept)
+            df, y = self._get_observations_and_log_targets(target_name)
+            used_feature_names = [
+                name for name in feature_names
+                if name in df.columns and df[name].notnull().all() and df[name].nunique() > 1
+            ]
+            x = self._get_transformed_feature_matrix(df[used_feature_names].to_numpy(dtype=float, copy=True), used_feature_names)
+
+            #
+            if len(y) >= MIN_NUM_OBSERVATIONS_FOR_PREDICTION:
+                means = x.mean(axis=0)
+                stds = x.std(axis=0)
+                stds[stds == 0] = 1.0
+                x_standardized = (x - means) / stds
+                a = np.hstack([np.ones((len(y), 1)), x_standardized])
+                regularization = np.sqrt(RIDGE_REGULARIZATION_STRENGTH) * np.eye(a.shape[1])
+                regularization[0, 0] = 0.0  # do not regularize intercept
+                coefficients, *_ = np.linalg.lstsq(np.vstack([a, regularization]), np.concatenate([y, np.zeros(a.shape[1])]), rcond=None)
+                residuals = y - a @ coefficients
+                residual_std = float(np.sqrt(np.sum(residuals**2) / max(1, len(y) - a.shape[1])))
+                fit = (used_feature_names, means, stds, coefficients, residual_std)
+
+        #
+        self._target_name_to_fit_cache_key_dict[target_name] = fit_cache_key
+        self._target_name_to_fit_dict[target_name] = fit
+
+        return fit
+
+    def _predict_log_target_and_residual_std(self, features_dict: Dict[str, float], target_name: str) -> Optional[Tuple[float, float]]:
+        fit = self._get_fit(tuple(sorted(features_dict.keys())), target_name)
+        if fit is None:
+            return None
+        used_feature_names, means, stds, coefficients, residual_std = fit
+
+        #
+        x = self._get_transformed_feature_matrix(np.array([[features_dict[name] for name in used_feature_names]], dtype=float), used_feature_names)[0]
+
+        return float(coefficients[0] + np.dot((x - means) / stds, coefficients[1:])), residual_std
+
+    def predict_runtime_seconds_upper_bound(self, features_dict: Dict[str, float]) -> Optional[float]:
+        """Returns None if there are not yet enough observations to make a prediction."""
+
+        prediction = self._predict_log_target_and_residual_std(features_dict, "runtime_seconds")
+        if prediction is None:
+            return None
+        log_runtime_per_conformation, residual_std = prediction
+
+        return RUNTIME_SAFETY_FACTOR * features_dict["num_conformations"] * float(np.exp(log_runtime_per_conformation + RUNTIME_UPPER_BOUND_NUM_STANDARD_DEVIATIONS * residual_std))
+
+    def predict_memory_mb_upper_bound(self, features_dict: Dict[str, float]) -> Optional[float]:
+        """Returns None if there are not yet enough observations of peak memory usage to make a prediction."""
+
+        prediction = self._predict_log_target_and_residual_std(features_dict, "max_rss_mb")
+        if prediction is None:
+            return None
+        log_memory_mb, residual_std = prediction
+
+        return MEMORY_SAFETY_FACTOR * float(np.exp(log_memory_mb + MEMORY_UPPER_BOUND_NUM_STANDARD_DEVIATIONS * residual_std))
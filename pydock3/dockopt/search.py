@@ -0,0 +1,320 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional, Union
+import logging
+import math
+
+import numpy as np
+from scipy.stats import norm
+
+from pydock3.config import Parameter
+from pydock3.dockopt.docking_configuration import DockingConfiguration
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+PARAMETER_KEY_PREFIX = "parameters."
+DEFAULT_MAX_FRACTION_OF_CONFIGURATIONS = 0.25
+
+
+def _get_raw_value(value):
+    if isinstance(value, Parameter):
+        return value.value
+    return value
+
+
+def _is_numeric(value) -> bool:
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+
+def get_feature_matrix(docking_configurations: List[DockingConfiguration]) -> np.ndarray:
+    """Returns a matrix with one row per docking configuration, encoding its parameters.
+
+    Parameters that take a single value across all configurations are dropped. Numeric parameters are min-max scaled
+    to [0, 1]. All other parameters (bools, strings, None) are treated as categorical and one-hot encoded."""
+
+    #
+    param_dicts = []
+    for dc in docking_configurations:
+        param_dicts.append({key: _get_raw_value(value) for key, value in dc.to_dict().items() if key.startswith(PARAMETER_KEY_PREFIX)})
+    keys = sorted(set([key for param_dict in param_dicts for key in param_dict]))
+
+    #
+    columns = []
+    for key in keys:
+        values = [param_dict.get(key) for param_dict in param_dicts]
+        unique_values = sorted(set([str(value) for value in values]))
+        if len(unique_values) < 2:
+            continue
+        if all([_is_numeric(value) for value in values]):
+            column = np.array(values, dtype=float)
+            column = (column - column.min()) / (column.max() - column.min())
+            columns.append(column[:, np.newaxis])
+        else:
+            value_str_to_index_dict = {value_str: i for i, value_str in enumerate(unique_values)}
+            one_hot = np.zeros((len(values), len(unique_values)))
+            one_hot[np.arange(len(values)), [value_str_to_index_dict[str(value)] for value in values]] = 1.0
+            columns.append(one_hot)
+
+    #
+    if not columns:
+        return np.zeros((len(docking_configurations), 0))
+
+    return np.hstack(columns)
+
+
+class SurrogateModel(ABC):
+    @abstractmethod
+    def fit(self, X: np.ndarray, y: np.ndarray) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def predict(self, X: np.ndarray) -> (np.ndarray, np.ndarray):
+        """Returns the predicted mean and standard deviation for each row of X."""
+
+        raise NotImplementedError
+
+
+class GaussianProcessSurrogateModel(SurrogateModel):
+    """Gaussian process regression with a Matern 5/2 kernel.
+
+    The length scale and noise level are chosen by maximizing the log marginal likelihood over a small grid, which is
+    cheap since the number of evaluated configurations is small."""
+
+    LENGTH_SCALES = (0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+    NOISE_VARIANCES = (1e-6, 1e-3, 1e-2, 1e-1)
+
+    def __init__(self):
+        self.length_scale = None
+        self.noise_variance = None
+        self.X = None
+        self.y_mean = None
+        self.y_std = None
+        self.alpha = None
+        self.L = None
+
+    @staticmethod
+    def _kernel(X1: np.ndarray, X2: np.ndarray, length_scale: float) -> np.ndarray:
+        dists = np.sqrt(np.maximum(((X1[:, np.newaxis, :] - X2[np.newaxis, :, :]) ** 2).sum(axis=2), 0.0)) / length_scale
+        sqrt_5_dists = math.sqrt(5.0) * dists
+
+        return (1.0 + sqrt_5_dists + (5.0 / 3.0) * dists ** 2) * np.exp(-sqrt_5_dists)
+
+    def _factorize(self, X: np.ndarray, y_normalized: np.ndarray, length_scale: float, noise_variance: float):
+        K = self._kernel(X, X, length_scale) + noise_variance * np.eye(X.shape[0])
+        L = np.linalg.cholesky(K)
+        alpha = np.linalg.solve(L.T, np.linalg.solve(L, y_normalized))
+        log_marginal_likelihood = -0.5 * y_normalized.dot(alpha) - np.log(np.diag(L)).sum() - 0.5 * X.shape[0] * math.log(2 * math.pi)
+
+        return L, alpha, log_marginal_likelihood
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> None:
+        #
+        self.X = X
+        self.y_mean = y.mean()
+        self.y_std = y.std() if y.std() > 0 else 1.0
+        y_normalized = (y - self.y_mean) / self.y_std
+
+        #
+        best = None
+        for length_scale in self.LENGTH_SCALES:
+            for noise_variance in self.NOISE_VARIANCES:
+                try:
+                    L, alpha, log_marginal_likelihood = self._factorize(X, y_normalized, length_scale, noise_variance)
+                except np.linalg.LinAlgError:
+                    continue
+                if best is None or log_marginal_likelihood > best[0]:
+                    best = (log_marginal_likelihood, length_scale, noise_variance, L, alpha)
+        if best is None:
+            raise Exception("Failed to fit Gaussian process surrogate model.")
+        _, self.length_scale, self.noise_variance, self.L, self.alpha = best
+
+    def predict(self, X: np.ndarray) -> (np.ndarray, np.ndarray):
+        K_star = self._kernel(X, self.X, self.length_scale)
+        mean = K_star.dot(self.alpha)
+        v = np.linalg.solve(self.L, K_star.T)
+        variance = np.maximum(1.0 - (v ** 2).sum(axis=0), 1e-12)
+
+        return self.y_mean + self.y_std * mean, self.y_std * np.sqrt(variance)
+
+
+#
+SURROGATE_MODEL_CLASS_DICT = {
+    "gaussian_process": GaussianProcessSurrogateModel,
+}
+
+
+def get_expected_improvement(mean: np.ndarray, std: np.ndarray, best_value: float, xi: float = 0.01) -> np.ndarray:
+    """Expected improvement (for maximization) over `best_value`."""
+
+    improvement = mean - best_value - xi
+    z = improvement / std
+
+    return improvement * norm.cdf(z) + std * norm.pdf(z)
+
+
+class DockingConfigurationSearch(ABC):
+    """Decides which docking configurations, out of all those specified for a step, to dock and in what batches.
+
+    Usage: call `get_next_batch()` to get the configurations to dock next, dock them, report their criterion values
+    via `add_results()`, and repeat until `get_next_batch()` returns an empty list."""
+
+    def __init__(self, docking_configurations: List[DockingConfiguration]):
+        self.docking_configurations = list(docking_configurations)
+        self.configuration_num_to_criterion_value_dict = {}
+        self.configuration_num_to_prior_criterion_value_dict = {}
+        self.proposed_configuration_nums = set()
+
+    @property
+    def unproposed_docking_configurations(self) -> List[DockingConfiguration]:
+        return [dc for dc in self.docking_configurations if dc.configuration_num not in self.proposed_configuration_nums]
+
+    def add_results(self, configuration_num_to_criterion_value_dict: Dict[int, float]) -> None:
+        self.configuration_num_to_criterion_value_dict.update(configuration_num_to_criterion_value_dict)
+
+    def add_prior_results(self, configuration_num_to_criterion_value_dict: Dict[int, float]) -> None:
+        """Add criterion values known from elsewhere (e.g., near matches in a results database) for configurations not yet docked. Superseded by actual results."""
+
+        self.configuration_num_to_prior_criterion_value_dict.update(configuration_num_to_criterion_value_dict)
+
+    @property
+    def configuration_num_to_known_criterion_value_dict(self) -> Dict[int, float]:
+        return {**self.configuration_num_to_prior_criterion_value_dict, **self.configuration_num_to_criterion_value_dict}
+
+    def get_next_batch(self) -> List[DockingConfiguration]:
+        batch = self._get_next_batch()
+        self.proposed_configuration_nums.update([dc.configuration_num for dc in batch])
+
+        return batch
+
+    @abstractmethod
+    def _get_next_batch(self) -> List[DockingConfiguration]:
+        raise NotImplementedError
+
+
+class ExhaustiveSearch(DockingConfigurationSearch):
+    """Docks every configuration in a single batch (the default)."""
+
+    def _get_next_batch(self) -> List[DockingConfiguration]:
+        return self.unproposed_docking_configurations
+
+
+class SurrogateModelSearch(DockingConfigurationSearch):
+    """Docks an initial random batch of configurations, then repeatedly fits a surrogate model of the criterion to the
+    configurations docked so far and docks the batch of remaining configurations with the highest expected improvement.
+
+    Batches are selected greedily: after each pick, the surrogate is refit with the predicted mean of the pick as a
+    stand-in for its criterion value (the "kriging believer" heuristic), which spreads the batch out."""
+
+    def __init__(
+            self,
+            docking_configurations: List[DockingConfiguration],
+            surrogate_model: str = "gaussian_process",
+            num_initial_configurations: Optional[int] = None,
+            batch_size: Optional[int] = None,
+            max_configurations: Optional[int] = None,
+            random_seed: Optional[int] = None,
+    ):
+        super().__init__(docking_configurations)
+
+        #
+        if surrogate_model not in SURROGATE_MODEL_CLASS_DICT:
+            raise ValueError(f"`surrogate_model` must be one of: {list(SURROGATE_MODEL_CLASS_DICT.keys())}. Witnessed: {surrogate_model}")
+        self.surrogate_model_class = SURROGATE_MODEL_CLASS_DICT[surrogate_model]
+
+        #
+        num_total = len(self.docking_configurations)
+        self.max_configurations = self.get_max_configurations(num_total, max_configurations)
+        if num_initial_configurations is None:
+            num_initial_configurations = max(1, int(math.ceil(0.2 * self.max_configurations)))
+        self.num_initial_configurations = min(num_initial_configurations, self.max_configurations)
+        if batch_size is None:
+            batch_size = self.num_initial_configurations
+        self.batch_size = batch_size
+
+        #
+        self.random_state = np.random.RandomState(random_seed)
+        self.X = get_feature_matrix(self.docking_configurations)
+        self.configuration_num_to_row_index_dict = {dc.configuration_num: i for i, dc in enumerate(self.docking_configurations)}
+
+    @staticmethod
+    def get_max_configurations(num_total: int, max_configurations: Optional[int] = None) -> int:
+        """Number of configurations the search docks at most (a quarter of them by default)."""
+
+        if max_configurations is None:
+            max_configurations = max(1, int(math.ceil(DEFAULT_MAX_FRACTION_OF_CONFIGURATIONS * num_total)))
+        return min(max_configurations, num_total)
+
+    def _get_next_batch(self) -> List[DockingConfiguration]:
+        #
+        num_remaining = self.max_configurations - len(self.proposed_configuration_nums)
+        candidates = self.unproposed_docking_configurations
+        if num_remaining <= 0 or not candidates:
+            return []
+
+        #
+        configuration_num_to_known_criterion_value_dict = self.configuration_num_to_known_criterion_value_dict
+        evaluated_configuration_nums = [num for num in configuration_num_to_known_criterion_value_dict if num in self.configuration_num_to_row_index_dict]
+
+        # initial batch is chosen at random (unless prior results are enough to fit the surrogate model)
+        if not self.proposed_configuration_nums and len(evaluated_configuration_nums) < 2:
+            indices = self.random_state.choice(len(candidates), size=min(self.num_initial_configurations, len(candidates)), replace=False)
+            return [candidates[i] for i in sorted(indices)]
+
+        #
+        batch_size = min(self.batch_size, num_remaining, len(candidates))
+        if len(evaluated_configuration_nums) < 2 or self.X.shape[1] == 0:  # nothing to model; fall back to random
+            logger.warning("Too few evaluated docking configurations to fit surrogate model. Choosing next batch at random.")
+            indices = self.random_state.choice(len(candidates), size=batch_size, replace=False)
+            return [candidates[i] for i in sorted(indices)]
+
+        #
+        X_observed = self.X[[self.configuration_num_to_row_index_dict[num] for num in evaluated_configuration_nums]]
+        y_observed = np.array([configuration_num_to_known_criterion_value_dict[num] for num in evaluated_configuration_nums], dtype=float)
+        best_value = y_observed.max()
+        candidate_row_indices = [self.configuration_num_to_row_index_dict[dc.configuration_num] for dc in candidates]
+        X_candidates = self.X[candidate_row_indices]
+
+        #
+        chosen_indices = []
+        for _ in range(batch_size):
+            model = self.surrogate_model_class()
+            model.fit(X_observed, y_observed)
+            mean, std = model.predict(X_candidates)
+            expected_improvement = get_expected_improvement(mean, std, best_value)
+            expected_improvement[chosen_indices] = -np.inf
+            i = int(np.argmax(expected_improvement))
+            chosen_indices.append(i)
+            X_observed = np.vstack([X_observed, X_candidates[i]])
+            y_observed = np.append(y_observed, mean[i])
+        logger.info(f"Surrogate model proposed {len(chosen_indices)} docking configurations (best criterion value so far: {best_value})")
+
+        return [candidates[i] for i in sorted(chosen_indices)]
+
+
+#
+SEARCH_STRATEGY_CLASS_DICT = {
+    "exhaustive": ExhaustiveSearch,
+    "surrogate": SurrogateModelSearch,
+}
+
+
+def get_docking_configuration_search(
+        docking_configurations: List[DockingConfiguration],
+        search_dict: Optional[Dict[str, Union[str, int]]] = None,
+) -> DockingConfigurationSearch:
+    """Returns the search specified by the `search` section of a step's config (exhaustive if absent)."""
+
+    if not search_dict:
+        return ExhaustiveSearch(docking_configurations)
+
+    #
+    kwargs = dict(search_dict)
+    strategy = kwargs.pop("strategy", "exhaustive")
+    if strategy not in SEARCH_STRATEGY_CLASS_DICT:
+        raise ValueError(f"`search.strategy` must be one of: {list(SEARCH_STRATEGY_CLASS_DICT.keys())}. Witnessed: {strategy}")
+    if strategy == "exhaustive":
+        return ExhaustiveSearch(docking_configurations)
+
+    return SEARCH_STRATEGY_CLASS_DICT[strategy](docking_configurations, **kwargs)
@@ -0,0 +1,185 @@
+import os
+import time
+import shutil
+import logging
+import statistics
+import collections
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+from pydock3.files import Dir
+from pydock3.jobs import ArrayDockingJob
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+SPECULATIVE_ATTEMPTS_DIR_NAME = "speculative_attempts"
+SPECULATIVE_JOB_NAME_SUFFIX = "_speculative"
+MIN_NUM_TASK_RUNTIMES_FOR_SPECULATIVE_EXECUTION = 5
+MAX_FRACTION_OF_TASKS_TO_SPECULATIVELY_EXECUTE = 0.1
+MAX_SECONDS_TO_WAIT_FOR_CANCELLED_TASKS_TO_LEAVE_QUEUE = 300
+SECONDS_BETWEEN_QUEUE_CHECKS_FOR_CANCELLED_TASKS = 5
+
+
+class SpeculativeTaskExecutor(object):
+    """Launches a duplicate attempt of each straggler task, i.e. each task that has been running for longer than
+    `straggler_runtime_multiple` times the median runtime of the tasks completed so far in the same job dir (actives
+    tasks and decoys tasks differ too much in runtime to be compared with each other).
+
+    Duplicate attempts run as a separate array job exporting to a separate directory
+    (`<job dir>/speculative_attempts/<task id>`). Whichever attempt completes first is accepted and the other is
+    cancelled. An accepted duplicate attempt is moved into the original task dir once the cancelled original attempt has
+    left the job scheduler queue (see `finalize`).
+
+    Relies on the start time file written by `rundock.bash` and thus on the clocks of the nodes being synchronized."""
+
+    def __init__(self, straggler_runtime_multiple: float, num_tasks: int):
+        #
+        if straggler_runtime_multiple <= 1.0:
+            raise Exception(f"`straggler_runtime_multiple` must be greater than 1. Witnessed: {straggler_runtime_multiple}")
+        self.straggler_runtime_multiple = straggler_runtime_multiple
+        self.max_num_speculative_attempts = max(1, int(MAX_FRACTION_OF_TASKS_TO_SPECULATIVELY_EXECUTE * num_tasks))
+
+        #
+        self.job_dir_path_to_task_runtimes_dict: Dict[str, List[float]] = collections.defaultdict(list)
+        self.array_job_name_to_speculative_array_job_dict: Dict[str, ArrayDockingJob] = {}
+        self.key_to_speculative_array_job_dict: Dict[Tuple[str, str], ArrayDockingJob] = {}
+        self.key_to_accepted_task_dir_path_dict: Dict[Tuple[str, str], str] = {}
+        self.accepted_speculative_attempts: List[Tuple[ArrayDockingJob, ArrayDockingJob, str]] = []
+
+    def get_median_task_runtime(self, array_job: ArrayDockingJob) -> Optional[float]:
+        task_runtimes = self.job_dir_path_to_task_runtimes_dict[array_job.job_dir.path]
+        if len(task_runtimes) < MIN_NUM_TASK_RUNTIMES_FOR_SPECULATIVE_EXECUTION:
+            return None
+        return statistics.median(task_runtimes)
+
+    def _record_task_runtime(self, array_job: ArrayDockingJob, runtime: Optional[float]) -> None:
+        if runtime is not None:
+            self.job_dir_path_to_task_runtimes_dict[array_job.job_dir.path].append(runtime)
+
+    def _get_speculative_array_job(self, array_job: ArrayDockingJob) -> ArrayDockingJob:
+        if array_job.name not in self.array_job_name_to_speculative_array_job_dict:
+            self.array_job_name_to_speculative_array_job_dict[array_job.name] = replace(
+                array_job,
+                name=f"{array_job.name}{SPECULATIVE_JOB_NAME_SUFFIX}",
+                job_dir=Dir(os.path.join(array_job.job_dir.path, SPECULATIVE_ATTEMPTS_DIR_NAME), create=True, reset=False),
+            )
+        return self.array_job_name_to_speculative_array_job_dict[array_job.name]
+
+    def _get_speculative_array_job_of_task(self, array_job: ArrayDockingJob, task_id: str) -> Optional[ArrayDockingJob]:
+        return self.key_to_speculative_array_job_dict.get((array_job.name, task_id))
+
+    def launch_speculative_attempt_if_straggler(self, array_job: ArrayDockingJob, task_id: str) -> bool:
+        """Launch a duplicate attempt of the task if it is a straggler (and has no duplicate attempt yet). Returns whether one was launched."""
+
+        #
+        if self._get_speculative_array_job_of_task(array_job, task_id) is not None:
+            return False
+        if len(self.key_to_speculative_array_job_dict) >= self.max_num_speculative_attempts:
+            return False
+        median_task_runtime = self.get_median_task_runtime(array_job)
+        if median_task_runtime is None:
+            return False
+
+        # only tasks that have actually started running can be stragglers (tasks waiting on the queue are not)
+        start_time = array_job.get_task_start_time(task_id)
+        if start_time is None:
+            return False
+        elapsed_seconds = time.time() - start_time
+        if elapsed_seconds <= self.straggler_runtime_multiple * median_task_runtime:
+            return False
+
+        #
+        speculative_array_job = self._get_speculative_array_job(array_job)
+        speculative_array_job.submit_task(task_id, skip_if_complete=False)
+        self.key_to_speculative_array_job_dict[(array_job.name, task_id)] = speculative_array_job
+        logger.info(f"Task {task_id} of {array_job.name} has been running for {elapsed_seconds:.0f} s (median task runtime: {median_task_runtime:.0f} s). Launched speculative attempt.")
+
+        return True
+
+    def task_is_complete(self, array_job: ArrayDockingJob, task_id: str) -> bool:
+        """Whether either the original attempt or the duplicate attempt (if any) of the task is complete."""
+
+        if array_job.task_is_complete(task_id):
+            return True
+        speculative_array_job = self._get_speculative_array_job_of_task(array_job, task_id)
+        return speculative_array_job is not None and speculative_array_job.task_is_complete(task_id)
+
+    def task_failed(self, array_job: ArrayDockingJob, task_id: str) -> bool:
+        """Whether both the original attempt and the duplicate attempt (if any) of the task failed."""
+
+        if not array_job.task_failed(task_id):
+            return False
+        speculative_array_job = self._get_speculative_array_job_of_task(array_job, task_id)
+        return speculative_array_job is None or speculative_array_job.task_failed(task_id)
+
+    def accept(self, array_job: ArrayDockingJob, task_id: str) -> str:
+        """Accept the first complete attempt of the task, cancelling the other. Returns the path of the task dir holding the accepted attempt's output."""
+
+        #
+        key = (array_job.name, task_id)
+        if key in self.key_to_accepted_task_dir_path_dict:
+            return self.key_to_accepted_task_dir_path_dict[key]
+        speculative_array_job = self._get_speculative_array_job_of_task(array_job, task_id)
+
+        #
+        if array_job.task_is_complete(task_id):
+            self._record_task_runtime(array_job, array_job.get_task_runtime_seconds(task_id))
+            if speculative_array_job is not None:
+                speculative_array_job.cancel_task(task_id)
+                shutil.rmtree(speculative_array_job.get_task_dir_path(task_id), ignore_errors=True)
+                logger.info(f"Original attempt of task {task_id} of {array_job.name} completed first. Cancelled speculative attempt.")
+            task_dir_path = array_job.get_task_dir_path(task_id)
+        elif speculative_array_job is not None and speculative_array_job.task_is_complete(task_id):
+            self._record_task_runtime(array_job, speculative_array_job.get_task_runtime_seconds(task_id))
+            array_job.cancel_task(task_id)
+            self.accepted_speculative_attempts.append((array_job, speculative_array_job, task_id))
+            logger.info(f"Speculative attempt of task {task_id} of {array_job.name} completed first. Cancelled original attempt.")
+            task_dir_path = speculative_array_job.get_task_dir_path(task_id)
+        else:
+            raise Exception(f"No attempt of task {task_id} of {array_job.name} is complete.")
+        self.key_to_accepted_task_dir_path_dict[key] = task_dir_path
+
+        return task_dir_path
+
+    def discard(self, array_job: ArrayDockingJob, task_id: str) -> None:
+        """Forget about the attempts of the task (e.g., before it is re-attempted because its output could not be loaded),
+        cancelling and removing its duplicate attempt, if any."""
+
+        #
+        key = (array_job.name, task_id)
+        self.key_to_accepted_task_dir_path_dict.pop(key, None)
+        self.accepted_speculative_attempts = [(j, s, t) for j, s, t in self.accepted_speculative_attempts if (j.name, t) != key]
+        speculative_array_job = self.key_to_speculative_array_job_dict.pop(key, None)
+        if speculative_array_job is not None:
+            speculative_array_job.cancel_task(task_id)
+            shutil.rmtree(speculative_array_job.get_task_dir_path(task_id), ignore_errors=True)
+
+    def finalize(self) -> None:
+        """Move the output of each accepted duplicate attempt into the original task dir, once the cancelled original
+        attempt has left the job scheduler queue (otherwise its clean-up could overwrite the moved output)."""
+
+        #
+        datetime_started = time.time()
+        remaining = list(self.accepted_speculative_attempts)
+        while remaining:
+            still_remaining = []
+            for array_job, speculative_array_job, task_id in remaining:
+                if array_job.task_is_on_queue(task_id):
+                    still_remaining.append((array_job, speculative_array_job, task_id))
+                    continue
+                task_dir_path = array_job.get_task_dir_path(task_id)
+                shutil.rmtree(task_dir_path, ignore_errors=True)
+                shutil.move(speculative_array_job.get_task_dir_path(task_id), task_dir_path)
+            remaining = still_remaining
+
+            #
+            if remaining:
+                if time.time() - datetime_started > MAX_SECONDS_TO_WAIT_FOR_CANCELLED_TASKS_TO_LEAVE_QUEUE:
+                    remaining_str = "\n\t".join([speculative_array_job.get_task_dir_path(task_id) for _, speculative_array_job, task_id in remaining])
+                    logger.warning(f"Cancelled original attempts of {len(remaining)} task(s) are still on the job scheduler queue. Output of their speculative attempts was left in:\n\t{remaining_str}")
+                    break
+                time.sleep(SECONDS_BETWEEN_QUEUE_CHECKS_FOR_CANCELLED_TASKS)
+        self.accepted_speculative_attempts = []
@@ -0,0 +1,55 @@
+import os
+import json
+import time
+import uuid
+import logging
+from datetime import datetime
+from typing import Optional
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+STATUS_FILE_NAME = "dockopt_status.json"
+MIN_SECONDS_BETWEEN_STATUS_FILE_WRITES = 5
+
+
+class DockoptJobStatus(object):
+    """Progress of a DockOpt job (state, current component, number of tasks complete, etc.), persisted to a small JSON
+    file in the job dir so that it can be reported (see `Dockopt.status`) without walking the job dir. Writes are
+    throttled to one per `MIN_SECONDS_BETWEEN_STATUS_FILE_WRITES` unless forced, and are atomic (via rename)."""
+
+    def __init__(self, status_file_path: str):
+        self.status_file_path = status_file_path
+        self.status_dict = {}
+        self._time_last_written = None
+
+    @staticmethod
+    def load(status_file_path: str) -> Optional[dict]:
+        """Returns None if there is no (readable) status file."""
+
+        try:
+            with open(status_file_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, force: bool = False, **kwargs) -> None:
+        self.status_dict.update(kwargs)
+        self.status_dict["updated_utc"] = datetime.utcnow().isoformat()
+        if not force and self._time_last_written is not None and time.time() - self._time_last_written < MIN_SECONDS_BETWEEN_STATUS_FILE_WRITES:
+            return
+        self._write()
+
+    def _write(self) -> None:
+        temp_status_file_path = f"{self.status_file_path}.{uuid.uuid4()}.tmp"
+        try:
+            with open(temp_status_file_path, "w") as f:
+                json.dump(self.status_dict, f, indent=2, default=str)
+            os.replace(temp_status_file_path, self.status_file_path)
+            self._time_last_written = time.time()
+        except OSError as e:  # progress reporting must never take down the job
+            logger.debug(f"Failed to write status file `{self.status_file_path}`: {e}")
+            if os.path.exists(temp_status_file_path):
+                os.remove(temp_status_file_path)
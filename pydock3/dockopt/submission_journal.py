@@ -0,0 +1,86 @@
+import os
+import json
+import logging
+from typing import List, Optional
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+SUBMISSION_JOURNAL_FILE_NAME = "submitted_array_jobs.jsonl"
+
+
+class SubmissionJournal(object):
+    """Append-only record (one JSON line per array job) of the array jobs submitted by a DockOpt step, so that a restarted
+    job can adopt the array jobs it already submitted instead of submitting them again.
+
+    Array jobs are adopted per docking configuration and only if its effective content (see
+    `DockingConfiguration.get_hexdigest_of_md5_hash_of_effective_content`) is unchanged since submission."""
+
+    def __init__(self, journal_file_path: str):
+        self.journal_file_path = journal_file_path
+
+        #
+        self.records = []
+        self.array_job_nums = set()
+        self._configuration_num_and_sub_dir_name_to_record_dict = {}
+        if os.path.isfile(self.journal_file_path):
+            with open(self.journal_file_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:  # e.g., last line was cut short by a crash
+                        logger.debug(f"Skipping malformed line in submission journal `{self.journal_file_path}`")
+                        continue
+                    self._add_record(record)
+
+    def _add_record(self, record: dict) -> None:
+        self.records.append(record)
+        self.array_job_nums.add(record["array_job_num"])
+        for configuration_num, effective_content_hash in record["configuration_num_to_effective_content_hash"].items():
+            self._configuration_num_and_sub_dir_name_to_record_dict[(int(configuration_num), record["sub_dir_name"])] = record  # latest submission wins
+
+    def add(
+        self,
+        array_job_num: int,
+        job_name: str,
+        sub_dir_name: str,
+        array_job_docking_configurations_file_path: str,
+        job_timeout_minutes: Optional[int],
+        job_memory_mb: Optional[int],
+        export_mol2: bool,
+        configuration_num_to_effective_content_hash_dict: dict,
+    ) -> None:
+        record = {
+            "array_job_num": array_job_num,
+            "job_name": job_name,
+            "sub_dir_name": sub_dir_name,
+            "array_job_docking_configurations_file_path": array_job_docking_configurations_file_path,
+            "job_timeout_minutes": job_timeout_minutes,
+            "job_memory_mb": job_memory_mb,
+            "export_mol2": export_mol2,
+            "configuration_num_to_effective_content_hash": {str(k): v for k, v in configuration_num_to_effective_content_hash_dict.items()},
+        }
+        with open(self.journal_file_path, "a") as f:
+            f.write(f"{json.dumps(record)}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._add_record(record)
+
+    def get_records_of_docking_configuration(self, configuration_num: int, effective_content_hash: str, sub_dir_names: List[str]) -> Optional[List[dict]]:
+        """Returns the records of the array jobs (one per sub dir, in the order of `sub_dir_names`) that the given docking
+        configuration was submitted in, or None if it was not submitted in all of them with the given effective content."""
+
+        records = []
+        for sub_dir_name in sub_dir_names:
+            record = self._configuration_num_and_sub_dir_name_to_record_dict.get((configuration_num, sub_dir_name))
+            if record is None:
+                return None
+            if record["configuration_num_to_effective_content_hash"][str(configuration_num)] != effective_content_hash:
+                return None
+            if not os.path.isfile(record["array_job_docking_configurations_file_path"]):
+                return None
+            records.append(record)
+
+        return records
@@ -0,0 +1,145 @@
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+from pydock3.config import Parameter
+from pydock3.dockopt.docking_configuration import DockingConfiguration
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+PARAMETER_KEY_PREFIX = "parameters."
+DEFAULT_NUM_NEAREST_NEIGHBORS = 5
+SIMILARITY_BLOCK_SIZE = 1024
+
+
+def _get_comparable_value(value):
+    """Raw value of a parameter as a float if numeric and as a string otherwise (values loaded from results CSVs may be of either)."""
+
+    if isinstance(value, Parameter):
+        value = value.value
+    if isinstance(value, (bool, np.bool_)) or value is None:
+        return str(value)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if np.isnan(value):  # `None` is written to results CSVs as an empty field
+        return str(None)
+    return value
+
+
+def _get_param_dict(d: dict) -> dict:
+    return {key: _get_comparable_value(value) for key, value in d.items() if key.startswith(PARAMETER_KEY_PREFIX)}
+
+
+class SubmissionOrdering(object):
+    """Decides the order in which the docking configurations of a step are submitted (and their dock files generated).
+
+    With method `configuration_num` (the default), configurations are submitted in order of configuration number. With
+    method `expected_criterion_value`, those with the highest expected criterion value are submitted first, so that the
+    most promising configurations produce results early on. The expected criterion value of a configuration is the
+    similarity-weighted mean criterion value of its `num_nearest_neighbors` most similar reference configurations, i.e.
+    configurations with known criterion values: those docked by earlier components of the pipeline and those found in
+    the results database. Similarity is the mean per-parameter similarity over the parameters the two configurations
+    share (1 for equal values, otherwise 0 for categorical parameters and 1 minus the range-normalized difference for
+    numeric ones). Configurations with no reference configurations go last."""
+
+    METHODS = ["configuration_num", "expected_criterion_value"]
+
+    def __init__(self, method: str = "configuration_num", num_nearest_neighbors: int = DEFAULT_NUM_NEAREST_NEIGHBORS):
+        if method not in self.METHODS:
+            raise ValueError(f"`submission_ordering.method` must be one of: {self.METHODS}. Witnessed: {method}")
+        self.method = method
+        self.num_nearest_neighbors = num_nearest_neighbors
+
+        #
+        self.reference_param_dicts = []
+        self.reference_criterion_values = []
+
+    @staticmethod
+    def from_dict(d: Optional[dict]) -> "SubmissionOrdering":
+        if not d:
+            return SubmissionOrdering()
+        return SubmissionOrdering(**d)
+
+    @property
+    def uses_reference_configurations(self) -> bool:
+        return self.method == "expected_criterion_value"
+
+    def add_reference_configuration(self, d: dict, criterion_value: float) -> None:
+        """Add a configuration with known criterion value. `d` is a docking configuration dict or results dataframe row."""
+
+        if criterion_value is None or np.isnan(criterion_value):
+            return
+        self.reference_param_dicts.append(_get_param_dict(d))
+        self.reference_criterion_values.append(float(criterion_value))
+
+    def get_configuration_num_to_expected_criterion_value_dict(self, docking_configurations: List[DockingConfiguration]) -> Dict[int, float]:
+        if not self.reference_param_dicts:
+            return {}
+
+        #
+        param_dicts = [_get_param_dict(dc.to_dict()) for dc in docking_configurations]
+        keys = sorted(set([key for param_dict in param_dicts for key in param_dict]) & set([key for param_dict in self.reference_param_dicts for key in param_dict]))
+        reference_criterion_values = np.array(self.reference_criterion_values)
+
+        # per-parameter similarities are computed in blocks of configurations (one row per configuration, one column per reference)
+        configuration_num_to_expected_criterion_value_dict = {}
+        for block_start in range(0, len(docking_configurations), SIMILARITY_BLOCK_SIZE):
+            block_param_dicts = param_dicts[block_start:block_start + SIMILARITY_BLOCK_SIZE]
+            similarity_sums = np.zeros((len(block_param_dicts), len(self.reference_param_dicts)))
+            num_shared_keys = np.zeros((len(block_param_dicts), len(self.reference_param_dicts)))
+            for key in keys:
+                values = [param_dict.get(key) for param_dict in block_param_dicts]
+                reference_values = [param_dict.get(key) for param_dict in self.reference_param_dicts]
+                shared = np.array([value is not None for value in values])[:, np.newaxis] & np.array([value is not None for value in reference_values])[np.newaxis, :]
+                present_values = [value for value in values + reference_values if value is not None]
+
+                # categorical similarity (also used for numeric parameters that take non-numeric values, e.g. None)
+                value_str_to_code_dict = {value_str: i for i, value_str in enumerate(sorted(set([str(value) for value in present_values])))}
+                a = np.array([value_str_to_code_dict[str(value)] if value is not None else -1 for value in values])
+                b = np.array([value_str_to_code_dict[str(value)] if value is not None else -2 for value in reference_values])
+                similarity = (a[:, np.newaxis] == b[np.newaxis, :]).astype(float)
+
+                # numeric similarity
+                numeric_values = [value for value in present_values if isinstance(value, float)]
+                if len(set(numeric_values)) > 1:
+                    a = np.array([value if isinstance(value, float) else np.nan for value in values])
+                    b = np.array([value if isinstance(value, float) else np.nan for value in reference_values])
+                    with np.errstate(invalid="ignore"):
+                        numeric_similarity = 1.0 - np.abs(a[:, np.newaxis] - b[np.newaxis, :]) / (max(numeric_values) - min(numeric_values))
+                    similarity = np.where(np.isnan(numeric_similarity), similarity, numeric_similarity)
+                similarity_sums += np.where(shared, similarity, 0.0)
+                num_shared_keys += shared
+            similarities = np.divide(similarity_sums, num_shared_keys, out=np.zeros(similarity_sums.shape), where=(num_shared_keys > 0))
+
+            #
+            for dc, row in zip(docking_configurations[block_start:block_start + SIMILARITY_BLOCK_SIZE], similarities):
+                nearest_indices = np.argsort(-row, kind="stable")[:self.num_nearest_neighbors]
+                nearest_indices = nearest_indices[row[nearest_indices] > 0]
+                if len(nearest_indices) == 0:
+                    continue
+                weights = row[nearest_indices]
+                configuration_num_to_expected_criterion_value_dict[dc.configuration_num] = float(np.dot(weights, reference_criterion_values[nearest_indices]) / weights.sum())
+
+        return configuration_num_to_expected_criterion_value_dict
+
+    def order(self, docking_configurations: List[DockingConfiguration]) -> List[DockingConfiguration]:
+        if self.method == "configuration_num":
+            return sorted(docking_configurations, key=lambda dc: dc.configuration_num)
+
+        #
+        configuration_num_to_expected_criterion_value_dict = self.get_configuration_num_to_expected_criterion_value_dict(docking_configurations)
+        logger.info(f"Estimated expected criterion value of {len(configuration_num_to_expected_criterion_value_dict)} out of {len(docking_configurations)} docking configurations from {len(self.reference_param_dicts)} reference configurations")
+
+        return sorted(
+            docking_configurations,
+            key=lambda dc: (
+                -configuration_num_to_expected_criterion_value_dict.get(dc.configuration_num, -np.inf),
+                dc.configuration_num,
+            ),
+        )
@@ -0,0 +1,301 @@
+import os
+import re
+import glob
+import math
+import time
+import logging
+import collections
+from enum import Enum
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from pydock3.jobs import ArrayDockingJob, OUTDOCK_FILE_NAME
+from pydock3.job_schedulers import (
+    JobScheduler,
+    TaskAccountingRecord,
+    TASK_STATE_COMPLETED,
+    TASK_STATE_TIMEOUT,
+    TASK_STATE_OUT_OF_MEMORY,
+    TASK_STATE_NODE_FAIL,
+    TASK_STATE_PREEMPTED,
+    TASK_STATE_CANCELLED,
+)
+from pydock3.dockopt.runtime_model import JOB_TIMEOUT_MINUTES_OPTIONS, MEMORY_MB_GRANULARITY
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+MIN_SECONDS_BETWEEN_ACCOUNTING_QUERIES = 30
+NUM_TAIL_LINES_TO_INSPECT = 50
+JOB_MEMORY_MB_MULTIPLIER = 2.0  # on re-attempting a task killed for exceeding its memory
+MIN_NUM_NODE_FAILURES_TO_EXCLUDE_NODE = 3  # within `NODE_FAILURES_WINDOW_SECONDS`, for a node to be excluded from every task
+NODE_FAILURES_WINDOW_SECONDS = 3600
+MAX_NUM_EXCLUDED_NODES = 10  # per re-attempt
+
+# messages in the stderr of a task written by the job scheduler itself
+STDERR_PATTERN_TO_JOB_SCHEDULER_STATE_DICT = {
+    r"DUE TO TIME LIMIT": TASK_STATE_TIMEOUT,
+    r"oom[-_]kill|Exceeded job memory limit|Out Of Memory": TASK_STATE_OUT_OF_MEMORY,
+    r"DUE TO NODE FAILURE": TASK_STATE_NODE_FAIL,
+    r"DUE TO PREEMPTION": TASK_STATE_PREEMPTED,
+}
+
+# messages in the stderr or OUTDOCK file of a task written by DOCK (or by the Fortran runtime / shell on its behalf)
+DOCK_INTERRUPT_PATTERN = r"interrupt signal detected since last ligand"  # soft time limit reached (see `rundock.bash`)
+DOCK_OUT_OF_MEMORY_PATTERN = r"forrtl: severe \(41\)|insufficient virtual memory|Cannot allocate memory"
+DOCK_FILE_SYSTEM_ERROR_PATTERN = r"No such file or directory|Stale file handle|Input/output error|Permission denied|forrtl: severe \((9|29|30)\)"  # e.g., a lost mount, so worth re-attempting
+DOCK_ERROR_PATTERNS = [  # deterministic: DOCK crashed or stopped itself
+    r"^\s*forrtl: severe",
+    r"^\s*Program received signal",
+    r"Segmentation fault",
+    r"^\s*ERROR STOP\b",
+    r"^\s*STOP\s+[1-9]",  # non-zero stop code
+]
+
+
+class TaskFailureClass(Enum):
+    TIME_LIMIT = 1
+    OUT_OF_MEMORY = 2
+    NODE_FAILURE = 3
+    PREEMPTED = 4
+    CANCELLED = 5
+    DOCK_ERROR = 6  # deterministic: re-attempting the task would fail the same way
+    OUTPUT_MISSING = 7  # task finished without error but its output never appeared (e.g., file system issue)
+    UNKNOWN = 8
+
+
+#
+JOB_SCHEDULER_STATE_TO_TASK_FAILURE_CLASS_DICT = {
+    TASK_STATE_TIMEOUT: TaskFailureClass.TIME_LIMIT,
+    TASK_STATE_OUT_OF_MEMORY: TaskFailureClass.OUT_OF_MEMORY,
+    TASK_STATE_NODE_FAIL: TaskFailureClass.NODE_FAILURE,
+    TASK_STATE_PREEMPTED: TaskFailureClass.PREEMPTED,
+    TASK_STATE_CANCELLED: TaskFailureClass.CANCELLED,
+}
+
+
+@dataclass
+class TaskFailure:
+    failure_class: TaskFailureClass
+    reason: str
+    accounting_record: Optional[TaskAccountingRecord] = None
+
+
+def get_tail_lines_of_file(file_path: str, num_lines: int = NUM_TAIL_LINES_TO_INSPECT) -> List[str]:
+    try:
+        with open(file_path, "r", errors="replace") as f:
+            return f.readlines()[-num_lines:]
+    except OSError:
+        return []
+
+
+def get_job_timeout_minutes_as_int(job_timeout_minutes) -> Optional[int]:
+    """e.g., `90`, `"90"`, `"90:00"`, `"1:30:00"`, or `"1-12:00:00"` (as accepted by Slurm's `--time`)"""
+
+    if job_timeout_minutes is None:
+        return None
+    job_timeout_minutes_str = str(job_timeout_minutes).strip()
+    days_str, _, time_str = job_timeout_minutes_str.rpartition('-')
+    if not re.match(r'^\d*$', days_str) or not re.match(r'^\d+(:\d+){0,2}$', time_str):
+        return None
+    days = int(days_str) if days_str else 0
+    parts = [int(x) for x in time_str.split(':')]
+    if days_str:  # `days-hours[:minutes[:seconds]]`
+        parts += [0] * (3 - len(parts))
+        return 1440 * days + 60 * parts[0] + parts[1]
+    if len(parts) == 3:  # `hours:minutes:seconds`
+        return 60 * parts[0] + parts[1]
+
+    return parts[0]  # `minutes[:seconds]`
+
+
+class TaskFailureClassifier(object):
+    """Works out why a task of an array job failed, from (in order of precedence) the job scheduler's accounting of the
+    task's latest attempt (queried in bulk per array job, see `JobScheduler.get_task_accounting_records`), the messages
+    in the task's stderr, and the tail of its OUTDOCK file (which `rundock.bash` copies out even if DOCK crashed).
+
+    A task whose output was not detected has no OUTDOCK file, so then only the first two sources can tell why it failed.
+    Its stderr log is found from the accounting record or, if there is none (yet), as the newest of its stderr logs."""
+
+    def __init__(self, job_scheduler: JobScheduler):
+        self.job_scheduler = job_scheduler
+
+        #
+        self._job_name_to_time_of_last_query_dict: Dict[str, float] = {}
+        self._job_name_to_task_id_to_accounting_record_dict: Dict[str, Dict[str, TaskAccountingRecord]] = {}
+        self._accounting_is_available = True
+
+    def get_accounting_record(self, array_job: ArrayDockingJob, task_id: str) -> Optional[TaskAccountingRecord]:
+        """Returns None if the task's latest attempt is not (yet) in the job scheduler's accounting."""
+
+        if not self._accounting_is_available:
+            return None
+
+        #
+        task_id_to_record_dict = self._job_name_to_task_id_to_accounting_record_dict.get(array_job.name, {})
+        time_of_last_query = self._job_name_to_time_of_last_query_dict.get(array_job.name)
+        if task_id not in task_id_to_record_dict and (time_of_last_query is None or time.time() - time_of_last_query >= MIN_SECONDS_BETWEEN_ACCOUNTING_QUERIES):
+            try:
+                task_id_to_record_dict = self.job_scheduler.get_task_accounting_records(array_job.name)
+            except NotImplementedError:
+                self._accounting_is_available = False
+                return None
+            except Exception as e:
+                logger.debug(f"Failed to get accounting of array job {array_job.name}: {e}")
+                task_id_to_record_dict = {}
+            self._job_name_to_task_id_to_accounting_record_dict[array_job.name] = task_id_to_record_dict
+            self._job_name_to_time_of_last_query_dict[array_job.name] = time.time()
+
+        return task_id_to_record_dict.get(task_id)
+
+    def forget(self, array_job: ArrayDockingJob, task_id: str) -> None:
+        """Forget the accounting of the task (e.g., because it is being re-attempted)."""
+
+        self._job_name_to_task_id_to_accounting_record_dict.get(array_job.name, {}).pop(task_id, None)
+
+    def _get_task_stderr_file_path(self, array_job: ArrayDockingJob, task_id: str, record: Optional[TaskAccountingRecord]) -> str:
+        if record is not None:
+            return self.job_scheduler.get_task_stderr_file_path(array_job.name, array_job.log_dir.path, record.job_id, task_id)
+
+        # the job ID of the latest attempt is unknown, so take the newest stderr log of any attempt
+        pattern = self.job_scheduler.get_task_stderr_file_path(glob.escape(array_job.name), glob.escape(array_job.log_dir.path), "*", task_id)
+        file_paths = glob.glob(pattern)
+        if not file_paths:
+            return pattern  # i.e., none
+        return max(file_paths, key=os.path.getmtime)
+
+    def classify(self, array_job: ArrayDockingJob, task_id: str) -> TaskFailure:
+        record = self.get_accounting_record(array_job, task_id)
+
+        #
+        if record is not None and record.state in JOB_SCHEDULER_STATE_TO_TASK_FAILURE_CLASS_DICT:
+            return TaskFailure(JOB_SCHEDULER_STATE_TO_TASK_FAILURE_CLASS_DICT[record.state], f"job scheduler reported state {record.state} on node {record.node_name}", record)
+
+        #
+        stderr_lines = get_tail_lines_of_file(self._get_task_stderr_file_path(array_job, task_id, record))
+        for line in stderr_lines:
+            for pattern, state in STDERR_PATTERN_TO_JOB_SCHEDULER_STATE_DICT.items():
+                if re.search(pattern, line):
+                    return TaskFailure(JOB_SCHEDULER_STATE_TO_TASK_FAILURE_CLASS_DICT[state], f"stderr: {line.strip()}", record)
+
+        #
+        outdock_lines = get_tail_lines_of_file(os.path.join(array_job.get_task_dir_path(task_id), OUTDOCK_FILE_NAME))
+        for line in outdock_lines + stderr_lines:
+            if re.search(DOCK_INTERRUPT_PATTERN, line):
+                return TaskFailure(TaskFailureClass.TIME_LIMIT, f"DOCK was interrupted: {line.strip()}", record)
+        for line in outdock_lines + stderr_lines:
+            if re.search(DOCK_OUT_OF_MEMORY_PATTERN, line):
+                return TaskFailure(TaskFailureClass.OUT_OF_MEMORY, f"DOCK ran out of memory: {line.strip()}", record)
+            if re.search(DOCK_FILE_SYSTEM_ERROR_PATTERN, line):
+                return TaskFailure(TaskFailureClass.UNKNOWN, f"file system error: {line.strip()}", record)
+        for line in outdock_lines + stderr_lines:
+            if any([re.search(pattern, line) for pattern in DOCK_ERROR_PATTERNS]):
+                return TaskFailure(TaskFailureClass.DOCK_ERROR, f"DOCK error: {line.strip()}", record)
+
+        #
+        if record is not None and record.state == TASK_STATE_COMPLETED and not outdock_lines:
+            return TaskFailure(TaskFailureClass.OUTPUT_MISSING, "task completed but its OUTDOCK file is missing", record)
+        if record is not None:
+            return TaskFailure(TaskFailureClass.UNKNOWN, f"job scheduler reported state {record.state} with exit code {record.exit_code}", record)
+
+        return TaskFailure(TaskFailureClass.UNKNOWN, "no accounting of task found", record)
+
+
+class TaskRetryPolicy(object):
+    """Decides whether and how to re-attempt a failed task, by the class of its failure:
+
+    - TIME_LIMIT: with the next longer time limit (see `JOB_TIMEOUT_MINUTES_OPTIONS`), up to `max_job_timeout_minutes`;
+      not re-attempted if the time limit cannot be raised
+    - OUT_OF_MEMORY: with `JOB_MEMORY_MB_MULTIPLIER` times the memory (or the peak memory used, if none was requested)
+    - NODE_FAILURE: excluding the nodes the task itself failed on, as well as every node that failed at least
+      `MIN_NUM_NODE_FAILURES_TO_EXCLUDE_NODE` tasks within the last `NODE_FAILURES_WINDOW_SECONDS` (so that a node is
+      excluded from every task only while it keeps failing, not for good after one failure), up to
+      `MAX_NUM_EXCLUDED_NODES` nodes
+    - DOCK_ERROR: not re-attempted
+    - otherwise: as before
+    """
+
+    def __init__(self, max_job_timeout_minutes: Optional[int] = None):
+        self.max_job_timeout_minutes = max_job_timeout_minutes
+
+        #
+        self._key_to_job_timeout_minutes_dict: Dict[Tuple[str, str], Optional[int]] = {}
+        self._key_to_job_memory_mb_dict: Dict[Tuple[str, str], Optional[int]] = {}
+        self._key_to_node_names_failed_on_dict: Dict[Tuple[str, str], List[str]] = collections.defaultdict(list)
+        self._node_name_to_failure_times_dict: Dict[str, List[float]] = collections.defaultdict(list)
+
+    def _get_num_recent_failures_of_node(self, node_name: str) -> int:
+        failure_times = [t for t in self._node_name_to_failure_times_dict[node_name] if time.time() - t <= NODE_FAILURES_WINDOW_SECONDS]
+        self._node_name_to_failure_times_dict[node_name] = failure_times
+        return len(failure_times)
+
+    @property
+    def excluded_node_names(self) -> Set[str]:
+        """Nodes currently excluded from every task (i.e., those failing repeatedly)."""
+
+        return set([node_name for node_name in list(self._node_name_to_failure_times_dict.keys()) if self._get_num_recent_failures_of_node(node_name) >= MIN_NUM_NODE_FAILURES_TO_EXCLUDE_NODE])
+
+    def _get_excluded_node_names_of_task(self, key: Tuple[str, str]) -> List[str]:
+        # the task's own failed nodes (most recent first), then the nodes failing most often
+        node_names = list(reversed(self._key_to_node_names_failed_on_dict.get(key, [])))
+        node_names += sorted(self.excluded_node_names - set(node_names), key=lambda node_name: (-self._get_num_recent_failures_of_node(node_name), node_name))
+        node_names = list(dict.fromkeys(node_names))
+
+        return sorted(node_names[:MAX_NUM_EXCLUDED_NODES])
+
+    def get_retry_submission_kwargs(self, array_job: ArrayDockingJob, task_id: str, task_failure: TaskFailure) -> Optional[dict]:
+        """Returns the kwargs of `ArrayDockingJob.submit_task` with which to re-attempt the task, or None if it should
+        not be re-attempted."""
+
+        key = (array_job.name, task_id)
+        job_timeout_minutes = self._key_to_job_timeout_minutes_dict.get(key, array_job.job_timeout_minutes)
+        job_memory_mb = self._key_to_job_memory_mb_dict.get(key, array_job.job_memory_mb)
+        record = task_failure.accounting_record
+
+        #
+        if task_failure.failure_class == TaskFailureClass.DOCK_ERROR:
+            return None
+        elif task_failure.failure_class == TaskFailureClass.TIME_LIMIT:
+            job_timeout_minutes = self._get_next_job_timeout_minutes(job_timeout_minutes)
+            if job_timeout_minutes is None:
+                return None
+        elif task_failure.failure_class == TaskFailureClass.OUT_OF_MEMORY:
+            if job_memory_mb is not None:
+                memory_mb = JOB_MEMORY_MB_MULTIPLIER * job_memory_mb
+            elif record is not None and record.max_rss_mb is not None:
+                memory_mb = JOB_MEMORY_MB_MULTIPLIER * record.max_rss_mb
+            else:
+                memory_mb = None
+            if memory_mb is not None:
+                job_memory_mb = int(math.ceil(memory_mb / MEMORY_MB_GRANULARITY) * MEMORY_MB_GRANULARITY)
+        elif task_failure.failure_class == TaskFailureClass.NODE_FAILURE:
+            if record is not None and record.node_name is not None:
+                self._key_to_node_names_failed_on_dict[key].append(record.node_name)
+                self._node_name_to_failure_times_dict[record.node_name].append(time.time())
+
+        #
+        self._key_to_job_timeout_minutes_dict[key] = job_timeout_minutes
+        self._key_to_job_memory_mb_dict[key] = job_memory_mb
+
+        return {
+            "job_timeout_minutes": job_timeout_minutes,
+            "job_memory_mb": job_memory_mb,
+            "excluded_node_names": self._get_excluded_node_names_of_task(key),
+        }
+
+    def _get_next_job_timeout_minutes(self, job_timeout_minutes: Optional[int]) -> Optional[int]:
+        """Returns None if the time limit cannot be raised."""
+
+        job_timeout_minutes = get_job_timeout_minutes_as_int(job_timeout_minutes)
+        max_job_timeout_minutes = get_job_timeout_minutes_as_int(self.max_job_timeout_minutes)
+        if job_timeout_minutes is None or max_job_timeout_minutes is None:
+            return None
+        if job_timeout_minutes >= max_job_timeout_minutes:
+            return None
+        for option in JOB_TIMEOUT_MINUTES_OPTIONS:
+            if option > job_timeout_minutes:
+                return min(option, max_job_timeout_minutes)
+
+        return max_job_timeout_minutes
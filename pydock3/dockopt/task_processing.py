@@ -0,0 +1,266 @@
+import os
+import time
+import logging
+import collections
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from pydock3.jobs import ArrayDockingJob, OUTDOCK_FILE_NAME
+from pydock3.job_schedulers import JobScheduler
+from pydock3.files import OutdockFile
+from pydock3.retrodock.retrodock import get_results_dataframe_from_actives_job_and_decoys_job_outdock_files
+from pydock3.dockopt.speculation import SpeculativeTaskExecutor
+from pydock3.dockopt.task_failures import TaskFailureClassifier, TaskRetryPolicy
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+MIN_SECONDS_BETWEEN_QUEUE_CHECKS = 2
+MIN_SECONDS_BETWEEN_TASK_OUTPUT_DETECTION_REATTEMPTS = 30
+MIN_SECONDS_BETWEEN_TASK_OUTPUT_LOADING_REATTEMPTS = 30
+MAX_TASK_OUTPUT_DETECTION_REATTEMPTS = 1
+MAX_TASK_OUTPUT_LOADING_REATTEMPTS = 1
+
+
+class TaskResultsProcessor(object):
+    """Awaits the tasks of submitted array docking jobs (an actives job and a decoys job per task) and loads the results
+    of each task as soon as both of its OUTDOCK files appear.
+
+    Failed tasks are re-attempted according to why they failed (see `TaskFailureClassifier` and `TaskRetryPolicy`), up to
+    `max_reattempts` times. Optionally, straggler tasks are re-run speculatively (see `SpeculativeTaskExecutor`). Used by
+    `DockoptStep` as well as by the orchestration benchmark (see `pydock3.simulation.benchmark`), so that the latter
+    measures the real thing."""
+
+    def __init__(
+            self,
+            job_scheduler: JobScheduler,
+            max_reattempts: int,
+            allow_failed_tasks: bool,
+            max_job_timeout_minutes: Optional[int] = None,
+            speculative_execution_runtime_multiple: Optional[float] = None,
+    ):
+        self.max_reattempts = max_reattempts
+        self.allow_failed_tasks = allow_failed_tasks
+        self.speculative_execution_runtime_multiple = speculative_execution_runtime_multiple
+
+        #
+        self.task_failure_classifier = TaskFailureClassifier(job_scheduler)
+        self.task_retry_policy = TaskRetryPolicy(max_job_timeout_minutes=max_job_timeout_minutes)
+        self.speculative_task_executor: Optional[SpeculativeTaskExecutor] = None
+
+        #
+        self.task_id_to_num_reattempts_dict: Dict[str, int] = collections.defaultdict(int)
+        self.task_ids_failed: List[str] = []
+        self.failure_class_name_to_count_dict: Dict[str, int] = collections.Counter()
+
+    def _task_is_complete(self, array_job: ArrayDockingJob, task_id: str) -> bool:
+        if self.speculative_task_executor is not None:
+            return self.speculative_task_executor.task_is_complete(array_job, task_id)
+        return array_job.task_is_complete(task_id)
+
+    def _task_failed(self, array_job: ArrayDockingJob, task_id: str) -> bool:
+        if self.speculative_task_executor is not None:
+            return self.speculative_task_executor.task_failed(array_job, task_id)
+        return array_job.task_failed(task_id)
+
+    def _get_retry_submission_kwargs_list(self, task_id: str, failed_array_jobs: List[ArrayDockingJob]) -> Optional[List[dict]]:
+        """Returns the kwargs of `submit_task` per failed array job, or None if re-attempting the task cannot succeed."""
+
+        retry_submission_kwargs_list = []
+        for array_job in failed_array_jobs:
+            task_failure = self.task_failure_classifier.classify(array_job, task_id)
+            self.failure_class_name_to_count_dict[task_failure.failure_class.name] += 1
+            logger.warning(f"Task {task_id} of array job {array_job.name} failed: {task_failure.failure_class.name} ({task_failure.reason})")
+            retry_submission_kwargs = self.task_retry_policy.get_retry_submission_kwargs(array_job, task_id, task_failure)
+            if retry_submission_kwargs is None:
+                logger.warning(f"Not re-attempting task {task_id} since re-attempting it cannot succeed ({task_failure.failure_class.name})")
+                return None
+            retry_submission_kwargs_list.append(retry_submission_kwargs)
+
+        return retry_submission_kwargs_list
+
+    def _reattempt_failed_task(self, task_id: str, failed_array_jobs: List[ArrayDockingJob]) -> bool:
+        """Returns False (having given up on the task) if it has no attempts left or if re-attempting it cannot succeed."""
+
+        #
+        if self.task_id_to_num_reattempts_dict[task_id] + 1 > self.max_reattempts:
+            logger.warning(f"Maximum allowed attempts ({self.max_reattempts + 1}) exhausted for task {task_id}")
+            self._give_up_on_task(task_id, f"Failed to complete task {task_id} after {self.max_reattempts + 1} attempts.")
+            return False
+        retry_submission_kwargs_list = self._get_retry_submission_kwargs_list(task_id, failed_array_jobs)
+        if retry_submission_kwargs_list is None:
+            self._give_up_on_task(task_id, f"Failed to complete task {task_id}. Re-attempting it cannot succeed.")
+            return False
+
+        #
+        for array_job, retry_submission_kwargs in zip(failed_array_jobs, retry_submission_kwargs_list):
+            if self.speculative_task_executor is not None:  # free the slot & dir of the (failed) speculative attempt, if any, so the re-attempt can get one too
+                self.speculative_task_executor.discard(array_job, task_id)
+            array_job.submit_task(
+                task_id,
+                skip_if_complete=False,
+                **retry_submission_kwargs,
+            )
+            self.task_failure_classifier.forget(array_job, task_id)
+        self.task_id_to_num_reattempts_dict[task_id] += 1
+        logger.info(
+            f"Re-attempting task {task_id} (attempt {self.task_id_to_num_reattempts_dict[task_id] + 1} of at most {self.max_reattempts + 1})"
+        )
+
+        return True
+
+    def _give_up_on_task(self, task_id: str, message: str) -> None:
+        if not self.allow_failed_tasks:
+            raise Exception(message)
+        self.task_ids_failed.append(task_id)
+
+    def run(
+            self,
+            task_ids: List[str],
+            task_id_to_array_jobs_dict: Dict[str, List[ArrayDockingJob]],
+            on_task_results_loaded: Callable[[str, pd.DataFrame, List[ArrayDockingJob]], None],
+            on_queue_cycle: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        """Process the given tasks until each has had its results loaded or has been given up on.
+
+        `on_task_results_loaded` is called with the task ID, the combined results dataframe of its actives & decoys jobs
+        (see `get_results_dataframe_from_actives_job_and_decoys_job_outdock_files`), and its array jobs (actives job,
+        then decoys job). If given, `on_queue_cycle` is called with the number of tasks remaining before each task is
+        looked at (e.g., to report progress)."""
+
+        #
+        processing_queue = collections.deque(task_ids)
+        task_id_to_num_task_output_detection_failed_attempts_dict = collections.defaultdict(int)
+        task_id_to_num_task_output_loading_failed_attempts_dict = collections.defaultdict(int)
+        datetime_queue_was_last_checked = datetime.min
+        task_id_to_datetime_task_output_detection_was_last_attempted_dict = {task_id: datetime.min for task_id in task_ids}
+        task_id_to_datetime_task_output_loading_was_last_attempted_dict = {task_id: datetime.min for task_id in task_ids}
+
+        # optionally, re-run straggler tasks speculatively (first complete attempt wins)
+        if self.speculative_execution_runtime_multiple is not None:
+            self.speculative_task_executor = SpeculativeTaskExecutor(
+                straggler_runtime_multiple=self.speculative_execution_runtime_multiple,
+                num_tasks=2 * len(task_ids),  # actives task & decoys task per docking configuration
+            )
+        else:
+            self.speculative_task_executor = None
+
+        #
+        while len(processing_queue) > 0:
+            if on_queue_cycle is not None:
+                on_queue_cycle(len(processing_queue))
+            task_id = processing_queue.popleft()
+            array_jobs = task_id_to_array_jobs_dict[task_id]  # array jobs of the chunk this task belongs to
+
+            #
+            if any([not self._task_is_complete(array_job, task_id) for array_job in array_jobs]):  # one or both OUTDOCK files do not exist yet
+                time.sleep(
+                    0.01
+                )  # sleep for a bit
+
+                #
+                datetime_now = datetime.now()
+                if datetime_now < (datetime_queue_was_last_checked + timedelta(seconds=MIN_SECONDS_BETWEEN_QUEUE_CHECKS)):
+                    processing_queue.append(task_id)  # move to back of queue
+                    continue  # move on to next in queue in order to more efficiently use time between queue checks
+
+                #
+                datetime_queue_was_last_checked = datetime.now()
+                if self.speculative_task_executor is not None:
+                    for array_job in array_jobs:
+                        if not self._task_is_complete(array_job, task_id):
+                            self.speculative_task_executor.launch_speculative_attempt_if_straggler(array_job, task_id)
+                if any([self._task_failed(array_job, task_id) for array_job in array_jobs]):
+                    #
+                    if datetime.now() < (task_id_to_datetime_task_output_detection_was_last_attempted_dict[task_id] + timedelta(seconds=MIN_SECONDS_BETWEEN_TASK_OUTPUT_DETECTION_REATTEMPTS)):
+                        processing_queue.append(task_id)  # move to back of queue
+                        continue  # move on to next in queue in order to more efficiently use time between queue checks
+                    task_id_to_datetime_task_output_detection_was_last_attempted_dict[task_id] = datetime.now()
+
+                    #
+                    task_id_to_num_task_output_detection_failed_attempts_dict[task_id] += 1
+                    logger.warning(f"Failed to detect output for task {task_id}")
+
+                    #
+                    if task_id_to_num_task_output_detection_failed_attempts_dict[task_id] > MAX_TASK_OUTPUT_DETECTION_REATTEMPTS:
+                        # re-attempt incomplete task(s), unless re-attempting cannot succeed
+                        failed_array_jobs = [array_job for array_job in array_jobs if self._task_failed(array_job, task_id)]
+                        if not self._reattempt_failed_task(task_id, failed_array_jobs):
+                            continue  # move on to next in queue without re-attempting failed task
+                        task_id_to_num_task_output_detection_failed_attempts_dict[task_id] = 0  # reset task failures counter
+                    else:
+                        # task must have timed out / failed for one or both jobs
+                        logger.warning(
+                            f"Failed to detect output for task {task_id}. Will move on in queue and re-attempt once it cycles back around."
+                        )
+                        time.sleep(1)
+
+                #
+                processing_queue.append(task_id)  # move to back of queue
+                continue  # move on to next in queue
+
+            # read the OUTDOCK files of the accepted attempts
+            if self.speculative_task_executor is not None:
+                task_dir_paths = [self.speculative_task_executor.accept(array_job, task_id) for array_job in array_jobs]
+            else:
+                task_dir_paths = [array_job.get_task_dir_path(task_id) for array_job in array_jobs]
+            actives_outdock_file_path, decoys_outdock_file_path = [os.path.join(task_dir_path, OUTDOCK_FILE_NAME) for task_dir_path in task_dir_paths]
+
+            # load outdock files and get dataframe
+            try:
+                # get dataframe of actives job results and decoys job results combined
+                df = get_results_dataframe_from_actives_job_and_decoys_job_outdock_files(
+                    actives_outdock_file_path, decoys_outdock_file_path
+                )
+            except Exception:  # if outdock files failed to be parsed then re-attempt task
+                try:
+                    time.sleep(0.01)  # sleep for a bit and try again
+                    df = get_results_dataframe_from_actives_job_and_decoys_job_outdock_files(
+                        actives_outdock_file_path, decoys_outdock_file_path
+                    )
+                except Exception as e:
+                    #
+                    if datetime.now() < (task_id_to_datetime_task_output_loading_was_last_attempted_dict[task_id] + timedelta(seconds=MIN_SECONDS_BETWEEN_TASK_OUTPUT_LOADING_REATTEMPTS)):
+                        processing_queue.append(task_id)  # move to back of queue
+                        continue  # move on to next in queue in order to more efficiently use time between queue checks
+                    task_id_to_datetime_task_output_loading_was_last_attempted_dict[task_id] = datetime.now()
+
+                    #
+                    task_id_to_num_task_output_loading_failed_attempts_dict[task_id] += 1
+                    logger.warning(f"Failed to load output for task {task_id} due to error: {e}")
+
+                    #
+                    if task_id_to_num_task_output_loading_failed_attempts_dict[task_id] > MAX_TASK_OUTPUT_LOADING_REATTEMPTS:
+                        failed_array_jobs = []
+                        for array_job, outdock_file_path in zip(array_jobs, [actives_outdock_file_path, decoys_outdock_file_path]):
+                            try:
+                                _ = OutdockFile(outdock_file_path).get_dataframe()  # only resubmit if outdock file can't be loaded
+                            except Exception:
+                                failed_array_jobs.append(array_job)
+
+                        # e.g., DOCK crashed (in which case its partial OUTDOCK file tells whether re-attempting can succeed)
+                        if not self._reattempt_failed_task(task_id, failed_array_jobs):
+                            continue  # move on to next in queue without re-attempting failed task
+                    else:
+                        logger.warning(
+                            f"Failed to load output for task {task_id}. Will move on in queue and re-attempt once it cycles back around."
+                        )
+                        time.sleep(1)
+
+                    #
+                    processing_queue.append(task_id)  # move to back of queue
+                    continue  # move on to next in queue
+
+            #
+            logger.info(
+                f"Task {task_id} complete. Loaded both OUTDOCK files."
+            )
+            on_task_results_loaded(task_id, df, array_jobs)
+
+        # move output of accepted speculative attempts into the task dirs
+        if self.speculative_task_executor is not None:
+            self.speculative_task_executor.finalize()
@@ -5,6 +5,8 @@ import collections
 import logging
 import os
 import shutil
+import fcntl
+import stat
 import pathlib
 from datetime import datetime
 import tarfile
@@ -12,6 +14,7 @@ import gzip
 import re
 import uuid
 import time
+import hashlib
 
 import numpy as np
 import pandas as pd
@@ -27,6 +30,9 @@ logger = logging.getLogger("dockopt")
 #
 INDOCK_FILE_NAME = "INDOCK"
 
+#
+FICLONE_IOCTL_REQUEST_CODE = 0x40049409  # from linux/fs.h
+
 
 def create_relative_symlink(target: str, link_name: str, target_is_directory: bool) -> None:
     # Convert target and link_name to absolute paths
@@ -146,6 +152,17 @@ class Dir(FileSystemEntity):
 
         return dst_file
 
+    def stage_in_file(self, src_file_path: str, dst_file_name: Optional[str] = None, overwrite: bool = True, allow_symlink: bool = False, read_only: bool = False, link_writable_src: bool = True):
+        """Like `copy_in_file` but avoids copying data where the file system allows it. See `File.stage_file`."""
+        File.validate_file_exists(src_file_path)
+
+        if dst_file_name is None:
+            dst_file_name = File.get_file_name_of_file(src_file_path)
+        dst_file = File(path=os.path.join(self.path, dst_file_name))
+        dst_file.stage_from(src_file_path=src_file_path, overwrite=overwrite, allow_symlink=allow_symlink, read_only=read_only, link_writable_src=link_writable_src)
+
+        return dst_file
+
     @staticmethod
     def delete_dir(dir_path: str) -> None:
         if os.path.exists(dir_path):
@@ -210,6 +227,11 @@ class File(FileSystemEntity):
             src_file_path=src_file_path, dst_file_path=self.path, overwrite=overwrite
         )
 
+    def stage_from(self, src_file_path: str, overwrite: bool = True, allow_symlink: bool = False, read_only: bool = False, link_writable_src: bool = True):
+        return self.stage_file(
+            src_file_path=src_file_path, dst_file_path=self.path, overwrite=overwrite, allow_symlink=allow_symlink, read_only=read_only, link_writable_src=link_writable_src
+        )
+
     def delete(self):
         self.delete_file(self.path)
 
@@ -267,6 +289,98 @@ class File(FileSystemEntity):
                 dst_file_path,
             )
 
+    @staticmethod
+    def clone_file(src_file_path: str, dst_file_path: str, overwrite: bool = True) -> str:
+        """Makes `dst_file_path` a clone of `src_file_path` without copying data where the file system allows it.
+
+        Tries a reflink (copy-on-write clone) first, then a hardlink, then falls back to a regular copy. Returns the
+        method used: "reflink", "hardlink", or "copy" (or "skip" if the destination exists and `overwrite=False`)."""
+
+        return File.stage_file(src_file_path, dst_file_path, overwrite=overwrite, allow_symlink=False, read_only=False)
+
+    @staticmethod
+    def stage_file(src_file_path: str, dst_file_path: str, overwrite: bool = True, allow_symlink: bool = False, read_only: bool = False, link_writable_src: bool = True) -> str:
+        """Stages `src_file_path` at `dst_file_path` with the cheapest method the file system allows.
+
+        Tries a reflink (copy-on-write clone), then a hardlink, then (if `allow_symlink`) a symlink, then falls back to a
+        regular copy. If `read_only`, write permissions are removed from the staged file (and thus from every hardlink
+        sharing its inode), so that it cannot be modified in place; programs that rewrite files (e.g., `sed -i`) still work
+        since they replace the file rather than modify it. If not `link_writable_src`, a source that is writable is never
+        hardlinked or symlinked (only reflinked or copied), so that the staged file cannot be used to modify the source
+        (e.g., a user's input file or one of the package's default files). Returns the method used: "reflink", "hardlink",
+        "symlink", or "copy" (or "skip" if the destination exists and `overwrite=False`)."""
+        File.validate_file_exists(src_file_path)
+        File.validate_path(dst_file_path)
+
+        #
+        if os.path.isfile(dst_file_path) or os.path.islink(dst_file_path):
+            if not overwrite:
+                return "skip"
+            os.remove(dst_file_path)
+
+        #
+        allow_link = link_writable_src or not File._file_is_writable(src_file_path)
+        if File._reflink_file(src_file_path, dst_file_path):
+            method = "reflink"
+        elif allow_link and File._hardlink_file(src_file_path, dst_file_path):
+            method = "hardlink"
+        elif allow_link and allow_symlink and File._symlink_file(src_file_path, dst_file_path):
+            method = "symlink"
+        else:
+            shutil.copyfile(src_file_path, dst_file_path)
+            method = "copy"
+        logger.debug(f"File {src_file_path} staged at {dst_file_path} via {method}")
+
+        #
+        if read_only and method != "symlink":  # chmod of a symlink would change its target
+            mode = stat.S_IMODE(os.stat(dst_file_path).st_mode)
+            read_only_mode = mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+            if read_only_mode != mode:  # a hardlinked read-only source may not be owned by us, so don't chmod it needlessly
+                os.chmod(dst_file_path, read_only_mode)
+
+        return method
+
+    @staticmethod
+    def _file_is_writable(file_path: str) -> bool:
+        return bool(stat.S_IMODE(os.stat(file_path).st_mode) & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+    @staticmethod
+    def _reflink_file(src_file_path: str, dst_file_path: str) -> bool:
+        try:
+            with open(src_file_path, "rb") as f_src, open(dst_file_path, "wb") as f_dst:
+                fcntl.ioctl(f_dst.fileno(), FICLONE_IOCTL_REQUEST_CODE, f_src.fileno())
+            return True
+        except (OSError, IOError):
+            if os.path.isfile(dst_file_path):
+                os.remove(dst_file_path)
+            return False
+
+    @staticmethod
+    def _hardlink_file(src_file_path: str, dst_file_path: str) -> bool:
+        try:
+            os.link(src_file_path, dst_file_path)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _symlink_file(src_file_path: str, dst_file_path: str) -> bool:
+        try:
+            os.symlink(os.path.realpath(src_file_path), dst_file_path)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def get_hexdigest_of_md5_hash_of_file_contents(file_path: str, chunk_size: int = 2**20) -> str:
+        File.validate_file_exists(file_path)
+
+        m = hashlib.md5()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                m.update(chunk)
+        return m.hexdigest()
+
     @staticmethod
     def delete_file(file_path: str):
         File.validate_path(file_path)
@@ -423,6 +537,38 @@ class LogFile(File):
         super().__init__(path=path, validate_existence=validate_existence)
 
 
+class FileLock(object):
+    """Advisory, exclusive lock (via `flock`) on a hidden lock file next to the file it guards.
+
+    Used as a context manager. Safe to use between processes on the same host as well as between
+    processes on different hosts sharing a file system that supports `flock`."""
+
+    def __init__(self, file_path: str):
+        File.validate_path(file_path)
+        self.file_path = file_path
+        self.lock_file_path = os.path.join(
+            File.get_dir_path_of_file(file_path), f".{File.get_file_name_of_file(file_path)}.lock"
+        )
+        self._fd = None
+
+    def acquire(self) -> None:
+        self._fd = os.open(self.lock_file_path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.release()
+
+
 class IndockFile(File):
     """
     The INDOCK file is the main parameters file for the DOCK program.
@@ -685,6 +831,14 @@ class DB2File(File):
                     return columns[1]
         return None
 
+    def get_num_conformations(self) -> int:
+        num_conformations = 0
+        with self.open_file() as f:
+            for line in f:
+                if line.startswith("C "):
+                    num_conformations += 1
+        return num_conformations
+
 
 class OutdockFile(File):
 
@@ -1,7 +1,8 @@
 import logging
-from typing import Union, List, Iterable
+from typing import Union, List, Iterable, Dict, Set, Optional
 import os
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from itertools import groupby
 from operator import itemgetter
 import re
@@ -16,6 +17,43 @@ from pydock3.files import File
 #
 logger = logging.getLogger("dockopt")
 
+#
+ACCOUNTING_LOOKBACK_DAYS = 7
+
+# states of finished tasks, as named by Slurm
+TASK_STATE_COMPLETED = "COMPLETED"
+TASK_STATE_FAILED = "FAILED"
+TASK_STATE_TIMEOUT = "TIMEOUT"
+TASK_STATE_OUT_OF_MEMORY = "OUT_OF_MEMORY"
+TASK_STATE_NODE_FAIL = "NODE_FAIL"
+TASK_STATE_PREEMPTED = "PREEMPTED"
+TASK_STATE_CANCELLED = "CANCELLED"
+
+
+@dataclass
+class TaskAccountingRecord:
+    """Accounting (e.g., from `sacct` / `qacct`) of the latest attempt of a task of an array job."""
+
+    job_id: str
+    task_id: str
+    state: str
+    exit_code: Optional[int] = None
+    node_name: Optional[str] = None
+    elapsed_seconds: Optional[float] = None
+    max_rss_mb: Optional[float] = None
+
+
+def parse_memory_str_as_mb(memory_str: str) -> Optional[float]:
+    """e.g., `1234K`, `1.5G`, or `2048` (bytes)"""
+
+    match = re.match(r'^([\d.]+)\s*([KMGT]?)B?$', memory_str.strip().upper())
+    if match is None:
+        return None
+    unit_to_mb_dict = {"": 1 / 1024**2, "K": 1 / 1024, "M": 1, "G": 1024, "T": 1024**2}
+
+    return float(match.group(1)) * unit_to_mb_dict[match.group(2)]
+
+
 class JobScheduler(ABC):
     REQUIRED_ENV_VAR_NAMES = []
 
@@ -31,7 +69,9 @@ class JobScheduler(ABC):
             log_dir_path: str,
             task_ids: Iterable[Union[str, int]],
             job_timeout_minutes: Union[int, None] = None,
-            extra_submission_cmd_params_str: [str, None] = None
+            extra_submission_cmd_params_str: [str, None] = None,
+            job_memory_mb: Union[int, None] = None,
+            excluded_node_names: Union[Iterable[str], None] = None,
     ):
         """returns: subprocess.CompletedProcess"""
 
@@ -45,6 +85,27 @@ class JobScheduler(ABC):
     def task_is_on_queue(self, task_id: Union[str, int], job_name: str) -> bool:
         raise NotImplementedError
 
+    def cancel_task(self, task_id: Union[str, int], job_name: str) -> List[CompletedProcess]:
+        """Cancel the task of the array job with the given name, if it is on the queue."""
+
+        raise NotImplementedError
+
+    def get_queue_snapshot(self) -> Dict[str, Set[str]]:
+        """Get the IDs of the tasks on the queue of every array job on the queue, by job name, with one query of the queue."""
+
+        raise NotImplementedError
+
+    def get_task_accounting_records(self, job_name: str) -> Dict[str, TaskAccountingRecord]:
+        """Get the accounting of the latest attempt of every finished task of the array job(s) with the given name, by
+        task ID, with one query of the job scheduler's accounting."""
+
+        raise NotImplementedError
+
+    def get_task_stderr_file_path(self, job_name: str, log_dir_path: str, job_id: str, task_id: Union[str, int]) -> str:
+        """Get the path of the stderr file written by the job scheduler for the given task."""
+
+        raise NotImplementedError
+
 
 class SlurmJobScheduler(JobScheduler):
     REQUIRED_ENV_VAR_NAMES = [
@@ -61,6 +122,8 @@ class SlurmJobScheduler(JobScheduler):
 
         # set optional env vars
         self.SLURM_SETTINGS = os.environ.get("SLURM_SETTINGS")
+        self.SCANCEL_EXEC = os.environ.get("SCANCEL_EXEC", os.path.join(os.path.dirname(self.SQUEUE_EXEC), "scancel"))
+        self.SACCT_EXEC = os.environ.get("SACCT_EXEC", os.path.join(os.path.dirname(self.SQUEUE_EXEC), "sacct"))
 
         #
         if self.SLURM_SETTINGS:
@@ -75,6 +138,8 @@ class SlurmJobScheduler(JobScheduler):
             task_ids: Iterable[Union[str, int]],
             job_timeout_minutes: Union[int, None] = None,
             extra_submission_cmd_params_str: [str, None] = None,
+            job_memory_mb: Union[int, None] = None,
+            excluded_node_names: Union[Iterable[str], None] = None,
     ) -> List[CompletedProcess]:
         #
         if extra_submission_cmd_params_str is None:
@@ -106,6 +171,12 @@ class SlurmJobScheduler(JobScheduler):
             if job_timeout_minutes is not None:
                 command_str += f" --time={job_timeout_minutes}"
 
+            if job_memory_mb is not None:
+                command_str += f" --mem={job_memory_mb}"
+
+            if excluded_node_names:
+                command_str += f" --exclude={','.join(sorted(excluded_node_names))}"
+
             command_str += f" {script_path}"
 
             if self.SLURM_SETTINGS:
@@ -138,14 +209,99 @@ class SlurmJobScheduler(JobScheduler):
             return False
 
         #
+        return len(self._get_queued_task_job_ids(proc.stdout, task_id, job_name)) > 0
+
+    @staticmethod
+    def _get_queued_task_job_ids(squeue_stdout: str, task_id: Union[str, int], job_name: str) -> List[str]:
+        """Get the IDs (e.g., `1234_5`) on the queue of the given task of the array job with exactly the given name."""
+
+        job_ids = []
+        for line in squeue_stdout.split('\n'):
+            line_stripped = line.strip()
+            if line_stripped:
+                job_id, this_job_name, state = line_stripped.split()
+                if this_job_name == job_name and job_id.endswith(f"_{task_id}"):
+                    job_ids.append(job_id)
+
+        return job_ids
+
+    def cancel_task(self, task_id: Union[str, int], job_name: str) -> List[CompletedProcess]:
+        command_str = f"{self.SQUEUE_EXEC} -r --format='%i %j %t' | grep '{job_name}'"
+        proc = system_call(command_str)
+
+        #
+        if not proc.stdout:
+            return []
+
+        #
+        procs = []
+        for job_id in self._get_queued_task_job_ids(proc.stdout, task_id, job_name):
+            procs.append(system_call(f"{self.SCANCEL_EXEC} {job_id}"))
+
+        return procs
+
+    def get_queue_snapshot(self) -> Dict[str, Set[str]]:
+        command_str = f"{self.SQUEUE_EXEC} -r -h --format='%i %j %t'"
+        proc = system_call(command_str)
+        if proc.returncode != 0:
+            raise Exception(f"Command '{command_str}' failed. stderr: {proc.stderr}")
+
+        #
+        job_name_to_task_ids_dict = {}
         for line in proc.stdout.split('\n'):
             line_stripped = line.strip()
             if line_stripped:
                 job_id, job_name, state = line_stripped.split()
-                if job_id.endswith(f"_{task_id}"):
-                    return True
+                task_ids = job_name_to_task_ids_dict.setdefault(job_name, set())
+                if "_" in job_id:  # array job task (e.g., `1234_5`)
+                    task_ids.add(job_id.split("_")[-1])
+
+        return job_name_to_task_ids_dict
+
+    def get_task_accounting_records(self, job_name: str) -> Dict[str, TaskAccountingRecord]:
+        command_str = f"{self.SACCT_EXEC} -n -P -S now-{ACCOUNTING_LOOKBACK_DAYS}days --name={job_name} --format=JobID,State,ExitCode,NodeList,ElapsedRaw,MaxRSS"
+        proc = system_call(command_str)
+        if proc.returncode != 0:
+            raise Exception(f"Command '{command_str}' failed. stderr: {proc.stderr}")
+
+        # one line per task attempt (e.g., `1234_5`) followed by lines of its steps (e.g., `1234_5.batch`)
+        job_id_to_record_dict = {}
+        for line in proc.stdout.split('\n'):
+            if not line.strip():
+                continue
+            job_id, state, exit_code_str, node_name, elapsed_str, max_rss_str = line.strip().split('|')
+            task_job_id, _, step_name = job_id.partition('.')
+            if '_' not in task_job_id or '[' in task_job_id:  # not a task of an array job, or tasks not yet started
+                continue
+            state = state.split()[0] if state.strip() else ""  # e.g., `CANCELLED by 1234`
+            exit_code = int(exit_code_str.split(':')[0]) if re.match(r'^\d+:\d+$', exit_code_str) else None
+            max_rss_mb = parse_memory_str_as_mb(max_rss_str) if max_rss_str else None
+            if not step_name:
+                job_id_to_record_dict[task_job_id] = TaskAccountingRecord(
+                    job_id=task_job_id.split('_')[0],
+                    task_id=task_job_id.split('_')[1],
+                    state=state,
+                    exit_code=exit_code,
+                    node_name=(node_name if node_name and node_name != "None assigned" else None),
+                    elapsed_seconds=(float(elapsed_str) if elapsed_str.isdigit() else None),
+                    max_rss_mb=max_rss_mb,
+                )
+            elif task_job_id in job_id_to_record_dict:
+                record = job_id_to_record_dict[task_job_id]
+                if state == TASK_STATE_OUT_OF_MEMORY:  # some versions of Slurm only report this for the step
+                    record.state = TASK_STATE_OUT_OF_MEMORY
+                if max_rss_mb is not None:
+                    record.max_rss_mb = max(record.max_rss_mb or 0.0, max_rss_mb)
+
+        # latest attempt of each task
+        task_id_to_record_dict = {}
+        for record in sorted(job_id_to_record_dict.values(), key=lambda r: int(r.job_id)):
+            task_id_to_record_dict[record.task_id] = record
 
-        return False
+        return task_id_to_record_dict
+
+    def get_task_stderr_file_path(self, job_name: str, log_dir_path: str, job_id: str, task_id: Union[str, int]) -> str:
+        return os.path.join(log_dir_path, f"{job_name}_{job_id}_{task_id}.err")  # see `-e` in `submit`
 
 
 class SGEJobScheduler(JobScheduler):
@@ -163,6 +319,8 @@ class SGEJobScheduler(JobScheduler):
 
         # set optional env vars
         self.SGE_SETTINGS = os.environ.get("SGE_SETTINGS")
+        self.QDEL_EXEC = os.environ.get("QDEL_EXEC", os.path.join(os.path.dirname(self.QSTAT_EXEC), "qdel"))
+        self.QACCT_EXEC = os.environ.get("QACCT_EXEC", os.path.join(os.path.dirname(self.QSTAT_EXEC), "qacct"))
 
         #
         if self.SGE_SETTINGS:
@@ -177,6 +335,8 @@ class SGEJobScheduler(JobScheduler):
             task_ids: Iterable[Union[str, int]],
             job_timeout_minutes: Union[int, None] = None,
             extra_submission_cmd_params_str: [str, None] = None,
+            job_memory_mb: Union[int, None] = None,
+            excluded_node_names: Union[Iterable[str], None] = None,
     ) -> List[CompletedProcess]:
         #
         if extra_submission_cmd_params_str is None:
@@ -206,6 +366,12 @@ class SGEJobScheduler(JobScheduler):
                     f" -l s_rt={job_timeout_seconds} -l h_rt={job_timeout_seconds}"
                 )
 
+            if job_memory_mb is not None:
+                command_str += f" -l mem_free={job_memory_mb}M"
+
+            if excluded_node_names:
+                command_str += f" -l 'hostname=!({'|'.join(sorted(excluded_node_names))})'"
+
             command_str += f" {script_path}"
 
             if self.SGE_SETTINGS:
@@ -238,7 +404,10 @@ class SGEJobScheduler(JobScheduler):
             raise Exception(f"Error parsing XML from command '{command_str}'. \nstdout: \n{proc.stdout}\n\nstderr: {proc.stderr}") from e
 
     def task_is_on_queue(self, task_id: Union[str, int], job_name: str) -> bool:
-        task_num = int(task_id)
+        return len(self._get_queued_task_job_numbers(task_id, job_name)) > 0
+
+    def _get_job_dicts(self) -> List[dict]:
+        """Get a dict per job (or group of tasks of an array job) on the queue."""
 
         #
         q_dict = self._get_qstat_xml_as_dict()
@@ -256,7 +425,18 @@ class SGEJobScheduler(JobScheduler):
             else:
                 raise Exception(f"Unexpected type for `job_list`: {type(obj)}")
 
+        return job_dicts
+
+    def _get_queued_task_job_numbers(self, task_id: Union[str, int], job_name: str) -> List[str]:
+        """Get the numbers of the jobs on the queue with the given name that include the given task."""
+
+        task_num = int(task_id)
+
+        #
+        job_dicts = self._get_job_dicts()
+
         #
+        job_numbers = []
         for job_dict in job_dicts:
             #
             if not job_dict.get('JB_name') == job_name:
@@ -276,7 +456,8 @@ class SGEJobScheduler(JobScheduler):
                     end = int(match.group(2))
                     if (task_num >= start) and (task_num <= end):
                         #
-                        return True
+                        job_numbers.append(str(job_dict.get('JB_job_number')))
+                        continue
 
             #
             pattern = r'^(\d+)$'
@@ -285,7 +466,105 @@ class SGEJobScheduler(JobScheduler):
                 if match.group(1) is not None:
                     num = int(match.group(1))
                     if task_num == num:
-                        return True
+                        job_numbers.append(str(job_dict.get('JB_job_number')))
+
+        #
+        return sorted(set(job_numbers))
+
+    def cancel_task(self, task_id: Union[str, int], job_name: str) -> List[CompletedProcess]:
+        procs = []
+        for job_number in self._get_queued_task_job_numbers(task_id, job_name):
+            procs.append(system_call(f"{self.QDEL_EXEC} {job_number} -t {int(task_id)}"))
+
+        return procs
+
+    def get_queue_snapshot(self) -> Dict[str, Set[str]]:
+        job_name_to_task_ids_dict = {}
+        for job_dict in self._get_job_dicts():
+            task_ids = job_name_to_task_ids_dict.setdefault(job_dict.get('JB_name'), set())
+
+            #
+            tasks_str = job_dict.get('tasks')
+            if tasks_str is None:
+                continue
+
+            # e.g., `1-10:1` (pending tasks) or `5` (running task)
+            for tasks_range_str in tasks_str.split(','):
+                match = re.match(r'^(\d+)(-(\d+)(:(\d+))?)?$', tasks_range_str)
+                if match is None:
+                    raise Exception(f"Unexpected format of `tasks`: {tasks_str}")
+                start = int(match.group(1))
+                end = int(match.group(3)) if match.group(3) is not None else start
+                step = int(match.group(5)) if match.group(5) is not None else 1
+                task_ids.update([str(task_num) for task_num in range(start, end + 1, step)])
+
+        return job_name_to_task_ids_dict
+
+    def get_task_accounting_records(self, job_name: str) -> Dict[str, TaskAccountingRecord]:
+        command_str = f"{self.QACCT_EXEC} -j {job_name}"
+        proc = system_call(command_str)
+        if proc.returncode != 0:
+            if "not found" in proc.stderr:  # no task of the job has finished yet
+                return {}
+            raise Exception(f"Command '{command_str}' failed. stderr: {proc.stderr}")
+
+        # one block of `key value` lines per task attempt, each preceded by a line of `=`
+        attempt_dicts = []
+        for line in proc.stdout.split('\n'):
+            if line.startswith('='):
+                attempt_dicts.append({})
+            elif line.strip() and attempt_dicts:
+                key, _, value = line.strip().partition(' ')
+                attempt_dicts[-1][key] = value.strip()
+
+        #
+        task_id_to_record_dict = {}
+        for attempt_dict in sorted(attempt_dicts, key=lambda d: int(d.get('jobnumber', 0))):
+            if attempt_dict.get('taskid', 'undefined') == 'undefined':
+                continue
+            exit_code = int(attempt_dict['exit_status'].split()[0]) if attempt_dict.get('exit_status') else None
+            elapsed_seconds = float(attempt_dict['ru_wallclock'].rstrip('s')) if attempt_dict.get('ru_wallclock') else None
+            max_rss_mb = parse_memory_str_as_mb(attempt_dict['maxvmem']) if attempt_dict.get('maxvmem') else None
+            task_id_to_record_dict[attempt_dict['taskid']] = TaskAccountingRecord(
+                job_id=attempt_dict['jobnumber'],
+                task_id=attempt_dict['taskid'],
+                state=self._get_task_state(attempt_dict, exit_code, elapsed_seconds, max_rss_mb),
+                exit_code=exit_code,
+                node_name=attempt_dict.get('hostname'),
+                elapsed_seconds=elapsed_seconds,
+                max_rss_mb=max_rss_mb,
+            )
+
+        return task_id_to_record_dict
+
+    @staticmethod
+    def _get_task_state(attempt_dict: dict, exit_code: Optional[int], elapsed_seconds: Optional[float], max_rss_mb: Optional[float]) -> str:
+        """Map the `failed` code & exit status of a task attempt reported by `qacct` to the equivalent Slurm state."""
+
+        failed_code = int(attempt_dict.get('failed', '0').split()[0])
+
+        # resource requests of the job (e.g., `-l h_rt=3600,mem_free=1024M`)
+        category_str = attempt_dict.get('category', '')
+        match = re.search(r'h_rt=(\d+)', category_str)
+        time_limit_seconds = float(match.group(1)) if match is not None else None
+        match = re.search(r'(mem_free|h_vmem)=([\d.]+[KMGT]?)', category_str)
+        memory_limit_mb = parse_memory_str_as_mb(match.group(2)) if match is not None else None
 
         #
-        return False
+        if failed_code == 37 or 'h_rt' in attempt_dict.get('failed', ''):  # `qmaster enforced h_rt limit`
+            return TASK_STATE_TIMEOUT
+        if 0 < failed_code < 30:  # failed before or while starting the job on the node (e.g., execd / shepherd errors)
+            return TASK_STATE_NODE_FAIL
+        if exit_code in [137, 152]:  # killed (SIGKILL / SIGXCPU)
+            if time_limit_seconds is not None and elapsed_seconds is not None and elapsed_seconds >= time_limit_seconds:
+                return TASK_STATE_TIMEOUT
+            if memory_limit_mb is not None and max_rss_mb is not None and max_rss_mb >= memory_limit_mb:
+                return TASK_STATE_OUT_OF_MEMORY
+            return TASK_STATE_CANCELLED
+        if exit_code:
+            return TASK_STATE_FAILED
+
+        return TASK_STATE_COMPLETED
+
+    def get_task_stderr_file_path(self, job_name: str, log_dir_path: str, job_id: str, task_id: Union[str, int]) -> str:
+        return os.path.join(log_dir_path, f"{job_name}.e{job_id}.{task_id}")  # SGE default for `-e <dir>`
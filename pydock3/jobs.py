@@ -1,6 +1,6 @@
 import logging
 import subprocess
-from typing import Tuple, List, Optional
+from typing import Tuple, List, Optional, Iterable
 import os
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
@@ -24,6 +24,8 @@ logger = logging.getLogger("dockopt")
 
 #
 OUTDOCK_FILE_NAME = "OUTDOCK.0"
+MOL2_FILE_NAME = "test.mol2.gz.0"  # written by `rundock.bash`
+TASK_START_TIME_FILE_NAME = "start_time"  # written by `rundock.bash`
 
 
 #
@@ -54,6 +56,7 @@ class ArrayDockingJob(ABC):
     extra_submission_cmd_params_str: Optional[str] = None
     sleep_seconds_after_copying_output: int = 0
     export_mol2: bool = True
+    job_memory_mb: Optional[int] = None
     #max_reattempts: int = 0  # TODO
 
     def __post_init__(self):
@@ -120,6 +123,7 @@ class ArrayDockingJob(ABC):
             task_ids=task_ids_to_submit,
             job_timeout_minutes=self.job_timeout_minutes,
             extra_submission_cmd_params_str=self.extra_submission_cmd_params_str,
+            job_memory_mb=self.job_memory_mb,
         )
 
         failed_procs = [proc for proc in procs if proc.stderr]
@@ -132,13 +136,25 @@ class ArrayDockingJob(ABC):
             self,
             task_id: str,
             skip_if_complete: bool = True,
+            job_timeout_minutes: Optional[int] = None,
+            job_memory_mb: Optional[int] = None,
+            excluded_node_names: Optional[Iterable[str]] = None,
     ) -> Tuple[JobSubmissionResult, List[subprocess.CompletedProcess]]:
         """
         if job submission is skipped, returns (JobSubmissionResult, [])
         if job submission is not skipped, returns (JobSubmissionResult, List[subprocess.CompletedProcess])
         in case of failed submissions and (JobSubmissionResult, []) otherwise.
+
+        `job_timeout_minutes` & `job_memory_mb` override those of the array job for this submission (e.g., to re-attempt
+        a task that was killed for exceeding them).
         """
 
+        #
+        if job_timeout_minutes is None:
+            job_timeout_minutes = self.job_timeout_minutes
+        if job_memory_mb is None:
+            job_memory_mb = self.job_memory_mb
+
         #
         if skip_if_complete:
             if self.task_is_complete(task_id):
@@ -172,8 +188,10 @@ class ArrayDockingJob(ABC):
             env_vars_dict=env_vars_dict,
             log_dir_path=self.log_dir.path,
             task_ids=task_ids_to_submit,
-            job_timeout_minutes=self.job_timeout_minutes,
+            job_timeout_minutes=job_timeout_minutes,
             extra_submission_cmd_params_str=self.extra_submission_cmd_params_str,
+            job_memory_mb=job_memory_mb,
+            excluded_node_names=excluded_node_names,
         )
 
         failed_procs = [proc for proc in procs if proc.stderr]
@@ -201,6 +219,35 @@ class ArrayDockingJob(ABC):
 
         return File.file_exists(os.path.join(task_dir_path, OUTDOCK_FILE_NAME))
 
+    def get_task_dir_path(self, task_id: str) -> str:
+        return os.path.join(self.job_dir.path, task_id)
+
+    def get_task_start_time(self, task_id: str) -> Optional[float]:
+        """Get the time (seconds since epoch) at which the current attempt of the task started running, or None if it has not started."""
+
+        try:
+            with open(os.path.join(self.get_task_dir_path(task_id), TASK_START_TIME_FILE_NAME), 'r') as f:
+                return float(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def get_task_runtime_seconds(self, task_id: str) -> Optional[float]:
+        """Get the runtime of the task if it is complete, otherwise None."""
+
+        start_time = self.get_task_start_time(task_id)
+        if start_time is None:
+            return None
+        try:
+            return os.path.getmtime(os.path.join(self.get_task_dir_path(task_id), OUTDOCK_FILE_NAME)) - start_time
+        except OSError:
+            return None
+
+    def task_is_on_queue(self, task_id: str) -> bool:
+        return self.job_scheduler.task_is_on_queue(task_id, job_name=self.name)
+
+    def cancel_task(self, task_id: str) -> List[subprocess.CompletedProcess]:
+        return self.job_scheduler.cancel_task(task_id, job_name=self.name)
+
     def task_failed(self, task_id: str) -> bool:
         """Check if the supplied array job task failed (i.e., outdock file did not appear despite job being absent from the job scheduler queue)."""
 
@@ -2,7 +2,8 @@ import os
 import tarfile
 from typing import List, Generator
 
-from pydock3.files import TarballFile, DB2File
+from pydock3.files import File, TarballFile, DB2File
+from pydock3.util import get_hexdigest_of_persistent_md5_hash_of_tuple
 
 
 class RetrospectiveDataset(object):
@@ -50,6 +51,53 @@ class RetrospectiveDataset(object):
         self.num_molecules_in_active_class = len(list(set([DB2File(os.path.join(self.actives_dir_path, file.name.lstrip('./'))).get_molecule_name() for file in TarballFile(self.actives_tgz_file_path).iterate_over_files_tarinfo()])))
         self.num_molecules_in_decoy_class = len(list(set([DB2File(os.path.join(self.decoys_dir_path, file.name.lstrip('./'))).get_molecule_name() for file in TarballFile(self.decoys_tgz_file_path).iterate_over_files_tarinfo()])))
 
+        #
+        self._hexdigest_of_md5_hash_of_manifest = None
+        self._num_conformations_in_active_class = None
+        self._num_conformations_in_decoy_class = None
+
+    @property
+    def hexdigest_of_md5_hash_of_manifest(self) -> str:
+        """Hash of the relative path and contents of every DB2 file of each class. Computed once, on first access."""
+
+        if self._hexdigest_of_md5_hash_of_manifest is None:
+            manifest = []
+            for class_label, dir_path in [("active", self.actives_dir_path), ("decoy", self.decoys_dir_path)]:
+                for root, dirs, files in os.walk(dir_path):
+                    for file_name in files:
+                        file_path = os.path.join(root, file_name)
+                        manifest.append((class_label, os.path.relpath(file_path, dir_path), File.get_hexdigest_of_md5_hash_of_file_contents(file_path)))
+            self._hexdigest_of_md5_hash_of_manifest = get_hexdigest_of_persistent_md5_hash_of_tuple(tuple(sorted(manifest)))
+
+        return self._hexdigest_of_md5_hash_of_manifest
+
+    @property
+    def num_conformations_in_active_class(self) -> int:
+        """Total number of conformations in the DB2 files of the active class. Computed once, on first access."""
+
+        if self._num_conformations_in_active_class is None:
+            self._num_conformations_in_active_class = self._get_num_conformations_in_db2_files(self.actives_dir_path)
+
+        return self._num_conformations_in_active_class
+
+    @property
+    def num_conformations_in_decoy_class(self) -> int:
+        """Total number of conformations in the DB2 files of the decoy class. Computed once, on first access."""
+
+        if self._num_conformations_in_decoy_class is None:
+            self._num_conformations_in_decoy_class = self._get_num_conformations_in_db2_files(self.decoys_dir_path)
+
+        return self._num_conformations_in_decoy_class
+
+    @staticmethod
+    def _get_num_conformations_in_db2_files(dir_path: str) -> int:
+        num_conformations = 0
+        for root, dirs, files in os.walk(dir_path):
+            for file_name in files:
+                num_conformations += DB2File(os.path.join(root, file_name)).get_num_conformations()
+
+        return num_conformations
+
     def _validate_tarball_files(self, tarball_path: str) -> None:
         file_count = 0
         for file in TarballFile(tarball_path).iterate_over_files_tarinfo():
@@ -12,6 +12,7 @@ SCRIPT_CLASSES = [  # script classes are those that inherit from the Script clas
     "Blastermaster",
     "Retrodock",
     "Dockopt",
+    "Simulation",
     # "TopPoses",
 ]
 
@@ -40,6 +41,8 @@ def get_script_class(script_class_name, *args, **kwargs) -> Union[Script, None]:
             from pydock3.retrodock.retrodock import Retrodock as cls
         elif script_class_name == "dockopt":
             from pydock3.dockopt.dockopt import Dockopt as cls
+        elif script_class_name == "simulation":
+            from pydock3.simulation.simulation import Simulation as cls
         elif script_class_name == "SDIFile":
             from pydock3.files import SDIFile as cls
         else:
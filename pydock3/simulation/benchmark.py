@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import logging
+import resource
+import subprocess
+import collections
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from pydock3.simulation.cluster import SimulatedCluster, SimulatedClusterConfig, COMPLETED
+from pydock3.simulation.commands import install_fake_executables
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+CLUSTER_DIR_NAME = "cluster"
+DATASET_DIR_NAME = "dataset"
+DOCKFILES_DIR_NAME = "dockfiles"
+ARRAY_JOB_SPECS_DIR_NAME = "array_job_specs"
+RETRODOCK_JOBS_DIR_NAME = "retrodock_jobs"
+TEMP_DIR_NAME = "tmp"
+BENCHMARK_RESULTS_FILE_NAME = "benchmark_results.json"
+SECONDS_BETWEEN_CLUSTER_ADVANCES = 1.0
+SECONDS_BETWEEN_PROGRESS_REPORTS = 30
+AUDIT_EVENT_NAMES_TO_REPORT = [  # stand-ins for the syscalls they make
+    "open",
+    "os.listdir",
+    "os.scandir",
+    "os.mkdir",
+    "os.remove",
+    "os.rmdir",
+    "os.rename",
+    "os.chmod",
+    "shutil.rmtree",
+    "subprocess.Popen",
+]
+
+
+class AuditEventCounter(object):
+    """Counts the audit events (see `sys.addaudithook`) raised in this process while enabled. Audit hooks cannot be
+    removed, so the hook stays installed (but idle) once disabled."""
+
+    def __init__(self):
+        self.event_name_to_count_dict = collections.Counter()
+        self.enabled = False
+        sys.addaudithook(self._hook)
+
+    def _hook(self, event_name, args):
+        if self.enabled:
+            self.event_name_to_count_dict[event_name] += 1
+
+
+def write_synthetic_inputs(sim_dir_path: str, num_tasks: int, max_task_array_size: int, num_actives: int, num_decoys: int, num_distinct_indock_files: int, dock_executable_path: str) -> List[str]:
+    """Write a retrospective dataset (empty DB2 files), INDOCK files, and one array job spec file per chunk of tasks
+    (in the format written by `DockoptStep`). Returns the spec file paths."""
+
+    #
+    for sub_dir_name, num_molecules in [("actives", num_actives), ("decoys", num_decoys)]:
+        ligands_dir_path = os.path.join(sim_dir_path, DATASET_DIR_NAME, sub_dir_name, "ligands")
+        os.makedirs(ligands_dir_path, exist_ok=True)
+        for i in range(1, num_molecules + 1):
+            open(os.path.join(ligands_dir_path, f"{i}.db2"), "w").close()
+
+    #
+    dockfiles_dir_path = os.path.join(sim_dir_path, DOCKFILES_DIR_NAME)
+    os.makedirs(dockfiles_dir_path, exist_ok=True)
+    indock_file_paths = []
+    for i in range(1, num_distinct_indock_files + 1):
+        indock_file_path = os.path.join(dockfiles_dir_path, f"INDOCK_{i}")
+        with open(indock_file_path, "w") as f:
+            f.write(f"DOCK 3.8 parameter\n# simulated docking configuration {i}\n")
+        indock_file_paths.append(indock_file_path)
+
+    #
+    array_job_specs_dir_path = os.path.join(sim_dir_path, ARRAY_JOB_SPECS_DIR_NAME)
+    os.makedirs(array_job_specs_dir_path, exist_ok=True)
+    spec_file_paths = []
+    for array_job_num, start in enumerate(range(1, num_tasks + 1, max_task_array_size), start=1):
+        spec_file_path = os.path.join(array_job_specs_dir_path, f"array_job_docking_configurations_{array_job_num}.txt")
+        with open(spec_file_path, "w") as f:
+            for configuration_num in range(start, min(start + max_task_array_size, num_tasks + 1)):
+                f.write(f"{configuration_num} {indock_file_paths[(configuration_num - 1) % len(indock_file_paths)]} {dock_executable_path}\n")
+        spec_file_paths.append(spec_file_path)
+
+    return spec_file_paths
+
+
+def get_percentiles_dict(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p90": float(np.percentile(values, 90)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(np.max(values)),
+    }
+
+
+def run_benchmark(
+    sim_dir_path: str,
+    scheduler_name: str = "slurm",
+    num_tasks: int = 1000,
+    max_task_array_size: int = 20000,
+    num_actives: int = 5,
+    num_decoys: int = 20,
+    num_distinct_indock_files: int = 100,
+    max_reattempts: int = 2,
+    job_timeout_minutes: Optional[int] = None,
+    max_job_timeout_minutes: Optional[int] = None,
+    job_memory_mb: Optional[int] = None,
+    timeout_seconds: Optional[float] = None,
+    speculative_execution_runtime_multiple: Optional[float] = None,
+    cluster_config: Optional[SimulatedClusterConfig] = None,
+) -> dict:
+    """Submit a step's worth of array docking jobs (actives & decoys) to a simulated cluster and await / load their
+    results with `DockoptStep`'s own `TaskResultsProcessor`, measuring the cost to the orchestrating process.
+
+    Reports the wall time to all results, the CPU time of this process and of the job scheduler commands it ran (the
+    fake commands also advance the simulation, so their CPU time is an upper bound), the number of job scheduler
+    commands run, counts of audit events standing in for syscalls (e.g., `open`, `os.scandir`, `subprocess.Popen`),
+    the latency between each task's output appearing on the simulated cluster and its results being loaded, and the
+    classes of the task failures (see `TaskFailureClassifier`)."""
+
+    #
+    if cluster_config is None:
+        cluster_config = SimulatedClusterConfig()
+    sim_dir_path = os.path.abspath(sim_dir_path)
+    os.makedirs(sim_dir_path, exist_ok=True)
+    cluster_dir_path = os.path.join(sim_dir_path, CLUSTER_DIR_NAME)
+    cluster = SimulatedCluster.create(cluster_dir_path, cluster_config)
+    os.environ.update(install_fake_executables(cluster_dir_path))
+
+    # pydock3 modules that read the env vars at import time
+    from pydock3.jobs import ArrayDockingJob
+    from pydock3.job_schedulers import SlurmJobScheduler, SGEJobScheduler
+    from pydock3.files import Dir
+    from pydock3.dockopt.task_processing import TaskResultsProcessor
+
+    #
+    if scheduler_name == "slurm":
+        job_scheduler = SlurmJobScheduler()
+    elif scheduler_name == "sge":
+        job_scheduler = SGEJobScheduler()
+    else:
+        raise Exception(f"scheduler_name must be one of: ['slurm', 'sge']. Witnessed: {scheduler_name}")
+
+    #
+    logger.info(f"Writing synthetic inputs for {num_tasks} tasks")
+    spec_file_paths = write_synthetic_inputs(sim_dir_path, num_tasks, max_task_array_size, num_actives, num_decoys, num_distinct_indock_files, os.environ["DOCK3_EXECUTABLE_PATH"])
+    temp_dir_path = os.path.join(sim_dir_path, TEMP_DIR_NAME)
+    os.makedirs(temp_dir_path, exist_ok=True)
+
+    #
+    clock_proc = subprocess.Popen(
+        [sys.executable, "-c", "from pydock3.simulation.cluster import main; main()", cluster_dir_path, f"--seconds_between_advances={SECONDS_BETWEEN_CLUSTER_ADVANCES}"],
+        stdout=subprocess.DEVNULL,
+    )
+    audit_event_counter = AuditEventCounter()
+    rusage_self_start = resource.getrusage(resource.RUSAGE_SELF)
+    rusage_children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    time_start = time.time()
+    audit_event_counter.enabled = True
+    try:
+        # submit
+        logger.info(f"Submitting {2 * len(spec_file_paths)} array jobs")
+        task_id_to_array_jobs_dict = collections.defaultdict(list)
+        for array_job_num, spec_file_path in enumerate(spec_file_paths, start=1):
+            for sub_dir_name in ["actives", "decoys"]:
+                job_name = f"simulated_step_{sub_dir_name}_{array_job_num}"
+                array_job = ArrayDockingJob(
+                    name=job_name,
+                    job_dir=Dir(os.path.join(sim_dir_path, RETRODOCK_JOBS_DIR_NAME, sub_dir_name), create=True, reset=False),
+                    input_molecules_dir_path=os.path.join(sim_dir_path, DATASET_DIR_NAME, sub_dir_name),
+                    job_scheduler=job_scheduler,
+                    temp_storage_path=temp_dir_path,
+                    array_job_docking_configurations_file_path=spec_file_path,
+                    export_mol2=(sub_dir_name == "actives"),
+                    job_timeout_minutes=job_timeout_minutes,
+                    job_memory_mb=job_memory_mb,
+                )
+                sub_result, procs = array_job.submit_all_tasks(skip_if_complete=False)
+                if procs:
+                    raise Exception(f"Failed to submit array job {job_name}: {[proc.stderr for proc in procs]}")
+                for task_id in array_job.task_ids:
+                    task_id_to_array_jobs_dict[task_id].append(array_job)
+        time_submitted = time.time()
+
+        # await / load results (as `DockoptStep` does)
+        task_id_to_time_results_loaded_dict = {}
+        task_results_processor = TaskResultsProcessor(
+            job_scheduler=job_scheduler,
+            max_reattempts=max_reattempts,
+            allow_failed_tasks=True,
+            max_job_timeout_minutes=max_job_timeout_minutes,
+            speculative_execution_runtime_multiple=speculative_execution_runtime_multiple,
+        )
+        time_of_last_progress_report = time.time()
+
+        def on_queue_cycle(num_tasks_remaining):
+            nonlocal time_of_last_progress_report
+
+            if timeout_seconds is not None and time.time() - time_start > timeout_seconds:
+                raise Exception(f"Benchmark timed out with {num_tasks_remaining} tasks remaining")
+            if time.time() - time_of_last_progress_report > SECONDS_BETWEEN_PROGRESS_REPORTS:
+                logger.info(f"{len(task_id_to_time_results_loaded_dict)} / {len(task_id_to_array_jobs_dict)} tasks loaded")
+                time_of_last_progress_report = time.time()
+
+        def on_task_results_loaded(task_id, df, array_jobs):
+            task_id_to_time_results_loaded_dict[task_id] = time.time()
+
+        task_results_processor.run(
+            sorted(task_id_to_array_jobs_dict, key=int),
+            task_id_to_array_jobs_dict,
+            on_task_results_loaded=on_task_results_loaded,
+            on_queue_cycle=on_queue_cycle,
+        )
+    finally:
+        audit_event_counter.enabled = False
+        time_end = time.time()
+        rusage_self_end = resource.getrusage(resource.RUSAGE_SELF)
+        rusage_children_end = resource.getrusage(resource.RUSAGE_CHILDREN)  # before the clock is reaped, so that it is not counted
+        clock_proc.terminate()
+        clock_proc.wait()
+
+    # latency of results: from the later of the task's actives & decoys output appearing to its results being loaded
+    conn = cluster.connect()
+    task_id_to_real_time_finished_dict = {}
+    for task_id, real_time_finished in conn.execute("SELECT task_id, real_time_finished FROM tasks WHERE state = ?", (COMPLETED,)).fetchall():
+        task_id = str(task_id)
+        task_id_to_real_time_finished_dict[task_id] = max(task_id_to_real_time_finished_dict.get(task_id, 0.0), real_time_finished)
+    latencies = [
+        max(0.0, time_results_loaded - task_id_to_real_time_finished_dict[task_id])
+        for task_id, time_results_loaded in task_id_to_time_results_loaded_dict.items()
+        if task_id in task_id_to_real_time_finished_dict
+    ]
+
+    #
+    results_dict = {
+        "scheduler_name": scheduler_name,
+        "num_tasks": num_tasks,
+        "num_array_jobs": 2 * len(spec_file_paths),
+        "cluster_config": cluster_config.__dict__,
+        "num_tasks_with_results": len(task_id_to_time_results_loaded_dict),
+        "num_tasks_failed": len(task_results_processor.task_ids_failed),
+        "num_task_reattempts": sum(task_results_processor.task_id_to_num_reattempts_dict.values()),
+        "task_failure_class_counts": dict(task_results_processor.failure_class_name_to_count_dict),
+        "excluded_node_names": sorted(task_results_processor.task_retry_policy.excluded_node_names),
+        "wall_seconds_to_submit": time_submitted - time_start,
+        "wall_seconds_to_all_results": time_end - time_start,
+        "orchestrator_cpu_user_seconds": rusage_self_end.ru_utime - rusage_self_start.ru_utime,
+        "orchestrator_cpu_system_seconds": rusage_self_end.ru_stime - rusage_self_start.ru_stime,
+        "scheduler_commands_cpu_seconds": (rusage_children_end.ru_utime + rusage_children_end.ru_stime) - (rusage_children_start.ru_utime + rusage_children_start.ru_stime),
+        "scheduler_command_counts": cluster.get_command_counts_dict(conn),
+        "task_state_counts": cluster.get_task_stats_dict(conn),
+        "audit_event_counts": {name: audit_event_counter.event_name_to_count_dict.get(name, 0) for name in AUDIT_EVENT_NAMES_TO_REPORT},
+        "seconds_from_output_to_results": get_percentiles_dict(latencies),
+    }
+    conn.close()
+    with open(os.path.join(sim_dir_path, BENCHMARK_RESULTS_FILE_NAME), "w") as f:
+        json.dump(results_dict, f, indent=2)
+
+    return results_dict
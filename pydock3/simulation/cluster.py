@@ -0,0 +1,429 @@
+import os
+import json
+import math
+import time
+import random
+import sqlite3
+import logging
+import subprocess
+from dataclasses import dataclass, asdict, fields
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import fire
+
+from pydock3.simulation.fake_dock import get_hexdigest_of_md5_hash_of_str, write_outdock_and_mol2_files, docking_configuration_has_dock_error, DOCK_ERROR_MESSAGE
+
+
+#
+logger = logging.getLogger("dockopt")
+
+#
+CLUSTER_CONFIG_FILE_NAME = "cluster_config.json"
+CLUSTER_DATABASE_FILE_NAME = "cluster.sqlite"
+SQLITE_TIMEOUT_SECONDS = 600
+
+# task states (as shown by `squeue`)
+PENDING = "PD"
+RUNNING = "R"
+COMPLETED = "CD"
+NODE_FAIL = "NF"
+TIMEOUT = "TO"
+OUT_OF_MEMORY = "OOM"
+CANCELLED = "CA"
+FINAL_STATES = [COMPLETED, NODE_FAIL, TIMEOUT, OUT_OF_MEMORY, CANCELLED]
+
+# outcomes of task attempts
+SUCCESS = "success"
+NODE_FAILURE = "node_failure"
+PREEMPTED = "preempted"
+TIME_LIMIT_REACHED = "timeout"
+MEMORY_LIMIT_REACHED = "out_of_memory"
+
+#
+OUTCOME_TO_FINAL_STATE_DICT = {
+    SUCCESS: COMPLETED,
+    NODE_FAILURE: NODE_FAIL,
+    TIME_LIMIT_REACHED: TIMEOUT,
+    MEMORY_LIMIT_REACHED: OUT_OF_MEMORY,
+}
+
+
+@dataclass
+class SimulatedClusterConfig:
+    """Parameters of a simulated cluster. Times are in simulated seconds, which pass `time_scale` times as fast as real
+    seconds."""
+
+    time_scale: float = 1.0
+    mean_queue_delay_seconds: float = 5.0
+    median_task_runtime_seconds: float = 60.0
+    task_runtime_sigma: float = 0.5  # of the log-normal distribution of task runtimes
+    median_task_memory_mb: Optional[float] = None  # log-normal with the same sigma as task runtimes; if set, tasks using more than their memory limit are killed
+    node_failure_probability: float = 0.0  # per task attempt
+    preemption_probability: float = 0.0  # per task attempt (preempted tasks are requeued)
+    dock_error_probability: float = 0.0  # per docking configuration (DOCK crashes on every attempt of its tasks)
+    num_nodes: int = 100
+    num_bad_nodes: int = 0  # every task attempt on these nodes hits a node failure
+    max_tasks_running: Optional[int] = None
+    execute_scripts: bool = False  # run the submitted scripts (e.g., `rundock.bash` with the fake DOCK executable) instead of writing task output directly
+    seed: int = 0
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, "w") as f:
+            json.dump(asdict(self), f, indent=2)
+
+    @classmethod
+    def load(cls, file_path: str) -> "SimulatedClusterConfig":
+        with open(file_path, "r") as f:
+            config_dict = json.load(f)
+        return cls(**{field.name: config_dict[field.name] for field in fields(cls) if field.name in config_dict})
+
+
+class SimulatedCluster(object):
+    """A job scheduler queue and the nodes running its tasks, simulated in a SQLite database in `cluster_dir_path`.
+
+    There is no daemon: the simulation is advanced to the current (simulated) time whenever the queue is queried or
+    modified (e.g., by the fake `sbatch` / `squeue` executables). Tasks wait in the queue for an exponentially
+    distributed delay, run for a log-normally distributed time, and then either succeed (writing their output), fail
+    (node failure or time limit), or are preempted and requeued."""
+
+    def __init__(self, cluster_dir_path: str):
+        self.cluster_dir_path = os.path.abspath(cluster_dir_path)
+        self.config = SimulatedClusterConfig.load(os.path.join(self.cluster_dir_path, CLUSTER_CONFIG_FILE_NAME))
+        self.database_file_path = os.path.join(self.cluster_dir_path, CLUSTER_DATABASE_FILE_NAME)
+        self._input_dir_path_to_db2_file_paths_dict = {}
+        self._spec_file_path_to_task_id_to_line_dict = {}
+
+    @classmethod
+    def create(cls, cluster_dir_path: str, config: SimulatedClusterConfig) -> "SimulatedCluster":
+        os.makedirs(cluster_dir_path, exist_ok=True)
+        config.save(os.path.join(cluster_dir_path, CLUSTER_CONFIG_FILE_NAME))
+        database_file_path = os.path.join(cluster_dir_path, CLUSTER_DATABASE_FILE_NAME)
+        if os.path.exists(database_file_path):
+            os.remove(database_file_path)
+        with sqlite3.connect(database_file_path) as conn:
+            conn.executescript("""
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value REAL);
+                CREATE TABLE jobs (
+                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scheduler_name TEXT,
+                    job_name TEXT,
+                    script_path TEXT,
+                    env_json TEXT,
+                    log_dir_path TEXT,
+                    time_limit_seconds REAL,
+                    memory_mb INTEGER,
+                    excluded_node_names_json TEXT,
+                    time_submitted REAL
+                );
+                CREATE TABLE tasks (
+                    job_id INTEGER,
+                    task_id INTEGER,
+                    state TEXT,
+                    time_eligible REAL,
+                    time_started REAL,
+                    time_ends REAL,
+                    outcome TEXT,
+                    node_name TEXT,
+                    memory_used_mb REAL,
+                    num_attempts INTEGER DEFAULT 0,
+                    real_time_finished REAL,
+                    PRIMARY KEY (job_id, task_id)
+                );
+                CREATE INDEX tasks_state_index ON tasks (state);
+                CREATE TABLE command_log (command TEXT, real_time REAL);
+                INSERT INTO sqlite_sequence (name, seq) VALUES ('jobs', 1000);
+            """)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('real_time_started', ?)", (time.time(),))
+
+        return cls(cluster_dir_path)
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database_file_path, timeout=SQLITE_TIMEOUT_SECONDS, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+
+        return conn
+
+    def get_time(self, conn: sqlite3.Connection) -> float:
+        """Simulated seconds since the cluster was created."""
+
+        real_time_started, = conn.execute("SELECT value FROM meta WHERE key = 'real_time_started'").fetchone()
+
+        return (time.time() - real_time_started) * self.config.time_scale
+
+    def get_epoch_time(self, conn: sqlite3.Connection, t: float) -> float:
+        """Seconds since epoch of the given simulated time (used for task start times & output modification times, so
+        that observed task runtimes are in simulated seconds)."""
+
+        real_time_started, = conn.execute("SELECT value FROM meta WHERE key = 'real_time_started'").fetchone()
+
+        return real_time_started + t
+
+    def get_real_time(self, conn: sqlite3.Connection, t: float) -> float:
+        """Seconds since epoch at which the given simulated time is (or was) reached."""
+
+        real_time_started, = conn.execute("SELECT value FROM meta WHERE key = 'real_time_started'").fetchone()
+
+        return real_time_started + t / self.config.time_scale
+
+    def log_command(self, conn: sqlite3.Connection, command: str) -> None:
+        conn.execute("INSERT INTO command_log (command, real_time) VALUES (?, ?)", (command, time.time()))
+
+    def submit(
+        self,
+        conn: sqlite3.Connection,
+        scheduler_name: str,
+        job_name: str,
+        script_path: str,
+        env_vars_dict: dict,
+        log_dir_path: str,
+        task_ids: Iterable[int],
+        time_limit_seconds: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        excluded_node_names: Optional[List[str]] = None,
+    ) -> int:
+        """Returns the job ID."""
+
+        now = self.get_time(conn)
+        cursor = conn.execute(
+            "INSERT INTO jobs (scheduler_name, job_name, script_path, env_json, log_dir_path, time_limit_seconds, memory_mb, excluded_node_names_json, time_submitted) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (scheduler_name, job_name, script_path, json.dumps(env_vars_dict), log_dir_path, time_limit_seconds, memory_mb, json.dumps(excluded_node_names or []), now),
+        )
+        job_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO tasks (job_id, task_id, state, time_eligible) VALUES (?, ?, ?, ?)",
+            [(job_id, task_id, PENDING, now + self._get_queue_delay_seconds(job_id, task_id, 0)) for task_id in task_ids],
+        )
+
+        return job_id
+
+    def cancel(self, conn: sqlite3.Connection, job_id: int, task_id: Optional[int] = None) -> None:
+        if task_id is None:
+            conn.execute("UPDATE tasks SET state = ? WHERE job_id = ? AND state IN (?, ?)", (CANCELLED, job_id, PENDING, RUNNING))
+        else:
+            conn.execute("UPDATE tasks SET state = ? WHERE job_id = ? AND task_id = ? AND state IN (?, ?)", (CANCELLED, job_id, task_id, PENDING, RUNNING))
+
+    def get_queued_tasks(self, conn: sqlite3.Connection) -> List[Tuple[int, str, int, str]]:
+        """(job ID, job name, task ID, state) of every task on the queue (pending or running)."""
+
+        return conn.execute(
+            "SELECT tasks.job_id, jobs.job_name, tasks.task_id, tasks.state FROM tasks JOIN jobs ON tasks.job_id = jobs.job_id WHERE tasks.state IN (?, ?) ORDER BY tasks.job_id, tasks.task_id",
+            (PENDING, RUNNING),
+        ).fetchall()
+
+    def _get_rng(self, job_id: int, task_id: int, num_attempts: int, purpose: str) -> random.Random:
+        return random.Random(f"{self.config.seed}:{job_id}:{task_id}:{num_attempts}:{purpose}")
+
+    def _get_queue_delay_seconds(self, job_id: int, task_id: int, num_attempts: int) -> float:
+        if self.config.mean_queue_delay_seconds <= 0:
+            return 0.0
+        return self._get_rng(job_id, task_id, num_attempts, "queue_delay").expovariate(1.0 / self.config.mean_queue_delay_seconds)
+
+    def advance(self, conn: sqlite3.Connection) -> None:
+        """Advance the simulation to the current time. Must be called within a transaction."""
+
+        now = self.get_time(conn)
+        job_id_to_job_dict = {}
+
+        def get_job_dict(job_id):
+            if job_id not in job_id_to_job_dict:
+                column_names = ["scheduler_name", "job_name", "script_path", "env_json", "log_dir_path", "time_limit_seconds", "memory_mb", "excluded_node_names_json"]
+                row = conn.execute(f"SELECT {', '.join(column_names)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                job_id_to_job_dict[job_id] = dict(zip(column_names, row))
+            return job_id_to_job_dict[job_id]
+
+        while True:
+            # end the attempts of running tasks that are due
+            rows = conn.execute("SELECT job_id, task_id, time_ends, outcome, num_attempts FROM tasks WHERE state = ? AND time_ends <= ? ORDER BY time_ends", (RUNNING, now)).fetchall()
+            for job_id, task_id, time_ends, outcome, num_attempts in rows:
+                if outcome == PREEMPTED:  # requeue
+                    conn.execute(
+                        "UPDATE tasks SET state = ?, time_eligible = ?, time_started = NULL, time_ends = NULL, outcome = NULL, num_attempts = ? WHERE job_id = ? AND task_id = ?",
+                        (PENDING, time_ends + self._get_queue_delay_seconds(job_id, task_id, num_attempts + 1), num_attempts + 1, job_id, task_id),
+                    )
+                    continue
+                if outcome == SUCCESS:
+                    self._write_task_output(conn, get_job_dict(job_id), job_id, task_id, time_ends)
+                elif outcome == MEMORY_LIMIT_REACHED:
+                    self._write_task_stderr(get_job_dict(job_id), job_id, task_id, "slurmstepd: error: Detected 1 oom_kill event. Some of the step tasks have been OOM Killed.")
+                conn.execute(
+                    "UPDATE tasks SET state = ?, real_time_finished = ? WHERE job_id = ? AND task_id = ?",
+                    (OUTCOME_TO_FINAL_STATE_DICT[outcome], self.get_real_time(conn, time_ends), job_id, task_id),
+                )
+
+            # start pending tasks that are eligible (as many as there are free slots)
+            if self.config.max_tasks_running is None:
+                limit = -1
+            else:
+                num_running, = conn.execute("SELECT COUNT(*) FROM tasks WHERE state = ?", (RUNNING,)).fetchone()
+                limit = max(0, self.config.max_tasks_running - num_running)
+            pending_rows = conn.execute("SELECT job_id, task_id, time_eligible, num_attempts FROM tasks WHERE state = ? AND time_eligible <= ? ORDER BY time_eligible LIMIT ?", (PENDING, now, limit)).fetchall()
+            time_slot_freed = min([r[2] for r in rows], default=0.0)  # tasks beyond the free slots waited for these to end
+            for job_id, task_id, time_eligible, num_attempts in pending_rows:
+                if self.config.max_tasks_running is None:
+                    time_started = time_eligible
+                else:
+                    time_started = max(time_eligible, time_slot_freed)
+                time_ends, outcome, node_name, memory_used_mb = self._get_attempt_end_time_and_outcome(job_id, task_id, num_attempts, time_started, get_job_dict(job_id))
+                conn.execute(
+                    "UPDATE tasks SET state = ?, time_started = ?, time_ends = ?, outcome = ?, node_name = ?, memory_used_mb = ? WHERE job_id = ? AND task_id = ?",
+                    (RUNNING, time_started, time_ends, outcome, node_name, memory_used_mb, job_id, task_id),
+                )
+                self._write_task_start_time(conn, get_job_dict(job_id), task_id, time_started)
+
+            #
+            if not rows and not pending_rows:
+                break
+
+    def get_node_names(self) -> List[str]:
+        """The first `num_bad_nodes` are bad."""
+
+        return [f"simnode{i:04d}" for i in range(1, self.config.num_nodes + 1)]
+
+    def _get_attempt_end_time_and_outcome(self, job_id: int, task_id: int, num_attempts: int, time_started: float, job_dict: dict) -> Tuple[float, str, str, Optional[float]]:
+        """Returns the end time, outcome, node, and memory used of a task attempt."""
+
+        rng = self._get_rng(job_id, task_id, num_attempts, "attempt")
+        runtime_seconds = rng.lognormvariate(math.log(self.config.median_task_runtime_seconds), self.config.task_runtime_sigma)
+        if self.config.median_task_memory_mb is not None:
+            memory_used_mb = rng.lognormvariate(math.log(self.config.median_task_memory_mb), self.config.task_runtime_sigma)
+        else:
+            memory_used_mb = None
+
+        #
+        node_names = self.get_node_names()
+        excluded_node_names = set(json.loads(job_dict["excluded_node_names_json"] or "[]"))
+        node_name = rng.choice([n for n in node_names if n not in excluded_node_names] or node_names)
+        if node_name in node_names[:self.config.num_bad_nodes]:
+            return time_started + runtime_seconds * rng.random(), NODE_FAILURE, node_name, None
+
+        #
+        x = rng.random()
+        if x < self.config.node_failure_probability:
+            return time_started + runtime_seconds * rng.random(), NODE_FAILURE, node_name, None
+        if x < self.config.node_failure_probability + self.config.preemption_probability:
+            return time_started + runtime_seconds * rng.random(), PREEMPTED, node_name, None
+        if memory_used_mb is not None and job_dict["memory_mb"] is not None and memory_used_mb > job_dict["memory_mb"]:
+            return time_started + runtime_seconds * rng.random(), MEMORY_LIMIT_REACHED, node_name, float(job_dict["memory_mb"])
+        if job_dict["time_limit_seconds"] is not None and runtime_seconds > job_dict["time_limit_seconds"]:
+            return time_started + job_dict["time_limit_seconds"], TIME_LIMIT_REACHED, node_name, memory_used_mb
+
+        return time_started + runtime_seconds, SUCCESS, node_name, memory_used_mb
+
+    def _write_task_start_time(self, conn: sqlite3.Connection, job_dict: dict, task_id: int, time_started: float) -> None:
+        if self.config.execute_scripts:  # written by the script
+            return
+        env_vars_dict = json.loads(job_dict["env_json"])
+        if "EXPORT_DEST" not in env_vars_dict:
+            return
+        task_dir_path = os.path.join(env_vars_dict["EXPORT_DEST"], str(task_id))
+        os.makedirs(task_dir_path, exist_ok=True)
+        with open(os.path.join(task_dir_path, "start_time"), "w") as f:
+            f.write(f"{int(self.get_epoch_time(conn, time_started))}\n")
+
+    def _write_task_output(self, conn: sqlite3.Connection, job_dict: dict, job_id: int, task_id: int, time_ends: float) -> None:
+        env_vars_dict = json.loads(job_dict["env_json"])
+
+        #
+        if self.config.execute_scripts:
+            if job_dict["scheduler_name"] == "slurm":
+                task_env_vars_dict = {"SLURM_ARRAY_JOB_ID": str(job_id), "SLURM_ARRAY_TASK_ID": str(task_id)}
+            else:
+                task_env_vars_dict = {"JOB_ID": str(job_id), "SGE_TASK_ID": str(task_id)}
+            out_file_path = os.path.join(job_dict["log_dir_path"], f"{job_dict['job_name']}_{job_id}_{task_id}.out")
+            with open(out_file_path, "w") as f:
+                subprocess.run(["bash", job_dict["script_path"]], env={**os.environ, **env_vars_dict, **task_env_vars_dict}, stdout=f, stderr=subprocess.STDOUT)
+            return
+
+        # write what `rundock.bash` would with the fake DOCK executable
+        if "EXPORT_DEST" not in env_vars_dict:
+            return
+        task_dir_path = os.path.join(env_vars_dict["EXPORT_DEST"], str(task_id))
+        os.makedirs(task_dir_path, exist_ok=True)
+        spec_line = self._get_array_job_docking_configurations_file_line(env_vars_dict["ARRAY_JOB_DOCKING_CONFIGURATIONS"], task_id)
+        indock_file_path = spec_line.split()[1]
+        with open(indock_file_path, "r") as f:
+            docking_configuration_seed = get_hexdigest_of_md5_hash_of_str(f.read())
+        has_dock_error = docking_configuration_has_dock_error(docking_configuration_seed, self.config.dock_error_probability)
+        write_outdock_and_mol2_files(
+            task_dir_path,
+            "OUTDOCK.0",
+            "test.mol2.gz.0",
+            self._get_db2_file_paths(env_vars_dict["INPUT_DIR"]),
+            docking_configuration_seed,
+            export_mol2=(env_vars_dict.get("EXPORT_MOL2", "true") == "true"),
+            has_dock_error=has_dock_error,
+        )
+        if has_dock_error:
+            self._write_task_stderr(job_dict, job_id, task_id, DOCK_ERROR_MESSAGE)
+        epoch_time_ends = self.get_epoch_time(conn, time_ends)
+        os.utime(os.path.join(task_dir_path, "OUTDOCK.0"), (epoch_time_ends, epoch_time_ends))
+
+    def get_task_stderr_file_path(self, job_dict: dict, job_id: int, task_id: int) -> str:
+        if job_dict["scheduler_name"] == "slurm":
+            return os.path.join(job_dict["log_dir_path"], f"{job_dict['job_name']}_{job_id}_{task_id}.err")
+        else:
+            return os.path.join(job_dict["log_dir_path"], f"{job_dict['job_name']}.e{job_id}.{task_id}")
+
+    def _write_task_stderr(self, job_dict: dict, job_id: int, task_id: int, message: str) -> None:
+        if not os.path.isdir(job_dict["log_dir_path"]):
+            return
+        with open(self.get_task_stderr_file_path(job_dict, job_id, task_id), "a") as f:
+            f.write(f"{message}\n")
+
+    def _get_array_job_docking_configurations_file_line(self, file_path: str, task_id: int) -> str:
+        if file_path not in self._spec_file_path_to_task_id_to_line_dict:
+            with open(file_path, "r") as f:
+                self._spec_file_path_to_task_id_to_line_dict[file_path] = {int(line.split()[0]): line for line in f if line.strip()}
+        return self._spec_file_path_to_task_id_to_line_dict[file_path][task_id]
+
+    def _get_db2_file_paths(self, input_dir_path: str) -> List[str]:
+        """Same as the `split_database_index` made by `rundock.bash`."""
+
+        if input_dir_path not in self._input_dir_path_to_db2_file_paths_dict:
+            db2_file_paths = []
+            for dir_path, _, file_names in os.walk(input_dir_path):
+                db2_file_paths += [os.path.realpath(os.path.join(dir_path, file_name)) for file_name in file_names if ".db2" in file_name]
+            self._input_dir_path_to_db2_file_paths_dict[input_dir_path] = sorted(db2_file_paths)
+        return self._input_dir_path_to_db2_file_paths_dict[input_dir_path]
+
+    def get_finished_tasks(self, conn: sqlite3.Connection, job_names: List[str]) -> List[dict]:
+        """Accounting of the latest attempt of every finished task of the jobs with the given names."""
+
+        column_names = ["job_id", "job_name", "task_id", "state", "node_name", "memory_used_mb", "time_started", "time_ends", "time_limit_seconds", "memory_mb"]
+        rows = conn.execute(
+            f"SELECT tasks.job_id, jobs.job_name, tasks.task_id, tasks.state, tasks.node_name, tasks.memory_used_mb, tasks.time_started, tasks.time_ends, jobs.time_limit_seconds, jobs.memory_mb FROM tasks JOIN jobs ON tasks.job_id = jobs.job_id WHERE jobs.job_name IN ({', '.join(['?'] * len(job_names))}) AND tasks.state IN ({', '.join(['?'] * len(FINAL_STATES))}) ORDER BY tasks.job_id, tasks.task_id",
+            (*job_names, *FINAL_STATES),
+        ).fetchall()
+
+        return [dict(zip(column_names, row)) for row in rows]
+
+    def get_task_stats_dict(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """Number of tasks by state."""
+
+        return dict(conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+
+    def get_command_counts_dict(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """Number of invocations by command (e.g., `sbatch`)."""
+
+        return dict(conn.execute("SELECT command, COUNT(*) FROM command_log GROUP BY command").fetchall())
+
+
+def run_clock(cluster_dir_path: str, seconds_between_advances: float = 1.0) -> None:
+    """Advance the simulated cluster periodically (until terminated), so that task output appears close to when the
+    tasks end rather than only when the queue is next queried."""
+
+    cluster = SimulatedCluster(cluster_dir_path)
+    conn = cluster.connect()
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cluster.advance(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        time.sleep(seconds_between_advances)
+
+
+def main() -> None:
+    fire.Fire(run_clock)
@@ -0,0 +1,408 @@
+import os
+import re
+import sys
+import stat
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Tuple
+from xml.sax.saxutils import escape
+
+from pydock3.simulation.cluster import SimulatedCluster, PENDING, COMPLETED, NODE_FAIL, TIMEOUT, OUT_OF_MEMORY, CANCELLED
+
+
+#
+CLUSTER_DIR_ENV_VAR_NAME = "PYDOCK3_SIMULATED_CLUSTER_DIR"
+FAKE_EXECUTABLES_DIR_NAME = "bin"
+FAKE_DOCK_EXECUTABLE_NAME = "dock64"
+COMMAND_NAMES = ["sbatch", "squeue", "scancel", "sacct", "qsub", "qstat", "qdel", "qacct"]
+
+#
+COMMAND_NAME_TO_ENV_VAR_NAME_DICT = {  # as read by `SlurmJobScheduler` / `SGEJobScheduler`
+    "sbatch": "SBATCH_EXEC",
+    "squeue": "SQUEUE_EXEC",
+    "scancel": "SCANCEL_EXEC",
+    "sacct": "SACCT_EXEC",
+    "qsub": "QSUB_EXEC",
+    "qstat": "QSTAT_EXEC",
+    "qdel": "QDEL_EXEC",
+    "qacct": "QACCT_EXEC",
+}
+
+#
+STATE_TO_SACCT_STATE_AND_EXIT_CODE_DICT = {
+    COMPLETED: ("COMPLETED", "0:0"),
+    NODE_FAIL: ("NODE_FAIL", "0:0"),
+    TIMEOUT: ("TIMEOUT", "0:15"),
+    OUT_OF_MEMORY: ("OUT_OF_MEMORY", "0:125"),
+    CANCELLED: ("CANCELLED", "0:15"),
+}
+STATE_TO_QACCT_FAILED_AND_EXIT_STATUS_DICT = {
+    COMPLETED: ("0", "0"),
+    NODE_FAIL: ("8     : assumedly before job", "0"),
+    TIMEOUT: ("37    : qmaster enforced h_rt, h_cpu, or h_vmem limit", "137"),
+    OUT_OF_MEMORY: ("100   : assumedly after job", "137"),
+    CANCELLED: ("100   : assumedly after job", "137"),
+}
+
+
+class CommandError(Exception):
+    """Error of a fake command, reported on stderr with a nonzero exit code (as the real command would)."""
+
+    pass
+
+
+def get_contiguous_ranges(nums: List[int]) -> List[Tuple[int, int]]:
+    return [
+        (g[0], g[-1])
+        for g in [list(map(itemgetter(1), g)) for k, g in groupby(enumerate(sorted(nums)), lambda x: x[0] - x[1])]
+    ]
+
+
+def parse_task_ids_str(task_ids_str: str) -> List[int]:
+    """e.g., `1-3,7` (Slurm `--array`) or `1-9:2` (SGE `-t`)"""
+
+    task_ids = []
+    for range_str in task_ids_str.split(","):
+        match = re.match(r"^(\d+)(-(\d+)(:(\d+))?)?$", range_str.strip())
+        if match is None:
+            raise Exception(f"Invalid task array: {task_ids_str}")
+        start = int(match.group(1))
+        end = int(match.group(3)) if match.group(3) is not None else start
+        step = int(match.group(5)) if match.group(5) is not None else 1
+        task_ids += list(range(start, end + 1, step))
+
+    return task_ids
+
+
+def parse_slurm_time_limit_seconds(time_str: str) -> float:
+    """e.g., `30` (minutes), `1:30:00`, or `1-12:00:00`"""
+
+    days = 0
+    if "-" in time_str:
+        days_str, time_str = time_str.split("-", 1)
+        days = int(days_str)
+    parts = [int(x) for x in time_str.split(":")]
+    if len(parts) == 1:
+        seconds = 60 * parts[0]
+    elif len(parts) == 2:
+        seconds = 60 * parts[0] + parts[1]
+    else:
+        seconds = 3600 * parts[0] + 60 * parts[1] + parts[2]
+
+    return 86400 * days + seconds
+
+
+def parse_memory_mb(memory_str: str) -> int:
+    match = re.match(r"^(\d+)([KMGT]?)$", memory_str.upper())
+    if match is None:
+        raise Exception(f"Invalid memory: {memory_str}")
+    unit_to_factor_dict = {"K": 1 / 1024, "": 1, "M": 1, "G": 1024, "T": 1024**2}
+
+    return int(int(match.group(1)) * unit_to_factor_dict[match.group(2)])
+
+
+def sbatch(cluster: SimulatedCluster, conn, args: List[str]) -> None:
+    job_name, log_dir_path, task_ids, time_limit_seconds, memory_mb, excluded_node_names = "sbatch", os.getcwd(), [0], None, None, []
+    for arg, next_arg in zip(args, args[1:] + [None]):
+        if arg == "-J":
+            job_name = next_arg
+        elif arg == "-o":
+            log_dir_path = os.path.dirname(next_arg)
+        elif arg.startswith("--array="):
+            task_ids = parse_task_ids_str(arg.split("=", 1)[1])
+        elif arg.startswith("--time="):
+            time_limit_seconds = parse_slurm_time_limit_seconds(arg.split("=", 1)[1])
+        elif arg.startswith("--mem="):
+            memory_mb = parse_memory_mb(arg.split("=", 1)[1])
+        elif arg.startswith("--exclude="):
+            excluded_node_names = arg.split("=", 1)[1].split(",")
+    script_path = args[-1]
+
+    #
+    job_id = cluster.submit(conn, "slurm", job_name, script_path, dict(os.environ), log_dir_path, task_ids, time_limit_seconds, memory_mb, excluded_node_names)
+    print(f"Submitted batch job {job_id}")
+
+
+def squeue(cluster: SimulatedCluster, conn, args: List[str]) -> None:
+    one_line_per_task = "-r" in args or "--array" in args
+    no_header = "-h" in args or "--noheader" in args
+    format_str = "%.18i %.9P %.8j %.8u %.2t %.10M %.6D %R"
+    for arg, next_arg in zip(args, args[1:] + [None]):
+        if arg.startswith("--format="):
+            format_str = arg.split("=", 1)[1]
+        elif arg in ["-o", "--format"]:
+            format_str = next_arg
+
+    #
+    rows = []  # (job id, job name, state)
+    job_id_to_job_name_and_pending_task_ids_dict = {}
+    for job_id, job_name, task_id, state in cluster.get_queued_tasks(conn):
+        if state == PENDING and not one_line_per_task:  # pending tasks of an array job are shown together
+            job_id_to_job_name_and_pending_task_ids_dict.setdefault(job_id, (job_name, []))[1].append(task_id)
+        else:
+            rows.append((f"{job_id}_{task_id}", job_name, state))
+    for job_id, (job_name, task_ids) in job_id_to_job_name_and_pending_task_ids_dict.items():
+        ranges_str = ",".join([f"{a}" if a == b else f"{a}-{b}" for a, b in get_contiguous_ranges(task_ids)])
+        rows.append((f"{job_id}_[{ranges_str}]", job_name, PENDING))
+
+    #
+    def format_row(job_id, job_name, state):
+        field_to_value_dict = {"i": job_id, "j": job_name, "t": state}
+        return re.sub(r"%\.?\d*([a-zA-Z])", lambda m: field_to_value_dict.get(m.group(1), ""), format_str)
+
+    lines = [] if no_header else [format_row("JOBID", "NAME", "ST")]
+    lines += [format_row(*row) for row in rows]
+    if lines:
+        print("\n".join(lines))
+
+
+def scancel(cluster: SimulatedCluster, conn, args: List[str]) -> None:
+    for arg in args:
+        if arg.startswith("-"):
+            continue
+        if "_" in arg:
+            job_id_str, task_id_str = arg.split("_", 1)
+            cluster.cancel(conn, int(job_id_str), int(task_id_str))
+        else:
+            cluster.cancel(conn, int(arg))
+
+
+def qsub(cluster: SimulatedCluster, conn, args: List[str]) -> None:
+    job_name, log_dir_path, task_ids, time_limit_seconds, memory_mb, excluded_node_names = "qsub", os.getcwd(), [1], None, None, []
+    for arg, next_arg in zip(args, args[1:] + [None]):
+        if arg == "-N":
+            job_name = next_arg
+        elif arg == "-o":
+            log_dir_path = next_arg
+        elif arg == "-t":
+            task_ids = parse_task_ids_str(next_arg)
+        elif arg == "-l":
+            resource_name, _, value = next_arg.partition("=")
+            if resource_name == "h_rt":
+                time_limit_seconds = float(value)
+            elif resource_name == "mem_free":
+                memory_mb = parse_memory_mb(value)
+            elif resource_name in ["h", "hostname"] and value.startswith("!"):  # e.g., `!(node1|node2)`
+                excluded_node_names = value.lstrip("!").strip("()").split("|")
+    script_path = args[-1]
+
+    #
+    job_id = cluster.submit(conn, "sge", job_name, script_path, dict(os.environ), log_dir_path, task_ids, time_limit_seconds, memory_mb, excluded_node_names)
+    ranges_str = ",".join([f"{a}-{b}:1" for a, b in get_contiguous_ranges(task_ids)])
+    print(f'Your job-array {job_id}.{ranges_str} ("{job_name}") has been submitted')
+
+
+def _get_sge_job_groups(cluster: SimulatedCluster, conn) -> List[Tuple[int, str, str, str]]:
+    """(job number, job name, state, tasks) per running task & per contiguous range of pending tasks, as listed by `qstat`."""
+
+    groups = []
+    job_id_to_job_name_and_pending_task_ids_dict = {}
+    for job_id, job_name, task_id, state in cluster.get_queued_tasks(conn):
+        if state == PENDING:
+            job_id_to_job_name_and_pending_task_ids_dict.setdefault(job_id, (job_name, []))[1].append(task_id)
+        else:
+            groups.append((job_id, job_name, "r", f"{task_id}"))
+    for job_id, (job_name, task_ids) in job_id_to_job_name_and_pending_task_ids_dict.items():
+        for a, b in get_contiguous_ranges(task_ids):
+            groups.append((job_id, job_name, "qw", f"{a}" if a == b else f"{a}-{b}:1"))
+
+    return groups
+
+
+def qstat(cluster: SimulatedCluster, conn, args: List[str]) -> None:
+    groups = _get_sge_job_groups(cluster, conn)
+
+    #
+    if "-xml" in args:
+        running_xml = "".join([
+            f"<job_list state=\"running\"><JB_job_number>{n}</JB_job_number><JB_name>{escape(name)}</JB_name><state>{s}</state><tasks>{t}</tasks></job_list>"
+            for n, name, s, t in groups if s == "r"
+        ])
+        pending_xml = "".join([
+            f"<job_list state=\"pending\"><JB_job_number>{n}</JB_job_number><JB_name>{escape(name)}</JB_name><state>{s}</state><tasks>{t}</tasks></job_list>"
+            for n, name, s, t in groups if s == "qw"
+        ])
+        print(f"<?xml version='1.0'?>\n<job_info><queue_info>{running_xml}</queue_info><job_info>{pending_xml}</job_info></job_info>")
+        return
+
+    #
+    if not groups:
+        return
+    lines = ["job-ID  prior   name       user         state ja-task-ID", "-" * 60]
+    for n, name, s, t in groups:
+        lines.append(f"{n:>7} 0.50000 {name[:10]:<10} simulated    {s:<5} {t}")
+        if "-r" in args:
+            lines.append(f"       Full jobname:     {name}")
+    print("\n".join(lines))
+
+
+def qdel(cluster: SimulatedCluster, conn, args: List[str]) -> None:
+    job_id, task_ids = None, None
+    for arg, next_arg in zip(args, args[1:] + [None]):
+        if arg == "-t":
+            task_ids = parse_task_ids_str(next_arg)
+        elif re.match(r"^\d+$", arg) and job_id is None:
+            job_id = int(arg)
+    if job_id is None:
+        raise Exception("qdel: job ID required")
+    if task_ids is None:
+        cluster.cancel(conn, job_id)
+    else:
+        for task_id in task_ids:
+            cluster.cancel(conn, job_id, task_id)
+
+
+def sacct(cluster: SimulatedCluster, conn, args: List[str]) -> None:
+    job_names, format_field_names = [], ["JobID", "JobName", "State", "ExitCode"]
+    parsable = "-P" in args or "--parsable2" in args
+    for arg, next_arg in zip(args, args[1:] + [None]):
+        if arg.startswith("--name="):
+            job_names = arg.split("=", 1)[1].split(",")
+        elif arg.startswith("--format="):
+            format_field_names = arg.split("=", 1)[1].split(",")
+    if not job_names:
+        return
+
+    # a line per task attempt & a line per its batch step
+    lines = []
+    for task_dict in cluster.get_finished_tasks(conn, job_names):
+        state, exit_code = STATE_TO_SACCT_STATE_AND_EXIT_CODE_DICT[task_dict["state"]]
+        elapsed_seconds = int(task_dict["time_ends"] - task_dict["time_started"]) if task_dict["time_ends"] is not None and task_dict["time_started"] is not None else 0
+        max_rss_str = f"{int(1024 * task_dict['memory_used_mb'])}K" if task_dict["memory_used_mb"] is not None else ""
+        job_id_str = f"{task_dict['job_id']}_{task_dict['task_id']}"
+        for field_name_to_value_dict in [
+            {"JobID": job_id_str, "JobName": task_dict["job_name"], "MaxRSS": ""},
+            {"JobID": f"{job_id_str}.batch", "JobName": "batch", "MaxRSS": max_rss_str},
+        ]:
+            field_name_to_value_dict.update({
+                "State": state,
+                "ExitCode": exit_code,
+                "NodeList": task_dict["node_name"] or "None assigned",
+                "ElapsedRaw": str(elapsed_seconds),
+            })
+            values = [field_name_to_value_dict.get(field_name, "") for field_name in format_field_names]
+            lines.append("|".join(values) if parsable else " ".join(values))
+    if lines:
+        print("\n".join(lines))
+
+
+def qacct(cluster: SimulatedCluster, conn, args: List[str]) -> None:
+    job_name = None
+    for arg, next_arg in zip(args, args[1:] + [None]):
+        if arg == "-j":
+            job_name = next_arg
+    task_dicts = cluster.get_finished_tasks(conn, [job_name]) if job_name is not None else []
+    if not task_dicts:
+        raise CommandError(f"error: job name {job_name} not found")
+
+    # a block per task attempt
+    lines = []
+    for task_dict in task_dicts:
+        failed, exit_status = STATE_TO_QACCT_FAILED_AND_EXIT_STATUS_DICT[task_dict["state"]]
+        elapsed_seconds = task_dict["time_ends"] - task_dict["time_started"] if task_dict["time_ends"] is not None and task_dict["time_started"] is not None else 0.0
+        resource_requests = []
+        if task_dict["time_limit_seconds"] is not None:
+            resource_requests.append(f"h_rt={int(task_dict['time_limit_seconds'])}")
+        if task_dict["memory_mb"] is not None:
+            resource_requests.append(f"mem_free={task_dict['memory_mb']}M")
+        lines += [
+            "=" * 62,
+            "qname        all.q",
+            f"hostname     {task_dict['node_name'] or 'UNKNOWN'}",
+            f"jobname      {task_dict['job_name']}",
+            f"jobnumber    {task_dict['job_id']}",
+            f"taskid       {task_dict['task_id']}",
+            f"category     {'-l ' + ','.join(resource_requests) if resource_requests else ''}",
+            f"failed       {failed}",
+            f"exit_status  {exit_status}",
+            f"ru_wallclock {elapsed_seconds:.3f}s",
+            f"maxvmem      {task_dict['memory_used_mb'] or 0:.3f}M",
+        ]
+    print("\n".join(lines))
+
+
+COMMAND_NAME_TO_FUNC_DICT = {
+    "sbatch": sbatch,
+    "squeue": squeue,
+    "scancel": scancel,
+    "sacct": sacct,
+    "qsub": qsub,
+    "qstat": qstat,
+    "qdel": qdel,
+    "qacct": qacct,
+}
+
+
+
+def run_command(cluster_dir_path: str, command_name: str, args: List[str]) -> None:
+    """Run a fake job scheduler command against the simulated cluster, advancing it to the current time first."""
+
+    cluster = SimulatedCluster(cluster_dir_path)
+    conn = cluster.connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cluster.log_command(conn, command_name)
+        cluster.advance(conn)
+        COMMAND_NAME_TO_FUNC_DICT[command_name](cluster, conn, args)
+        conn.execute("COMMIT")
+    except CommandError:
+        conn.execute("COMMIT")
+        raise
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def install_fake_executables(cluster_dir_path: str) -> dict:
+    """Write the fake job scheduler executables and the fake DOCK executable to the `bin` dir of the simulated cluster.
+    Returns the env vars pointing pydock3 to them.
+
+    The paths of the cluster & of pydock3 are written into the executables, since pydock3 runs the job scheduler
+    commands with only the env vars of the job."""
+
+    cluster_dir_path = os.path.abspath(cluster_dir_path)
+    bin_dir_path = os.path.join(cluster_dir_path, FAKE_EXECUTABLES_DIR_NAME)
+    os.makedirs(bin_dir_path, exist_ok=True)
+    python_path = os.pathsep.join([p for p in sys.path if p] + [os.environ.get("PYTHONPATH", "")]).rstrip(os.pathsep)
+
+    #
+    def write_executable(name, module_cmd):
+        file_path = os.path.join(bin_dir_path, name)
+        with open(file_path, "w") as f:
+            f.write(
+                "#!/bin/sh\n"
+                f"export {CLUSTER_DIR_ENV_VAR_NAME}='{cluster_dir_path}'\n"
+                f"export PYTHONPATH='{python_path}'\n"
+                f"exec '{sys.executable}' -m {module_cmd} \"$@\"\n"
+            )
+        os.chmod(file_path, os.stat(file_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        return file_path
+
+    #
+    env_vars_dict = {}
+    for command_name in COMMAND_NAMES:
+        env_vars_dict[COMMAND_NAME_TO_ENV_VAR_NAME_DICT[command_name]] = write_executable(command_name, f"pydock3.simulation.commands {command_name}")
+    env_vars_dict["DOCK3_EXECUTABLE_PATH"] = write_executable(FAKE_DOCK_EXECUTABLE_NAME, "pydock3.simulation.fake_dock")
+
+    return env_vars_dict
+
+
+def main() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMAND_NAME_TO_FUNC_DICT:
+        sys.stderr.write(f"usage: python -m pydock3.simulation.commands {{{','.join(COMMAND_NAMES)}}} [args...]\n")
+        sys.exit(1)
+    cluster_dir_path = os.environ.get(CLUSTER_DIR_ENV_VAR_NAME)
+    if cluster_dir_path is None:
+        sys.stderr.write(f"Env var {CLUSTER_DIR_ENV_VAR_NAME} not set.\n")
+        sys.exit(1)
+    try:
+        run_command(cluster_dir_path, sys.argv[1], sys.argv[2:])
+    except CommandError as e:
+        sys.stderr.write(f"{e}\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+import sys
+import gzip
+import json
+import random
+import hashlib
+from typing import List
+
+
+#
+OUTDOCK_COLUMN_NAMES = [  # see `OutdockFile.COLUMN_NAMES`
+    "mol#", "id_num", "flexiblecode", "matched", "nscored", "time", "hac", "setnum", "matnum", "rank", "charge",
+    "elect", "gist", "vdW", "psol", "asol", "tStrain", "mStrain", "rec_d", "r_hyd", "Total",
+]
+OUTDOCK_FILE_NAME = "OUTDOCK"  # as written by DOCK in its working dir (see `rundock.bash`)
+MOL2_FILE_NAME = "test.mol2.gz"
+SPLIT_DATABASE_INDEX_FILE_NAME = "split_database_index"
+
+#
+MEAN_DECOY_TOTAL_ENERGY = -25.0
+STD_TOTAL_ENERGY = 6.0
+MAX_ACTIVE_ENRICHMENT_SHIFT = 12.0  # actives score better than decoys by up to this much, depending on the docking configuration
+DOCK_ERROR_MESSAGE = "forrtl: severe (174): SIGSEGV, segmentation fault occurred"
+
+
+def get_hexdigest_of_md5_hash_of_str(s: str) -> str:
+    return hashlib.md5(s.encode("utf-8")).hexdigest()
+
+
+def get_docking_configuration_quality(docking_configuration_seed: str) -> float:
+    """Deterministic value in [0, 1) of how well a docking configuration separates actives from decoys."""
+
+    return int(get_hexdigest_of_md5_hash_of_str(f"quality:{docking_configuration_seed}")[:8], 16) / 16**8
+
+
+def docking_configuration_has_dock_error(docking_configuration_seed: str, dock_error_probability: float) -> bool:
+    """Deterministic, so that every attempt of the docking configuration's tasks crashes in the same way."""
+
+    return int(get_hexdigest_of_md5_hash_of_str(f"dock_error:{docking_configuration_seed}")[:8], 16) / 16**8 < dock_error_probability
+
+
+def get_synthetic_total_energy(db2_file_path: str, docking_configuration_seed: str) -> float:
+    """Deterministic synthetic DOCK score of a molecule (DB2 file) under a docking configuration. Molecules in a directory
+    named `actives` score better by an amount that depends on the docking configuration."""
+
+    rng = random.Random(get_hexdigest_of_md5_hash_of_str(f"{docking_configuration_seed}:{db2_file_path}"))
+    total_energy = rng.gauss(MEAN_DECOY_TOTAL_ENERGY, STD_TOTAL_ENERGY)
+    if f"{os.sep}actives{os.sep}" in db2_file_path:
+        total_energy -= MAX_ACTIVE_ENRICHMENT_SHIFT * get_docking_configuration_quality(docking_configuration_seed)
+
+    return total_energy
+
+
+def get_outdock_lines(db2_file_paths: List[str], docking_configuration_seed: str, elapsed_seconds: float = 1.0, has_dock_error: bool = False) -> List[str]:
+    """Lines of a synthetic OUTDOCK file (one pose per DB2 file) in the format read by `OutdockFile`. With a DOCK error,
+    the file is cut short after the first DB2 file, as when DOCK crashes."""
+
+    lines = []
+    for i, db2_file_path in enumerate(db2_file_paths):
+        if has_dock_error and i == 1:
+            lines.append(f" {DOCK_ERROR_MESSAGE}")
+            return lines
+        total_energy = get_synthetic_total_energy(db2_file_path, docking_configuration_seed)
+        molecule_id = f"SIM{get_hexdigest_of_md5_hash_of_str(db2_file_path)[:12]}"
+        vdw_energy = 0.6 * total_energy
+        elect_energy = 0.3 * total_energy
+        polar_desolvation_energy = 0.1 * total_energy
+        lines.append(f" open the file: {db2_file_path}")
+        if i == 0:
+            lines.append(" " + " ".join(OUTDOCK_COLUMN_NAMES))
+        lines.append(
+            f" {i + 1} {molecule_id} 0 100 50 0.01 20 1 1 1 0.00 {elect_energy:.2f} 0.00 {vdw_energy:.2f} {polar_desolvation_energy:.2f} 0.00 0.00 0.00 0.00 0.00 {total_energy:.2f}"
+        )
+        lines.append(f" close the file: {db2_file_path}")
+    lines.append(f"elapsed time (sec): {elapsed_seconds:.4f}")
+
+    return lines
+
+
+def write_outdock_and_mol2_files(dir_path: str, outdock_file_name: str, mol2_file_name: str, db2_file_paths: List[str], docking_configuration_seed: str, export_mol2: bool = True, has_dock_error: bool = False) -> None:
+    with open(os.path.join(dir_path, outdock_file_name), "w") as f:
+        f.write("\n".join(get_outdock_lines(db2_file_paths, docking_configuration_seed, has_dock_error=has_dock_error)) + "\n")
+    if export_mol2:
+        with gzip.open(os.path.join(dir_path, mol2_file_name), "wt") as f:
+            f.write("@<TRIPOS>MOLECULE\nsimulated\n")
+
+
+def main() -> None:
+    """Stand-in for the DOCK executable: `dock64 INDOCK`, run in the working dir prepared by `rundock.bash`."""
+
+    if len(sys.argv) != 2:
+        sys.stderr.write("usage: dock64 INDOCK\n")
+        sys.exit(1)
+    with open(sys.argv[1], "r") as f:
+        docking_configuration_seed = get_hexdigest_of_md5_hash_of_str(f.read())
+    with open(SPLIT_DATABASE_INDEX_FILE_NAME, "r") as f:
+        db2_file_paths = [line.strip() for line in f if line.strip()]
+
+    # DOCK errors of the simulated cluster this is run on, if any
+    dock_error_probability = 0.0
+    cluster_dir_path = os.environ.get("PYDOCK3_SIMULATED_CLUSTER_DIR")
+    if cluster_dir_path is not None:
+        with open(os.path.join(cluster_dir_path, "cluster_config.json"), "r") as f:
+            dock_error_probability = json.load(f).get("dock_error_probability", 0.0)
+    has_dock_error = docking_configuration_has_dock_error(docking_configuration_seed, dock_error_probability)
+
+    #
+    write_outdock_and_mol2_files(os.getcwd(), OUTDOCK_FILE_NAME, MOL2_FILE_NAME, db2_file_paths, docking_configuration_seed, has_dock_error=has_dock_error)
+    if has_dock_error:
+        sys.stderr.write(f"{DOCK_ERROR_MESSAGE}\n")
+        sys.exit(174)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import json
+import logging
+from typing import Optional
+
+from pydock3.util import Script, CleanExit
+from pydock3.simulation.cluster import SimulatedCluster, SimulatedClusterConfig
+from pydock3.simulation.commands import install_fake_executables
+from pydock3.simulation.benchmark import run_benchmark
+
+
+#
+logger = logging.getLogger("dockopt")
+
+
+class Simulation(Script):
+    """Simulated Slurm / SGE cluster (fake `sbatch`, `squeue`, `scancel`, `qsub`, `qstat`, `qdel` & DOCK executables) for
+    load testing DockOpt's orchestration on one machine."""
+
+    SIM_DIR_NAME = "simulated_cluster"
+
+    def __init__(self):
+        super().__init__()
+
+    def new(
+        self,
+        sim_dir_path: str = SIM_DIR_NAME,
+        time_scale: float = 1.0,
+        mean_queue_delay_seconds: float = 5.0,
+        median_task_runtime_seconds: float = 60.0,
+        task_runtime_sigma: float = 0.5,
+        median_task_memory_mb: Optional[float] = None,
+        node_failure_probability: float = 0.0,
+        preemption_probability: float = 0.0,
+        dock_error_probability: float = 0.0,
+        num_nodes: int = 100,
+        num_bad_nodes: int = 0,
+        max_tasks_running: Optional[int] = None,
+        execute_scripts: bool = False,
+        seed: int = 0,
+    ) -> None:
+        """Create a simulated cluster and print the env vars that point pydock3 to it (e.g., for `pydock3 dockopt - run`)."""
+
+        config = SimulatedClusterConfig(
+            time_scale=time_scale,
+            mean_queue_delay_seconds=mean_queue_delay_seconds,
+            median_task_runtime_seconds=median_task_runtime_seconds,
+            task_runtime_sigma=task_runtime_sigma,
+            median_task_memory_mb=median_task_memory_mb,
+            node_failure_probability=node_failure_probability,
+            preemption_probability=preemption_probability,
+            dock_error_probability=dock_error_probability,
+            num_nodes=num_nodes,
+            num_bad_nodes=num_bad_nodes,
+            max_tasks_running=max_tasks_running,
+            execute_scripts=execute_scripts,
+            seed=seed,
+        )
+        SimulatedCluster.create(sim_dir_path, config)
+        env_vars_dict = install_fake_executables(sim_dir_path)
+        logger.info(f"Created simulated cluster in `{os.path.abspath(sim_dir_path)}`. To use it:")
+        print("\n".join([f"export {name}={value}" for name, value in env_vars_dict.items()]))
+
+    def benchmark(
+        self,
+        sim_dir_path: str = SIM_DIR_NAME,
+        scheduler: str = "slurm",
+        num_tasks: int = 1000,
+        max_task_array_size: int = 20000,
+        num_actives: int = 5,
+        num_decoys: int = 20,
+        max_reattempts: int = 2,
+        job_timeout_minutes: Optional[int] = None,
+        max_job_timeout_minutes: Optional[int] = None,
+        job_memory_mb: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        speculative_execution_runtime_multiple: Optional[float] = None,
+        time_scale: float = 1.0,
+        mean_queue_delay_seconds: float = 5.0,
+        median_task_runtime_seconds: float = 60.0,
+        task_runtime_sigma: float = 0.5,
+        median_task_memory_mb: Optional[float] = None,
+        node_failure_probability: float = 0.0,
+        preemption_probability: float = 0.0,
+        dock_error_probability: float = 0.0,
+        num_nodes: int = 100,
+        num_bad_nodes: int = 0,
+        max_tasks_running: Optional[int] = None,
+        execute_scripts: bool = False,
+        seed: int = 0,
+    ) -> None:
+        """Run a step's worth of array docking jobs against a new simulated cluster and report the cost of orchestrating
+        them (wall time, CPU time, job scheduler commands, file system & process events, latency of results)."""
+
+        with CleanExit():
+            config = SimulatedClusterConfig(
+                time_scale=time_scale,
+                mean_queue_delay_seconds=mean_queue_delay_seconds,
+                median_task_runtime_seconds=median_task_runtime_seconds,
+                task_runtime_sigma=task_runtime_sigma,
+                median_task_memory_mb=median_task_memory_mb,
+                node_failure_probability=node_failure_probability,
+                preemption_probability=preemption_probability,
+                dock_error_probability=dock_error_probability,
+                num_nodes=num_nodes,
+                num_bad_nodes=num_bad_nodes,
+                max_tasks_running=max_tasks_running,
+                execute_scripts=execute_scripts,
+                seed=seed,
+            )
+            results_dict = run_benchmark(
+                sim_dir_path,
+                scheduler_name=scheduler,
+                num_tasks=num_tasks,
+                max_task_array_size=max_task_array_size,
+                num_actives=num_actives,
+                num_decoys=num_decoys,
+                max_reattempts=max_reattempts,
+                job_timeout_minutes=job_timeout_minutes,
+                max_job_timeout_minutes=max_job_timeout_minutes,
+                job_memory_mb=job_memory_mb,
+                timeout_seconds=timeout_seconds,
+                speculative_execution_runtime_multiple=speculative_execution_runtime_multiple,
+                cluster_config=config,
+            )
+            logger.info(f"Benchmark results:\n{json.dumps(results_dict, indent=2)}")
@@ -0,0 +1,5 @@
+import os
+
+
+# `pydock3.jobs` reads this on import; no test runs DOCK
+os.environ.setdefault("DOCK3_EXECUTABLE_PATH", "dock64")
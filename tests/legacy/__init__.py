@@ -0,0 +1,2 @@
+"""Reference implementations that predate their vectorized replacements in `pydock3`, kept verbatim so that tests can
+check the replacements against them."""
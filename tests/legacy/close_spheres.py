@@ -0,0 +1,35 @@
+# `trim_sph` & `distance_sph_pdb` of `pydock3.blastermaster.steps.close_spheres` as of before they used KD-trees (kept
+# verbatim as a reference)
+
+
+def trim_sph(sph_list, sph_rad):
+    for i in range(len(sph_list) - 1):
+        if sph_list[i][1]:
+            for j in range(i + 1, len(sph_list)):
+                if sph_list[j][1]:
+                    dist = (
+                        (sph_list[i][0].X - sph_list[j][0].X) ** 2
+                        + (sph_list[i][0].Y - sph_list[j][0].Y) ** 2
+                        + (sph_list[i][0].Z - sph_list[j][0].Z) ** 2
+                    )
+                    if dist <= (sph_rad**2.0) / 2.0:
+                        sph_list[j][1] = False
+
+    final_sph_list = []
+    for sph in sph_list:
+        if sph[1]:
+            final_sph_list.append(sph[0])
+
+    return final_sph_list
+
+
+def distance_sph_pdb(spheres, pdb_atoms, distance):
+    sph_list = []
+    for sph in spheres:
+        for atom in pdb_atoms:
+            d2 = (atom.X - sph.X) ** 2 + (atom.Y - sph.Y) ** 2 + (atom.Z - sph.Z) ** 2
+            if d2 < float(distance) ** 2.0:
+                sph_list.append([sph, True])
+                break
+
+    return sph_list
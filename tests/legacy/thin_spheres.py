@@ -0,0 +1,46 @@
+# `format_sphere_line` & `thin_spheres` of `pydock3.blastermaster.steps.thin_spheres` as of before `SphereSet` (kept
+# verbatim as a reference)
+
+
+def format_sphere_line(atom_num, sphere, size):
+    """Format a line of a DOCK .sph file"""
+
+    # FORTRAN FORMAT: (I5, 3F10.5, F8.3, I5, I2, I3)
+    return "%5d%10.5f%10.5f%10.5f%8.3f%5d%2d%3d" % (
+        atom_num,
+        sphere[0],
+        sphere[1],
+        sphere[2],
+        size,
+        atom_num,
+        0,
+        0,
+    )
+
+
+def thin_spheres(in_f, out_f, distance=1.8, size=1.9):
+    """Generate delphi sphere pool near a given distance using rec.ms."""
+
+    spheres = []
+    for line in in_f:
+        if line[40] == "S":
+            splits = line.split()
+            point = [float(line[13:21]), float(line[21:30]), float(line[30:39])]
+            normal = [
+                float(line[43:50]),
+                float(line[50:57]),
+                float(line[57:64]),
+                float(line[64:71]),
+            ]
+            sphere = [p + distance * n for p, n in zip(point, normal)]
+
+            # Handle odd chain id placement
+            try:
+                atom_num = int(splits[1])
+            except ValueError:
+                atom_num = int(splits[1][:-1])
+            spheres.append((atom_num, sphere))
+
+    out_f.write("cluster     0   number of spheres in cluster %5d\n" % len(spheres))
+    for atom_num, sphere in spheres:
+        out_f.write(format_sphere_line(atom_num, sphere, size=size) + "\n")
@@ -0,0 +1,84 @@
+import random
+
+import numpy as np
+import pytest
+
+from pydock3.blastermaster.programs.thinspheres import sph_lib
+from pydock3.blastermaster.steps import close_spheres
+
+from legacy import close_spheres as legacy_close_spheres
+
+
+#
+NUM_TRIALS = 300
+LATTICE_SPACING = 0.5  # distances between lattice points hit the cutoffs below exactly
+DISTANCES = [0, 0.5, 1, 1.5, "1.5", 2 ** 0.5]  # `distance_to_ligand_parameter` (strict cutoff: d^2 < distance^2)
+RADII = [0, 1.0, 2.0, 2 ** 0.5, 3.0]  # `distance_to_surface_parameter` + `penetration_parameter` (cutoff: d^2 <= r^2 / 2)
+
+
+class Atom(object):
+    def __init__(self, x, y, z):
+        self.X, self.Y, self.Z = x, y, z
+
+
+def make_coordinates(rng, num_points, on_lattice):
+    if on_lattice:
+        return [tuple(rng.randint(0, 6) * LATTICE_SPACING for _ in range(3)) for _ in range(num_points)]
+    return [tuple(round(rng.uniform(0, 10), 3) for _ in range(3)) for _ in range(num_points)]
+
+
+def make_spheres(coordinates):
+    return [sph_lib.Sphere(i + 1, x, y, z, 1.0, i, 0, 0) for i, (x, y, z) in enumerate(coordinates)]
+
+
+def make_trial(trial_num):
+    rng = random.Random(trial_num)
+    on_lattice = trial_num % 2 == 0
+    spheres = make_spheres(make_coordinates(rng, rng.randint(1, 60), on_lattice))
+    atoms = [Atom(*coords) for coords in make_coordinates(rng, rng.randint(0, 30), on_lattice)]
+    atoms += [Atom(sph.X, sph.Y + rng.choice([0.0, 0.5, 1.0, 1.5]), sph.Z) for sph in rng.sample(spheres, min(3, len(spheres)))]  # at the cutoffs
+    distance = rng.choice(DISTANCES + [rng.uniform(0, 4)])
+    radius = rng.choice(RADII + [rng.uniform(0, 5)])
+    return spheres, atoms, distance, radius
+
+
+@pytest.mark.parametrize("trial_num", range(NUM_TRIALS))
+def test_distance_sph_pdb_and_trim_sph_match_legacy(trial_num):
+    spheres, atoms, distance, radius = make_trial(trial_num)
+
+    #
+    old_sph_list = legacy_close_spheres.distance_sph_pdb(spheres, atoms, distance)
+    new_sph_list = close_spheres.distance_sph_pdb(spheres, atoms, distance)
+    assert [id(sph) for sph, _ in new_sph_list] == [id(sph) for sph, _ in old_sph_list]
+
+    #
+    old_trimmed = legacy_close_spheres.trim_sph(old_sph_list, radius)
+    new_trimmed = close_spheres.trim_sph(new_sph_list, radius)
+    assert [id(sph) for sph in new_trimmed] == [id(sph) for sph in old_trimmed]
+    assert [kept for _, kept in new_sph_list] == [kept for _, kept in old_sph_list]  # flags updated in place alike
+
+
+@pytest.mark.parametrize("trial_num", range(0, NUM_TRIALS, 10))
+def test_sphere_set_methods_match_legacy(trial_num):
+    """the path `CloseSpheresGenerationStep.run` takes"""
+
+    spheres, atoms, distance, radius = make_trial(trial_num)
+    expected = legacy_close_spheres.trim_sph(legacy_close_spheres.distance_sph_pdb(spheres, atoms, distance), radius)
+
+    sphere_set = sph_lib.SphereSet.from_spheres(spheres)
+    ligand_coords = np.array([[atom.X, atom.Y, atom.Z] for atom in atoms]).reshape(-1, 3)
+    sphere_set = sphere_set[sphere_set.get_is_within_distance_of_points(ligand_coords, distance)]
+    sphere_set = sphere_set[sphere_set.get_is_kept_after_trimming(radius)]
+    assert sphere_set.indices.tolist() == [sph.index for sph in expected]
+
+
+def test_exact_cutoffs():
+    # on the ligand-distance cutoff: excluded (strict); on the trimming cutoff: removed (inclusive)
+    spheres = make_spheres([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0), (3.0, 0.0, 0.0)])
+    atoms = [Atom(0.0, 0.0, 0.0)]
+    assert [sph.index for sph, _ in close_spheres.distance_sph_pdb(spheres, atoms, 1.0)] == [1]
+    assert [sph.index for sph, _ in close_spheres.distance_sph_pdb(spheres, atoms, 1.5)] == [1, 2, 3]
+    sph_list = [[sph, True] for sph in spheres]
+    assert [sph.index for sph in close_spheres.trim_sph(sph_list, 2.0)] == [1, 4]  # r^2 / 2 = 2: (1, 1, 0) removed too
+    sph_list = [[sph, True] for sph in spheres]
+    assert [sph.index for sph in legacy_close_spheres.trim_sph(sph_list, 2.0)] == [1, 4]
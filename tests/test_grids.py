@@ -0,0 +1,198 @@
+import os
+import shutil
+import struct
+import subprocess
+
+import numpy as np
+import pytest
+
+from pydock3.blastermaster import grids
+from pydock3.blastermaster.util import ProgramFilePaths
+from pydock3.blastermaster.defaults import __file__ as DEFAULTS_INIT_FILE_PATH
+from pydock3.dockopt.rescoring import read_grids_of_best_retrodock_job
+
+
+#
+DEFAULTS_DIR_PATH = os.path.dirname(DEFAULTS_INIT_FILE_PATH)
+RECEPTOR_PDB_TEXT = """ATOM      1  N   ALA A   1      11.104   6.134  -6.504  1.00  0.00           N
+ATOM      2  CA  ALA A   1      11.639   6.071  -5.147  1.00  0.00           C
+ATOM      3  C   ALA A   1      13.149   5.999  -5.116  1.00  0.00           C
+ATOM      4  O   ALA A   1      13.740   6.016  -4.038  1.00  0.00           O
+ATOM      5  CB  ALA A   1      11.134   4.857  -4.369  1.00  0.00           C
+ATOM      6  N   GLY A   2      13.764   5.922  -6.293  1.00  0.00           N
+ATOM      7  CA  GLY A   2      15.207   5.850  -6.407  1.00  0.00           C
+ATOM      8  C   GLY A   2      15.880   7.174  -6.076  1.00  0.00           C
+ATOM      9  O   GLY A   2      15.276   8.240  -6.186  1.00  0.00           O
+"""
+BOX_FILE_TEXT = """HEADER    CORNERS OF BOX     9.000   3.000  -9.000  17.000  10.000  -1.500
+REMARK    CENTER (X Y Z)   13.000   6.500  -5.250
+REMARK    DIMENSIONS (X Y Z)    8.000   7.000   7.500
+ATOM      1  DUA BOX     1       9.000   3.000  -9.000
+ATOM      2  DUA BOX     1      17.000   3.000  -9.000
+ATOM      3  DUA BOX     1      17.000   3.000  -1.500
+ATOM      4  DUA BOX     1       9.000   3.000  -1.500
+ATOM      5  DUA BOX     1       9.000  10.000  -9.000
+ATOM      6  DUA BOX     1      17.000  10.000  -9.000
+ATOM      7  DUA BOX     1      17.000  10.000  -1.500
+ATOM      8  DUA BOX     1       9.000  10.000  -1.500
+"""
+
+
+@pytest.fixture(scope="module")
+def grids_dir_path(tmp_path_factory):
+    """runs the bundled chemgrid & solvmap, the programs that define the formats, on a small receptor"""
+
+    dir_path = str(tmp_path_factory.mktemp("grids"))
+    with open(os.path.join(dir_path, "rec.crg.pdb"), "w") as f:
+        f.write(RECEPTOR_PDB_TEXT)
+    with open(os.path.join(dir_path, "box"), "w") as f:
+        f.write(BOX_FILE_TEXT)
+    for file_name in ["prot.table.ambcrg.ambH", "vdw.parms.amb.mindock"]:
+        shutil.copy(os.path.join(DEFAULTS_DIR_PATH, file_name), dir_path)
+    with open(os.path.join(dir_path, "INCHEM"), "w") as f:
+        f.write("rec.crg.pdb\nprot.table.ambcrg.ambH\nvdw.parms.amb.mindock\nbox\n0.2\n1\n4\n10\n2.3 2.6\nvdw\n")
+    with open(os.path.join(dir_path, "INSEV"), "w") as f:
+        f.write("rec.crg.pdb\nligand.desolv.heavy\n1.60,1.65,1.90,1.90,1.90,1.60\n1.4\n2\nbox\n1.8\n")
+    with open(os.path.join(dir_path, "INDOCK"), "w") as f:
+        f.write("chemgrid_file  vdw.vdw\nbumpmap_file  vdw.bmp\nsolvmap_file  ligand.desolv.heavy\ndelphi_file 0\n")
+
+    #
+    for program_file_path in [ProgramFilePaths.CHEMGRID_PROGRAM_FILE_PATH, ProgramFilePaths.SOLVMAP_PROGRAM_FILE_PATH]:
+        try:
+            subprocess.run([program_file_path], cwd=dir_path, check=True, capture_output=True, timeout=120)
+        except (OSError, subprocess.SubprocessError) as e:
+            pytest.skip(f"cannot run {program_file_path}: {e}")
+
+    return dir_path
+
+
+def read_fortran_ordered_reference(flat_values, shape):
+    """x-fastest, element by element"""
+    nx, ny, nz = shape
+    values = np.empty(shape, dtype=np.asarray(flat_values).dtype)
+    for z in range(nz):
+        for y in range(ny):
+            for x in range(nx):
+                values[x, y, z] = flat_values[x + (nx * (y + (ny * z)))]
+    return values
+
+
+def read_vdw_file_reference(vdw_file_path, num_points):
+    with open(vdw_file_path, "rb") as f:
+        records = []
+        for _ in range(2):
+            (num_bytes,) = struct.unpack(">i", f.read(4))
+            assert num_bytes == 4 * num_points
+            records.append(struct.unpack(f">{num_points}f", f.read(num_bytes)))
+            assert struct.unpack(">i", f.read(4)) == (num_bytes,)
+        assert f.read() == b""
+    return records
+
+
+def read_bump_map_file_reference(bump_map_file_path):
+    with open(bump_map_file_path, "r") as f:
+        lines = f.read().splitlines()
+    header_line = lines[1]
+    spacing, *origin = [float(header_line[i: i + 8]) for i in range(0, 32, 8)]
+    shape = tuple(int(header_line[i: i + 4]) for i in range(32, 44, 4))
+    chars = "".join(lines[2:])
+    return spacing, tuple(origin), shape, chars
+
+
+def read_solvmap_file_reference(solvmap_file_path):
+    with open(solvmap_file_path, "r") as f:
+        lines = f.read().splitlines()
+    tokens = lines[0].split()
+    max_indices = [int(token) for token in tokens[:3]]
+    num_points_per_angstrom = int(tokens[3])
+    max_corner = [float(token) / num_points_per_angstrom for token in tokens[4:7]]
+    flat_values = []
+    for line in lines[1:]:
+        flat_values += [float(line[i: i + 6]) for i in range(0, len(line), 6)]
+    nx, ny, nz = [n + 1 for n in max_indices]
+    values = np.empty((nx, ny, nz), dtype=np.float32)
+    for x in range(nx):
+        for y in range(ny):
+            for z in range(nz):
+                values[x, y, z] = flat_values[z + (nz * (y + (ny * x)))]  # z-fastest
+    spacing = 1.0 / num_points_per_angstrom
+    origin = tuple(c - (n * spacing) for c, n in zip(max_corner, max_indices))
+    return spacing, origin, values
+
+
+def test_read_bump_map_file_matches_reference(grids_dir_path):
+    bump_map_file_path = os.path.join(grids_dir_path, "vdw.bmp")
+    spacing, origin, shape, chars = read_bump_map_file_reference(bump_map_file_path)
+    grid = grids.read_bump_map_file(bump_map_file_path)
+    assert grid.geometry == grids.GridGeometry(origin=origin, spacing=spacing, shape=shape)
+    assert set(chars) <= {"F", "T", "X"} and "T" in chars
+    expected_values = read_fortran_ordered_reference(np.array(list(chars), dtype="S1"), shape)
+    assert np.array_equal(grid.values, expected_values)
+
+
+def test_read_vdw_file_matches_reference(grids_dir_path):
+    geometry = grids.GridGeometry.from_bump_map_file(os.path.join(grids_dir_path, "vdw.bmp"))
+    a_grid, b_grid = grids.read_vdw_file(os.path.join(grids_dir_path, "vdw.vdw"), geometry)
+    for grid, flat_values in zip([a_grid, b_grid], read_vdw_file_reference(os.path.join(grids_dir_path, "vdw.vdw"), geometry.num_points)):
+        assert np.array_equal(np.asarray(grid.values, dtype=np.float32), read_fortran_ordered_reference(np.array(flat_values, dtype=np.float32), geometry.shape))
+    assert np.any(np.asarray(a_grid.values) != 0)
+
+
+def test_read_solvmap_file_matches_reference(grids_dir_path):
+    spacing, origin, values = read_solvmap_file_reference(os.path.join(grids_dir_path, "ligand.desolv.heavy"))
+    grid = grids.read_solvmap_file(os.path.join(grids_dir_path, "ligand.desolv.heavy"))
+    assert grid.geometry.spacing == spacing
+    assert np.allclose(grid.geometry.origin, origin, rtol=0.0, atol=1e-9)
+    assert grid.geometry.shape == values.shape
+    assert np.array_equal(grid.values, values)
+
+
+def test_geometry_from_box_file_matches_bump_map(grids_dir_path):
+    from_box = grids.GridGeometry.from_box_file(os.path.join(grids_dir_path, "box"), spacing=0.2)
+    from_bump_map = grids.GridGeometry.from_bump_map_file(os.path.join(grids_dir_path, "vdw.bmp"))
+    assert from_box.shape == from_bump_map.shape
+    assert np.allclose(from_box.origin, from_bump_map.origin, rtol=0.0, atol=5e-4)  # bump map origin has 3 decimals
+
+
+@pytest.mark.parametrize("file_name", ["vdw.vdw", "vdw.bmp", "ligand.desolv.heavy"])
+def test_writers_reproduce_program_output(grids_dir_path, tmp_path, file_name):
+    file_path = os.path.join(grids_dir_path, file_name)
+    out_file_path = str(tmp_path / file_name)
+    if file_name == "vdw.vdw":
+        geometry = grids.GridGeometry.from_bump_map_file(os.path.join(grids_dir_path, "vdw.bmp"))
+        grids.write_vdw_file(out_file_path, *grids.read_vdw_file(file_path, geometry))
+    elif file_name == "vdw.bmp":
+        grids.write_bump_map_file(out_file_path, grids.read_bump_map_file(file_path))
+    else:
+        grids.write_solvmap_file(out_file_path, grids.read_solvmap_file(file_path))
+    with open(file_path, "rb") as f, open(out_file_path, "rb") as g:
+        assert f.read() == g.read()
+
+
+def test_read_grids_from_indock_file(grids_dir_path):
+    grid_name_to_grid_dict = grids.read_grids_from_indock_file(os.path.join(grids_dir_path, "INDOCK"))
+    assert sorted(grid_name_to_grid_dict) == ["bump_map", "heavy_atom_desolvation", "vdw_a", "vdw_b"]  # delphi_file 0: none
+    with_box = grids.read_grids_from_indock_file(os.path.join(grids_dir_path, "INDOCK"), box_file_path=os.path.join(grids_dir_path, "box"))
+    assert np.array_equal(with_box["vdw_a"].values, grid_name_to_grid_dict["vdw_a"].values)
+
+
+def test_read_grids_from_indock_file_relative_to_dock_working_dir(grids_dir_path, tmp_path):
+    """as DockOpt writes INDOCK files: `../dockfiles/<name>`, relative to the dir DOCK runs in"""
+
+    os.makedirs(tmp_path / "dockfiles")
+    for file_name in ["vdw.vdw", "vdw.bmp", "ligand.desolv.heavy"]:
+        shutil.copy(os.path.join(grids_dir_path, file_name), tmp_path / "dockfiles" / f"{file_name}_1")
+    with open(tmp_path / "INDOCK_1", "w") as f:
+        f.write("chemgrid_file  ../dockfiles/vdw.vdw_1\nbumpmap_file  ../dockfiles/vdw.bmp_1\nsolvmap_file  ../dockfiles/ligand.desolv.heavy_1\ndelphi_file 0\n")
+    expected = grids.read_grids_from_indock_file(os.path.join(grids_dir_path, "INDOCK"))
+    with pytest.raises(FileNotFoundError):
+        grids.read_grids_from_indock_file(str(tmp_path / "INDOCK_1"))
+    grid_name_to_grid_dict = grids.read_grids_from_indock_file(str(tmp_path / "INDOCK_1"), base_dir_path=str(tmp_path / "working"))
+    assert sorted(grid_name_to_grid_dict) == sorted(expected)
+    for grid_name, grid in grid_name_to_grid_dict.items():
+        assert grid.geometry == expected[grid_name].geometry
+        assert np.array_equal(grid.values, expected[grid_name].values)
+
+    #
+    shutil.move(str(tmp_path / "INDOCK_1"), tmp_path / "dockfiles")
+    assert sorted(read_grids_of_best_retrodock_job(str(tmp_path))) == sorted(expected)
@@ -0,0 +1,274 @@
+import io
+import os
+import random
+import filecmp
+import contextlib
+
+import numpy as np
+import pytest
+import yaml
+
+from pydock3.blastermaster import pdb
+from pydock3.blastermaster.defaults import __file__ as DEFAULTS_INIT_FILE_PATH
+from pydock3.blastermaster.programs.thinspheres import pdb_lib
+
+from legacy import pdb as legacy_pdb
+from legacy import pdb_lib as legacy_pdb_lib
+
+
+#
+NUM_TRIALS = 40
+RESIDUE_NAME_TO_ATOM_NAMES_DICT = {
+    "ALA": ["N", "CA", "C", "O", "CB", "H", "HA", "HB1"],
+    "HIS": ["N", "CA", "CB", "ND1", "HD1", "HE2", "H", "HB2"],
+    "CYS": ["N", "CA", "CB", "SG", "HG", "H"],
+    "SER": ["N", "CA", "CB", "OG", "HG", "H"],
+    "LYS": ["N", "CA", "NZ", "HZ1", "HZ2", "1HB"],
+    "GLY": ["N", "CA", "C", "O", "H"],
+    "TYR": ["N", "CA", "OH", "HH", "HD1"],
+    "HOH": ["O", "HOH"],
+    "XYZ": ["C1", "H1"],  # unknown to the radii & polar hydrogen tables
+}
+PDB_DATA_FIELD_NAMES = ["atoms", "residue_nums", "residue_names", "alt_chars", "chains", "model_nums", "radii"]
+with open(os.path.join(os.path.dirname(DEFAULTS_INIT_FILE_PATH), "residue_code_polar_h.yaml")) as _f:
+    RESIDUE_CODE_TO_POLAR_HYDROGENS_DICT = yaml.safe_load(_f)
+
+
+def get_atom_line(rng, record_name, serial, atom_name, alt_char, residue_name, chain, residue_num, insertion_code, x, y, z, occupancy, b_factor):
+    padded_atom_name = atom_name if len(atom_name) == 4 else " " + atom_name.ljust(3)
+    if rng.random() < 0.05 and len(atom_name) < 4:
+        padded_atom_name = rng.choice("123") + atom_name.ljust(3)
+    return "%-6s%5d %4s%1s%3s %1s%4d%1s   %8.3f%8.3f%8.3f%6.2f%6.2f          %2s" % (
+        record_name, serial, padded_atom_name, alt_char, residue_name, chain, residue_num, insertion_code, x, y, z, occupancy, b_factor, atom_name[0]
+    )
+
+
+def write_random_pdb_file(file_path, rng, num_residues, allow_unknown=False):
+    """residues with alternate locations, insertion codes, chain breaks, waters, models & an over-long remark line"""
+
+    residue_names = [name for name in RESIDUE_NAME_TO_ATOM_NAMES_DICT if allow_unknown or name != "XYZ"]
+    lines = ["REMARK test file with a rather long remark line to widen the char array ..........................................\n"]
+    serial, residue_num, chain = 1, rng.randint(1, 50), "A"
+    has_models = rng.random() < 0.2
+    if has_models:
+        lines.append("MODEL        %d\n" % rng.randint(1, 3))
+    for _ in range(num_residues):
+        residue_name = rng.choice(residue_names)
+        if rng.random() < 0.05:
+            residue_num -= rng.randint(5, 20)  # chain break
+        residue_num += 1
+        insertion_code = rng.choice([" "] * 9 + ["A"])
+        alt_chars = [" "] if rng.random() < 0.7 else rng.sample(["A", "B", "C"], rng.randint(2, 3))
+        occupancies = [rng.choice([0.5, 0.25, 0.75, 1.0, 0.0] if rng.random() < 0.3 else [0.3, 0.6, 0.9, 0.45]) for _ in alt_chars]
+        for atom_name in RESIDUE_NAME_TO_ATOM_NAMES_DICT[residue_name]:
+            if rng.random() < 0.1:
+                continue
+            for alt_char, occupancy in zip(alt_chars, occupancies):
+                record_name = "HETATM" if residue_name in ("HOH", "XYZ") else "ATOM"
+                coords = [rng.uniform(-99, 99) for _ in range(3)]
+                lines.append(get_atom_line(rng, record_name, serial, atom_name, alt_char, residue_name, chain, residue_num, insertion_code, *coords, occupancy, rng.uniform(0, 99)) + "\n")
+                serial += 1
+        if rng.random() < 0.03:
+            lines.append("TER\n")
+            chain = chr(ord(chain) + 1)
+        if has_models and rng.random() < 0.05:
+            lines.append("ENDMDL\nMODEL        %d\n" % rng.randint(1, 9))
+    if rng.random() < 0.3:
+        lines.append("\n")
+    lines.append("END\n")
+    with open(file_path, "w") as f:
+        f.write("".join(lines))
+
+
+def call_or_get_exception_type_name(func):
+    try:
+        return func()
+    except Exception as e:
+        return ("EXC", type(e).__name__)
+
+
+def assert_same_data(old_data, new_data):
+    for field_name in PDB_DATA_FIELD_NAMES:
+        assert list(getattr(new_data, field_name)) == list(getattr(old_data, field_name)), field_name
+    assert [tuple(c) for c in new_data.coords] == [tuple(c) for c in old_data.coords]
+    assert [tuple(f) for f in new_data.factors] == [tuple(f) for f in old_data.factors]
+    assert new_data.raw_data == old_data.raw_data
+
+
+def assert_same_files(file_path_1, file_path_2):
+    assert filecmp.cmp(file_path_1, file_path_2, shallow=False)
+
+
+@pytest.fixture(params=range(NUM_TRIALS))
+def trial(request, tmp_path):
+    rng = random.Random(request.param)
+    pdb_file_path = str(tmp_path / "in.pdb")
+    write_random_pdb_file(pdb_file_path, rng, rng.randint(1, 60), allow_unknown=request.param % 4 == 0)
+    residue_nums = sorted(set(legacy_pdb.PDBData(pdb_file_path, ignore_waters=False).residue_nums))
+    some_residue_nums = rng.sample(residue_nums, min(3, len(residue_nums)))
+    return rng, pdb_file_path, some_residue_nums
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"ignore_waters": False}, {"het_only": True}])
+def test_read_matches_legacy(trial, kwargs):
+    _, pdb_file_path, _ = trial
+    assert_same_data(legacy_pdb.PDBData(pdb_file_path, **kwargs), pdb.PDBData(pdb_file_path, **kwargs))
+
+
+def test_edits_match_legacy(trial, tmp_path):
+    rng, pdb_file_path, some_residue_nums = trial
+    old_data = legacy_pdb.PDBData(pdb_file_path, ignore_waters=False)
+    new_data = pdb.PDBData(pdb_file_path, ignore_waters=False)
+    edits = [
+        lambda d: d.replace_hetatm_with_atom(),
+        lambda d: d.replace_alt_chars(" "),
+        lambda d: d.delete_insertion_codes(),
+        lambda d: d.fix_chain_ids(),
+        lambda d: d.rename_histidines(),
+        lambda d: d.rename_cysteines(),
+        lambda d: d.remove_apolar_hydrogen(RESIDUE_CODE_TO_POLAR_HYDROGENS_DICT),
+        lambda d: d.remove_all_hydrogens(res_list=some_residue_nums),
+        lambda d: d.select_most_occupied(exceptions=some_residue_nums[:1], leave_alone=some_residue_nums[1:2]),
+        lambda d: d.delete_alternates(some_residue_nums),
+        lambda d: d.delete_all_residues(leave_alone=some_residue_nums),
+        lambda d: d.select_one_alt(some_residue_nums, "B"),
+        lambda d: d.remove_protons_for_covalent_docking(some_residue_nums[0], "CYS", "HG,H"),
+        lambda d: d.remove_protons_for_covalent_docking(some_residue_nums[0], "ZZZ", "HG"),
+    ]
+    rng.shuffle(edits)
+    for edit in edits[:rng.randint(1, 5)]:
+        old_result = call_or_get_exception_type_name(lambda: edit(old_data))
+        if isinstance(old_result, tuple):  # the previous implementation fails on some edits after removing lines
+            break
+        assert call_or_get_exception_type_name(lambda: edit(new_data)) == old_result
+        assert_same_data(old_data, new_data)
+        old_data.write(str(tmp_path / "old.pdb"))
+        new_data.write(str(tmp_path / "new.pdb"))
+        assert_same_files(tmp_path / "old.pdb", tmp_path / "new.pdb")
+
+
+def test_queries_match_legacy(trial):
+    _, pdb_file_path, some_residue_nums = trial
+    old_data, new_data = legacy_pdb.PDBData(pdb_file_path), pdb.PDBData(pdb_file_path)
+    for residue_num in some_residue_nums + [-999]:
+        queries = [
+            lambda d: d.get_index_by_residue_atom(residue_num, "CYS", "SG"),
+            lambda d: d.get_index_by_residue_atom(residue_num, d.residue_names[0] if len(d.residue_names) else "ALA", "CA "),
+            lambda d: d.get_occupancy_residue(residue_num),
+            lambda d: d.is_most_occupied_residue_chain(residue_num, "A"),
+            lambda d: sorted(d.get_alt_chars([residue_num])),
+            lambda d: d.residue_sets(),
+        ]
+        for query in queries:
+            assert call_or_get_exception_type_name(lambda: query(new_data)) == call_or_get_exception_type_name(lambda: query(old_data))
+
+
+@pytest.mark.parametrize("matching", [True, False])
+def test_clear_factors_residues_matches_legacy(trial, tmp_path, matching):
+    _, pdb_file_path, some_residue_nums = trial
+    old_data = legacy_pdb.PDBData(pdb_file_path).clear_factors_residues(some_residue_nums, matching=matching)
+    new_data = pdb.PDBData(pdb_file_path).clear_factors_residues(some_residue_nums, matching=matching)
+    assert_same_data(old_data, new_data)
+    old_data.write(str(tmp_path / "old.pdb"))
+    new_data.write(str(tmp_path / "new.pdb"))
+    assert_same_files(tmp_path / "old.pdb", tmp_path / "new.pdb")
+
+
+@pytest.mark.parametrize("func_name", ["most_occupied", "delete_alt_chars", "del_hydrogens", "delete_alts", "del_all_but", "specific_alts"])
+def test_file_functions_match_legacy(trial, tmp_path, func_name):
+    _, pdb_file_path, some_residue_nums = trial
+    old_file_path, new_file_path = str(tmp_path / "old.pdb"), str(tmp_path / "new.pdb")
+    if func_name == "specific_alts":
+        args_list = [(pdb_file_path, ["%dB" % some_residue_nums[0]], file_path) for file_path in [old_file_path, new_file_path]]
+    else:
+        extra_args = {"most_occupied": ([some_residue_nums[0]],), "delete_alt_chars": ()}.get(func_name, (some_residue_nums,))
+        args_list = [(pdb_file_path, file_path, *extra_args) for file_path in [old_file_path, new_file_path]]
+    old_result = call_or_get_exception_type_name(lambda: getattr(legacy_pdb, func_name)(*args_list[0]))
+    new_result = call_or_get_exception_type_name(lambda: getattr(pdb, func_name)(*args_list[1]))
+    assert new_result == old_result
+    if old_result is None:
+        assert_same_files(old_file_path, new_file_path)
+
+
+def test_make_alts_matches_legacy(trial, tmp_path):
+    _, pdb_file_path, some_residue_nums = trial
+    old_result = call_or_get_exception_type_name(lambda: legacy_pdb.make_alts(pdb_file_path, str(tmp_path / "old"), [some_residue_nums[:1]]))
+    new_result = call_or_get_exception_type_name(lambda: pdb.make_alts(pdb_file_path, str(tmp_path / "new"), [some_residue_nums[:1]]))
+    if isinstance(old_result, tuple) and old_result[0] == "EXC":
+        assert new_result == old_result
+        return
+    assert list(new_result[1]) == list(old_result[1])
+    assert len(new_result[0]) == len(old_result[0])
+    for old_file_path, new_file_path in zip(old_result[0], new_result[0]):
+        assert_same_files(old_file_path, new_file_path)
+
+
+def test_move_columns_matches_legacy(trial, tmp_path):
+    """on a file with shifted columns & truncated lines"""
+
+    rng, pdb_file_path, _ = trial
+    with open(pdb_file_path) as f:
+        lines = f.readlines()
+    for i, line in enumerate(lines):
+        if line.startswith("ATOM") and rng.random() < 0.2:
+            lines[i] = line[:22] + (" " * rng.randint(1, 3)) + line[22:]
+        elif line.startswith("ATOM") and rng.random() < 0.05:
+            lines[i] = line[:40] + "\n"
+    shifted_pdb_file_path = str(tmp_path / "shifted.pdb")
+    with open(shifted_pdb_file_path, "w") as f:
+        f.write("".join(lines))
+    old_result = call_or_get_exception_type_name(lambda: legacy_pdb.move_columns(shifted_pdb_file_path, str(tmp_path / "old.pdb")))
+    new_result = call_or_get_exception_type_name(lambda: pdb.move_columns(shifted_pdb_file_path, str(tmp_path / "new.pdb")))
+    assert new_result == old_result
+    if old_result is None:
+        assert_same_files(tmp_path / "old.pdb", tmp_path / "new.pdb")
+
+
+def test_pdb_lib_matches_legacy(trial, tmp_path):
+    _, pdb_file_path, _ = trial
+    with contextlib.redirect_stdout(io.StringIO()) as old_stdout:
+        old_atoms = legacy_pdb_lib.read_pdb(pdb_file_path)
+    with contextlib.redirect_stdout(io.StringIO()) as new_stdout:
+        new_atoms = pdb_lib.read_pdb(pdb_file_path)
+    assert [vars(atom) for atom in new_atoms] == [vars(atom) for atom in old_atoms]
+    assert new_stdout.getvalue() == old_stdout.getvalue()
+
+    # `PDBAtomRecords` of the same atoms
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = pdb_lib.read_pdb_records(pdb_file_path)
+    assert records.get_coords().tolist() == [[atom.X, atom.Y, atom.Z] for atom in old_atoms]
+
+    #
+    if len(old_atoms) > 0:
+        legacy_pdb_lib.output_pdb(old_atoms, str(tmp_path / "old.pdb"))
+        pdb_lib.output_pdb(new_atoms, str(tmp_path / "new.pdb"))
+        assert_same_files(tmp_path / "old.pdb", tmp_path / "new.pdb")
+
+
+def test_pdb_atom_records_fields_match_string_slicing(trial, tmp_path):
+    rng, pdb_file_path, _ = trial
+    with open(pdb_file_path) as f:
+        lines = f.read().splitlines()
+    records = pdb.PDBAtomRecords(lines)
+    assert records.get_lines() == lines
+    records.write(str(tmp_path / "new.pdb"))
+    with open(tmp_path / "new.pdb") as f:
+        assert f.read() == "".join([line + "\n" for line in lines if line])  # empty lines are skipped
+
+    #
+    for _ in range(20):
+        start = rng.randint(0, 90)
+        end = start + rng.randint(0, 12)
+        assert records.get_field(start, end).tolist() == [line[start:end] for line in lines]
+        indices = rng.sample(range(len(lines)), rng.randint(0, len(lines)))
+        values = ["".join(rng.choice("AB 1") for _ in range(rng.choice([end - start, rng.randint(0, 4)]))) for _ in indices]
+        records.set_field(start, end, values, indices=indices)
+        for i, value in zip(indices, values):
+            lines[i] = lines[i][:start] + value + lines[i][end:]
+        assert records.get_lines() == lines
+
+    #
+    is_atom = records.get_is_record(pdb.ATOM_RECORD_NAMES)
+    assert is_atom.tolist() == [line.startswith(tuple(pdb.ATOM_RECORD_NAMES)) for line in lines]
+    assert records[is_atom].get_lines() == [line for line in lines if line.startswith(tuple(pdb.ATOM_RECORD_NAMES))]
+    assert np.array_equal(pdb.PDBAtomRecords.concatenate([records[:3], records[3:]]).get_lines_array(), records.get_lines_array())
@@ -0,0 +1,96 @@
+import array
+import filecmp
+
+import numpy as np
+import pytest
+
+from pydock3.files import File
+from pydock3.blastermaster import phi
+
+from legacy import phi as legacy_phi
+
+
+#
+GRID_SIZE = 41
+BOX_FILE_TEXT = """HEADER    CORNERS OF BOX    -5.000  -8.000   0.000   6.000   2.000  12.300
+REMARK    CENTER (X Y Z)    0.500  -3.000   6.000
+REMARK    DIMENSIONS (X Y Z)   11.000  10.000  12.300
+"""
+
+
+def write_random_phimap(file_path, seed):
+    """writes a phimap of random values with the reference writer"""
+    phi_data = legacy_phi.Phi()
+    phi_data.toplabel = b"now starting phimap "
+    phi_data.head = b"headhead12"
+    phi_data.title = b"t" * 60
+    phi_data.botlabel = b"end of phimap   "
+    phi_data.scale = 2.0
+    phi_data.oldmid = [1.5, -3.25, 7.0]
+    values = np.random.default_rng(seed).normal(size=GRID_SIZE**3).astype(np.float32)
+    phi_data.phi_array = array.array("f", values.tolist())
+    phi_data.write(File(file_path))
+
+
+@pytest.fixture
+def phimap_file_paths(tmp_path):
+    file_paths = [str(tmp_path / "in.phi"), str(tmp_path / "in2.phi")]
+    for seed, file_path in enumerate(file_paths):
+        write_random_phimap(file_path, seed)
+    return file_paths
+
+
+def test_read_write_round_trip_matches_legacy(phimap_file_paths, tmp_path):
+    legacy_phi.Phi(File(phimap_file_paths[0])).write(File(str(tmp_path / "old.phi")))
+    phi.Phi(File(phimap_file_paths[0])).write(File(str(tmp_path / "new.phi")))
+    assert filecmp.cmp(tmp_path / "old.phi", tmp_path / "new.phi", shallow=False)
+    assert filecmp.cmp(phimap_file_paths[0], tmp_path / "new.phi", shallow=False)
+
+
+@pytest.mark.parametrize(
+    "new_mid_indices, new_size",
+    [
+        ((20, 20, 20), 11),  # inside
+        ((20, 20, 20), GRID_SIZE),  # whole grid
+        ((0, 3, 40), 15),  # past the lower & upper edges
+        ((-3, 50, 10), 9),  # center outside of the grid
+        ((5, 6, 7), 10),  # even size
+        ((1, 1, 1), 6),
+    ],
+)
+def test_trim_phi_matches_legacy(phimap_file_paths, tmp_path, new_mid_indices, new_size):
+    legacy_phi.Phi(File(phimap_file_paths[0])).trim_phi(new_mid_indices, new_size).write(File(str(tmp_path / "old.phi")))
+    phi.Phi(File(phimap_file_paths[0])).trim_phi(new_mid_indices, new_size).write(File(str(tmp_path / "new.phi")))
+    assert filecmp.cmp(tmp_path / "old.phi", tmp_path / "new.phi", shallow=False)
+
+
+def test_trim_matches_legacy(phimap_file_paths, tmp_path):
+    box_file_path = str(tmp_path / "box")
+    with open(box_file_path, "w") as f:
+        f.write(BOX_FILE_TEXT)
+    old_result = legacy_phi.trim(File(phimap_file_paths[0]), File(box_file_path), File(str(tmp_path / "old.phi")))
+    new_result = phi.trim(File(phimap_file_paths[0]), File(box_file_path), File(str(tmp_path / "new.phi")))
+    assert tuple(new_result) == tuple(old_result)
+    assert filecmp.cmp(tmp_path / "old.phi", tmp_path / "new.phi", shallow=False)
+
+
+def get_legacy_modified_values(phimap_file_paths, method_name):
+    """the reference `Phi.modify` leaves a list of python floats (which its `write` cannot handle), so compare values"""
+    phi_data = legacy_phi.Phi(File(phimap_file_paths[0]))
+    getattr(phi_data, method_name)(legacy_phi.Phi(File(phimap_file_paths[1])))
+    return np.asarray(phi_data.phi_array, dtype=np.float32)
+
+
+@pytest.mark.parametrize("func_name", ["add", "subtract"])
+def test_add_and_subtract_match_legacy(phimap_file_paths, tmp_path, func_name):
+    getattr(phi, func_name)(File(phimap_file_paths[0]), File(phimap_file_paths[1]), File(str(tmp_path / "new.phi")))
+    new_phi_data = phi.Phi(File(str(tmp_path / "new.phi")))
+    assert np.asarray(new_phi_data.phi_array, dtype=np.float32).tobytes() == get_legacy_modified_values(phimap_file_paths, func_name).tobytes()
+
+
+def test_add_in_place_matches_legacy(phimap_file_paths):
+    """the output file may be the (memory-mapped) input file"""
+    legacy_values = get_legacy_modified_values(phimap_file_paths, "add")
+    phi.add(File(phimap_file_paths[0]), File(phimap_file_paths[1]), File(phimap_file_paths[0]))
+    new_phi_data = phi.Phi(File(phimap_file_paths[0]))
+    assert np.asarray(new_phi_data.phi_array, dtype=np.float32).tobytes() == legacy_values.tobytes()
@@ -0,0 +1,181 @@
+import os
+import gzip
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.interpolate import RegularGridInterpolator
+
+from pydock3.blastermaster.grids import Grid, GridGeometry
+from pydock3.blastermaster.defaults import __file__ as DEFAULTS_INIT_FILE_PATH
+from pydock3.criterion.enrichment.logauc import NormalizedLogAUC
+from pydock3.retrodock.retrodock import sort_by_energy_and_drop_duplicate_molecules
+from pydock3.dockopt import rescoring
+from pydock3.dockopt.rescoring import KT_IN_KCAL_PER_MOL, TERM_NAMES, PoseRescorer, PoseSet, interpolate_grid
+
+
+#
+VDW_PARAMETERS_FILE_PATH = os.path.join(os.path.dirname(DEFAULTS_INIT_FILE_PATH), "vdw.parms.amb.mindock")
+VDW_TYPES = [1, 5, 7, 6, 11, 8]  # incl. hydrogens (6, 7)
+NUM_ATOMS = 12
+NUM_POSES_PER_MOLECULE = 3
+
+
+def interpolate_grid_reference(grid, coordinates):
+    geometry = grid.geometry
+    axes = [geometry.origin[i] + (geometry.spacing * np.arange(geometry.shape[i])) for i in range(3)]
+    interpolator = RegularGridInterpolator(axes, np.asarray(grid.values, dtype=np.float64), bounds_error=False, fill_value=np.nan)
+    return np.array([interpolator(point[None])[0] for point in coordinates])  # point by point
+
+
+def make_grid(rng, origin, spacing, shape):
+    return Grid(geometry=GridGeometry(origin=origin, spacing=spacing, shape=shape), values=rng.normal(size=shape).astype(np.float32))
+
+
+@pytest.fixture
+def grid_name_to_grid_dict():
+    rng = np.random.default_rng(0)
+    vdw_geometry_kwargs = dict(origin=(9.0, 3.0, -9.0), spacing=0.2, shape=(41, 36, 38))
+    return {
+        "vdw_a": make_grid(rng, **vdw_geometry_kwargs),
+        "vdw_b": make_grid(rng, **vdw_geometry_kwargs),
+        "bump_map": make_grid(rng, **vdw_geometry_kwargs),
+        "heavy_atom_desolvation": make_grid(rng, origin=(8.5, 2.5, -9.5), spacing=0.5, shape=(18, 16, 17)),
+        "hydrogen_desolvation": make_grid(rng, origin=(9.25, 3.25, -8.75), spacing=0.5, shape=(16, 14, 15)),
+        "electrostatics": make_grid(rng, origin=(7.0, 1.0, -11.0), spacing=0.5, shape=(25, 25, 25)),
+    }
+
+
+def test_interpolate_grid_matches_reference(grid_name_to_grid_dict):
+    rng = np.random.default_rng(1)
+    grid = grid_name_to_grid_dict["heavy_atom_desolvation"]
+    geometry = grid.geometry
+    max_corner = np.asarray(geometry.origin) + (geometry.spacing * (np.asarray(geometry.shape) - 1))
+    coordinates = np.concatenate([
+        rng.uniform(geometry.origin, max_corner, size=(500, 3)),  # inside
+        geometry.get_coordinates_of_indices(rng.integers(0, geometry.shape, size=(50, 3))),  # on grid points
+        [geometry.origin, max_corner, [geometry.origin[0], max_corner[1], geometry.origin[2]]],  # corners
+        rng.uniform(np.asarray(geometry.origin) - 2.0, max_corner + 2.0, size=(500, 3)),  # partly outside
+        [np.asarray(geometry.origin) - 1e-9, max_corner + 1e-9],  # just outside
+    ])
+    values, is_inside = interpolate_grid(grid, coordinates)
+    expected_values = interpolate_grid_reference(grid, coordinates)
+    assert np.array_equal(is_inside, ~np.isnan(expected_values))
+    assert np.allclose(values, expected_values, rtol=1e-10, atol=1e-12, equal_nan=True)
+    assert not is_inside[-2:].any()
+
+
+def write_db2_file(file_path, rng, molecule_names):
+    with gzip.open(file_path, "wt") as f:
+        for molecule_name in molecule_names:
+            f.write(f"M {molecule_name} protname {NUM_ATOMS} 0 0 0 0 0 0 0\nM +0.000 -5.0 1.0 -4.0 200.0\n")
+            for i in range(NUM_ATOMS):
+                f.write(f"A {i + 1:3d} C{i} C.3 {VDW_TYPES[i % len(VDW_TYPES)]} 1 {rng.normal() * 0.3:+.4f} {-abs(rng.normal()):+.3f} {abs(rng.normal()) * 0.3:+.3f} 0.0 10.0\n")
+            f.write("E\n")
+
+
+def write_mol2_file(file_path, rng, molecule_names, num_atoms=NUM_ATOMS):
+    with gzip.open(file_path, "wt") as f:
+        for molecule_name in molecule_names:
+            for _ in range(NUM_POSES_PER_MOLECULE):
+                center = rng.uniform([11.0, 5.0, -7.0], [15.0, 8.0, -4.0])
+                coordinates = center + (rng.normal(size=(num_atoms, 3)) * 1.5)  # some atoms outside of some grids
+                f.write(f"##########                 Name:     {molecule_name}\n")
+                f.write(f"##########              Van der Waals:     {rng.normal():.2f}\n")
+                f.write("##########              Total Energy:     -2.00\n\n")
+                f.write(f"@<TRIPOS>MOLECULE\n{molecule_name}\n {num_atoms} 0 1\nSMALL\nUSER_CHARGES\n\n@<TRIPOS>ATOM\n")
+                for i, (x, y, z) in enumerate(coordinates):
+                    f.write(f"{i + 1:7d} C{i}  {x:10.4f}{y:10.4f}{z:10.4f} C.3  1 LIG  0.0000\n")
+                f.write("@<TRIPOS>BOND\n")
+
+
+@pytest.fixture
+def pose_set(tmp_path):
+    rng = np.random.default_rng(2)
+    pose_sets = []
+    for prefix, num_molecules, is_active in [("ACT", 15, True), ("DEC", 60, False)]:
+        molecule_names = [f"{prefix}{i}" for i in range(num_molecules)]
+        db2_file_path, mol2_file_path = str(tmp_path / f"{prefix}.db2.gz"), str(tmp_path / f"{prefix}.mol2.gz")
+        write_db2_file(db2_file_path, rng, molecule_names)
+        write_mol2_file(mol2_file_path, rng, molecule_names)
+        pose_sets.append(PoseSet.from_mol2_and_db2_files([mol2_file_path], [db2_file_path], VDW_PARAMETERS_FILE_PATH, is_active))
+    return PoseSet.concatenate(pose_sets)
+
+
+def get_term_energies_reference(pose_set, grid_name_to_grid_dict, ligand_desolvation):
+    """pose by pose, atom by atom"""
+
+    vdw_type_to_parameters_dict = rescoring.read_vdw_parameters_file(VDW_PARAMETERS_FILE_PATH)
+    assert set(np.unique(pose_set.vdw_sqrt_a)) <= {a for a, _ in vdw_type_to_parameters_dict.values()}
+
+    def interpolate(grid_name, point):
+        return interpolate_grid_reference(grid_name_to_grid_dict[grid_name], point[None])[0]
+
+    term_energies = np.zeros((pose_set.num_poses, len(TERM_NAMES)))
+    for pose_index in range(pose_set.num_poses):
+        for i in np.flatnonzero(pose_set.atom_pose_indices == pose_index):
+            point = pose_set.coordinates[i]
+            desolvation_grid_name = "hydrogen_desolvation" if (ligand_desolvation == "full" and pose_set.is_hydrogen[i]) else "heavy_atom_desolvation"
+            desolvated_fraction = interpolate(desolvation_grid_name, point)
+            term_energies[pose_index] += [
+                KT_IN_KCAL_PER_MOL * pose_set.charges[i] * interpolate("electrostatics", point),
+                (pose_set.vdw_sqrt_a[i] * interpolate("vdw_a", point)) - (pose_set.vdw_sqrt_b[i] * interpolate("vdw_b", point)),
+                -desolvated_fraction * pose_set.polar_solvation[i],
+                -desolvated_fraction * pose_set.apolar_solvation[i],
+            ]
+    term_energies[np.isnan(term_energies).any(axis=1)] = np.nan  # whole pose, if any atom is outside of any grid
+    return term_energies
+
+
+@pytest.mark.parametrize("ligand_desolvation", ["volume", "full"])
+def test_get_term_energies_matches_reference(pose_set, grid_name_to_grid_dict, ligand_desolvation):
+    term_energies = PoseRescorer(pose_set, ligand_desolvation=ligand_desolvation).get_term_energies(grid_name_to_grid_dict)
+    expected_term_energies = get_term_energies_reference(pose_set, grid_name_to_grid_dict, ligand_desolvation)
+    assert 0 < np.isnan(expected_term_energies[:, 0]).sum() < pose_set.num_poses
+    assert np.allclose(term_energies, expected_term_energies, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_pose_set_matches_files(pose_set):
+    assert pose_set.num_poses == (15 + 60) * NUM_POSES_PER_MOLECULE
+    assert np.array_equal(np.bincount(pose_set.atom_pose_indices), np.full(pose_set.num_poses, NUM_ATOMS))
+    assert pose_set.is_active.sum() == 15 * NUM_POSES_PER_MOLECULE
+    assert np.isnan(pose_set.baseline_term_energies[:, TERM_NAMES.index("electrostatic_energy")]).all()  # not written
+    assert not np.isnan(pose_set.baseline_term_energies[:, TERM_NAMES.index("vdw_energy")]).any()
+
+
+def test_pose_with_mismatched_atoms_is_skipped(tmp_path):
+    rng = np.random.default_rng(3)
+    write_db2_file(str(tmp_path / "a.db2.gz"), rng, ["MOL"])
+    write_mol2_file(str(tmp_path / "a.mol2.gz"), rng, ["MOL"], num_atoms=NUM_ATOMS - 1)
+    pose_set = PoseSet.from_mol2_and_db2_files([str(tmp_path / "a.mol2.gz")], [str(tmp_path / "a.db2.gz")], VDW_PARAMETERS_FILE_PATH, True)
+    assert pose_set.num_poses == 0
+
+
+def get_criterion_value_reference(pose_set, total_energies):
+    """as retrodock ranks the results of a docking run"""
+
+    df = pd.DataFrame({"id_num": pose_set.molecule_names, "total_energy": total_energies, "is_active": pose_set.is_active.astype(int)})
+    df = sort_by_energy_and_drop_duplicate_molecules(df)
+    return NormalizedLogAUC().calculate(df["is_active"])
+
+
+def test_rescore_matches_retrodock_ranking(pose_set, grid_name_to_grid_dict):
+    rng = np.random.default_rng(4)
+    rescorer = PoseRescorer(pose_set)
+    term_energies = rescorer.get_term_energies(grid_name_to_grid_dict)
+    scales_df = pd.DataFrame({
+        "electrostatic_scale": np.concatenate([rng.uniform(0.0, 2.0, 20), [0.0, 1.0]]),
+        "vdw_scale": np.concatenate([rng.uniform(0.5, 1.5, 20), [0.0, 1.0]]),
+        "ligand_desolv_scale": np.concatenate([rng.uniform(0.0, 2.0, 20), [0.0, 1.0]]),
+    })  # incl. all-zero scales (every molecule ties)
+    best_pose_total_energies = rescorer.get_best_pose_total_energies(term_energies, scales_df)
+    criterion_values = rescorer.get_criterion_values(best_pose_total_energies)
+    for j, scales in scales_df.iterrows():
+        total_energies = term_energies @ np.array([scales.electrostatic_scale, scales.vdw_scale, scales.ligand_desolv_scale, scales.ligand_desolv_scale])
+        expected_df = pd.DataFrame({"molecule_name": pose_set.molecule_names, "total_energy": total_energies}).groupby("molecule_name")["total_energy"].min()
+        assert np.allclose(best_pose_total_energies[:, j], expected_df.loc[rescorer.molecule_names].to_numpy(), equal_nan=True)
+        assert criterion_values[j] == pytest.approx(get_criterion_value_reference(pose_set, total_energies), rel=1e-12)
+
+    #
+    rescored_df = rescorer.rescore(grid_name_to_grid_dict, scales_df)
+    assert np.array_equal(rescored_df[NormalizedLogAUC().name].to_numpy(), criterion_values)
@@ -0,0 +1,112 @@
+import io
+import copy
+import random
+
+import pytest
+
+from pydock3.util import get_hexdigest_of_persistent_md5_hash_of_tuple
+from pydock3.blastermaster.programs.thinspheres import sph_lib
+from pydock3.blastermaster.steps import thin_spheres
+
+from legacy import sph_lib as legacy_sph_lib
+from legacy import thin_spheres as legacy_thin_spheres
+
+
+#
+NUM_TRIALS = 50
+CLUSTER_AND_COLOR_CHOICES = [("A", "A"), ("1", "A"), ("2", "3"), ("A", "0")]
+
+
+def write_random_sph_file(file_path, rng):
+    """two clusters of spheres, with repeated indices, duplicate coordinates, zero radii & blank cluster/color fields"""
+
+    num_spheres = rng.randint(1, 50)
+    with open(file_path, "w") as f:
+        f.write("DOCK spheres within 10.0 ang of ligands\n")
+        for cluster_num in (1, 2):
+            f.write("cluster     %d   number of spheres in cluster %3d\n" % (cluster_num, num_spheres))
+            for _ in range(num_spheres):
+                x, y, z = [rng.choice([rng.uniform(-50, 50), 1.25, -0.0, 0.0]) for _ in range(3)]
+                radius = rng.choice([0.0, rng.uniform(0.5, 3)])
+                line = "%5d%10.5f%10.5f%10.5f%8.3f%5d" % (rng.randint(1, num_spheres), x, y, z, radius, rng.randint(0, 9999))
+                f.write(line + rng.choice(["  ", " 1", "12"]) + rng.choice(["   ", "  0", "  3", " 11"]) + "\n")
+
+
+def read_sph_or_error_message(read_sph_func, file_path, chosen_cluster, color):
+    try:
+        return read_sph_func(file_path, chosen_cluster, color)
+    except Exception as e:
+        return str(e)
+
+
+@pytest.fixture(params=range(NUM_TRIALS))
+def sph_file_path(request, tmp_path):
+    file_path = str(tmp_path / "in.sph")
+    write_random_sph_file(file_path, random.Random(request.param))
+    return file_path
+
+
+@pytest.mark.parametrize("chosen_cluster, color", CLUSTER_AND_COLOR_CHOICES)
+def test_read_and_write_match_legacy(sph_file_path, tmp_path, chosen_cluster, color):
+    old_spheres = read_sph_or_error_message(legacy_sph_lib.read_sph, sph_file_path, chosen_cluster, color)
+    new_spheres = read_sph_or_error_message(sph_lib.read_sph, sph_file_path, chosen_cluster, color)
+    if isinstance(old_spheres, str):  # e.g., "sphere list is empty"
+        assert new_spheres == old_spheres
+        with pytest.raises(Exception, match=old_spheres):
+            sph_lib.SphereSet.read(sph_file_path, chosen_cluster, color)
+        return
+    assert [vars(sphere) for sphere in new_spheres] == [vars(sphere) for sphere in old_spheres]
+
+    #
+    legacy_sph_lib.write_sph(str(tmp_path / "old.sph"), old_spheres)
+    sph_lib.write_sph(str(tmp_path / "new.sph"), new_spheres)
+    sph_lib.SphereSet.read(sph_file_path, chosen_cluster, color).write(str(tmp_path / "new_set.sph"))
+    with open(tmp_path / "old.sph") as f:
+        old_text = f.read()
+    for file_name in ["new.sph", "new_set.sph"]:
+        with open(tmp_path / file_name) as f:
+            assert f.read() == old_text
+
+
+def test_get_perturbed_matches_legacy(sph_file_path, tmp_path):
+    """as `MatchingSpheresPerturbationStep` perturbs spheres, before & after `SphereSet`"""
+
+    max_deviation = 0.5
+    old_spheres = read_sph_or_error_message(legacy_sph_lib.read_sph, sph_file_path, "A", "A")
+    sphere_hashes = [
+        get_hexdigest_of_persistent_md5_hash_of_tuple((sphere.index, sphere.X, sphere.Y, sphere.Z, sphere.radius, sphere.atomnum, sphere.critical_cluster, sphere.sphere_color))
+        for sphere in old_spheres
+    ]
+    seed = get_hexdigest_of_persistent_md5_hash_of_tuple(tuple(sphere_hashes + ["matching_spheres.sph", max_deviation]))
+    random.seed(seed)
+    old_perturbed_spheres = []
+    for sphere in old_spheres:
+        new_sphere = copy.deepcopy(sphere)
+        perturbation_xyz = tuple([random.uniform(-max_deviation, max_deviation) for _ in range(3)])
+        new_sphere.X += perturbation_xyz[0]
+        new_sphere.Y += perturbation_xyz[1]
+        new_sphere.Z += perturbation_xyz[2]
+        old_perturbed_spheres.append(new_sphere)
+    legacy_sph_lib.write_sph(str(tmp_path / "old.sph"), old_perturbed_spheres)
+
+    #
+    spheres = sph_lib.SphereSet.read(sph_file_path, "A", "A")
+    assert spheres.get_hexdigests() == sphere_hashes
+    spheres.get_perturbed(max_deviation, random.Random(seed)).write(str(tmp_path / "new.sph"))
+    with open(tmp_path / "old.sph") as f, open(tmp_path / "new.sph") as g:
+        assert f.read() == g.read()
+
+
+def test_thin_spheres_matches_legacy():
+    rng = random.Random(0)
+    lines = []
+    for _ in range(3000):
+        prefix = ("ALA %5s%s" % (rng.randint(1, 9999), rng.choice(["", "A"]))).ljust(13)  # incl. odd chain ID placement
+        x, y, z = rng.uniform(-99, 99), rng.uniform(-99, 99), rng.uniform(-99, 99)
+        normal = [rng.uniform(-1, 1) for _ in range(3)]
+        lines.append(prefix + "%8.3f%9.3f%9.3f" % (x, y, z) + " " + rng.choice("SA") + "C0" + "%7.3f%7.3f%7.3f%7.3f" % (*normal, 0.5) + "\n")
+    old_f, new_f = io.StringIO(), io.StringIO()
+    legacy_thin_spheres.thin_spheres(iter(lines), old_f, 1.8, 2.0)
+    thin_spheres.thin_spheres(iter(lines), new_f, 1.8, 2.0)
+    assert new_f.getvalue() == old_f.getvalue()
+    assert new_f.getvalue().count("\n") > 1000